@@ -7,5 +7,7 @@ API路由包初始化模块。
 """
 
 from .weather import router as weather_router
+from .admin import router as admin_router
+from .alerts import router as alerts_router
 
-__all__ = ["weather_router"] 
\ No newline at end of file
+__all__ = ["weather_router", "admin_router", "alerts_router"] 
\ No newline at end of file
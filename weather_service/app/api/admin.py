@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+管理API路由模块。
+提供缓存统计、定向失效、数据导出、原始响应查阅、城市目录和气候基准重载等运维接口。
+"""
+
+import os
+import logging
+import secrets
+from datetime import datetime
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_read_db, ReadSessionLocal
+from ..services import cache, city_catalog, climate_baselines
+from ..services.export_service import EXPORT_FORMATS, check_export, export_stream, export_filename
+from ..services.payload_archive import list_payloads, load_payload, archive_stats
+
+# 加载环境变量
+load_dotenv()
+
+# 管理接口令牌，未配置时拒绝所有管理请求
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    依赖注入：校验管理接口令牌。
+
+    Args:
+        x_admin_token: 请求头X-Admin-Token中的令牌
+
+    Raises:
+        HTTPException: 未配置ADMIN_TOKEN或令牌不匹配时抛出
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="未配置管理令牌，管理接口已禁用"
+        )
+    if not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理令牌无效"
+        )
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    namespace: Optional[str] = Query(None, description="只统计指定命名空间"),
+    top: int = Query(10, ge=0, le=100, description="每个命名空间返回的热门键数量")
+):
+    """
+    获取缓存统计信息。
+
+    Args:
+        namespace: 命名空间（current、forecast、viz_temp、viz_dashboard等）
+        top: 每个命名空间返回的热门键数量
+
+    Returns:
+        Dict: 总体及各命名空间的命中、未命中、淘汰、过期、条目大小、年龄分布和热门键
+    """
+    return cache.stats(namespace=namespace, top_n=top)
+
+
+@router.delete("/cache")
+async def invalidate_cache(
+    namespace: Optional[str] = Query(None, description="要失效的命名空间"),
+    city: Optional[str] = Query(None, description="要失效的城市")
+):
+    """
+    按命名空间和/或城市定向失效缓存，均不指定时清空全部缓存。
+
+    Args:
+        namespace: 命名空间
+        city: 城市名称
+
+    Returns:
+        Dict: 删除的条目数
+    """
+    removed = cache.invalidate(namespace=namespace, city=city)
+    logger.info(f"缓存失效: 命名空间={namespace}, 城市={city}, 删除条目={removed}")
+    return {"namespace": namespace, "city": city, "removed": removed}
+
+
+@router.post("/cities/reload")
+async def reload_city_catalog(db: AsyncSession = Depends(get_read_db)):
+    """
+    从数据库重新加载城市目录，导入新的城市数据后调用。
+
+    Args:
+        db: 只读数据库会话
+
+    Returns:
+        Dict: 加载的城市数
+    """
+    count = await city_catalog.load(db)
+    return {"cities": count}
+
+
+@router.post("/climate/reload")
+async def reload_climate_baselines(db: AsyncSession = Depends(get_read_db)):
+    """
+    从数据库重新加载气候基准，并使已缓存的天气预报失效，重新计算气候基准后调用。
+
+    Args:
+        db: 只读数据库会话
+
+    Returns:
+        Dict: 有基准的城市数和失效的预报缓存条目数
+    """
+    count = await climate_baselines.load(db)
+    removed = cache.invalidate(namespace="forecast")
+    return {"cities": count, "invalidated": removed}
+
+
+@router.get("/export/{dataset}")
+async def export_data(
+    dataset: str,
+    format: str = Query("csv", description="导出格式：csv、ndjson或parquet"),
+    start: Optional[datetime] = Query(None, description="起始时间（含，UTC）"),
+    end: Optional[datetime] = Query(None, description="结束时间（不含，UTC）"),
+    gzip: bool = Query(False, description="是否gzip压缩"),
+):
+    """
+    流式导出查询历史或观测数据，数据按时间升序分块读取和输出。
+
+    响应体在处理函数返回后才开始生成，只读会话在生成器内打开并在输出结束后关闭，
+    不使用请求依赖注入的会话（依赖的清理可能早于响应体发送）。
+
+    Args:
+        dataset: 数据集名称（history或observations）
+        format: 导出格式
+        start: 起始时间
+        end: 结束时间
+        gzip: 是否gzip压缩
+
+    Returns:
+        StreamingResponse: 导出文件下载响应
+
+    Raises:
+        HTTPException: 数据集或格式不支持时抛出
+    """
+    try:
+        check_export(dataset, format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def stream():
+        async with ReadSessionLocal() as session:
+            async for data in export_stream(session, dataset, format, start=start, end=end, gzip=gzip):
+                yield data
+
+    media_type = "application/gzip" if gzip else EXPORT_FORMATS[format][0]
+    filename = export_filename(dataset, format, gzip)
+    logger.info(f"导出数据: 数据集={dataset}, 格式={format}, 起始={start}, 结束={end}, gzip={gzip}")
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/payloads")
+async def get_archived_payloads(
+    kind: Optional[str] = Query(None, description="响应类型：current或forecast"),
+    city_id: Optional[int] = Query(None, description="第三方API中的城市ID"),
+    start: Optional[datetime] = Query(None, description="起始获取时间（含，UTC）"),
+    end: Optional[datetime] = Query(None, description="结束获取时间（不含，UTC）"),
+    limit: int = Query(100, ge=1, le=1000, description="最多返回的条数"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    按获取时间倒序列出已归档的第三方API原始响应，只返回元数据，不解压。
+
+    Args:
+        kind: 响应类型
+        city_id: 第三方API中的城市ID
+        start: 起始获取时间
+        end: 结束获取时间
+        limit: 最多返回的条数
+        db: 只读数据库会话
+
+    Returns:
+        List[Dict]: 内容哈希、类型、城市ID、获取时间、压缩算法、原始和压缩后字节数
+    """
+    return await list_payloads(db, kind=kind, city_external_id=city_id,
+                               start=start, end=end, limit=limit)
+
+
+@router.get("/payloads/stats")
+async def get_archive_stats(db: AsyncSession = Depends(get_read_db)):
+    """
+    获取原始响应归档的条数和压缩率。
+
+    Args:
+        db: 只读数据库会话
+
+    Returns:
+        Dict: 当前压缩算法、字典和按类型的统计
+    """
+    return await archive_stats(db)
+
+
+@router.get("/payloads/{sha256}")
+async def get_archived_payload(sha256: str, db: AsyncSession = Depends(get_read_db)):
+    """
+    按内容哈希读取并解压一个已归档的原始响应。
+
+    Args:
+        sha256: 内容哈希
+        db: 只读数据库会话
+
+    Returns:
+        Dict: 第三方API原始响应
+
+    Raises:
+        HTTPException: 响应不存在时抛出
+    """
+    payload = await load_payload(db, sha256)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"原始响应'{sha256}'不存在")
+    return payload
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预警API路由模块。
+提供阈值预警规则的创建、查询和删除，以及触发通知的查询接口。
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db, get_read_db
+from ..models import AlertRule, AlertNotification
+from ..models.schemas import (
+    AlertRuleCreate, AlertRule as AlertRuleSchema, AlertNotification as AlertNotificationSchema
+)
+from ..services.alert_service import alert_engine, alert_writer, create_rule, delete_rule
+from ..services.weather_service import WeatherService
+from .weather import get_weather_service
+
+router = APIRouter(
+    prefix="/alerts",
+    tags=["alerts"],
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+@router.post("/rules", response_model=AlertRuleSchema, status_code=201)
+async def create_alert_rule(
+    request: AlertRuleCreate,
+    db: AsyncSession = Depends(get_db),
+    weather_service: WeatherService = Depends(get_weather_service)
+):
+    """
+    创建预警规则，城市的预报之后每次刷新时检查该规则。
+
+    Args:
+        request: 订阅者、城市、指标、比较方式、阈值和检查天数
+        db: 数据库会话
+        weather_service: 天气服务实例
+
+    Returns:
+        AlertRuleSchema: 保存后的规则
+    """
+    # 通过预报确认城市存在并确定城市键（优先使用缓存）
+    forecast = await weather_service.get_compact_forecast(request.city)
+    try:
+        return await create_rule(db, request.subscriber, forecast, request.metric, request.operator,
+                                 request.threshold, request.horizon_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/rules", response_model=List[AlertRuleSchema])
+async def list_alert_rules(
+    subscriber: str = Query(..., description="订阅者标识"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    获取订阅者的全部预警规则。
+
+    Args:
+        subscriber: 订阅者标识
+        db: 数据库会话
+
+    Returns:
+        List[AlertRuleSchema]: 按创建顺序排列的规则
+    """
+    result = await db.execute(
+        select(AlertRule).where(AlertRule.subscriber == subscriber).order_by(AlertRule.id)
+    )
+    return result.scalars().all()
+
+
+@router.delete("/rules/{rule_id}")
+async def delete_alert_rule(
+    rule_id: int,
+    subscriber: str = Query(..., description="订阅者标识"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    删除订阅者自己的预警规则，规则不存在或属于其他订阅者时都返回404。
+
+    Args:
+        rule_id: 规则ID
+        subscriber: 订阅者标识
+        db: 数据库会话
+
+    Returns:
+        dict: 删除结果
+    """
+    if not await delete_rule(db, rule_id, subscriber):
+        raise HTTPException(status_code=404, detail=f"预警规则{rule_id}不存在")
+    return {"deleted": rule_id}
+
+
+@router.get("/notifications", response_model=List[AlertNotificationSchema])
+async def list_alert_notifications(
+    subscriber: str = Query(..., description="订阅者标识"),
+    since: Optional[datetime] = Query(None, description="只返回该时间之后的通知（UTC）"),
+    limit: int = Query(50, ge=1, le=500, description="最多返回的通知数"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    获取订阅者的预警通知，最新的在前。通知由后台批量写入，触发后可能有约一秒的延迟。
+
+    Args:
+        subscriber: 订阅者标识
+        since: 只返回该时间之后的通知
+        limit: 最多返回的通知数
+        db: 数据库会话
+
+    Returns:
+        List[AlertNotificationSchema]: 通知列表
+    """
+    query = select(AlertNotification).where(AlertNotification.subscriber == subscriber)
+    if since is not None:
+        query = query.where(AlertNotification.created_at > since)
+    result = await db.execute(
+        query.order_by(AlertNotification.created_at.desc(), AlertNotification.id.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
+
+@router.get("/stats")
+async def get_alert_stats():
+    """
+    获取预警引擎统计。
+
+    Returns:
+        dict: 规则数、城市数、规则组数、检查次数、候选规则数、触发和被去重的通知数，以及通知队列状态
+    """
+    return {**alert_engine.summary(), "queue": {"pending": alert_writer.pending, **alert_writer.stats}}
@@ -7,23 +7,44 @@
 """
 
 from typing import List, Dict, Any, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from datetime import datetime, date
+import asyncio
+import base64
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, insert
 import logging
 import traceback
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import City, WeatherRecord, QueryHistory
 from ..models.schemas import (
     WeatherResponse, WeatherForecastResponse, WeatherForecastDay, 
+    ObservationSeriesResponse, ObservationStatisticsResponse, QueryHistoryPage, CitySuggestion,
+    NearbyCity, WeatherGridResponse, TrendingResponse,
+    ResampledForecastResponse, ResampleBatchRequest, ResampleBatchResponse,
+    ForecastCompareRequest, ForecastComparisonResponse,
     QueryHistory as QueryHistorySchema
 )
 from ..services import (
-    weather_service, cached, visualization_service
+    weather_service, cache, cached, render_pool, history_writer, city_catalog,
+    trending_tracker, climate_baselines
 )
-from app.services.weather_service import WeatherService
+from ..services.observation_service import find_city, query_observations
+from ..services.grid_service import build_grid
+from ..services.forecast_resample import resampled_response, resample_cities
+from ..services.forecast_compare import compare_forecasts
+from ..services.forecast_indices import current_indices
+from ..services.stats_service import (
+    observation_statistics, parse_metrics, parse_percentiles, STATS_BASE_TEMPERATURE
+)
+from ..services.history_service import query_history_page, history_buffer
+from ..services.render_pool import RenderQueueFull, RenderTimeout
+from ..services.cache_service import CACHE_TTL
+from ..services.visualization_service import IMAGE_FORMATS, negotiate_image_format, etag_matches
+from ..utils.time_buckets import naive_utc
+from app.services.weather_service import WeatherService, CHINESE_CITY_MAP
 
 
 router = APIRouter(
@@ -45,11 +66,55 @@ def get_weather_service():
     return WeatherService()
 
 
+@cached("current_weather_", namespace="current")
+async def _build_current_weather(
+    city: str,
+    weather_service: WeatherService
+) -> Dict[str, Any]:
+    """
+    获取并整理指定城市的当前天气响应数据（结果按城市缓存）。
+    
+    Args:
+        city: 城市名称
+        weather_service: 天气服务实例
+        
+    Returns:
+        Dict[str, Any]: 当前天气响应数据
+    """
+    # 调用天气服务获取数据
+    weather_data = await weather_service.get_current_weather(city)
+    logger.info(f"成功获取{city}的天气数据")
+    
+    # 准备响应数据
+    current_weather = {
+        "temperature": weather_data["main"]["temp"],
+        "humidity": weather_data["main"]["humidity"],
+        "pressure": weather_data["main"]["pressure"],
+        "wind_speed": weather_data["wind"]["speed"],
+        "wind_direction": weather_data["wind"]["deg"],
+        "weather_description": weather_data["weather"][0]["description"],
+        "weather_icon": weather_data["weather"][0]["icon"]
+    }
+    # 体感温度、露点、舒适度等派生指标，随当前天气一同缓存
+    current_weather.update(current_indices(
+        current_weather["temperature"], current_weather["humidity"], current_weather["wind_speed"]
+    ))
+    
+    return {
+        "city": weather_data["name"],
+        "country": weather_data["sys"]["country"],
+        "coordinates": {
+            "lat": weather_data["coord"]["lat"],
+            "lon": weather_data["coord"]["lon"]
+        },
+        "current_weather": current_weather,
+        "timestamp": datetime.fromtimestamp(weather_data["dt"])
+    }
+
+
 @router.get("/current/{city}", response_model=WeatherResponse)
-@cached("current_weather_")
 async def get_current_weather(
     city: str, 
-    db: AsyncSession = Depends(get_db),
     request: Request = None,
     weather_service: WeatherService = Depends(get_weather_service)
 ):
@@ -58,7 +123,6 @@ async def get_current_weather(
     
     Args:
         city: 城市名称
-        db: 数据库会话
         request: 请求对象
         weather_service: 天气服务实例
         
@@ -69,40 +133,15 @@ async def get_current_weather(
     logger.info(f"收到查询当前天气请求: 城市={city}, 客户端IP={client_ip}")
     
     try:
-        # 调用天气服务获取数据
-        weather_data = await weather_service.get_current_weather(city)
-        logger.info(f"成功获取{city}的天气数据")
-        
-        # 记录查询历史
-        query_history = QueryHistory(
-            city_name=city,
-            query_time=datetime.utcnow(),
-            ip_address=client_ip
+        # 获取天气数据（命中缓存时不会请求第三方API）
+        response = await _build_current_weather(
+            city=city, weather_service=weather_service
         )
-        db.add(query_history)
-        await db.commit()
         
-        # 准备响应数据
-        current_weather = {
-            "temperature": weather_data["main"]["temp"],
-            "humidity": weather_data["main"]["humidity"],
-            "pressure": weather_data["main"]["pressure"],
-            "wind_speed": weather_data["wind"]["speed"],
-            "wind_direction": weather_data["wind"]["deg"],
-            "weather_description": weather_data["weather"][0]["description"],
-            "weather_icon": weather_data["weather"][0]["icon"]
-        }
+        # 记录查询历史（缓存命中时同样记录，后台批量写入，不等待数据库）
+        await history_writer.record(city_name=city, ip_address=client_ip)
         
-        return {
-            "city": weather_data["name"],
-            "country": weather_data["sys"]["country"],
-            "coordinates": {
-                "lat": weather_data["coord"]["lat"],
-                "lon": weather_data["coord"]["lon"]
-            },
-            "current_weather": current_weather,
-            "timestamp": datetime.fromtimestamp(weather_data["dt"])
-        }
+        return response
     except HTTPException as e:
         # 记录请求失败
         logger.error(f"获取'{city}'的当前天气数据失败: {e.detail}")
@@ -128,12 +167,58 @@ async def get_current_weather(
         )
 
 
+@cached("forecast_", namespace="forecast")
+async def _build_weather_forecast(
+    city: str,
+    days: int,
+    weather_service: WeatherService
+) -> Dict[str, Any]:
+    """
+    获取并按天汇总指定城市的天气预报（结果按城市和天数缓存）。
+    
+    Args:
+        city: 城市名称
+        days: 预报天数
+        weather_service: 天气服务实例
+        
+    Returns:
+        Dict[str, Any]: 天气预报响应数据
+    """
+    # 按城市当地日期汇总的每日预报（每份预报只汇总一次）
+    forecast_data = await weather_service.get_daily_forecast(city, days)
+    city_info = forecast_data["city"]
+    
+    forecast = [
+        WeatherForecastDay(
+            date=day["date"],
+            min_temp=day["min_temp"],
+            max_temp=day["max_temp"],
+            mean_temp=day["mean_temp"],
+            humidity=day["humidity"],
+            precipitation=day["precipitation"],
+            pop_max=day["pop_max"],
+            wind_speed_max=day["wind_speed_max"],
+            weather_description=day["weather_description"],
+            weather_icon=day["weather_icon"],
+            # 体感温度、露点、舒适度等派生指标（随预报缓存，每份预报只计算一次）
+            **indices,
+            # 日平均温度与预先计算的常年同期基准比较
+            anomaly=climate_baselines.anomaly(city_info, date.fromisoformat(day["date"]), day["mean_temp"])
+        )
+        for day, indices in zip(forecast_data["daily"], forecast_data["indices"])
+    ]
+    
+    return {
+        "city": city_info["name"],
+        "country": city_info["country"],
+        "forecast": forecast
+    }
+
+
 @router.get("/forecast/{city}", response_model=WeatherForecastResponse)
-@cached("forecast_")
 async def get_weather_forecast(
     city: str, 
     days: int = Query(5, ge=1, le=5, description="预报天数，最多5天"),
-    db: AsyncSession = Depends(get_db),
     request: Request = None,
     weather_service: WeatherService = Depends(get_weather_service)
 ):
@@ -143,7 +228,6 @@ async def get_weather_forecast(
     Args:
         city: 城市名称
         days: 预报天数，默认5天，最多5天
-        db: 数据库会话
         request: 请求对象
         weather_service: 天气服务实例
         
@@ -154,79 +238,15 @@ async def get_weather_forecast(
     logger.info(f"收到查询天气预报请求: 城市={city}, 天数={days}, 客户端IP={client_ip}")
     
     try:
-        # 调用天气服务获取数据
-        forecast_data = await weather_service.get_weather_forecast(city, days)
-        
-        # 记录查询历史
-        query_history = QueryHistory(
-            city_name=city,
-            query_time=datetime.utcnow(),
-            ip_address=client_ip
+        # 整理预报数据（命中缓存时不会请求第三方API）
+        response = await _build_weather_forecast(
+            city=city, days=days, weather_service=weather_service
         )
-        db.add(query_history)
-        await db.commit()
-        
-        # 处理预报数据
-        forecast_list = forecast_data["list"]
-        
-        # 按天分组
-        daily_forecasts = {}
-        for item in forecast_list:
-            # 提取日期（只保留年月日）
-            date_str = datetime.fromtimestamp(item["dt"]).strftime("%Y-%m-%d")
-            
-            if date_str not in daily_forecasts:
-                daily_forecasts[date_str] = {
-                    "min_temp": float('inf'),
-                    "max_temp": float('-inf'),
-                    "humidity": [],
-                    "weather_descriptions": [],
-                    "weather_icons": []
-                }
-            
-            daily_forecasts[date_str]["min_temp"] = min(
-                daily_forecasts[date_str]["min_temp"], 
-                item["main"]["temp_min"]
-            )
-            daily_forecasts[date_str]["max_temp"] = max(
-                daily_forecasts[date_str]["max_temp"], 
-                item["main"]["temp_max"]
-            )
-            daily_forecasts[date_str]["humidity"].append(item["main"]["humidity"])
-            daily_forecasts[date_str]["weather_descriptions"].append(
-                item["weather"][0]["description"]
-            )
-            daily_forecasts[date_str]["weather_icons"].append(
-                item["weather"][0]["icon"]
-            )
-        
-        # 转换为响应格式
-        forecast = []
-        for date_str, data in daily_forecasts.items():
-            # 选择出现次数最多的天气描述和图标
-            from collections import Counter
-            descriptions_counter = Counter(data["weather_descriptions"])
-            icons_counter = Counter(data["weather_icons"])
-            
-            forecast.append(
-                WeatherForecastDay(
-                    date=date_str,
-                    min_temp=data["min_temp"],
-                    max_temp=data["max_temp"],
-                    humidity=sum(data["humidity"]) / len(data["humidity"]),
-                    weather_description=descriptions_counter.most_common(1)[0][0],
-                    weather_icon=icons_counter.most_common(1)[0][0]
-                )
-            )
         
-        # 按日期排序
-        forecast.sort(key=lambda x: x.date)
+        # 记录查询历史（缓存命中时同样记录，后台批量写入，不等待数据库）
+        await history_writer.record(city_name=city, ip_address=client_ip)
         
-        return {
-            "city": forecast_data["city"]["name"],
-            "country": forecast_data["city"]["country"],
-            "forecast": forecast[:days]  # 限制天数
-        }
+        return response
     except HTTPException as e:
         # 记录请求失败
         logger.error(f"获取'{city}'的天气预报数据失败: {e.detail}")
@@ -252,6 +272,85 @@ async def get_weather_forecast(
         )
 
 
+@router.get("/forecast/{city}/resampled", response_model=ResampledForecastResponse)
+async def get_resampled_forecast(
+    city: str,
+    interval: str = Query("1h", description="时间间隔，如1h、30m，最小5分钟"),
+    times: Optional[str] = Query(None, description="逗号分隔的时间点（ISO格式或Unix时间戳，无时区时按UTC），指定后忽略interval"),
+    weather_service: WeatherService = Depends(get_weather_service)
+):
+    """
+    将缓存的3小时预报插值到指定时间间隔或时间点。
+    
+    温度、气压等线性插值，风向按单位向量插值；按间隔的结果随预报一同缓存。
+    
+    Args:
+        city: 城市名称
+        interval: 时间间隔
+        times: 逗号分隔的时间点
+        weather_service: 天气服务实例
+        
+    Returns:
+        ResampledForecastResponse: 重采样预报
+    """
+    forecast = await weather_service.get_compact_forecast(city)
+    try:
+        return resampled_response(
+            forecast, interval, [value for value in times.split(",") if value.strip()] if times else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/forecast/resampled", response_model=ResampleBatchResponse)
+async def resample_forecasts(
+    request: ResampleBatchRequest,
+    weather_service: WeatherService = Depends(get_weather_service)
+):
+    """
+    批量重采样多个城市的预报，各城市的预报并发获取（优先使用缓存），单个城市失败时在结果中返回错误。
+    
+    Args:
+        request: 城市列表和时间间隔或时间点
+        weather_service: 天气服务实例
+        
+    Returns:
+        ResampleBatchResponse: 按请求顺序排列的每个城市的结果
+    """
+    try:
+        results = await resample_cities(
+            request.cities, weather_service.get_compact_forecast, request.interval, request.times
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results}
+
+
+@router.post("/forecast/compare", response_model=ForecastComparisonResponse)
+async def compare_city_forecasts(
+    request: ForecastCompareRequest,
+    weather_service: WeatherService = Depends(get_weather_service)
+):
+    """
+    对比多个城市的每日预报，返回（城市×日期）矩阵、按天的排名和跨城市/跨日期统计。
+    
+    缓存中没有的城市并发获取，单个城市失败时在errors中返回原因。
+    
+    Args:
+        request: 城市列表、天数和对比指标
+        weather_service: 天气服务实例
+        
+    Returns:
+        ForecastComparisonResponse: 对比矩阵
+    """
+    try:
+        return await compare_forecasts(
+            request.cities, weather_service.get_compact_forecast, request.days, request.metrics
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/visualization/temperature/{city}")
 @cached("viz_temp_")
 async def get_temperature_chart(
@@ -261,6 +360,7 @@ async def get_temperature_chart(
 ):
     """
     获取指定城市的温度趋势图。
+    图表在渲染进程池中生成，渲染任务已满时返回503，渲染超时返回504。
     
     Args:
         city: 城市名称
@@ -271,58 +371,23 @@ async def get_temperature_chart(
         Dict: 包含Base64编码图像的响应
     """
     try:
-        # 获取天气预报数据
-        forecast_data = await weather_service.get_weather_forecast(city, days)
-        
-        # 处理预报数据
-        forecast_list = forecast_data["list"]
-        
-        # 按天分组
-        daily_forecasts = {}
-        for item in forecast_list:
-            # 提取日期（只保留年月日）
-            date_str = datetime.fromtimestamp(item["dt"]).strftime("%Y-%m-%d")
-            
-            if date_str not in daily_forecasts:
-                daily_forecasts[date_str] = {
-                    "min_temp": float('inf'),
-                    "max_temp": float('-inf'),
-                    "humidity": [],
-                }
-            
-            daily_forecasts[date_str]["min_temp"] = min(
-                daily_forecasts[date_str]["min_temp"], 
-                item["main"]["temp_min"]
-            )
-            daily_forecasts[date_str]["max_temp"] = max(
-                daily_forecasts[date_str]["max_temp"], 
-                item["main"]["temp_max"]
-            )
-            daily_forecasts[date_str]["humidity"].append(item["main"]["humidity"])
-        
-        # 转换为可视化服务需要的格式
-        viz_data = []
-        for date_str, data in daily_forecasts.items():
-            viz_data.append({
-                "date": date_str,
-                "min_temp": data["min_temp"],
-                "max_temp": data["max_temp"],
-                "humidity": sum(data["humidity"]) / len(data["humidity"])
-            })
-        
-        # 按日期排序
-        viz_data.sort(key=lambda x: x["date"])
+        # 按城市当地日期汇总的每日预报
+        forecast_data = await weather_service.get_daily_forecast(city, days)
         
-        # 生成图表
-        chart_data = visualization_service.generate_temperature_chart(
-            viz_data[:days], forecast_data["city"]["name"]
+        # 在渲染进程中生成图表，不阻塞事件循环
+        image_png = await render_pool.render(
+            "temperature", forecast_data["daily"], forecast_data["city"]["name"]
         )
         
         return {
             "city": forecast_data["city"]["name"],
             "country": forecast_data["city"]["country"],
-            "chart": chart_data
+            "chart": base64.b64encode(image_png).decode("utf-8")
         }
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成温度趋势图失败: {str(e)}")
 
@@ -336,6 +401,7 @@ async def get_weather_dashboard(
 ):
     """
     获取指定城市的天气仪表板。
+    图表在渲染进程池中生成，渲染任务已满时返回503，渲染超时返回504。
     
     Args:
         city: 城市名称
@@ -346,86 +412,467 @@ async def get_weather_dashboard(
         Dict: 包含Base64编码图像的响应
     """
     try:
-        # 获取天气预报数据
-        forecast_data = await weather_service.get_weather_forecast(city, days)
+        # 按城市当地日期汇总的每日预报
+        forecast_data = await weather_service.get_daily_forecast(city, days)
         
-        # 处理预报数据
-        forecast_list = forecast_data["list"]
+        # 在渲染进程中生成图表，不阻塞事件循环
+        image_png = await render_pool.render(
+            "dashboard", forecast_data["daily"], forecast_data["city"]["name"]
+        )
         
-        # 按天分组
-        daily_forecasts = {}
-        for item in forecast_list:
-            # 提取日期（只保留年月日）
-            date_str = datetime.fromtimestamp(item["dt"]).strftime("%Y-%m-%d")
-            
-            if date_str not in daily_forecasts:
-                daily_forecasts[date_str] = {
-                    "min_temp": float('inf'),
-                    "max_temp": float('-inf'),
-                    "humidity": [],
-                }
-            
-            daily_forecasts[date_str]["min_temp"] = min(
-                daily_forecasts[date_str]["min_temp"], 
-                item["main"]["temp_min"]
-            )
-            daily_forecasts[date_str]["max_temp"] = max(
-                daily_forecasts[date_str]["max_temp"], 
-                item["main"]["temp_max"]
+        return {
+            "city": forecast_data["city"]["name"],
+            "country": forecast_data["city"]["country"],
+            "dashboard": base64.b64encode(image_png).decode("utf-8")
+        }
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"生成天气仪表板失败: {str(e)}")
+
+
+async def chart_image(kind: str, city: str, days: int, image_format: Optional[str],
+                      request: Request) -> Response:
+    """
+    生成图表的二进制图像响应，按城市、天数和格式分别缓存。
+
+    Args:
+        kind: 图表类型（temperature、dashboard）
+        city: 城市名称
+        days: 预报天数
+        image_format: format参数，未指定时按Accept请求头选择
+        request: 请求对象
+
+    Returns:
+        Response: 图像响应，带ETag和Cache-Control；If-None-Match匹配时返回304
+
+    Raises:
+        HTTPException: 格式不支持时为400，没有可接受的图像类型时为406，渲染任务已满时为503，
+            渲染超时时为504，其他渲染错误为500
+    """
+    try:
+        image_format = negotiate_image_format(image_format, request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if image_format is None:
+        raise HTTPException(status_code=406, detail=f"可用的图像类型: {', '.join(IMAGE_FORMATS.values())}")
+
+    cache_key = f"viz_image_{kind}_{city}_days:{days}_{image_format}"
+    image = cache.get(cache_key, namespace="viz_image")
+    if image is None:
+        forecast_data = await weather_service.get_daily_forecast(city, days)
+        try:
+            content = await render_pool.render(
+                kind, forecast_data["daily"], forecast_data["city"]["name"], image_format
             )
-            daily_forecasts[date_str]["humidity"].append(item["main"]["humidity"])
+        except RenderQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except RenderTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"生成图表图像失败: {str(e)}")
+        image = {"content": content, "etag": f'"{hashlib.sha1(content).hexdigest()}"'}
+        cache.set(cache_key, image, namespace="viz_image", city=city)
+
+    headers = {"ETag": image["etag"], "Cache-Control": f"public, max-age={CACHE_TTL}", "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), image["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image["content"], media_type=IMAGE_FORMATS[image_format], headers=headers)
+
+
+@router.get("/visualization/temperature/{city}/image", response_class=Response)
+async def get_temperature_chart_image(
+    city: str,
+    request: Request,
+    days: int = Query(5, ge=1, le=5, description="预报天数，最多5天"),
+    format: Optional[str] = Query(None, description="图像格式（png、webp、svg），未指定时按Accept请求头选择")
+):
+    """
+    获取指定城市的温度趋势图图像，直接返回PNG、WebP或SVG数据，可被浏览器缓存。
+    
+    Args:
+        city: 城市名称
+        request: 请求对象
+        days: 预报天数，默认5天，最多5天
+        format: 图像格式
         
-        # 转换为可视化服务需要的格式
-        viz_data = []
-        for date_str, data in daily_forecasts.items():
-            viz_data.append({
-                "date": date_str,
-                "min_temp": data["min_temp"],
-                "max_temp": data["max_temp"],
-                "humidity": sum(data["humidity"]) / len(data["humidity"])
-            })
+    Returns:
+        Response: 图像响应
+    """
+    return await chart_image("temperature", city, days, format, request)
+
+
+@router.get("/visualization/dashboard/{city}/image", response_class=Response)
+async def get_weather_dashboard_image(
+    city: str,
+    request: Request,
+    days: int = Query(5, ge=1, le=5, description="预报天数，最多5天"),
+    format: Optional[str] = Query(None, description="图像格式（png、webp、svg），未指定时按Accept请求头选择")
+):
+    """
+    获取指定城市的天气仪表板图像，直接返回PNG、WebP或SVG数据，可被浏览器缓存。
+    
+    Args:
+        city: 城市名称
+        request: 请求对象
+        days: 预报天数，默认5天，最多5天
+        format: 图像格式
         
-        # 按日期排序
-        viz_data.sort(key=lambda x: x["date"])
+    Returns:
+        Response: 图像响应
+    """
+    return await chart_image("dashboard", city, days, format, request)
+
+
+@router.get("/cities/autocomplete", response_model=List[CitySuggestion])
+async def autocomplete_city(
+    q: str = Query(..., min_length=1, max_length=60, description="城市名称前缀（中文名、拼音或英文名）"),
+    limit: int = Query(10, ge=1, le=50, description="最多返回的城市数")
+):
+    """
+    城市名称自动补全，只查询本地城市目录，不请求第三方API。
+    
+    Args:
+        q: 城市名称前缀
+        limit: 最多返回的城市数
         
-        # 生成图表
-        dashboard_data = visualization_service.generate_weather_dashboard(
-            viz_data[:days], forecast_data["city"]["name"]
-        )
+    Returns:
+        List[CitySuggestion]: 完全匹配的城市在前，其余按人口从多到少排列
+    """
+    return city_catalog.search(q, limit=limit)
+
+
+async def _attach_current_weather(
+    cities: List[Dict[str, Any]],
+    weather_service: WeatherService
+) -> List[Dict[str, Any]]:
+    """
+    并发获取每个城市的当前天气（命中缓存时不请求第三方API），单个城市失败不影响其他城市。
+    
+    Args:
+        cities: 城市目录返回的城市列表
+        weather_service: 天气服务实例
+        
+    Returns:
+        List[Dict[str, Any]]: 添加了current_weather字段的城市列表
+    """
+    results = await asyncio.gather(
+        *[_build_current_weather(city=city["query"], weather_service=weather_service) for city in cities],
+        return_exceptions=True
+    )
+    for city, result in zip(cities, results):
+        if isinstance(result, Exception):
+            logger.warning(f"获取附近城市{city['query']}的天气失败: {result}")
+            result = None
+        city["current_weather"] = result["current_weather"] if result else None
+    return cities
+
+
+@router.get("/cities/nearest", response_model=List[NearbyCity])
+async def get_nearest_cities(
+    lat: float = Query(..., ge=-90, le=90, description="纬度"),
+    lon: float = Query(..., ge=-180, le=180, description="经度"),
+    k: int = Query(5, ge=1, le=20, description="返回的城市数"),
+    weather: bool = Query(True, description="是否附带每个城市的当前天气"),
+    weather_service: WeatherService = Depends(get_weather_service)
+):
+    """
+    查找离指定坐标最近的城市，使用城市目录的空间索引，不扫描数据库。
+    
+    Args:
+        lat: 纬度
+        lon: 经度
+        k: 返回的城市数
+        weather: 是否附带当前天气
+        weather_service: 天气服务实例
+        
+    Returns:
+        List[NearbyCity]: 按距离从近到远排列的城市
+    """
+    cities = city_catalog.nearest(lat, lon, k)
+    if weather:
+        cities = await _attach_current_weather(cities, weather_service)
+    return cities
+
+
+@router.get("/cities/within", response_model=List[NearbyCity])
+async def get_cities_within(
+    lat: float = Query(..., ge=-90, le=90, description="纬度"),
+    lon: float = Query(..., ge=-180, le=180, description="经度"),
+    radius_km: float = Query(50, gt=0, le=2000, description="半径(千米)"),
+    limit: int = Query(10, ge=1, le=20, description="最多返回的城市数"),
+    weather: bool = Query(True, description="是否附带每个城市的当前天气"),
+    weather_service: WeatherService = Depends(get_weather_service)
+):
+    """
+    查找指定坐标周围半径范围内的城市，使用城市目录的空间索引，不扫描数据库。
+    
+    Args:
+        lat: 纬度
+        lon: 经度
+        radius_km: 半径（千米）
+        limit: 最多返回的城市数
+        weather: 是否附带当前天气
+        weather_service: 天气服务实例
+        
+    Returns:
+        List[NearbyCity]: 按距离从近到远排列的城市
+    """
+    cities = city_catalog.within(lat, lon, radius_km, limit)
+    if weather:
+        cities = await _attach_current_weather(cities, weather_service)
+    return cities
+
+
+@router.get("/grid", response_model=WeatherGridResponse)
+async def get_weather_grid(
+    min_lat: float = Query(..., ge=-90, le=90, description="最小纬度"),
+    min_lon: float = Query(..., ge=-180, le=180, description="最小经度"),
+    max_lat: float = Query(..., ge=-90, le=90, description="最大纬度"),
+    max_lon: float = Query(..., ge=-180, le=180, description="最大经度"),
+    resolution: float = Query(0.25, gt=0, description="格点间距(度)"),
+    metric: str = Query("temperature", description="插值指标（temperature、humidity、pressure、wind_speed）"),
+    power: float = Query(2.0, gt=0, le=8, description="反距离加权的距离幂次"),
+    db: AsyncSession = Depends(get_read_db),
+    weather_service: WeatherService = Depends(get_weather_service)
+):
+    """
+    用范围内城市的观测插值生成规则网格，只为没有近期观测的城市请求天气（优先使用缓存）。
+    
+    Args:
+        min_lat: 最小纬度
+        min_lon: 最小经度
+        max_lat: 最大纬度
+        max_lon: 最大经度
+        resolution: 格点间距（度）
+        metric: 插值指标
+        power: 反距离加权的距离幂次
+        db: 数据库会话
+        weather_service: 天气服务实例
+        
+    Returns:
+        WeatherGridResponse: 网格坐标、插值结果和使用的站点
+    """
+    async def fetch_current(query: str) -> Dict[str, Any]:
+        response = await _build_current_weather(city=query, weather_service=weather_service)
+        return response["current_weather"]
+    
+    try:
+        grid = await build_grid(db, min_lat, min_lon, max_lat, max_lon, resolution, metric,
+                                fetch_current, power)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if grid is None:
+        raise HTTPException(status_code=404, detail="范围内没有可用的城市观测，请确认已导入城市目录")
+    return grid
+
+
+@router.get("/trending", response_model=TrendingResponse)
+async def get_trending_cities(
+    window: str = Query("hour", description="统计窗口：hour（最近一小时）或day（最近一天）"),
+    k: int = Query(10, ge=1, le=100, description="返回的城市数")
+):
+    """
+    获取统计窗口内查询次数最多的城市，由内存中的流式统计计算，不查询数据库。
+    
+    Args:
+        window: 统计窗口
+        k: 返回的城市数
         
+    Returns:
+        TrendingResponse: 窗口起止时间、总查询次数和热门城市
+    """
+    try:
+        return trending_tracker.top(window, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/observations/{city}", response_model=ObservationSeriesResponse)
+async def get_city_observations(
+    city: str,
+    start: Optional[datetime] = Query(None, description="起始观测时间（含，UTC）"),
+    end: Optional[datetime] = Query(None, description="结束观测时间（不含，UTC）"),
+    limit: int = Query(1000, ge=1, le=10000, description="最多返回的记录数"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    获取指定城市已保存的历史观测数据，不请求第三方API。
+    
+    Args:
+        city: 城市名称
+        start: 起始观测时间（含，UTC）
+        end: 结束观测时间（不含，UTC）
+        limit: 最多返回的记录数
+        db: 数据库会话
+        
+    Returns:
+        ObservationSeriesResponse: 按观测时间升序排列的观测记录
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="起始时间必须早于结束时间")
+    
+    try:
+        city_obj = await find_city(db, CHINESE_CITY_MAP.get(city, city))
+        if city_obj is None:
+            raise HTTPException(status_code=404, detail=f"城市'{city}'没有已保存的观测数据")
+        
+        records = await query_observations(db, city_obj.id, start, end, limit)
         return {
-            "city": forecast_data["city"]["name"],
-            "country": forecast_data["city"]["country"],
-            "dashboard": dashboard_data
+            "city": city_obj.name,
+            "country": city_obj.country,
+            "start": start,
+            "end": end,
+            "observations": records
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"生成天气仪表板失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"获取历史观测数据失败: {str(e)}")
+
+
+@router.get("/statistics/{city}", response_model=ObservationStatisticsResponse)
+async def get_city_statistics(
+    city: str,
+    start: Optional[datetime] = Query(None, description="起始观测时间（含，UTC）"),
+    end: Optional[datetime] = Query(None, description="结束观测时间（不含，UTC）"),
+    metrics: Optional[str] = Query(None, description="统计指标，逗号分隔（temperature、humidity、pressure、wind_speed），默认全部"),
+    percentiles: Optional[str] = Query(None, description="分位数（0-100），逗号分隔，默认10,50,90"),
+    rolling_days: int = Query(7, ge=1, le=365, description="滑动平均的窗口天数"),
+    base_temperature: float = Query(STATS_BASE_TEMPERATURE, description="度日数的基础温度(摄氏度)"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    统计指定城市已保存的观测数据，不请求第三方API。
+    
+    Args:
+        city: 城市名称
+        start: 起始观测时间（含，UTC）
+        end: 结束观测时间（不含，UTC）
+        metrics: 统计指标，逗号分隔
+        percentiles: 分位数，逗号分隔
+        rolling_days: 滑动平均的窗口天数
+        base_temperature: 度日数的基础温度
+        db: 数据库会话
+        
+    Returns:
+        ObservationStatisticsResponse: 每个指标的整体统计、日统计和滑动平均，以及度日数
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="起始时间必须早于结束时间")
+    try:
+        metric_names = parse_metrics(metrics)
+        percentile_values = parse_percentiles(percentiles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        city_obj = await find_city(db, CHINESE_CITY_MAP.get(city, city))
+        if city_obj is None:
+            raise HTTPException(status_code=404, detail=f"城市'{city}'没有已保存的观测数据")
+        
+        stats = await observation_statistics(
+            db, city_obj.id, metric_names, start, end, percentile_values,
+            rolling_days, base_temperature, city=city
+        )
+        return {
+            "city": city_obj.name,
+            "country": city_obj.country,
+            "start": start,
+            "end": end,
+            "rolling_days": rolling_days,
+            **stats
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"统计历史观测数据失败: {str(e)}")
 
 
 @router.get("/history", response_model=List[QueryHistorySchema])
 async def get_query_history(
     limit: int = Query(10, ge=1, le=100, description="查询历史记录数量限制"),
-    db: AsyncSession = Depends(get_db)
+    city: Optional[str] = Query(None, description="按城市名称过滤（精确匹配）"),
+    ip: Optional[str] = Query(None, description="按客户端IP过滤"),
+    start: Optional[datetime] = Query(None, description="起始查询时间（含，UTC）"),
+    end: Optional[datetime] = Query(None, description="结束查询时间（不含，UTC）"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取天气查询历史记录。
     
     Args:
         limit: 历史记录数量限制，默认10条，最多100条
+        city: 按城市名称过滤
+        ip: 按客户端IP过滤
+        start: 起始查询时间（含，UTC）
+        end: 结束查询时间（不含，UTC）
         db: 数据库会话
         
     Returns:
         List[QueryHistorySchema]: 查询历史记录列表
     """
+    # 带时区的时间统一转换为UTC，缓冲区和数据库使用相同的比较条件
+    start, end = naive_utc(start), naive_utc(end)
+    # 最近记录直接从内存缓冲区返回，缓冲区无法覆盖时才查询数据库
+    recent = history_buffer.recent(limit, city=city, ip_address=ip, start=start, end=end)
+    if recent is not None:
+        return recent
+    
     try:
         # 查询历史记录
-        result = await db.execute(
-            select(QueryHistory)
-            .order_by(QueryHistory.query_time.desc())
-            .limit(limit)
+        query_history, _ = await query_history_page(
+            db, limit=limit, city=city, ip_address=ip, start=start, end=end
         )
-        
-        query_history = result.scalars().all()
         return query_history
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取查询历史记录失败: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"获取查询历史记录失败: {str(e)}")
+
+
+@router.get("/history/page", response_model=QueryHistoryPage)
+async def get_query_history_page(
+    limit: int = Query(20, ge=1, le=100, description="每页记录数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
+    city: Optional[str] = Query(None, description="按城市名称过滤（精确匹配）"),
+    ip: Optional[str] = Query(None, description="按客户端IP过滤"),
+    start: Optional[datetime] = Query(None, description="起始查询时间（含，UTC）"),
+    end: Optional[datetime] = Query(None, description="结束查询时间（不含，UTC）"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    按查询时间倒序分页获取查询历史记录。
+    
+    使用游标分页，翻到任意深度每页的查询代价都只与每页记录数有关。
+    落在内存缓冲区内的页直接从缓冲区返回。
+    
+    Args:
+        limit: 每页记录数，默认20条，最多100条
+        cursor: 上一页返回的next_cursor，为空时返回第一页
+        city: 按城市名称过滤
+        ip: 按客户端IP过滤
+        start: 起始查询时间（含，UTC）
+        end: 结束查询时间（不含，UTC）
+        db: 数据库会话
+        
+    Returns:
+        QueryHistoryPage: 本页记录和下一页游标
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    try:
+        page = history_buffer.page(
+            limit, cursor=cursor, city=city, ip_address=ip, start=start, end=end
+        )
+        if page is None:
+            page = await query_history_page(
+                db, limit=limit, cursor=cursor, city=city, ip_address=ip, start=start, end=end
+            )
+        items, next_cursor = page
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取查询历史记录失败: {str(e)}")
+    return {"items": items, "next_cursor": next_cursor}
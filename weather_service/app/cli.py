@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+命令行工具模块。
+提供无需启动Web服务即可执行的维护任务。
+
+用法（在weather_service目录下运行）:
+    python -m app.cli retention --history-days 30 --observation-days 90
+    python -m app.cli export observations --format ndjson --gzip -o observations.ndjson.gz
+    python -m app.cli load-cities cities15000.zip
+    python -m app.cli climate-normals --csv daily_temperatures.csv
+    python -m app.cli train-payload-dict
+    python -m app.cli recompute forecast_daily --workers 8
+"""
+
+import sys
+import asyncio
+import argparse
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from .database import engine, read_engine, SessionLocal, ReadSessionLocal, init_schema
+from .services.city_catalog import load_geonames
+from .services.climate_service import (
+    build_climate_normals, CLIMATE_WINDOW_DAYS, CLIMATE_MIN_SAMPLES
+)
+from .services.export_service import (
+    EXPORT_DATASETS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, export_stream
+)
+from .services.payload_archive import payload_archive, PAYLOAD_DICT_SAMPLES, PAYLOAD_DICT_SIZE
+from .services.recompute_service import (
+    RECOMPUTE_JOBS, RECOMPUTE_CHUNK_SIZE, RECOMPUTE_WORKERS, run_recompute
+)
+from .services.retention_service import (
+    run_retention, RETENTION_HISTORY_DAYS, RETENTION_OBSERVATION_DAYS,
+    RETENTION_HOURLY_DAYS, RETENTION_BATCH_SIZE, RETENTION_BATCH_PAUSE
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+async def _init_db() -> None:
+    """创建尚不存在的数据表，并升级旧数据库的表结构。"""
+    await init_schema(engine)
+
+
+async def _dispose() -> None:
+    """关闭数据库连接。"""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+async def retention_command(args: argparse.Namespace) -> None:
+    """
+    执行一次数据汇总和清理，并输出每个数据源的结果。
+
+    Args:
+        args: 命令行参数
+    """
+    await _init_db()
+    report = await run_retention(
+        retention_days={
+            "query_history": args.history_days,
+            "weather_records": args.observation_days,
+        },
+        hourly_days=args.hourly_days,
+        batch_size=args.batch_size,
+        pause=args.pause,
+    )
+    for name, result in report.items():
+        print(f"{name}: 汇总进度={result['watermark']}, 小时汇总={result['rolled_up']}, "
+              f"清理原始数据={result['purged']}, 清理小时汇总={result['hourly_purged']}")
+
+    if args.vacuum and engine.dialect.name == "sqlite":
+        # VACUUM会锁住整个数据库，只在命令行中按需执行
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM"))
+        print("数据库文件已压缩")
+
+
+async def export_command(args: argparse.Namespace) -> None:
+    """
+    流式导出数据集到文件或标准输出。
+
+    Args:
+        args: 命令行参数
+    """
+    await _init_db()
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        async with ReadSessionLocal() as session:
+            stream = export_stream(session, args.dataset, args.format, start=args.start,
+                                   end=args.end, gzip=args.gzip, chunk_size=args.chunk_size)
+            async for data in stream:
+                output.write(data)
+                written += len(data)
+    finally:
+        if args.output:
+            output.close()
+    logger.info(f"导出{args.dataset}完成，共{written}字节")
+
+
+async def load_cities_command(args: argparse.Namespace) -> None:
+    """
+    从GeoNames数据文件导入城市目录。
+
+    Args:
+        args: 命令行参数
+    """
+    await _init_db()
+    count = await load_geonames(args.path, min_population=args.min_population,
+                                batch_size=args.batch_size)
+    print(f"已导入{count}个城市，运行中的服务需调用POST /admin/cities/reload重新加载目录")
+
+
+async def climate_normals_command(args: argparse.Namespace) -> None:
+    """
+    由已保存的观测数据或历史日平均气温CSV计算气候基准。
+
+    Args:
+        args: 命令行参数
+    """
+    await _init_db()
+    report = await build_climate_normals(csv_path=args.csv, window=args.window,
+                                         min_samples=args.min_samples)
+    print(f"日平均气温{report['days']}个，城市{report['cities']}个，写入基准{report['normals']}行，"
+          f"运行中的服务需调用POST /admin/climate/reload重新加载基准")
+
+
+async def train_payload_dict_command(args: argparse.Namespace) -> None:
+    """
+    用最近归档的原始响应训练压缩字典。
+
+    Args:
+        args: 命令行参数
+    """
+    await _init_db()
+    async with SessionLocal() as session:
+        dictionary_id = await payload_archive.train(session, samples=args.samples, size=args.size)
+        await session.commit()
+    print(f"已生成{payload_archive.codec}字典{dictionary_id}，运行中的服务重启后使用新字典压缩")
+
+
+def _print_progress(job: str, processed: int, total: int, elapsed: float) -> None:
+    """在标准错误的同一行刷新重新计算进度。"""
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    remaining = (total - processed) / rate if rate > 0 else 0.0
+    print(f"\r{job}: {processed}/{total}，{rate:.0f}行/秒，预计剩余{remaining:.0f}秒",
+          end="", file=sys.stderr, flush=True)
+
+
+async def recompute_command(args: argparse.Namespace) -> None:
+    """
+    用当前的计算规则重新计算归档数据的派生结果，中断后再次执行从断点继续。
+
+    Args:
+        args: 命令行参数
+    """
+    names = args.jobs or list(RECOMPUTE_JOBS)
+    unknown = [name for name in names if name not in RECOMPUTE_JOBS]
+    if unknown:
+        raise SystemExit(f"不支持的重新计算任务: {', '.join(unknown)}")
+    await _init_db()
+    for name in names:
+        result = (await run_recompute([name], workers=args.workers, chunk_size=args.chunk_size,
+                                      restart=args.restart, progress=_print_progress))[name]
+        print(file=sys.stderr)
+        print(f"{name}: 处理源数据{result['processed']}行，写入结果{result['written']}行")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    构建命令行参数解析器。
+
+    Returns:
+        argparse.ArgumentParser: 参数解析器
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="天气查询服务维护工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    retention = subparsers.add_parser("retention", help="汇总并清理过期的查询历史和观测数据")
+    retention.add_argument("--history-days", type=int, default=RETENTION_HISTORY_DAYS,
+                           help="查询历史原始数据保留天数，0表示不清理")
+    retention.add_argument("--observation-days", type=int, default=RETENTION_OBSERVATION_DAYS,
+                           help="观测原始数据保留天数，0表示不清理")
+    retention.add_argument("--hourly-days", type=int, default=RETENTION_HOURLY_DAYS,
+                           help="小时汇总保留天数，0表示不清理")
+    retention.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE,
+                           help="每批删除的行数")
+    retention.add_argument("--pause", type=float, default=RETENTION_BATCH_PAUSE,
+                           help="删除批次之间的等待时间（秒）")
+    retention.add_argument("--vacuum", action="store_true",
+                           help="清理后压缩SQLite数据库文件（期间阻塞写入）")
+    retention.set_defaults(handler=retention_command)
+
+    export = subparsers.add_parser("export", help="流式导出查询历史或观测数据")
+    export.add_argument("dataset", choices=sorted(EXPORT_DATASETS), help="数据集")
+    export.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv", help="导出格式")
+    export.add_argument("--start", type=datetime.fromisoformat, help="起始时间（含，UTC，ISO格式）")
+    export.add_argument("--end", type=datetime.fromisoformat, help="结束时间（不含，UTC，ISO格式）")
+    export.add_argument("--gzip", action="store_true", help="gzip压缩输出")
+    export.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE,
+                        help="每次从数据库读取的行数")
+    export.add_argument("-o", "--output", help="输出文件，默认输出到标准输出")
+    export.set_defaults(handler=export_command)
+
+    load_cities = subparsers.add_parser("load-cities", help="从GeoNames数据文件导入城市目录")
+    load_cities.add_argument("path", help="GeoNames城市数据文件（.txt、.gz或.zip，如cities15000.zip）")
+    load_cities.add_argument("--min-population", type=int, default=0, help="只导入人口不少于该值的城市")
+    load_cities.add_argument("--batch-size", type=int, default=2000, help="每批写入的城市数")
+    load_cities.set_defaults(handler=load_cities_command)
+
+    climate = subparsers.add_parser("climate-normals", help="计算每个城市每个日序的气温常年值")
+    climate.add_argument("--csv", help="历史日平均气温CSV（date、temperature列，以及external_id或city、country列），"
+                                       "默认使用已保存的观测数据")
+    climate.add_argument("--window", type=int, default=CLIMATE_WINDOW_DAYS,
+                         help="计算某日常年值时纳入前后各多少天的数据")
+    climate.add_argument("--min-samples", type=int, default=CLIMATE_MIN_SAMPLES,
+                         help="样本数少于该值的日序不生成基准")
+    climate.set_defaults(handler=climate_normals_command)
+
+    train = subparsers.add_parser("train-payload-dict", help="用最近归档的原始响应训练压缩字典")
+    train.add_argument("--samples", type=int, default=PAYLOAD_DICT_SAMPLES, help="最多使用的最近响应个数")
+    train.add_argument("--size", type=int, default=PAYLOAD_DICT_SIZE, help="字典大小（字节）")
+    train.set_defaults(handler=train_payload_dict_command)
+
+    recompute = subparsers.add_parser("recompute", help="并行重新计算归档预报的每日汇总和观测派生指标")
+    recompute.add_argument("jobs", nargs="*",
+                           help=f"任务（{'、'.join(sorted(RECOMPUTE_JOBS))}），默认全部执行")
+    recompute.add_argument("--workers", type=int, default=RECOMPUTE_WORKERS,
+                           help="计算进程数，0表示使用全部CPU核心，1表示不启动子进程")
+    recompute.add_argument("--chunk-size", type=int, default=RECOMPUTE_CHUNK_SIZE,
+                           help="每块读取的源数据行数")
+    recompute.add_argument("--restart", action="store_true", help="忽略断点，清空结果后从头计算")
+    recompute.set_defaults(handler=recompute_command)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    命令行入口。
+
+    Args:
+        argv: 命令行参数，默认使用sys.argv
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # development配置的SQL日志默认输出到标准输出，改为标准错误，避免混入导出内容
+    for handler in logging.getLogger("sqlalchemy.engine.Engine").handlers:
+        handler.setStream(sys.stderr)
+    args = build_parser().parse_args(argv)
+
+    async def run() -> None:
+        try:
+            await args.handler(args)
+        finally:
+            await _dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
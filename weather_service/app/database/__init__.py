@@ -6,6 +6,14 @@
 导出数据库相关的类和函数。
 """
 
-from .database import Base, get_db, engine
+from .database import (
+    Base, get_db, get_read_db, engine, read_engine, SessionLocal, ReadSessionLocal,
+    create_engines
+)
+from .migrations import init_schema, upgrade_schema
 
-__all__ = ["Base", "get_db", "engine"] 
\ No newline at end of file
+__all__ = [
+    "Base", "get_db", "get_read_db", "engine", "read_engine",
+    "SessionLocal", "ReadSessionLocal", "create_engines",
+    "init_schema", "upgrade_schema"
+] 
\ No newline at end of file
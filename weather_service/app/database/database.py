@@ -4,15 +4,20 @@
 """
 数据库连接和会话管理模块。
 用于创建数据库引擎、会话等数据库相关操作。
+
+支持两种引擎配置（通过环境变量DB_PROFILE选择）：
+- development: 输出SQL日志，使用SQLite默认设置
+- production: 关闭SQL日志，启用WAL等SQLite参数，复用连接，并为只读查询提供独立引擎
 """
 
 import os
-from typing import Generator
+from typing import Any, Dict, Generator, Tuple
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 
 # 加载环境变量
 load_dotenv()
@@ -23,18 +28,133 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./weather_data.db")
 if DATABASE_URL.startswith("sqlite"):
     DATABASE_URL = DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///")
 
+# 引擎配置名称
+DB_PROFILE = os.getenv("DB_PROFILE", "development")
+
+# 引擎配置
+ENGINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "development": {
+        "echo": True,
+        "pool_size": 0,
+        "read_engine": False,
+        "pragmas": {},
+    },
+    "production": {
+        "echo": False,
+        "pool_size": 5,
+        "read_engine": True,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # 负数表示KiB，即64MB
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+    },
+}
+
+
+def get_profile(name: str) -> Dict[str, Any]:
+    """
+    获取引擎配置，并应用环境变量中的覆盖项。
+
+    Args:
+        name: 配置名称（development或production）
+
+    Returns:
+        Dict[str, Any]: 引擎配置
+
+    Raises:
+        ValueError: 配置名称不存在时抛出
+    """
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"未知的数据库引擎配置: {name}")
+
+    profile = dict(ENGINE_PROFILES[name])
+    profile["pragmas"] = dict(profile["pragmas"])
+    if os.getenv("DB_ECHO") is not None:
+        profile["echo"] = os.getenv("DB_ECHO", "").lower() in ("1", "true", "yes")
+    if os.getenv("DB_POOL_SIZE") is not None:
+        profile["pool_size"] = int(os.getenv("DB_POOL_SIZE"))
+    for pragma in ("mmap_size", "cache_size", "busy_timeout"):
+        value = os.getenv(f"SQLITE_{pragma.upper()}")
+        if value is not None:
+            profile["pragmas"][pragma] = int(value)
+    return profile
+
+
+def _apply_pragmas(engine: AsyncEngine, pragmas: Dict[str, Any]) -> None:
+    """
+    在每个新建的SQLite连接上执行PRAGMA设置。
+
+    Args:
+        engine: 异步数据库引擎
+        pragmas: PRAGMA名称到取值的映射
+    """
+    if not pragmas:
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_engines(database_url: str, profile_name: str) -> Tuple[AsyncEngine, AsyncEngine]:
+    """
+    按配置创建读写引擎和只读引擎。
+
+    Args:
+        database_url: 数据库URL
+        profile_name: 引擎配置名称
+
+    Returns:
+        Tuple[AsyncEngine, AsyncEngine]: (读写引擎, 只读引擎)，不使用独立只读引擎时两者相同
+    """
+    profile = get_profile(profile_name)
+    is_sqlite = database_url.startswith("sqlite")
+    # 内存数据库无法在多个连接之间共享，不使用连接池和独立只读引擎
+    is_file = is_sqlite and ":memory:" not in database_url and not database_url.endswith("://")
+
+    options: Dict[str, Any] = {"echo": profile["echo"], "future": True}
+    if is_file and profile["pool_size"]:
+        options.update(poolclass=AsyncAdaptedQueuePool, pool_size=profile["pool_size"])
+
+    write_engine = create_async_engine(database_url, **options)
+    if not is_sqlite:
+        return write_engine, write_engine
+    _apply_pragmas(write_engine, profile["pragmas"])
+
+    if not (is_file and profile["read_engine"]):
+        return write_engine, write_engine
+
+    # 只读引擎：journal_mode由读写连接设置，读连接禁止写入
+    read_pragmas = {k: v for k, v in profile["pragmas"].items() if k != "journal_mode"}
+    read_pragmas["query_only"] = "ON"
+    read_engine = create_async_engine(database_url, **options)
+    _apply_pragmas(read_engine, read_pragmas)
+    return write_engine, read_engine
+
+
 # 创建异步引擎
-engine = create_async_engine(
-    DATABASE_URL, 
-    echo=True,
-    future=True,
-)
+engine, read_engine = create_engines(DATABASE_URL, DB_PROFILE)
 
 # 创建会话类
 SessionLocal = sessionmaker(
-    autocommit=False, 
-    autoflush=False, 
-    bind=engine, 
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=AsyncSession
+)
+
+# 创建只读会话类
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine,
     class_=AsyncSession
 )
 
@@ -44,10 +164,10 @@ Base = declarative_base()
 async def get_db() -> Generator:
     """
     获取数据库会话的依赖函数。
-    
+
     Yields:
         Generator: 数据库会话对象
-    
+
     示例:
         @app.get("/users/")
         async def read_users(db: AsyncSession = Depends(get_db)):
@@ -62,4 +182,19 @@ async def get_db() -> Generator:
         await db.rollback()
         raise
     finally:
-        await db.close() 
\ No newline at end of file
+        await db.close()
+
+
+async def get_read_db() -> Generator:
+    """
+    获取只读数据库会话的依赖函数。
+    production配置下使用独立的只读引擎，查询不会排在写入之后。
+
+    Yields:
+        Generator: 只读数据库会话对象
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
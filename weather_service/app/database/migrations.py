@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库结构升级模块。
+Base.metadata.create_all只创建不存在的表，不会修改已有的表；旧版本创建的数据库（如随项目提供的weather_data.db）
+缺少后来加入的列、索引和唯一约束。这里在create_all之后对比模型和数据库，补齐缺少的列（ALTER TABLE ADD COLUMN）、
+索引和具名唯一约束（SQLite不能给已有表添加约束，以同名唯一索引代替），可以重复执行。
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import Column, CreateColumn, Table, UniqueConstraint
+
+from .database import Base
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 新增列后的数据回填：(表名, 列名) -> SQL
+# 旧的观测记录用查询时间作为观测时间，同一城市同一时间有多条时只回填最早的一条，保证唯一约束可以建立
+COLUMN_BACKFILLS: Dict[Tuple[str, str], str] = {
+    ("weather_records", "observed_at"): """
+        UPDATE weather_records SET observed_at = query_time
+        WHERE observed_at IS NULL
+          AND id = (SELECT MIN(w.id) FROM weather_records w
+                    WHERE w.city_id = weather_records.city_id AND w.query_time = weather_records.query_time)
+          AND NOT EXISTS (SELECT 1 FROM weather_records w
+                          WHERE w.city_id = weather_records.city_id AND w.observed_at = weather_records.query_time)
+    """,
+}
+
+
+def _column_ddl(connection: Connection, column: Column) -> str:
+    """
+    生成ADD COLUMN使用的列定义。
+
+    Args:
+        connection: 数据库连接
+        column: 模型中的列
+
+    Returns:
+        str: 列定义
+
+    Raises:
+        RuntimeError: 非空列没有可用的默认值时抛出（已有行无法取值，需要手动迁移）
+    """
+    ddl = str(CreateColumn(column).compile(dialect=connection.dialect))
+    if column.nullable or column.server_default is not None:
+        return ddl
+    default = column.default
+    if default is None or not default.is_scalar:
+        raise RuntimeError(f"无法自动添加非空列{column.table.name}.{column.name}：没有常量默认值")
+    literal = column.type.literal_processor(connection.dialect)
+    value = literal(default.arg) if literal else repr(default.arg)
+    return f"{ddl} DEFAULT {value}"
+
+
+def _unique_index_ddl(connection: Connection, table: Table, constraint: UniqueConstraint) -> str:
+    """生成代替唯一约束的唯一索引语句。"""
+    quote = connection.dialect.identifier_preparer.quote
+    columns = ", ".join(quote(column.name) for column in constraint.columns)
+    return f"CREATE UNIQUE INDEX IF NOT EXISTS {quote(constraint.name)} ON {quote(table.name)} ({columns})"
+
+
+def upgrade_schema(connection: Connection) -> List[str]:
+    """
+    补齐已有表缺少的列、索引和具名唯一约束（在conn.run_sync中执行）。
+
+    Args:
+        connection: 数据库连接
+
+    Returns:
+        List[str]: 执行的升级步骤说明
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    applied = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        quote = connection.dialect.identifier_preparer.quote
+
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            connection.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {_column_ddl(connection, column)}"))
+            applied.append(f"添加列{table.name}.{column.name}")
+            backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+            if backfill:
+                result = connection.execute(text(backfill))
+                applied.append(f"回填{table.name}.{column.name}（{result.rowcount}行）")
+
+        # 先建唯一索引，再建普通索引
+        names = {index["name"] for index in inspector.get_indexes(table.name)}
+        names |= {constraint["name"] for constraint in inspector.get_unique_constraints(table.name)}
+        for constraint in table.constraints:
+            # 未命名的唯一约束无法判断是否已存在，只处理具名约束
+            if isinstance(constraint, UniqueConstraint) and constraint.name and constraint.name not in names:
+                connection.execute(text(_unique_index_ddl(connection, table, constraint)))
+                applied.append(f"创建唯一索引{constraint.name}")
+        for index in table.indexes:
+            if index.name not in names:
+                index.create(connection, checkfirst=True)
+                applied.append(f"创建索引{index.name}")
+    return applied
+
+
+async def init_schema(engine: AsyncEngine) -> List[str]:
+    """
+    创建不存在的表，并升级已有表的结构。
+
+    Args:
+        engine: 读写数据库引擎
+
+    Returns:
+        List[str]: 执行的升级步骤说明
+    """
+    # 导入全部模型，注册到Base.metadata
+    from .. import models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        applied = await conn.run_sync(upgrade_schema)
+    for step in applied:
+        logger.info(f"数据库结构升级: {step}")
+    return applied
@@ -16,8 +16,13 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .api import weather_router
-from .database import get_db, Base, engine
+from .api import weather_router, admin_router, alerts_router
+from .database import get_db, Base, engine, read_engine, ReadSessionLocal, init_schema
+from .services import (
+    history_writer, observation_writer, retention_scheduler, city_catalog, history_buffer,
+    trending_tracker, climate_baselines, payload_archive, payload_writer, alert_engine, alert_writer,
+    render_pool
+)
 
 # 加载环境变量
 load_dotenv()
@@ -38,6 +43,8 @@ app = FastAPI(
 
 # 添加路由
 app.include_router(weather_router)
+app.include_router(admin_router)
+app.include_router(alerts_router)
 
 # 配置静态文件
 static_dir = Path(__file__).parent.parent / "static"
@@ -52,29 +59,69 @@ templates = Jinja2Templates(directory=templates_dir)
 async def startup_event():
     """
     应用启动事件。
-    创建数据库表。
+    创建数据库表并升级旧数据库的表结构，启动后台写入任务和数据保留定时任务，
+    加载城市目录、预警规则、最近查询历史、气候基准和归档压缩字典，重建热门城市统计，启动图表渲染进程池。
     """
     try:
-        # 创建所有表
-        async with engine.begin() as conn:
-            # 如果需要清除所有表，取消注释下一行
-            # await conn.run_sync(Base.metadata.drop_all)
-            await conn.run_sync(Base.metadata.create_all)
+        # 创建所有表，并为旧数据库补齐后来加入的列和索引
+        await init_schema(engine)
         
         logger.info("数据库初始化完成")
+        
+        # 写入任务只依赖表结构，先于各项缓存加载启动
+        history_writer.start()
+        observation_writer.start()
+        payload_writer.start()
+        alert_writer.start()
+        retention_scheduler.start()
+        
+        async with ReadSessionLocal() as session:
+            await city_catalog.load(session)
+            await alert_engine.load(session)
+            await history_buffer.prime(session)
+            await trending_tracker.rebuild(session)
     except Exception as e:
         logger.error(f"数据库初始化失败: {e}")
         raise
 
+    # 气候基准和压缩字典是可选的：加载失败时天气响应不带距平，新归档的响应不使用字典
+    for name, loader in (("气候基准", climate_baselines), ("归档压缩字典", payload_archive)):
+        try:
+            async with ReadSessionLocal() as session:
+                await loader.load(session)
+        except Exception as e:
+            logger.error(f"加载{name}失败: {e}")
+
+    try:
+        render_pool.start()
+    except Exception as e:
+        # 不支持多进程的环境中图表接口不可用，其他接口不受影响
+        logger.error(f"启动图表渲染进程池失败: {e}")
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """
     应用关闭事件。
-    关闭数据库连接。
+    停止数据保留定时任务和图表渲染进程池，写入剩余的查询历史、观测数据、原始响应和预警通知，关闭数据库连接。
     """
+    try:
+        await retention_scheduler.stop()
+    except Exception as e:
+        logger.error(f"停止数据保留定时任务失败: {e}")
+
+    render_pool.stop()
+
+    for writer in (history_writer, observation_writer, payload_writer, alert_writer):
+        try:
+            await writer.stop()
+        except Exception as e:
+            logger.error(f"停止批量写入器'{writer.name}'失败: {e}")
+    
     try:
         await engine.dispose()
+        if read_engine is not engine:
+            await read_engine.dispose()
         logger.info("数据库连接已关闭")
     except Exception as e:
         logger.error(f"关闭数据库连接失败: {e}")
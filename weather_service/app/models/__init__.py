@@ -7,5 +7,16 @@
 """
 
 from .weather import City, WeatherRecord, QueryHistory
+from .rollup import QueryHistoryRollup, WeatherRecordRollup, RollupState
+from .climate import ClimateNormal
+from .archive import RawPayload, PayloadDictionary
+from .derived import ForecastDailySummary, ObservationMetric, RecomputeCheckpoint
+from .alerts import AlertRule, AlertNotification
 
-__all__ = ["City", "WeatherRecord", "QueryHistory"] 
\ No newline at end of file
+__all__ = [
+    "City", "WeatherRecord", "QueryHistory",
+    "QueryHistoryRollup", "WeatherRecordRollup", "RollupState",
+    "ClimateNormal", "RawPayload", "PayloadDictionary",
+    "ForecastDailySummary", "ObservationMetric", "RecomputeCheckpoint",
+    "AlertRule", "AlertNotification",
+] 
\ No newline at end of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预警数据模型模块。
+定义用户订阅的阈值预警规则，以及规则触发后写入的本地通知队列。
+"""
+
+import datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean
+
+from ..database import Base
+
+
+class AlertRule(Base):
+    """
+    预警规则模型。
+    如“上海未来3天最高气温>35°C”：城市的预报每次刷新时，按规则的指标、比较方式和阈值检查未来horizon_days天。
+    """
+    __tablename__ = "alert_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 订阅者标识，用于查询通知
+    subscriber = Column(String, nullable=False, index=True)
+    # 城市键：第三方城市ID，缺少时为"名称,国家代码"（小写）
+    city_key = Column(String, nullable=False, index=True)
+    city_name = Column(String, nullable=False)
+    metric = Column(String, nullable=False)
+    # 比较方式：>、>=、<、<=
+    operator = Column(String, nullable=False)
+    threshold = Column(Float, nullable=False)
+    # 检查的天数（从预报的第一个当地日期起）
+    horizon_days = Column(Integer, nullable=False, default=3)
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        """返回预警规则实例的字符串表示"""
+        return (f"<AlertRule {self.id} {self.city_name} {self.metric} {self.operator} {self.threshold} "
+                f"{self.horizon_days}d>")
+
+
+class AlertNotification(Base):
+    """
+    预警通知模型。
+    规则触发后由后台写入器批量写入，订阅者按时间轮询获取。
+    """
+    __tablename__ = "alert_notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rule_id = Column(Integer, nullable=False, index=True)
+    subscriber = Column(String, nullable=False, index=True)
+    city_name = Column(String, nullable=False)
+    metric = Column(String, nullable=False)
+    operator = Column(String, nullable=False)
+    threshold = Column(Float, nullable=False)
+    # 触发时的预报值和对应的城市当地日期（规则范围内第一个满足条件的日期）
+    value = Column(Float, nullable=False)
+    forecast_date = Column(Date, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        """返回预警通知实例的字符串表示"""
+        return (f"<AlertNotification rule={self.rule_id} {self.city_name} {self.metric}={self.value} "
+                f"{self.forecast_date}>")
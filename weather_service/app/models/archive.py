@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+原始数据归档模型模块。
+定义压缩保存的第三方API原始响应，以及压缩使用的共享字典。
+"""
+
+import datetime
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey, Index
+
+from ..database import Base
+
+
+class PayloadDictionary(Base):
+    """
+    压缩字典模型。
+    由已归档的响应训练得到，新响应使用最新的字典压缩，旧响应按记录的字典ID解压。
+    """
+    __tablename__ = "payload_dictionaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 压缩算法（zlib或zstd）
+    codec = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    # 训练使用的响应个数
+    sample_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        """返回压缩字典实例的字符串表示"""
+        return f"<PayloadDictionary {self.id} {self.codec}, {len(self.data or b'')} bytes>"
+
+
+class RawPayload(Base):
+    """
+    第三方API原始响应模型。
+    响应按规范化JSON的SHA-256去重，同一内容只保存一份压缩数据。
+    """
+    __tablename__ = "raw_payloads"
+    __table_args__ = (
+        Index("ix_raw_payloads_kind_fetched_at", "kind", "fetched_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    # 响应类型（current或forecast）
+    kind = Column(String, nullable=False)
+    # 第三方API中的城市ID
+    city_external_id = Column(Integer, nullable=True, index=True)
+    # 首次获取时间（UTC）
+    fetched_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    codec = Column(String, nullable=False)
+    dictionary_id = Column(Integer, ForeignKey("payload_dictionaries.id"), nullable=True)
+    # 压缩前的字节数
+    raw_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    def __repr__(self) -> str:
+        """返回原始响应实例的字符串表示"""
+        return (f"<RawPayload {self.kind} {self.sha256[:12]} "
+                f"{len(self.data or b'')}/{self.raw_size} bytes>")
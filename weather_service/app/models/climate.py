@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+气候基准数据模型模块。
+定义按城市和日序预先计算的气温常年值（平均值、标准差和分位数）。
+"""
+
+import datetime
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, UniqueConstraint
+
+from ..database import Base
+
+
+class ClimateNormal(Base):
+    """
+    气候基准模型，每个城市每个日序（1-366，按闰年日历编号）一行。
+    统计量由该日前后若干天、各年份的日平均气温计算。
+    """
+    __tablename__ = "climate_normals"
+    __table_args__ = (
+        UniqueConstraint("city_id", "day_of_year", name="uq_climate_normals_city_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    city_id = Column(Integer, ForeignKey("cities.id"), nullable=False)
+    # 日序（1-366），2月29日固定为60，平年的3月1日同样为61
+    day_of_year = Column(Integer, nullable=False)
+    # 参与统计的日平均气温个数
+    sample_count = Column(Integer, nullable=False)
+
+    temperature_mean = Column(Float, nullable=False)
+    temperature_std = Column(Float, nullable=True)
+    temperature_p10 = Column(Float, nullable=False)
+    temperature_p50 = Column(Float, nullable=False)
+    temperature_p90 = Column(Float, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        """返回气候基准实例的字符串表示"""
+        return (f"<ClimateNormal city_id={self.city_id}, day={self.day_of_year}, "
+                f"mean={self.temperature_mean}°C>")
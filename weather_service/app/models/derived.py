@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+派生数据模型模块。
+定义由归档数据离线重新计算得到的结果表，以及重新计算任务的断点。
+"""
+
+import datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, UniqueConstraint
+
+from ..database import Base
+
+
+class ForecastDailySummary(Base):
+    """
+    预报日汇总模型。
+    每个已归档的预报响应按城市当地日期聚合为每日数据，可用于对比同一日期不同时间发布的预报。
+    """
+    __tablename__ = "forecast_daily_summaries"
+    __table_args__ = (
+        UniqueConstraint("payload_id", "date", name="uq_forecast_daily_summaries_payload_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 来源预报在raw_payloads表中的ID
+    payload_id = Column(Integer, nullable=False)
+    city_external_id = Column(Integer, nullable=True, index=True)
+    # 预报获取时间（UTC）
+    issued_at = Column(DateTime, nullable=False)
+    # 城市当地日期
+    date = Column(Date, nullable=False)
+
+    min_temp = Column(Float, nullable=True)
+    max_temp = Column(Float, nullable=True)
+    mean_temp = Column(Float, nullable=True)
+    humidity = Column(Float, nullable=True)
+    precipitation = Column(Float, nullable=True)
+    wind_speed_max = Column(Float, nullable=True)
+    pop_max = Column(Float, nullable=True)
+    weather_description = Column(String, nullable=True)
+    weather_icon = Column(String, nullable=True)
+
+    def __repr__(self) -> str:
+        """返回预报日汇总实例的字符串表示"""
+        return (f"<ForecastDailySummary payload={self.payload_id} {self.date} "
+                f"{self.min_temp}~{self.max_temp}°C>")
+
+
+class ObservationMetric(Base):
+    """
+    观测派生指标模型，每条天气记录一行。
+    不设外键，原始记录被数据保留任务清理后派生指标仍然保留。
+    """
+    __tablename__ = "observation_metrics"
+
+    # 对应weather_records表的ID
+    record_id = Column(Integer, primary_key=True)
+    city_id = Column(Integer, nullable=False, index=True)
+    observed_at = Column(DateTime, nullable=True)
+    dew_point = Column(Float, nullable=True)
+    # 与接口返回的体感温度相同的NWS规则（炎热指数/风寒温度）
+    feels_like = Column(Float, nullable=True)
+
+    def __repr__(self) -> str:
+        """返回观测派生指标实例的字符串表示"""
+        return f"<ObservationMetric record={self.record_id} dew_point={self.dew_point}>"
+
+
+class RecomputeCheckpoint(Base):
+    """
+    重新计算任务断点模型，记录每个任务已处理到的源数据ID。
+    """
+    __tablename__ = "recompute_checkpoints"
+
+    name = Column(String, primary_key=True)
+    # 计算规则版本，与任务当前版本不一致时从头重新计算
+    version = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        """返回重新计算任务断点实例的字符串表示"""
+        return f"<RecomputeCheckpoint {self.name} v{self.version} last_id={self.last_id}>"
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+汇总数据模型模块。
+定义查询历史和天气观测的按小时、按天汇总表，以及汇总进度表。
+"""
+
+import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+
+from ..database import Base
+
+
+class QueryHistoryRollup(Base):
+    """
+    查询历史汇总模型，按时间桶和城市统计查询次数。
+    """
+    __tablename__ = "query_history_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "city_name",
+                         name="uq_query_history_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 汇总粒度（hour或day）
+    granularity = Column(String, nullable=False)
+    # 时间桶起点（UTC）
+    bucket_start = Column(DateTime, nullable=False)
+    city_name = Column(String, nullable=False)
+    query_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        """返回查询历史汇总实例的字符串表示"""
+        return (f"<QueryHistoryRollup {self.granularity} {self.bucket_start} "
+                f"city={self.city_name}, count={self.query_count}>")
+
+
+class WeatherRecordRollup(Base):
+    """
+    天气观测汇总模型，按时间桶和城市统计温度、湿度、气压和风速。
+    """
+    __tablename__ = "weather_record_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "city_id",
+                         name="uq_weather_record_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 汇总粒度（hour或day）
+    granularity = Column(String, nullable=False)
+    # 时间桶起点（UTC）
+    bucket_start = Column(DateTime, nullable=False)
+    city_id = Column(Integer, nullable=False, index=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+
+    temperature_avg = Column(Float, nullable=True)
+    temperature_min = Column(Float, nullable=True)
+    temperature_max = Column(Float, nullable=True)
+    humidity_avg = Column(Float, nullable=True)
+    pressure_avg = Column(Float, nullable=True)
+    wind_speed_avg = Column(Float, nullable=True)
+    wind_speed_max = Column(Float, nullable=True)
+
+    def __repr__(self) -> str:
+        """返回天气观测汇总实例的字符串表示"""
+        return (f"<WeatherRecordRollup {self.granularity} {self.bucket_start} "
+                f"city_id={self.city_id}, samples={self.sample_count}>")
+
+
+class RollupState(Base):
+    """
+    汇总进度模型，记录每个数据源已汇总到的时间点和已处理的最大原始数据ID。
+    早于该时间点且ID不大于last_id的原始数据已计入汇总表，可以被清理；
+    ID更大但时间早于该时间点的是迟到的数据，下次汇总时重新计算其所在小时。
+    """
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=False)
+    last_id = Column(Integer, nullable=True)
+    # 原始数据已清理到的时间点，所在小时早于它的迟到数据不再重新汇总
+    purged_before = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        """返回汇总进度实例的字符串表示"""
+        return f"<RollupState {self.name} watermark={self.watermark} last_id={self.last_id}>"
@@ -6,7 +6,7 @@
 定义用于API请求和响应的Pydantic模型。
 """
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 
@@ -32,6 +32,18 @@ class City(CityBase):
         orm_mode = True
 
 
+class CitySuggestion(BaseModel):
+    """城市自动补全结果模型。"""
+    id: int
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+    population: Optional[int] = None
+    matched: str = Field(..., description="匹配到的归一化名称")
+    query: str = Field(..., description="可直接用于天气查询的城市参数")
+
+
 class WeatherData(BaseModel):
     """天气数据模型。"""
     temperature: float = Field(..., description="温度(摄氏度)")
@@ -41,12 +53,32 @@ class WeatherData(BaseModel):
     wind_direction: Optional[float] = Field(None, description="风向(度)")
     weather_description: Optional[str] = Field(None, description="天气描述")
     weather_icon: Optional[str] = Field(None, description="天气图标代码")
+    feels_like: Optional[float] = Field(None, description="体感温度(摄氏度)，炎热时为炎热指数，寒冷有风时为风寒温度")
+    heat_index: Optional[float] = Field(None, description="炎热指数(摄氏度)")
+    wind_chill: Optional[float] = Field(None, description="风寒温度(摄氏度)，不满足风寒条件时等于气温")
+    dew_point: Optional[float] = Field(None, description="露点(摄氏度)")
+    absolute_humidity: Optional[float] = Field(None, description="绝对湿度(g/m³)")
+    comfort: Optional[str] = Field(None, description="舒适度等级（严寒、寒冷、凉爽、舒适、温暖、闷热、炎热）")
+
+
+class NearbyCity(BaseModel):
+    """附近城市模型。"""
+    id: int
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+    population: Optional[int] = None
+    distance_km: float = Field(..., description="与查询坐标的大圆距离(千米)")
+    query: str = Field(..., description="可直接用于天气查询的城市参数")
+    current_weather: Optional[WeatherData] = Field(None, description="当前天气（优先使用缓存），获取失败或未请求时为空")
 
 
 class WeatherRecordBase(BaseModel):
     """天气记录基础模型。"""
     city_id: int
     query_time: datetime = Field(default_factory=datetime.utcnow)
+    observed_at: Optional[datetime] = None
     temperature: float
     humidity: Optional[float] = None
     pressure: Optional[float] = None
@@ -70,6 +102,78 @@ class WeatherRecord(WeatherRecordBase):
         orm_mode = True
 
 
+class ObservationSeriesResponse(BaseModel):
+    """城市历史观测时间序列响应模型。"""
+    city: str
+    country: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    observations: List[WeatherRecord]
+
+
+class DailyStatistics(BaseModel):
+    """单个指标的日统计模型（UTC日期）。"""
+    date: str
+    count: int = Field(..., description="当天的有效观测次数")
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    rolling_mean: Optional[float] = Field(None, description="截至当天的滑动窗口内所有观测的平均值")
+
+
+class MetricStatistics(BaseModel):
+    """单个指标的统计模型。"""
+    count: int = Field(..., description="有效观测次数")
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = Field(None, description="样本标准差")
+    percentiles: Dict[str, Optional[float]] = Field(..., description="分位数，如p10、p50、p90")
+    daily: List[DailyStatistics]
+
+
+class DegreeDays(BaseModel):
+    """度日数模型，由日平均气温计算。"""
+    base: float = Field(..., description="基础温度(摄氏度)")
+    heating: float = Field(..., description="采暖度日数（日平均气温低于基础温度的度数之和）")
+    cooling: float = Field(..., description="制冷度日数（日平均气温高于基础温度的度数之和）")
+    days: int = Field(..., description="参与计算的天数")
+
+
+class ObservationStatisticsResponse(BaseModel):
+    """历史观测统计响应模型。"""
+    city: str
+    country: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    count: int = Field(..., description="时间范围内的观测记录数")
+    rolling_days: int
+    metrics: Dict[str, MetricStatistics]
+    degree_days: Optional[DegreeDays] = Field(None, description="度日数，仅统计温度时返回")
+
+
+class GridStation(BaseModel):
+    """插值网格使用的站点模型。"""
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+    value: float
+    source: str = Field(..., description="站点值来源：stored为已保存的近期观测，current为实时天气（优先使用缓存）")
+
+
+class WeatherGridResponse(BaseModel):
+    """区域插值网格响应模型。"""
+    metric: str
+    bbox: List[float] = Field(..., description="[min_lat, min_lon, max_lat, max_lon]")
+    resolution: float = Field(..., description="格点间距(度)")
+    time_bucket: datetime = Field(..., description="网格所属时间桶的起点（UTC）")
+    latitudes: List[float] = Field(..., description="网格纬度（升序），对应values的行")
+    longitudes: List[float] = Field(..., description="网格经度（升序），对应values的列")
+    values: List[List[float]] = Field(..., description="插值结果，values[i][j]对应latitudes[i]、longitudes[j]")
+    stations: List[GridStation]
+
+
 class QueryHistoryBase(BaseModel):
     """查询历史基础模型。"""
     city_name: str
@@ -90,6 +194,27 @@ class QueryHistory(QueryHistoryBase):
         orm_mode = True
 
 
+class QueryHistoryPage(BaseModel):
+    """查询历史分页响应模型。"""
+    items: List[QueryHistory]
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多记录时为空")
+
+
+class TrendingCity(BaseModel):
+    """热门城市模型。"""
+    city: str
+    count: int = Field(..., description="窗口内的估计查询次数（可能略有高估）")
+
+
+class TrendingResponse(BaseModel):
+    """热门城市统计响应模型。"""
+    window: str
+    start: datetime
+    end: datetime
+    total: int = Field(..., description="窗口内的总查询次数")
+    cities: List[TrendingCity]
+
+
 class WeatherResponse(BaseModel):
     """天气查询响应模型。"""
     city: str
@@ -100,18 +225,185 @@ class WeatherResponse(BaseModel):
     forecast: Optional[List[Dict[str, Any]]] = None
 
 
+class TemperatureAnomaly(BaseModel):
+    """气温距平模型，与常年同期的气候基准比较。"""
+    temperature: float = Field(..., description="预报日平均温度(摄氏度)")
+    normal: float = Field(..., description="常年同期日平均温度(摄氏度)")
+    difference: float = Field(..., description="较常年同期偏高（正）或偏低（负）的度数")
+    z_score: Optional[float] = Field(None, description="标准化距平（距平/常年标准差）")
+    normal_p10: float = Field(..., description="常年同期日平均温度的10%分位数")
+    normal_p90: float = Field(..., description="常年同期日平均温度的90%分位数")
+    sample_count: int = Field(..., description="计算基准使用的日平均温度个数")
+
+
 class WeatherForecastDay(BaseModel):
     """天气预报日模型。"""
-    date: str
+    date: str = Field(..., description="城市当地日期（YYYY-MM-DD）")
     min_temp: float
     max_temp: float
+    mean_temp: Optional[float] = Field(None, description="日平均温度(摄氏度)")
     humidity: float
+    precipitation: Optional[float] = Field(None, description="降水量（雨和雪，毫米）")
+    pop_max: Optional[float] = Field(None, description="最大降水概率(0-1)")
+    wind_speed_max: Optional[float] = Field(None, description="最大风速(m/s)")
     weather_description: str
     weather_icon: str
+    feels_like_min: Optional[float] = Field(None, description="最低体感温度(摄氏度)")
+    feels_like_max: Optional[float] = Field(None, description="最高体感温度(摄氏度)")
+    heat_index_max: Optional[float] = Field(None, description="最高炎热指数(摄氏度)")
+    wind_chill_min: Optional[float] = Field(None, description="最低风寒温度(摄氏度)")
+    dew_point: Optional[float] = Field(None, description="平均露点(摄氏度)")
+    absolute_humidity: Optional[float] = Field(None, description="平均绝对湿度(g/m³)")
+    comfort: Optional[str] = Field(None, description="当天出现最多的舒适度等级")
+    anomaly: Optional[TemperatureAnomaly] = Field(None, description="气温距平，城市没有气候基准时为空")
 
 
 class WeatherForecastResponse(BaseModel):
     """天气预报响应模型。"""
     city: str
     country: str
-    forecast: List[WeatherForecastDay] 
\ No newline at end of file
+    forecast: List[WeatherForecastDay] 
+
+class ResampledForecastPoint(BaseModel):
+    """重采样预报点模型，超出预报时间范围的时间点各字段为空。"""
+    dt: datetime = Field(..., description="时间（UTC）")
+    temp: Optional[float] = Field(None, description="温度(摄氏度)，线性插值")
+    pressure: Optional[float] = Field(None, description="气压(hPa)，线性插值")
+    humidity: Optional[float] = Field(None, description="湿度(%)，线性插值")
+    clouds: Optional[float] = Field(None, description="云量(%)，线性插值")
+    wind_speed: Optional[float] = Field(None, description="风速(m/s)，线性插值")
+    wind_gust: Optional[float] = Field(None, description="阵风(m/s)，线性插值")
+    wind_deg: Optional[float] = Field(None, description="风向(度)，按单位向量插值")
+    visibility: Optional[float] = Field(None, description="能见度(米)，线性插值")
+    pop: Optional[float] = Field(None, description="降水概率(0-1)，线性插值")
+    precipitation_rate: Optional[float] = Field(None, description="所在3小时时段的平均降水强度(毫米/小时)")
+    feels_like: Optional[float] = Field(None, description="由插值后的气温、湿度和风速计算的体感温度(摄氏度)")
+    heat_index: Optional[float] = Field(None, description="炎热指数(摄氏度)")
+    wind_chill: Optional[float] = Field(None, description="风寒温度(摄氏度)")
+    dew_point: Optional[float] = Field(None, description="露点(摄氏度)")
+    absolute_humidity: Optional[float] = Field(None, description="绝对湿度(g/m³)")
+    comfort: Optional[str] = Field(None, description="舒适度等级")
+    weather_description: Optional[str] = Field(None, description="最近预报点的天气描述")
+    weather_icon: Optional[str] = Field(None, description="最近预报点的天气图标代码")
+
+
+class ResampledForecastResponse(BaseModel):
+    """重采样预报响应模型。"""
+    city: str
+    country: str
+    timezone_offset: int = Field(..., description="城市时区相对UTC的偏移(秒)")
+    interval: Optional[str] = Field(None, description="时间间隔，按指定时间点重采样时为空")
+    points: List[ResampledForecastPoint]
+
+
+class ResampleBatchRequest(BaseModel):
+    """批量重采样预报请求模型。"""
+    cities: List[str] = Field(..., min_items=1, description="城市名称列表")
+    interval: Optional[str] = Field("1h", description="时间间隔，如1h、30m")
+    times: Optional[List[datetime]] = Field(None, description="指定时间点（无时区时按UTC），指定后忽略interval")
+
+
+class ResampleBatchItem(BaseModel):
+    """批量重采样中单个城市的结果，失败时forecast为空、error为原因。"""
+    city: str
+    forecast: Optional[ResampledForecastResponse] = None
+    error: Optional[str] = None
+
+
+class ResampleBatchResponse(BaseModel):
+    """批量重采样预报响应模型。"""
+    results: List[ResampleBatchItem]
+
+
+class ForecastCompareRequest(BaseModel):
+    """多城市预报对比请求模型。"""
+    cities: List[str] = Field(..., min_items=1, description="城市名称列表")
+    days: int = Field(5, ge=1, le=5, description="每个城市使用的预报天数")
+    metrics: Optional[List[str]] = Field(
+        None, description="对比指标（max_temp、min_temp、mean_temp、humidity、precipitation、wind_speed_max、pop_max），默认max_temp和min_temp"
+    )
+
+
+class CompareCity(BaseModel):
+    """对比矩阵中一行对应的城市。"""
+    query: str = Field(..., description="请求中的城市名称")
+    name: str
+    country: str
+
+
+class DailyComparison(BaseModel):
+    """每天的跨城市统计，列表下标对应dates。"""
+    mean: List[Optional[float]]
+    min: List[Optional[float]]
+    max: List[Optional[float]]
+    std: List[Optional[float]] = Field(..., description="总体标准差")
+    spread: List[Optional[float]] = Field(..., description="极差（最大值-最小值）")
+    highest: List[Optional[int]] = Field(..., description="当天值最大的城市在cities中的下标")
+    lowest: List[Optional[int]] = Field(..., description="当天值最小的城市在cities中的下标")
+
+
+class CityComparison(BaseModel):
+    """每个城市的跨日期统计，列表下标对应cities。"""
+    mean: List[Optional[float]]
+    min: List[Optional[float]]
+    max: List[Optional[float]]
+    rank: List[Optional[int]] = Field(..., description="按平均值从大到小的名次，并列名次相同")
+
+
+class MetricComparison(BaseModel):
+    """单个指标的对比矩阵。"""
+    values: List[List[Optional[float]]] = Field(..., description="values[i][j]为cities[i]在dates[j]的值，没有预报时为空")
+    ranks: List[List[Optional[int]]] = Field(..., description="ranks[i][j]为cities[i]在dates[j]按值从大到小的名次")
+    daily: DailyComparison
+    city: CityComparison
+
+
+class ForecastComparisonResponse(BaseModel):
+    """多城市预报对比响应模型。"""
+    dates: List[str] = Field(..., description="各城市当地日期的并集（升序），对应矩阵的列")
+    cities: List[CompareCity] = Field(..., description="成功获取预报的城市，对应矩阵的行")
+    errors: Dict[str, str] = Field(..., description="获取预报失败的城市及原因")
+    matrices: Dict[str, MetricComparison]
+
+
+class AlertRuleCreate(BaseModel):
+    """创建预警规则请求模型。"""
+    subscriber: str = Field(..., min_length=1, description="订阅者标识，用于查询通知")
+    city: str = Field(..., description="城市名称")
+    metric: str = Field(..., description="每日指标，如max_temp、min_temp、precipitation、wind_speed_max、heat_index_max")
+    operator: str = Field(..., description="比较方式：>、>=、<、<=")
+    threshold: float = Field(..., description="阈值")
+    horizon_days: int = Field(3, ge=1, le=5, description="检查未来几天（从预报的第一个当地日期起）")
+
+
+class AlertRule(BaseModel):
+    """预警规则响应模型。"""
+    id: int
+    subscriber: str
+    city_name: str
+    metric: str
+    operator: str
+    threshold: float
+    horizon_days: int
+    enabled: bool
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class AlertNotification(BaseModel):
+    """预警通知响应模型。"""
+    id: int
+    rule_id: int
+    subscriber: str
+    city_name: str
+    metric: str
+    operator: str
+    threshold: float
+    value: float = Field(..., description="触发时的预报值")
+    forecast_date: date = Field(..., description="规则范围内第一个满足条件的城市当地日期")
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
@@ -8,7 +8,10 @@
 
 import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import (
+    Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON,
+    Index, UniqueConstraint
+)
 from sqlalchemy.orm import relationship
 
 from ..database import Base
@@ -17,15 +20,25 @@ from ..database import Base
 class City(Base):
     """
     城市模型，用于存储城市信息。
+    城市目录（GeoNames数据）导入的城市额外保存拼音/ASCII名称、别名、人口和时区。
     """
     __tablename__ = "cities"
 
     id = Column(Integer, primary_key=True, index=True)
+    # 第三方天气API中的城市ID，用于去重（OpenWeatherMap城市ID与GeoNames ID一致）
+    external_id = Column(Integer, unique=True, index=True, nullable=True)
     name = Column(String, index=True, nullable=False)
     country = Column(String, nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     
+    # 城市目录字段
+    ascii_name = Column(String, nullable=True)
+    # 逗号分隔的别名（中文名、拼音、英文名等）
+    alternate_names = Column(Text, nullable=True)
+    population = Column(Integer, nullable=True)
+    timezone = Column(String, nullable=True)
+    
     # 关联查询记录
     weather_records = relationship("WeatherRecord", back_populates="city")
     
@@ -37,12 +50,20 @@ class City(Base):
 class WeatherRecord(Base):
     """
     天气记录模型，用于存储天气查询结果。
+    同一城市同一观测时间只保存一条记录。
     """
     __tablename__ = "weather_records"
+    __table_args__ = (
+        # 去重约束，同时作为按城市和时间范围查询的复合索引
+        UniqueConstraint("city_id", "observed_at", name="uq_weather_records_city_observed"),
+        Index("ix_weather_records_observed_at", "observed_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     city_id = Column(Integer, ForeignKey("cities.id"), nullable=False)
     query_time = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    # 观测时间（第三方API返回的dt，UTC）
+    observed_at = Column(DateTime, nullable=True)
     
     # 天气数据
     temperature = Column(Float, nullable=False)
@@ -71,6 +92,12 @@ class QueryHistory(Base):
     查询历史模型，用于记录用户的查询操作。
     """
     __tablename__ = "query_history"
+    __table_args__ = (
+        # 支持按时间倒序的键集分页，以及按城市、IP过滤后的分页
+        Index("ix_query_history_time_id", "query_time", "id"),
+        Index("ix_query_history_city_time_id", "city_name", "query_time", "id"),
+        Index("ix_query_history_ip_time_id", "ip_address", "query_time", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     city_name = Column(String, nullable=False)
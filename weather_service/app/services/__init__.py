@@ -8,10 +8,47 @@
 
 from .weather_service import WeatherService, weather_service
 from .cache_service import SimpleCache, cache, cached
+from .forecast_store import CompactForecast
 from .visualization_service import VisualizationService, visualization_service
+from .batch_writer import BatchWriter, bulk_insert_handler, history_writer
+from .observation_service import observation_writer, observations_handler
+from .retention_service import run_retention, retention_scheduler
+from .city_catalog import CityCatalog, city_catalog
+from .spatial_index import SpatialIndex
+from .history_service import HistoryRingBuffer, history_buffer
+from .trending_service import TrendingTracker, trending_tracker
+from .climate_service import ClimateBaselines, climate_baselines
+from .payload_archive import PayloadArchive, payload_archive, payload_writer
+from .forecast_aggregation import aggregate_daily, daily_forecast
+from .recompute_service import RecomputeJob, RECOMPUTE_JOBS, run_recompute
+from .stats_service import compute_statistics, observation_statistics
+from .grid_service import idw_grid, build_grid
+from .forecast_resample import resample, resample_forecast
+from .forecast_compare import compare_matrix, compare_forecasts
+from .forecast_indices import point_indices, daily_indices
+from .alert_service import AlertEngine, alert_engine, alert_writer
+from .render_pool import RenderPool, render_pool
 
 __all__ = [
     "WeatherService", "weather_service", 
     "SimpleCache", "cache", "cached",
-    "VisualizationService", "visualization_service"
+    "CompactForecast",
+    "VisualizationService", "visualization_service",
+    "BatchWriter", "bulk_insert_handler", "history_writer",
+    "observation_writer", "observations_handler",
+    "run_retention", "retention_scheduler",
+    "CityCatalog", "city_catalog", "SpatialIndex",
+    "HistoryRingBuffer", "history_buffer",
+    "TrendingTracker", "trending_tracker",
+    "ClimateBaselines", "climate_baselines",
+    "PayloadArchive", "payload_archive", "payload_writer",
+    "aggregate_daily", "daily_forecast",
+    "RecomputeJob", "RECOMPUTE_JOBS", "run_recompute",
+    "compute_statistics", "observation_statistics",
+    "idw_grid", "build_grid",
+    "resample", "resample_forecast",
+    "compare_matrix", "compare_forecasts",
+    "point_indices", "daily_indices",
+    "AlertEngine", "alert_engine", "alert_writer",
+    "RenderPool", "render_pool"
 ] 
\ No newline at end of file
@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+阈值预警服务模块。
+规则（如“上海未来3天最高气温>35°C”）保存在alert_rules表中，并在内存中按（城市、指标）建立索引；
+同一组内的规则按比较方向分开、按阈值排序，城市预报刷新时先用二分查找找出阈值被预报极值越过的规则，
+只对这些候选规则逐日检查。触发的通知进入本地有界队列，由后台写入器批量写入alert_notifications表。
+"""
+
+import os
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+import numpy as np
+from sqlalchemy import select, delete
+
+from ..models import AlertRule, AlertNotification
+from .batch_writer import BatchWriter, bulk_insert_handler
+from .forecast_store import CompactForecast
+from .forecast_aggregation import daily_columns
+from .forecast_indices import daily_index_columns
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 通知队列配置
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", 10000))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", 500))
+ALERT_FLUSH_INTERVAL = float(os.getenv("ALERT_FLUSH_INTERVAL", 1.0))
+
+# 规则最多检查的天数（预报共5天）
+ALERT_MAX_HORIZON = 5
+
+# 可设置预警的每日指标：每日预报列和每日派生指标列
+ALERT_DAILY_METRICS: List[str] = [
+    "max_temp", "min_temp", "mean_temp", "humidity", "precipitation", "wind_speed_max", "pop_max",
+]
+ALERT_INDEX_METRICS: List[str] = [
+    "feels_like_max", "feels_like_min", "heat_index_max", "wind_chill_min", "dew_point", "absolute_humidity",
+]
+ALERT_METRICS: List[str] = ALERT_DAILY_METRICS + ALERT_INDEX_METRICS
+
+# 比较方式：是否为“高于”方向、是否包含阈值
+ALERT_OPERATORS: Dict[str, Tuple[bool, bool]] = {
+    ">": (True, False),
+    ">=": (True, True),
+    "<": (False, False),
+    "<=": (False, True),
+}
+
+
+def city_key(city: Dict[str, Any]) -> str:
+    """
+    获取预报中城市的规则索引键：第三方城市ID，缺少时为"名称,国家代码"（小写）。
+
+    Args:
+        city: 预报的城市信息
+
+    Returns:
+        str: 城市键
+    """
+    if city.get("id") is not None:
+        return str(city["id"])
+    return f"{city.get('name', '')},{city.get('country', '')}".lower()
+
+
+def validate_rule(metric: str, operator: str, horizon_days: int) -> None:
+    """
+    校验规则参数。
+
+    Args:
+        metric: 指标名称
+        operator: 比较方式
+        horizon_days: 检查的天数
+
+    Raises:
+        ValueError: 参数不支持时抛出
+    """
+    if metric not in ALERT_METRICS:
+        raise ValueError(f"不支持的预警指标: {metric}，可选: {', '.join(ALERT_METRICS)}")
+    if operator not in ALERT_OPERATORS:
+        raise ValueError(f"不支持的比较方式: {operator}，可选: {', '.join(ALERT_OPERATORS)}")
+    if not 1 <= horizon_days <= ALERT_MAX_HORIZON:
+        raise ValueError(f"检查天数必须在1到{ALERT_MAX_HORIZON}之间")
+
+
+class _ThresholdIndex:
+    """
+    同一方向规则的阈值索引。
+
+    “低于”方向的阈值和预报值取相反数后按“高于”处理；规则按阈值升序排列，
+    预报极值为v时，只有阈值不大于v的前缀可能触发，用二分查找确定。
+    """
+
+    def __init__(self, rules: List[Tuple[int, float, int, bool]], above: bool):
+        """
+        建立索引。
+
+        Args:
+            rules: (规则ID, 阈值, 检查天数, 是否包含阈值)列表
+            above: 是否为“高于”方向
+        """
+        self.sign = 1.0 if above else -1.0
+        thresholds = np.array([rule[1] for rule in rules], dtype=np.float64) * self.sign
+        order = np.argsort(thresholds, kind="stable")
+        self.thresholds = thresholds[order]
+        self.ids = np.array([rule[0] for rule in rules], dtype=np.int64)[order]
+        self.horizons = np.array([rule[2] for rule in rules], dtype=np.int64)[order]
+        self.inclusive = np.array([rule[3] for rule in rules], dtype=bool)[order]
+
+    def match(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        查找被触发的规则。
+
+        Args:
+            values: 按日期升序的每日预报值（最多ALERT_MAX_HORIZON天）
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, int]: 触发的规则ID、每条规则第一个满足条件的日期下标，以及检查的候选规则数
+        """
+        values = values * self.sign
+        valid = ~np.isnan(values)
+        if not valid.any() or not len(self.ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+        peak = values[valid].max()
+        # 阈值不大于极值的规则才可能触发
+        count = int(np.searchsorted(self.thresholds, peak, side="right"))
+        if count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+
+        thresholds = self.thresholds[:count, None]
+        with np.errstate(invalid="ignore"):
+            hit = np.where(self.inclusive[:count, None], values >= thresholds, values > thresholds)
+        hit &= np.arange(len(values)) < self.horizons[:count, None]
+        fired = hit.any(axis=1)
+        return self.ids[:count][fired], hit[fired].argmax(axis=1), count
+
+
+class _RuleGroup:
+    """同一城市、同一指标的规则，修改后在下次检查时重建阈值索引。"""
+
+    def __init__(self):
+        """初始化空规则组。"""
+        self.rules: Dict[int, Tuple[str, float, int]] = {}
+        self._indexes: Optional[Tuple[_ThresholdIndex, _ThresholdIndex]] = None
+
+    def add(self, rule_id: int, operator: str, threshold: float, horizon_days: int) -> None:
+        """添加或替换规则。"""
+        self.rules[rule_id] = (operator, threshold, horizon_days)
+        self._indexes = None
+
+    def remove(self, rule_id: int) -> None:
+        """删除规则。"""
+        self.rules.pop(rule_id, None)
+        self._indexes = None
+
+    def indexes(self) -> Tuple[_ThresholdIndex, _ThresholdIndex]:
+        """获取“高于”和“低于”两个方向的阈值索引。"""
+        if self._indexes is None:
+            above, below = [], []
+            for rule_id, (operator, threshold, horizon_days) in self.rules.items():
+                is_above, inclusive = ALERT_OPERATORS[operator]
+                (above if is_above else below).append((rule_id, threshold, horizon_days, inclusive))
+            self._indexes = (_ThresholdIndex(above, True), _ThresholdIndex(below, False))
+        return self._indexes
+
+
+class AlertEngine:
+    """
+    内存中的预警规则索引和检查引擎。
+
+    规则按城市键和指标分组；预报刷新时只访问该城市的规则组，每组按阈值二分查找候选规则。
+    同一规则对同一预报日期只通知一次。
+    """
+
+    def __init__(self):
+        """初始化空引擎。"""
+        self._cities: Dict[str, Dict[str, _RuleGroup]] = {}
+        self._rules: Dict[int, Dict[str, Any]] = {}
+        # 每条规则已通知过的预报日期（ISO格式），早于预报首日的日期在检查时清理
+        self._notified: Dict[int, Set[str]] = {}
+        self.stats: Dict[str, int] = {"evaluations": 0, "candidates": 0, "fired": 0, "suppressed": 0}
+
+    def __len__(self) -> int:
+        """已加载的规则数。"""
+        return len(self._rules)
+
+    def add(self, rule: Dict[str, Any]) -> None:
+        """
+        添加或替换规则，未启用的规则只删除不添加。
+
+        Args:
+            rule: 规则字典，包含alert_rules表的列
+        """
+        self.remove(rule["id"])
+        if not rule.get("enabled", True):
+            return
+        groups = self._cities.setdefault(rule["city_key"], {})
+        group = groups.setdefault(rule["metric"], _RuleGroup())
+        group.add(rule["id"], rule["operator"], float(rule["threshold"]), int(rule["horizon_days"]))
+        self._rules[rule["id"]] = rule
+
+    def remove(self, rule_id: int) -> bool:
+        """
+        删除规则。
+
+        Args:
+            rule_id: 规则ID
+
+        Returns:
+            bool: 规则是否存在
+        """
+        rule = self._rules.pop(rule_id, None)
+        self._notified.pop(rule_id, None)
+        if rule is None:
+            return False
+        groups = self._cities[rule["city_key"]]
+        groups[rule["metric"]].remove(rule_id)
+        if not groups[rule["metric"]].rules:
+            del groups[rule["metric"]]
+        if not groups:
+            del self._cities[rule["city_key"]]
+        return True
+
+    def build(self, rules: List[Dict[str, Any]], notified: Optional[Dict[int, Set[str]]] = None) -> None:
+        """
+        用规则列表重建索引，保留仍存在的规则的通知记录。
+
+        Args:
+            rules: 规则字典列表
+            notified: 规则ID到已通知的预报日期集合（ISO格式），默认沿用当前记录
+        """
+        notified = dict(self._notified if notified is None else notified)
+        self._cities = {}
+        self._rules = {}
+        for rule in rules:
+            self.add(rule)
+        self._notified = {rule_id: set(days) for rule_id, days in notified.items() if rule_id in self._rules}
+
+    async def load(self, session) -> int:
+        """
+        从alert_rules表加载全部启用的规则，并从alert_notifications表恢复每条规则在预报范围内已通知的预报日期，
+        避免重启后对同一预报日期重复通知。
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            int: 加载的规则数
+        """
+        result = await session.execute(select(AlertRule.__table__).where(AlertRule.enabled.is_(True)))
+        rules = [dict(row) for row in result.mappings().all()]
+        # 仍在预报范围内的日期只能由最近几天内的通知触发，多保留一天以覆盖各时区
+        since = datetime.utcnow() - timedelta(days=ALERT_MAX_HORIZON + 1)
+        result = await session.execute(
+            select(AlertNotification.rule_id, AlertNotification.forecast_date)
+            .where(AlertNotification.created_at >= since)
+            .distinct()
+        )
+        notified: Dict[int, Set[str]] = {}
+        for rule_id, forecast_date in result.all():
+            notified.setdefault(rule_id, set()).add(forecast_date.isoformat())
+        self.build(rules, notified)
+        logger.info(f"预警规则已加载，共{len(self._rules)}条")
+        return len(self._rules)
+
+    def evaluate(self, forecast: CompactForecast,
+                 rule_ids: Optional[Collection[int]] = None) -> List[Dict[str, Any]]:
+        """
+        用刷新后的预报检查该城市的规则。
+
+        Args:
+            forecast: 紧凑预报
+            rule_ids: 只检查这些规则，默认检查该城市的全部规则
+
+        Returns:
+            List[Dict[str, Any]]: 新触发的通知（alert_notifications表的行数据）
+        """
+        groups = self._cities.get(city_key(forecast.city))
+        if not groups:
+            return []
+        self.stats["evaluations"] += 1
+
+        daily = daily_columns(forecast)
+        dates = daily["date"][:ALERT_MAX_HORIZON]
+        if not len(dates):
+            return []
+        indices = daily_index_columns(forecast)
+        first_date = str(dates[0])
+        now = datetime.utcnow()
+
+        notifications = []
+        for metric, group in groups.items():
+            values = (daily if metric in daily else indices)[metric][:ALERT_MAX_HORIZON].astype(np.float64)
+            for index in group.indexes():
+                matched, days, candidates = index.match(values)
+                self.stats["candidates"] += candidates
+                for rule_id, day in zip(matched.tolist(), days.tolist()):
+                    if rule_ids is not None and rule_id not in rule_ids:
+                        continue
+                    forecast_date = str(dates[day])
+                    notified = self._notified.get(rule_id, set())
+                    if forecast_date in notified:
+                        self.stats["suppressed"] += 1
+                        continue
+                    self._notified[rule_id] = {d for d in notified if d >= first_date} | {forecast_date}
+                    rule = self._rules[rule_id]
+                    notifications.append({
+                        "rule_id": rule_id,
+                        "subscriber": rule["subscriber"],
+                        "city_name": rule["city_name"],
+                        "metric": metric,
+                        "operator": rule["operator"],
+                        "threshold": rule["threshold"],
+                        "value": round(float(values[day]), 2),
+                        "forecast_date": date.fromisoformat(forecast_date),
+                        "created_at": now,
+                    })
+        self.stats["fired"] += len(notifications)
+        return notifications
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        获取引擎统计。
+
+        Returns:
+            Dict[str, Any]: 规则数、城市数、规则组数和检查统计
+        """
+        return {
+            "rules": len(self._rules),
+            "cities": len(self._cities),
+            "groups": sum(len(groups) for groups in self._cities.values()),
+            **self.stats,
+        }
+
+
+async def dispatch_alerts(forecast: CompactForecast, rule_ids: Optional[Collection[int]] = None) -> int:
+    """
+    预报刷新后检查规则，并把触发的通知放入本地通知队列（不等待写入数据库）。
+
+    Args:
+        forecast: 刷新后的紧凑预报
+        rule_ids: 只检查这些规则，默认检查该城市的全部规则
+
+    Returns:
+        int: 进入队列的通知数
+    """
+    try:
+        notifications = alert_engine.evaluate(forecast, rule_ids)
+    except Exception as e:
+        logger.error(f"检查{forecast.city.get('name')}的预警规则失败: {e}", exc_info=True)
+        return 0
+    queued = 0
+    for notification in notifications:
+        queued += await alert_writer.submit(notification)
+    if notifications:
+        logger.info(f"{forecast.city.get('name')}的预报触发{len(notifications)}条预警")
+    return queued
+
+
+async def create_rule(session, subscriber: str, forecast: CompactForecast, metric: str, operator: str,
+                      threshold: float, horizon_days: int = 3) -> Dict[str, Any]:
+    """
+    保存规则并加入内存索引，然后用创建规则时的预报检查一次该规则。
+
+    预报在缓存未命中时已经检查过（当时规则还不存在），缓存命中时要到下次刷新才会检查，
+    因此创建时已满足条件的规则在这里立即通知。
+
+    Args:
+        session: 数据库会话
+        subscriber: 订阅者标识
+        forecast: 规则城市的预报，用于确定城市键和名称，并检查新规则
+        metric: 指标名称
+        operator: 比较方式
+        threshold: 阈值
+        horizon_days: 检查的天数
+
+    Returns:
+        Dict[str, Any]: 保存后的规则
+
+    Raises:
+        ValueError: 参数不支持时抛出
+    """
+    validate_rule(metric, operator, horizon_days)
+    rule = AlertRule(
+        subscriber=subscriber,
+        city_key=city_key(forecast.city),
+        city_name=forecast.city.get("name", ""),
+        metric=metric,
+        operator=operator,
+        threshold=threshold,
+        horizon_days=horizon_days,
+        enabled=True,
+        created_at=datetime.utcnow(),
+    )
+    session.add(rule)
+    await session.flush()
+    # 提交前读取字段，提交后的实例会过期
+    result = {column.name: getattr(rule, column.name) for column in AlertRule.__table__.columns}
+    await session.commit()
+    alert_engine.add(result)
+    await dispatch_alerts(forecast, {result["id"]})
+    return result
+
+
+async def delete_rule(session, rule_id: int, subscriber: str) -> bool:
+    """
+    删除订阅者自己的规则并从内存索引中移除。
+
+    Args:
+        session: 数据库会话
+        rule_id: 规则ID
+        subscriber: 订阅者标识，只能删除该订阅者创建的规则
+
+    Returns:
+        bool: 该订阅者的规则是否存在
+    """
+    result = await session.execute(
+        delete(AlertRule).where(AlertRule.id == rule_id, AlertRule.subscriber == subscriber)
+    )
+    await session.commit()
+    if result.rowcount == 0:
+        return False
+    alert_engine.remove(rule_id)
+    return True
+
+
+# 创建全局预警引擎和通知写入器
+alert_engine = AlertEngine()
+alert_writer = BatchWriter(
+    "alert_notifications", bulk_insert_handler(AlertNotification),
+    max_queue=ALERT_QUEUE_SIZE, batch_size=ALERT_BATCH_SIZE, flush_interval=ALERT_FLUSH_INTERVAL,
+)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量写入服务模块。
+在后台将事件攒批后批量写入数据库，请求处理路径只需入队，无需等待数据库。
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import insert
+
+from ..database import SessionLocal
+from ..models import QueryHistory
+from .history_service import history_buffer
+from .trending_service import trending_tracker
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 查询历史写入配置
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", 10000))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 200))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 1.0))
+HISTORY_QUEUE_POLICY = os.getenv("HISTORY_QUEUE_POLICY", "drop")
+
+# 队列满时的处理策略
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+
+# 停止信号
+_STOP = object()
+
+
+def bulk_insert_handler(model, session_factory=None,
+                        on_inserted: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+                        ) -> Callable[[List[Dict[str, Any]]], Awaitable[None]]:
+    """
+    创建将一批行数据批量插入指定模型表的处理函数。
+
+    Args:
+        model: SQLAlchemy模型类
+        session_factory: 会话工厂，默认使用SessionLocal
+        on_inserted: 提交成功后的回调，接收包含数据库生成ID的完整行数据
+
+    Returns:
+        Callable: 接收行字典列表的异步处理函数
+    """
+    async def handler(rows: List[Dict[str, Any]]) -> None:
+        async with (session_factory or SessionLocal)() as session:
+            if on_inserted is None:
+                await session.execute(insert(model), rows)
+                await session.commit()
+                return
+            result = await session.execute(insert(model).returning(*model.__table__.columns), rows)
+            inserted = [dict(row) for row in result.mappings().all()]
+            await session.commit()
+        on_inserted(inserted)
+    return handler
+
+
+class BatchWriter:
+    """
+    后台批量写入器。
+    事件进入有界队列，后台任务在攒够batch_size条或等待flush_interval秒后批量写入。
+    """
+
+    def __init__(self, name: str,
+                 handler: Callable[[List[Any]], Awaitable[None]],
+                 max_queue: int = HISTORY_QUEUE_SIZE,
+                 batch_size: int = HISTORY_BATCH_SIZE,
+                 flush_interval: float = HISTORY_FLUSH_INTERVAL,
+                 policy: str = HISTORY_QUEUE_POLICY):
+        """
+        初始化批量写入器。
+
+        Args:
+            name: 写入器名称，用于日志
+            handler: 批量写入函数，接收一批事件
+            max_queue: 队列容量
+            batch_size: 每批最多写入的事件数
+            flush_interval: 最长攒批等待时间（秒）
+            policy: 队列满时的策略，drop丢弃新事件，block等待队列空位
+        """
+        if policy not in (POLICY_DROP, POLICY_BLOCK):
+            raise ValueError(f"不支持的队列策略: {policy}")
+
+        self.name = name
+        self.handler = handler
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats: Dict[str, int] = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "batches": 0,
+            "failures": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        """后台任务是否在当前事件循环中运行。"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return self._task is not None and not self._task.done() and self._loop is loop
+
+    @property
+    def pending(self) -> int:
+        """队列中等待写入的事件数。"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台写入任务。"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name=f"batch-writer-{self.name}")
+        logger.info(f"批量写入器'{self.name}'已启动")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        停止后台写入任务，并写入队列中剩余的事件。
+
+        Args:
+            timeout: 等待剩余事件写入的最长时间（秒）
+        """
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            logger.error(f"批量写入器'{self.name}'停止超时，剩余{self.pending}条事件未写入")
+        self._task = None
+        logger.info(f"批量写入器'{self.name}'已停止")
+
+    async def submit(self, event: Any) -> bool:
+        """
+        提交一个事件。
+
+        drop策略下不会等待，队列已满时丢弃事件；block策略下等待队列出现空位，但不会等待数据库。
+
+        Args:
+            event: 待写入的事件
+
+        Returns:
+            bool: 事件是否进入队列
+        """
+        if not self.running:
+            self.start()
+
+        if self.policy == POLICY_BLOCK:
+            await self._queue.put(event)
+        else:
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.stats["dropped"] += 1
+                logger.warning(f"批量写入器'{self.name}'队列已满，丢弃事件")
+                return False
+        self.stats["enqueued"] += 1
+        return True
+
+    async def _run(self) -> None:
+        """后台任务：按数量或时间攒批并写入。"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await self._queue.get()
+            if event is _STOP:
+                break
+            batch = [event]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            await self._write(batch)
+
+        # 停止前写入队列中剩余的事件
+        remaining_events = []
+        while not self._queue.empty():
+            event = self._queue.get_nowait()
+            if event is not _STOP:
+                remaining_events.append(event)
+        for start in range(0, len(remaining_events), self.batch_size):
+            await self._write(remaining_events[start:start + self.batch_size])
+
+    async def _write(self, batch: List[Any]) -> None:
+        """
+        写入一批事件，失败时记录日志并丢弃该批。
+
+        Args:
+            batch: 事件列表
+        """
+        try:
+            await self.handler(batch)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error(f"批量写入器'{self.name}'写入{len(batch)}条事件失败: {e}", exc_info=True)
+
+
+class QueryHistoryWriter(BatchWriter):
+    """查询历史批量写入器。"""
+
+    async def record(self, city_name: str, ip_address: Optional[str],
+                     query_time: Optional[datetime] = None) -> bool:
+        """
+        记录一次查询，同时更新热门城市统计。
+
+        Args:
+            city_name: 查询的城市名称
+            ip_address: 客户端IP
+            query_time: 查询时间（UTC），默认当前时间
+
+        Returns:
+            bool: 事件是否进入队列
+        """
+        query_time = query_time or datetime.utcnow()
+        # 热门城市统计在入队时更新，不等待写入数据库
+        trending_tracker.record(city_name, query_time)
+        return await self.submit({
+            "city_name": city_name,
+            "query_time": query_time,
+            "ip_address": ip_address,
+        })
+
+
+# 创建全局查询历史写入器
+history_writer = QueryHistoryWriter(
+    "query_history", bulk_insert_handler(QueryHistory, on_inserted=history_buffer.extend)
+)
@@ -4,12 +4,15 @@
 """
 缓存服务模块。
 提供内存缓存功能，缓存天气数据，减少API调用。
+支持按命名空间统计命中率、过期与淘汰情况，并可按命名空间或城市定向失效。
 """
 
 import os
+import sys
 import time
 import json
-from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict, Counter
+from typing import Dict, Any, Optional, Callable, List
 from functools import wraps
 from dotenv import load_dotenv
 
@@ -18,70 +21,308 @@ load_dotenv()
 
 # 缓存过期时间，默认30分钟
 CACHE_TTL = int(os.getenv("CACHE_TTL", 1800))
+# 缓存最大条目数，0表示不限制
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 0))
+
+# 未指定命名空间时使用的默认命名空间
+DEFAULT_NAMESPACE = "default"
+
+# 缓存条目年龄分布的分桶（上界秒数, 标签）
+AGE_BUCKETS = [
+    (60, "<1m"),
+    (300, "1m-5m"),
+    (900, "5m-15m"),
+    (1800, "15m-30m"),
+    (3600, "30m-1h"),
+    (float("inf"), ">1h"),
+]
+
+# 可以作为缓存键组成部分的参数类型（依赖注入的会话、请求等对象不参与构建缓存键）
+_KEY_TYPES = (str, int, float, bool, type(None))
+
+
+def _new_counters() -> Dict[str, int]:
+    """创建一组空的命名空间统计计数器。"""
+    return {
+        "hits": 0,
+        "misses": 0,
+        "sets": 0,
+        "evictions": 0,
+        "expirations": 0,
+        "invalidations": 0,
+    }
+
+
+def _deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    估算对象及其包含对象占用的内存字节数。
+
+    Args:
+        obj: 待估算的对象
+        seen: 已统计过的对象id集合，避免重复统计共享对象
+
+    Returns:
+        int: 估算的字节数
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _deep_sizeof(key, seen) + _deep_sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += _deep_sizeof(item, seen)
+    elif hasattr(obj, "__slots__"):
+        for name in obj.__slots__:
+            size += _deep_sizeof(getattr(obj, name, None), seen)
+    elif hasattr(obj, "nbytes"):
+        # NumPy数组等缓冲区对象，sys.getsizeof不一定包含数据区
+        size = max(size, int(obj.nbytes))
+    elif hasattr(obj, "__dict__"):
+        size += _deep_sizeof(vars(obj), seen)
+    return size
 
 
 class SimpleCache:
     """
     简单内存缓存类。
     用于存储API响应数据，减少API调用次数。
+
+    每个条目归属于一个命名空间（如current、forecast、viz_temp、viz_dashboard），
+    缓存按命名空间记录命中、未命中、淘汰、过期等统计信息。
+
+    条目关联的城市经city_key归一化后保存，按城市失效时使用同一函数，
+    使同一城市的不同写法（如"北京"、"Beijing"、"beijing,cn"）对应同一标签。
     """
-    
-    def __init__(self, ttl: int = CACHE_TTL):
+
+    def __init__(self, ttl: int = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
         """
         初始化缓存。
-        
+
         Args:
             ttl: 缓存过期时间（秒），默认30分钟
+            max_entries: 最大条目数，超出时按最近最少使用淘汰，0表示不限制
         """
         self.ttl = ttl
-        self.cache: Dict[str, Dict[str, Any]] = {}
-    
-    def get(self, key: str) -> Optional[Any]:
+        self.max_entries = max_entries
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # 城市标签归一化函数，默认只转小写，天气服务创建后替换为按查询参数归一化
+        self.city_key: Callable[[str], str] = str.lower
+
+    def _count(self, namespace: str, field: str, amount: int = 1) -> None:
+        """
+        累加命名空间统计计数。
+
+        Args:
+            namespace: 命名空间
+            field: 计数器名称
+            amount: 累加值
+        """
+        counters = self._counters.get(namespace)
+        if counters is None:
+            counters = self._counters[namespace] = _new_counters()
+        counters[field] += amount
+
+    def get(self, key: str, namespace: Optional[str] = None) -> Optional[Any]:
         """
         从缓存获取数据。
-        
+
         Args:
             key: 缓存键
-            
+            namespace: 命名空间，仅用于未命中时的统计，默认使用条目自身的命名空间
+
         Returns:
             Optional[Any]: 缓存数据，如果不存在或已过期则返回None
         """
-        if key not in self.cache:
+        cache_item = self.cache.get(key)
+        if cache_item is None:
+            self._count(namespace or DEFAULT_NAMESPACE, "misses")
             return None
-            
-        cache_item = self.cache[key]
+
         if time.time() > cache_item["expires"]:
             # 缓存已过期，删除并返回None
             del self.cache[key]
+            self._count(cache_item["namespace"], "expirations")
+            self._count(cache_item["namespace"], "misses")
+            return None
+
+        # 命中，移动到末尾以维护最近最少使用顺序
+        self.cache.move_to_end(key)
+        cache_item["hits"] += 1
+        self._count(cache_item["namespace"], "hits")
+        return cache_item["data"]
+
+    def peek(self, key: str) -> Optional[Any]:
+        """
+        读取缓存数据但不影响统计和淘汰顺序。
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Any]: 缓存数据，如果不存在或已过期则返回None
+        """
+        cache_item = self.cache.get(key)
+        if cache_item is None or time.time() > cache_item["expires"]:
             return None
-            
         return cache_item["data"]
-    
-    def set(self, key: str, data: Any, ttl: Optional[int] = None) -> None:
+
+    def set(self, key: str, data: Any, ttl: Optional[int] = None,
+            namespace: Optional[str] = None, city: Optional[str] = None) -> None:
         """
         设置缓存数据。
-        
+
         Args:
             key: 缓存键
             data: 缓存数据
             ttl: 缓存过期时间（秒），默认使用全局TTL
+            namespace: 命名空间，默认为default
+            city: 条目关联的城市，用于按城市定向失效
         """
-        expires = time.time() + (ttl if ttl is not None else self.ttl)
+        namespace = namespace or DEFAULT_NAMESPACE
+        now = time.time()
+        expires = now + (ttl if ttl is not None else self.ttl)
         self.cache[key] = {
             "data": data,
-            "expires": expires
+            "expires": expires,
+            "created": now,
+            "namespace": namespace,
+            "city": self.city_key(city) if city else None,
+            "hits": 0,
         }
-    
+        self.cache.move_to_end(key)
+        self._count(namespace, "sets")
+
+        # 超出容量时淘汰最近最少使用的条目
+        if self.max_entries:
+            while len(self.cache) > self.max_entries:
+                _, evicted = self.cache.popitem(last=False)
+                self._count(evicted["namespace"], "evictions")
+
     def delete(self, key: str) -> None:
         """
         删除缓存数据。
-        
+
         Args:
             key: 缓存键
         """
         if key in self.cache:
-            del self.cache[key]
-    
+            cache_item = self.cache.pop(key)
+            self._count(cache_item["namespace"], "invalidations")
+
+    def invalidate(self, namespace: Optional[str] = None,
+                   city: Optional[str] = None) -> int:
+        """
+        按命名空间和/或城市定向失效缓存。
+
+        Args:
+            namespace: 命名空间，为None时匹配所有命名空间
+            city: 城市名称（按city_key归一化后匹配），为None时匹配所有城市
+
+        Returns:
+            int: 删除的条目数
+        """
+        city = self.city_key(city) if city else None
+        keys = [
+            key for key, item in self.cache.items()
+            if (namespace is None or item["namespace"] == namespace)
+            and (city is None or item["city"] == city)
+        ]
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def purge_expired(self) -> int:
+        """
+        清理所有已过期的条目。
+
+        Returns:
+            int: 清理的条目数
+        """
+        now = time.time()
+        expired = [key for key, item in self.cache.items() if now > item["expires"]]
+        for key in expired:
+            cache_item = self.cache.pop(key)
+            self._count(cache_item["namespace"], "expirations")
+        return len(expired)
+
+    def stats(self, namespace: Optional[str] = None, top_n: int = 10) -> Dict[str, Any]:
+        """
+        统计缓存使用情况。
+
+        Args:
+            namespace: 只统计指定命名空间，为None时统计全部
+            top_n: 每个命名空间返回的热门键数量
+
+        Returns:
+            Dict[str, Any]: 包含总体和各命名空间统计信息的字典
+        """
+        now = time.time()
+        entries: Dict[str, List[Any]] = {}
+        for key, item in self.cache.items():
+            if now > item["expires"]:
+                continue
+            entries.setdefault(item["namespace"], []).append((key, item))
+
+        names = sorted(set(self._counters) | set(entries))
+        if namespace is not None:
+            names = [namespace]
+
+        namespaces = {}
+        for name in names:
+            counters = dict(self._counters.get(name) or _new_counters())
+            items = entries.get(name, [])
+            lookups = counters["hits"] + counters["misses"]
+            sizes = [_deep_sizeof(item["data"]) for _, item in items]
+            ages: Counter = Counter()
+            for _, item in items:
+                age = now - item["created"]
+                label = next(label for bound, label in AGE_BUCKETS if age < bound)
+                ages[label] += 1
+            top_keys = sorted(items, key=lambda pair: pair[1]["hits"], reverse=True)[:top_n]
+
+            namespaces[name] = {
+                **counters,
+                "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(items),
+                "total_size": sum(sizes),
+                "avg_entry_size": round(sum(sizes) / len(sizes), 1) if sizes else 0.0,
+                "age_distribution": {label: ages.get(label, 0) for _, label in AGE_BUCKETS},
+                "top_keys": [
+                    {
+                        "key": key,
+                        "hits": item["hits"],
+                        "city": item["city"],
+                        "age": round(now - item["created"], 1),
+                        "ttl_remaining": round(item["expires"] - now, 1),
+                    }
+                    for key, item in top_keys
+                ],
+            }
+
+        total_hits = sum(ns["hits"] for ns in namespaces.values())
+        total_lookups = total_hits + sum(ns["misses"] for ns in namespaces.values())
+        return {
+            "entries": sum(ns["entries"] for ns in namespaces.values()),
+            "total_size": sum(ns["total_size"] for ns in namespaces.values()),
+            "hit_ratio": round(total_hits / total_lookups, 4) if total_lookups else 0.0,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "namespaces": namespaces,
+        }
+
+    def reset_stats(self) -> None:
+        """重置所有统计计数器。"""
+        self._counters.clear()
+        for item in self.cache.values():
+            item["hits"] = 0
+
     def clear(self) -> None:
         """清空所有缓存数据。"""
         self.cache.clear()
@@ -91,22 +332,25 @@ class SimpleCache:
 cache = SimpleCache()
 
 
-def cached(key_prefix: str, ttl: Optional[int] = None):
+def cached(key_prefix: str, ttl: Optional[int] = None, namespace: Optional[str] = None):
     """
     缓存装饰器，用于缓存函数返回值。
-    
+
     Args:
         key_prefix: 缓存键前缀
         ttl: 缓存过期时间（秒），默认使用全局TTL
-        
+        namespace: 统计用命名空间，默认取去掉末尾下划线的键前缀
+
     Returns:
         Callable: 装饰器函数
-    
+
     使用示例：
-        @cached("weather_current_")
+        @cached("weather_current_", namespace="current")
         async def get_current_weather(city: str):
             # 函数实现
     """
+    namespace = namespace or key_prefix.rstrip("_")
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -114,21 +358,26 @@ def cached(key_prefix: str, ttl: Optional[int] = None):
             key_parts = [key_prefix]
             # 添加位置参数
             key_parts.extend([str(arg) for arg in args if not callable(arg)])
-            # 添加关键字参数
-            key_parts.extend([f"{k}:{v}" for k, v in sorted(kwargs.items())])
+            # 添加关键字参数（数据库会话、请求等注入对象不参与构建缓存键）
+            key_parts.extend([
+                f"{k}:{v}" for k, v in sorted(kwargs.items())
+                if isinstance(v, _KEY_TYPES)
+            ])
             cache_key = "_".join(key_parts)
-            
+
             # 尝试从缓存获取
-            result = cache.get(cache_key)
+            result = cache.get(cache_key, namespace=namespace)
             if result is not None:
                 return result
-                
+
             # 缓存未命中，调用原函数
             result = await func(*args, **kwargs)
-            
+
             # 缓存结果
-            cache.set(cache_key, result, ttl)
+            city = kwargs.get("city")
+            cache.set(cache_key, result, ttl, namespace=namespace,
+                      city=city if isinstance(city, str) else None)
             return result
-            
+
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+城市目录服务模块。
+从GeoNames格式的城市数据批量导入城市（含中文名、拼音等别名），
+并在内存中维护有序的名称前缀索引和经纬度空间索引，城市自动补全和附近城市查询无需请求第三方API。
+"""
+
+import io
+import gzip
+import bisect
+import heapq
+import logging
+import zipfile
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import SessionLocal
+from ..models import City
+from .observation_service import dialect_insert
+from .spatial_index import SpatialIndex
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# GeoNames城市数据（citiesXXXX.txt）的列位置
+_GEONAMES_ID = 0
+_GEONAMES_NAME = 1
+_GEONAMES_ASCII_NAME = 2
+_GEONAMES_ALTERNATE_NAMES = 3
+_GEONAMES_LATITUDE = 4
+_GEONAMES_LONGITUDE = 5
+_GEONAMES_FEATURE_CLASS = 6
+_GEONAMES_COUNTRY = 8
+_GEONAMES_POPULATION = 14
+_GEONAMES_TIMEZONE = 17
+
+# 名称归一化时去掉的分隔符，使"Xi'an"、"xi an"和"xian"匹配同一城市
+_SEPARATORS = str.maketrans("", "", " -'’.·")
+
+# 前缀长度不超过该值的查询结果会被缓存，短前缀匹配范围大，排序开销集中在这里
+_MEMO_PREFIX_LENGTH = 2
+
+
+def normalize_name(name: str) -> str:
+    """
+    归一化城市名称：去掉重音符号和分隔符并转为小写。
+
+    Args:
+        name: 城市名称
+
+    Returns:
+        str: 归一化后的名称
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold().translate(_SEPARATORS)
+
+
+def _is_cjk(ch: str) -> bool:
+    """是否为中日韩统一表意文字。"""
+    return "\u4e00" <= ch <= "\u9fff" or "\u3400" <= ch <= "\u4dbf"
+
+
+def _keep_alternate_name(name: str) -> bool:
+    """只保留中文名和拉丁字母名称（英文名、拼音等），其他语言的别名不进入目录。"""
+    if not name or len(name) > 60:
+        return False
+    has_cjk = any(_is_cjk(ch) for ch in name)
+    has_latin = any(ch.isalpha() and ord(ch) < 0x250 for ch in name)
+    if has_cjk and has_latin:
+        return False
+    return all(_is_cjk(ch) or ord(ch) < 0x250 or not ch.isalpha() for ch in name)
+
+
+def _open_text(path: str) -> io.TextIOBase:
+    """打开GeoNames数据文件，支持.txt、.gz以及GeoNames下载的.zip压缩包。"""
+    if path.endswith(".zip"):
+        archive = zipfile.ZipFile(path)
+        member = next(name for name in archive.namelist() if name.endswith(".txt"))
+        return io.TextIOWrapper(archive.open(member), encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def parse_geonames(lines, min_population: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    逐行解析GeoNames城市数据。
+
+    Args:
+        lines: 文本行迭代器（制表符分隔，19列）
+        min_population: 最小人口，人口更少的城市被跳过
+
+    Yields:
+        Dict[str, Any]: City表的行数据
+    """
+    for line in lines:
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 19 or fields[_GEONAMES_FEATURE_CLASS] != "P":
+            continue
+        population = int(fields[_GEONAMES_POPULATION] or 0)
+        if population < min_population:
+            continue
+        alternate_names = [
+            alt for alt in fields[_GEONAMES_ALTERNATE_NAMES].split(",")
+            if _keep_alternate_name(alt)
+        ]
+        yield {
+            "external_id": int(fields[_GEONAMES_ID]),
+            "name": fields[_GEONAMES_NAME],
+            "ascii_name": fields[_GEONAMES_ASCII_NAME] or None,
+            "alternate_names": ",".join(dict.fromkeys(alternate_names)) or None,
+            "country": fields[_GEONAMES_COUNTRY],
+            "latitude": float(fields[_GEONAMES_LATITUDE]),
+            "longitude": float(fields[_GEONAMES_LONGITUDE]),
+            "population": population,
+            "timezone": fields[_GEONAMES_TIMEZONE] or None,
+        }
+
+
+async def _upsert_catalog(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """按external_id写入或更新一批城市目录数据。"""
+    stmt = dialect_insert(session, City)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[City.external_id],
+        set_={name: stmt.excluded[name] for name in rows[0] if name != "external_id"},
+    )
+    await session.execute(stmt, rows)
+
+
+async def load_geonames(path: str, session_factory=None,
+                        min_population: int = 0, batch_size: int = 2000) -> int:
+    """
+    从GeoNames数据文件批量导入城市目录，每批单独提交。
+
+    Args:
+        path: 数据文件路径（如cities15000.zip）
+        session_factory: 会话工厂，默认使用SessionLocal
+        min_population: 最小人口
+        batch_size: 每批写入的城市数
+
+    Returns:
+        int: 导入的城市数
+    """
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    with _open_text(path) as lines:
+        for row in parse_geonames(lines, min_population):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                async with (session_factory or SessionLocal)() as session:
+                    await _upsert_catalog(session, batch)
+                    await session.commit()
+                total += len(batch)
+                batch = []
+    if batch:
+        async with (session_factory or SessionLocal)() as session:
+            await _upsert_catalog(session, batch)
+            await session.commit()
+        total += len(batch)
+    logger.info(f"已从{path}导入{total}个城市")
+    return total
+
+
+class CityCatalog:
+    """
+    城市目录前缀索引和空间索引。
+
+    每个城市的名称、ASCII名称和别名归一化后放入一个有序列表，
+    前缀查询用二分查找定位匹配区间，再按人口取前N个城市。
+    城市坐标另建KD树，用于查找最近的城市和半径范围内的城市。
+    """
+
+    def __init__(self):
+        """初始化空目录。"""
+        self._keys: List[str] = []
+        self._refs: List[int] = []
+        self._cities: List[Dict[str, Any]] = []
+        self._memo: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._spatial = SpatialIndex([], [])
+        self._latitudes = np.empty(0)
+        self._longitudes = np.empty(0)
+        self._populations = np.empty(0)
+
+    def __len__(self) -> int:
+        """目录中的城市数。"""
+        return len(self._cities)
+
+    def build(self, cities: List[Dict[str, Any]]) -> None:
+        """
+        用城市列表重建索引。
+
+        Args:
+            cities: 城市字典列表，包含id、name、country、latitude、longitude，
+                可选ascii_name、alternate_names（逗号分隔）和population
+        """
+        entries = []
+        for index, city in enumerate(cities):
+            names = [city["name"], city.get("ascii_name")]
+            names.extend((city.get("alternate_names") or "").split(","))
+            for key in {normalize_name(name) for name in names if name}:
+                if key:
+                    entries.append((key, index))
+        entries.sort()
+
+        self._cities = cities
+        self._keys = [key for key, _ in entries]
+        self._refs = [index for _, index in entries]
+        self._memo = {}
+        self._latitudes = np.array([city["latitude"] for city in cities], dtype=np.float64)
+        self._longitudes = np.array([city["longitude"] for city in cities], dtype=np.float64)
+        self._populations = np.array([city.get("population") or 0 for city in cities], dtype=np.int64)
+        self._spatial = SpatialIndex(self._latitudes, self._longitudes)
+
+    async def load(self, session: AsyncSession) -> int:
+        """
+        从City表加载全部城市并重建索引。
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            int: 加载的城市数
+        """
+        result = await session.execute(select(
+            City.id, City.name, City.country, City.latitude, City.longitude,
+            City.ascii_name, City.alternate_names, City.population,
+        ))
+        self.build([dict(row) for row in result.mappings().all()])
+        logger.info(f"城市目录已加载，共{len(self._cities)}个城市、{len(self._keys)}个名称")
+        return len(self._cities)
+
+    def _suggestion(self, index: int, matched: str) -> Dict[str, Any]:
+        """构造自动补全结果。"""
+        city = self._cities[index]
+        return {
+            "id": city["id"],
+            "name": city["name"],
+            "country": city["country"],
+            "latitude": city["latitude"],
+            "longitude": city["longitude"],
+            "population": city.get("population"),
+            "matched": matched,
+            # 第三方API按ASCII名称查询更可靠
+            "query": f"{city.get('ascii_name') or city['name']},{city['country']}",
+        }
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        按名称前缀查找城市。
+
+        完全匹配的城市排在前面，其余按人口从多到少排序。
+
+        Args:
+            prefix: 名称前缀，支持中文名、拼音和英文名，忽略大小写、重音和分隔符
+            limit: 最多返回的城市数
+
+        Returns:
+            List[Dict[str, Any]]: 城市列表，query字段可直接用于天气查询
+        """
+        key = normalize_name(prefix)
+        if not key or limit <= 0:
+            return []
+        memo_key = (key, limit)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_left(self._keys, key + "\U0010ffff", lo)
+        # 同一城市可能通过多个名称匹配，保留最短（最接近查询）的名称
+        matched: Dict[int, str] = {}
+        for position in range(lo, hi):
+            index = self._refs[position]
+            name = self._keys[position]
+            if index not in matched or len(name) < len(matched[index]):
+                matched[index] = name
+
+        best = heapq.nsmallest(
+            limit, matched,
+            key=lambda i: (matched[i] != key, -(self._cities[i].get("population") or 0),
+                           self._cities[i]["name"]),
+        )
+        results = [self._suggestion(index, matched[index]) for index in best]
+        if len(key) <= _MEMO_PREFIX_LENGTH:
+            self._memo[memo_key] = results
+        return results
+
+    def _nearby(self, index: int, distance_km: Optional[float] = None) -> Dict[str, Any]:
+        """构造按位置查找的城市结果。"""
+        city = self._cities[index]
+        result = {
+            "id": city["id"],
+            "name": city["name"],
+            "country": city["country"],
+            "latitude": city["latitude"],
+            "longitude": city["longitude"],
+            "population": city.get("population"),
+            "query": f"{city.get('ascii_name') or city['name']},{city['country']}",
+        }
+        if distance_km is not None:
+            result["distance_km"] = round(distance_km, 2)
+        return result
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        查找离指定坐标最近的k个城市（按大圆距离）。
+
+        Args:
+            latitude: 纬度（度）
+            longitude: 经度（度）
+            k: 最多返回的城市数
+
+        Returns:
+            List[Dict[str, Any]]: 城市列表，按距离从近到远排列，distance_km为距离（千米）
+        """
+        return [self._nearby(index, distance)
+                for index, distance in self._spatial.nearest(latitude, longitude, k)]
+
+    def within(self, latitude: float, longitude: float, radius_km: float,
+               limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        查找指定坐标周围半径范围内的城市。
+
+        Args:
+            latitude: 纬度（度）
+            longitude: 经度（度）
+            radius_km: 半径（千米）
+            limit: 最多返回的城市数
+
+        Returns:
+            List[Dict[str, Any]]: 城市列表，按距离从近到远排列，distance_km为距离（千米）
+        """
+        matches = self._spatial.within(latitude, longitude, radius_km)[:max(limit, 0)]
+        return [self._nearby(index, distance) for index, distance in matches]
+
+    def in_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        查找经纬度范围内的城市，超出limit时取人口最多的城市。
+
+        Args:
+            min_lat: 最小纬度
+            min_lon: 最小经度
+            max_lat: 最大纬度
+            max_lon: 最大经度
+            limit: 最多返回的城市数
+
+        Returns:
+            List[Dict[str, Any]]: 城市列表，按人口从多到少排列
+        """
+        mask = ((self._latitudes >= min_lat) & (self._latitudes <= max_lat)
+                & (self._longitudes >= min_lon) & (self._longitudes <= max_lon))
+        indices = np.flatnonzero(mask)
+        indices = indices[np.argsort(-self._populations[indices], kind="stable")][:max(limit, 0)]
+        return [self._nearby(index) for index in indices.tolist()]
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        按名称精确查找城市，同名城市取人口最多的。
+
+        Args:
+            name: 城市名称
+
+        Returns:
+            Optional[Dict[str, Any]]: 城市信息，不存在时返回None
+        """
+        results = self.search(name, limit=1)
+        if results and results[0]["matched"] == normalize_name(name):
+            return results[0]
+        return None
+
+
+# 创建全局城市目录
+city_catalog = CityCatalog()
@@ -0,0 +1,431 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+气候基准服务模块。
+由已保存的观测数据（天汇总和尚未汇总的原始数据）或导入的历史日平均气温数据，
+批量计算每个城市每个日序的气温常年值（平均值、标准差和分位数）并写入climate_normals表。
+服务运行时将基准加载为内存数组，预报的气温距平按下标直接读取，不查询历史数据。
+"""
+
+import os
+import csv
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import SessionLocal
+from ..models import City, WeatherRecord, WeatherRecordRollup, ClimateNormal
+from ..utils.time_buckets import GRANULARITY_DAY, floor_time, truncate_time, as_datetime
+from .city_catalog import normalize_name
+from .retention_service import get_watermark
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 计算某日常年值时纳入前后各多少天的数据（平滑逐日噪声，弥补年份较少的不足）
+CLIMATE_WINDOW_DAYS = int(os.getenv("CLIMATE_WINDOW_DAYS", 7))
+# 日序样本数少于该值时不生成基准
+CLIMATE_MIN_SAMPLES = int(os.getenv("CLIMATE_MIN_SAMPLES", 10))
+
+# 日序个数（按闰年日历）
+DAYS_PER_YEAR = 366
+# 统计量在基准数组最后一维中的顺序
+NORMAL_STATS = ["temperature_mean", "temperature_std", "temperature_p10",
+                "temperature_p50", "temperature_p90"]
+# 分位数对应的统计量
+_PERCENTILES = {"temperature_p10": 0.1, "temperature_p50": 0.5, "temperature_p90": 0.9}
+# 每批写入的基准行数
+_INSERT_BATCH_SIZE = 5000
+
+# 闰年中每月1日的日序下标（从0开始）
+_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+
+def day_slot(day: date) -> int:
+    """
+    获取日期的日序下标（0-365）。
+    按闰年日历编号，2月29日为59，3月1日无论平年闰年均为60，同一日期各年份的下标一致。
+
+    Args:
+        day: 日期
+
+    Returns:
+        int: 日序下标
+    """
+    return int(_MONTH_OFFSETS[day.month - 1]) + day.day - 1
+
+
+def compute_normals(city_ids: np.ndarray, slots: np.ndarray, values: np.ndarray,
+                    window: int = CLIMATE_WINDOW_DAYS,
+                    min_samples: int = CLIMATE_MIN_SAMPLES) -> Dict[str, np.ndarray]:
+    """
+    由日平均气温计算每个城市每个日序的常年值。
+
+    每个日平均气温计入所在日序及前后window天（跨年循环）的统计，
+    全部样本按(城市, 日序, 气温)排序后一次性计算各组的均值、标准差和分位数。
+
+    Args:
+        city_ids: 城市ID数组
+        slots: 日序下标数组（0-365），见day_slot
+        values: 日平均气温数组
+        window: 前后纳入的天数
+        min_samples: 最少样本数，不足的日序不输出
+
+    Returns:
+        Dict[str, np.ndarray]: city_id、day_of_year（1-366）、sample_count和NORMAL_STATS中各统计量的数组
+    """
+    city_ids = np.asarray(city_ids, dtype=np.int64)
+    slots = np.asarray(slots, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    city_ids, slots, values = city_ids[valid], slots[valid], values[valid]
+
+    offsets = np.arange(-window, window + 1)
+    spread_slots = ((slots[:, None] + offsets) % DAYS_PER_YEAR).ravel()
+    spread_cities = np.repeat(city_ids, len(offsets))
+    spread_values = np.repeat(values, len(offsets))
+
+    groups = spread_cities * DAYS_PER_YEAR + spread_slots
+    order = np.lexsort((spread_values, groups))
+    groups = groups[order]
+    spread_values = spread_values[order]
+
+    keys, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    keep = counts >= min_samples
+    if not keep.any():
+        return {name: np.empty(0) for name in
+                ["city_id", "day_of_year", "sample_count", *NORMAL_STATS]}
+
+    means = np.add.reduceat(spread_values, starts) / counts
+    squares = np.add.reduceat((spread_values - np.repeat(means, counts)) ** 2, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stds = np.where(counts > 1, np.sqrt(squares / (counts - 1)), np.nan)
+
+    normals = {
+        "city_id": keys // DAYS_PER_YEAR,
+        "day_of_year": keys % DAYS_PER_YEAR + 1,
+        "sample_count": counts,
+        "temperature_mean": means,
+        "temperature_std": stds,
+    }
+    # 组内已按气温排序，分位数在组内线性插值
+    for name, q in _PERCENTILES.items():
+        position = starts + q * (counts - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, starts + counts - 1)
+        fraction = position - lower
+        normals[name] = (spread_values[lower] * (1 - fraction)
+                         + spread_values[upper] * fraction)
+    return {name: column[keep] for name, column in normals.items()}
+
+
+async def daily_means_from_observations(session: AsyncSession) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    读取已保存观测数据的逐日平均气温（UTC日）。
+    已汇总的完整日期读取天汇总（原始数据可能已被清理），其余日期由原始数据按天聚合。
+
+    Args:
+        session: 数据库会话
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: 城市ID、日序下标和日平均气温数组
+    """
+    watermark = await get_watermark(session, "weather_records")
+    boundary = floor_time(watermark, GRANULARITY_DAY) if watermark else None
+
+    rows: List[Tuple[int, Any, float]] = []
+    if boundary is not None:
+        result = await session.execute(
+            select(WeatherRecordRollup.city_id, WeatherRecordRollup.bucket_start,
+                   WeatherRecordRollup.temperature_avg)
+            .where(WeatherRecordRollup.granularity == GRANULARITY_DAY,
+                   WeatherRecordRollup.bucket_start < boundary,
+                   WeatherRecordRollup.temperature_avg.isnot(None))
+        )
+        rows.extend(result.all())
+
+    bucket = truncate_time(session, WeatherRecord.observed_at, GRANULARITY_DAY).label("bucket")
+    stmt = (
+        select(WeatherRecord.city_id, bucket, func.avg(WeatherRecord.temperature))
+        .where(WeatherRecord.observed_at.isnot(None))
+        .group_by(WeatherRecord.city_id, bucket)
+    )
+    if boundary is not None:
+        stmt = stmt.where(WeatherRecord.observed_at >= boundary)
+    result = await session.execute(stmt)
+    rows.extend(result.all())
+
+    city_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    slots = np.fromiter((day_slot(as_datetime(row[1])) for row in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    return city_ids, slots, values
+
+
+async def daily_means_from_csv(session: AsyncSession, path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    读取导入的历史日平均气温数据。
+
+    CSV文件需包含date（YYYY-MM-DD）和temperature（摄氏度）列，
+    城市由external_id列（GeoNames/OpenWeatherMap城市ID）或city、country列指定，
+    城市需已存在于cities表中（例如已导入城市目录），找不到的城市被跳过。
+
+    Args:
+        session: 数据库会话
+        path: CSV文件路径
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: 城市ID、日序下标和日平均气温数组
+    """
+    result = await session.execute(
+        select(City.id, City.external_id, City.name, City.ascii_name, City.country)
+    )
+    by_external: Dict[int, int] = {}
+    by_name: Dict[Tuple[str, str], int] = {}
+    for city_id, external_id, name, ascii_name, country in result.all():
+        if external_id is not None:
+            by_external[external_id] = city_id
+        for alias in (name, ascii_name):
+            if alias:
+                by_name.setdefault((normalize_name(alias), country.upper()), city_id)
+
+    city_ids: List[int] = []
+    slots: List[int] = []
+    values: List[float] = []
+    skipped = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if not row.get("temperature"):
+                continue
+            if row.get("external_id"):
+                city_id = by_external.get(int(row["external_id"]))
+            else:
+                city_id = by_name.get((normalize_name(row.get("city") or ""),
+                                       (row.get("country") or "").upper()))
+            if city_id is None:
+                skipped += 1
+                continue
+            city_ids.append(city_id)
+            slots.append(day_slot(date.fromisoformat(row["date"][:10])))
+            values.append(float(row["temperature"]))
+    if skipped:
+        logger.warning(f"{path}中有{skipped}行数据找不到对应城市，已跳过")
+    return (np.array(city_ids, dtype=np.int64), np.array(slots, dtype=np.int64),
+            np.array(values, dtype=np.float64))
+
+
+async def save_normals(session: AsyncSession, normals: Dict[str, np.ndarray]) -> int:
+    """
+    写入气候基准，替换涉及城市的全部旧基准（不提交事务）。
+
+    Args:
+        session: 数据库会话
+        normals: compute_normals返回的数组
+
+    Returns:
+        int: 写入的基准行数
+    """
+    city_ids = sorted({int(city_id) for city_id in normals["city_id"]})
+    if not city_ids:
+        return 0
+    await session.execute(delete(ClimateNormal).where(ClimateNormal.city_id.in_(city_ids)))
+
+    now = datetime.utcnow()
+    columns = {name: column.tolist() for name, column in normals.items()}
+    rows = []
+    for i in range(len(columns["city_id"])):
+        row = {name: values[i] for name, values in columns.items()}
+        if row["temperature_std"] != row["temperature_std"]:
+            # 只有一个样本时标准差为NaN，写为NULL
+            row["temperature_std"] = None
+        row["updated_at"] = now
+        rows.append(row)
+    for start in range(0, len(rows), _INSERT_BATCH_SIZE):
+        await session.execute(ClimateNormal.__table__.insert(), rows[start:start + _INSERT_BATCH_SIZE])
+    return len(rows)
+
+
+async def build_climate_normals(session_factory=None, csv_path: Optional[str] = None,
+                                window: int = CLIMATE_WINDOW_DAYS,
+                                min_samples: int = CLIMATE_MIN_SAMPLES) -> Dict[str, int]:
+    """
+    批量计算并保存气候基准。
+
+    Args:
+        session_factory: 会话工厂，默认使用SessionLocal
+        csv_path: 历史日平均气温CSV文件，为空时使用已保存的观测数据
+        window: 前后纳入的天数
+        min_samples: 最少样本数
+
+    Returns:
+        Dict[str, int]: 输入的日平均气温数、涉及的城市数和写入的基准行数
+    """
+    async with (session_factory or SessionLocal)() as session:
+        if csv_path:
+            city_ids, slots, values = await daily_means_from_csv(session, csv_path)
+        else:
+            city_ids, slots, values = await daily_means_from_observations(session)
+        normals = compute_normals(city_ids, slots, values, window=window, min_samples=min_samples)
+        count = await save_normals(session, normals)
+        await session.commit()
+
+    report = {
+        "days": int(len(values)),
+        "cities": int(len(np.unique(normals["city_id"]))),
+        "normals": count,
+    }
+    logger.info(f"气候基准计算完成: 日平均气温{report['days']}个，城市{report['cities']}个，"
+                f"基准{report['normals']}行")
+    return report
+
+
+class ClimateBaselines:
+    """
+    内存中的气候基准。
+
+    全部基准保存在形状为(城市数, 366, 统计量数)的数组中，
+    城市通过第三方城市ID或(归一化名称, 国家代码)映射到数组的第一维下标。
+    """
+
+    def __init__(self):
+        """初始化空基准。"""
+        self._stats = np.full((0, DAYS_PER_YEAR, len(NORMAL_STATS)), np.nan, dtype=np.float32)
+        self._counts = np.zeros((0, DAYS_PER_YEAR), dtype=np.int32)
+        self._by_external: Dict[int, int] = {}
+        self._by_name: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        """有基准的城市数。"""
+        return int(self._stats.shape[0])
+
+    def build(self, cities: List[Dict[str, Any]], normals: Dict[str, np.ndarray]) -> None:
+        """
+        用城市和基准数组重建内存基准。
+
+        Args:
+            cities: 城市字典列表，包含id、external_id、name、ascii_name和country
+            normals: 与compute_normals返回格式相同的数组
+        """
+        rows = {city["id"]: row for row, city in enumerate(cities)}
+        stats = np.full((len(cities), DAYS_PER_YEAR, len(NORMAL_STATS)), np.nan, dtype=np.float32)
+        counts = np.zeros((len(cities), DAYS_PER_YEAR), dtype=np.int32)
+        if len(normals["city_id"]):
+            index = np.array([rows[int(city_id)] for city_id in normals["city_id"]])
+            slot = np.asarray(normals["day_of_year"], dtype=np.int64) - 1
+            stats[index, slot] = np.column_stack([
+                np.asarray(normals[name], dtype=np.float64) for name in NORMAL_STATS
+            ])
+            counts[index, slot] = normals["sample_count"]
+
+        by_external: Dict[int, int] = {}
+        by_name: Dict[Tuple[str, str], int] = {}
+        for row, city in enumerate(cities):
+            if city.get("external_id") is not None:
+                by_external[city["external_id"]] = row
+            for alias in (city.get("name"), city.get("ascii_name")):
+                if alias:
+                    by_name.setdefault((normalize_name(alias), (city.get("country") or "").upper()), row)
+
+        self._stats = stats
+        self._counts = counts
+        self._by_external = by_external
+        self._by_name = by_name
+
+    async def load(self, session: AsyncSession) -> int:
+        """
+        从climate_normals表加载全部基准。
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            int: 有基准的城市数
+        """
+        result = await session.execute(
+            select(ClimateNormal.city_id, ClimateNormal.day_of_year, ClimateNormal.sample_count,
+                   *(getattr(ClimateNormal, name) for name in NORMAL_STATS))
+        )
+        rows = result.all()
+        normals = {
+            name: np.array([row[i] for row in rows], dtype=np.float64)
+            for i, name in enumerate(["city_id", "day_of_year", "sample_count", *NORMAL_STATS])
+        }
+        city_ids = sorted({int(city_id) for city_id in normals["city_id"]})
+        result = await session.execute(
+            select(City.id, City.external_id, City.name, City.ascii_name, City.country)
+            .where(City.id.in_(city_ids))
+        )
+        cities = [dict(row) for row in result.mappings().all()]
+        self.build(cities, normals)
+        logger.info(f"气候基准已加载，共{len(cities)}个城市、{len(rows)}个日序")
+        return len(cities)
+
+    def _row(self, city: Dict[str, Any]) -> Optional[int]:
+        """查找城市在基准数组中的下标，city为第三方API的city字段。"""
+        row = self._by_external.get(city.get("id"))
+        if row is None and city.get("name"):
+            row = self._by_name.get((normalize_name(city["name"]), (city.get("country") or "").upper()))
+        return row
+
+    def lookup(self, city: Dict[str, Any], day: date) -> Optional[Dict[str, Any]]:
+        """
+        获取城市在某日的气候基准。
+
+        Args:
+            city: 城市信息字典（第三方API的city字段，包含id、name和country）
+            day: 日期
+
+        Returns:
+            Optional[Dict[str, Any]]: sample_count和NORMAL_STATS中的各统计量，没有基准时返回None
+        """
+        row = self._row(city)
+        if row is None:
+            return None
+        slot = day_slot(day)
+        count = int(self._counts[row, slot])
+        if count == 0:
+            return None
+        values = self._stats[row, slot]
+        normal: Dict[str, Any] = {"sample_count": count}
+        for name, value in zip(NORMAL_STATS, values.tolist()):
+            normal[name] = None if value != value else round(value, 2)
+        return normal
+
+    def anomaly(self, city: Dict[str, Any], day: date, temperature: float) -> Optional[Dict[str, Any]]:
+        """
+        计算日平均气温相对常年同期的距平。
+
+        Args:
+            city: 城市信息字典（第三方API的city字段）
+            day: 日期
+            temperature: 日平均气温（摄氏度）
+
+        Returns:
+            Optional[Dict[str, Any]]: 距平信息，没有基准时返回None
+        """
+        normal = self.lookup(city, day)
+        if normal is None:
+            return None
+        difference = temperature - normal["temperature_mean"]
+        std = normal["temperature_std"]
+        return {
+            "temperature": round(temperature, 2),
+            "normal": normal["temperature_mean"],
+            "difference": round(difference, 2),
+            "z_score": round(difference / std, 2) if std else None,
+            "normal_p10": normal["temperature_p10"],
+            "normal_p90": normal["temperature_p90"],
+            "sample_count": normal["sample_count"],
+        }
+
+
+# 创建全局气候基准
+climate_baselines = ClimateBaselines()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据导出服务模块。
+使用服务端游标分块读取查询历史和观测数据，流式输出CSV、NDJSON或Parquet，可选gzip压缩。
+任意时刻内存中只保留一个分块，与表的大小无关。
+"""
+
+import io
+import os
+import csv
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import City, QueryHistory, WeatherRecord
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - 可选依赖
+    pyarrow = None
+
+# 加载环境变量
+load_dotenv()
+
+# 每次从数据库游标读取的行数
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
+
+# 支持的导出格式及对应的媒体类型和文件扩展名
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ExportDataset:
+    """
+    可导出的数据集定义。
+    """
+
+    def __init__(self, name: str, columns: List[Tuple[str, Any, str]], time_column, join=None):
+        """
+        初始化数据集。
+
+        Args:
+            name: 数据集名称
+            columns: (输出列名, 列表达式, 类型)列表，类型为int、float、str、datetime或json
+            time_column: 时间范围过滤和排序使用的时间列
+            join: 需要关联的模型类
+        """
+        self.name = name
+        self.columns = columns
+        self.time_column = time_column
+        self.join = join
+
+    @property
+    def column_names(self) -> List[str]:
+        """输出列名列表。"""
+        return [name for name, _, _ in self.columns]
+
+    def statement(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """
+        构造按时间升序读取数据集的查询。
+
+        Args:
+            start: 起始时间（含，UTC）
+            end: 结束时间（不含，UTC）
+
+        Returns:
+            Select: 查询语句
+        """
+        stmt = select(*(column.label(name) for name, column, _ in self.columns))
+        if self.join is not None:
+            stmt = stmt.join(self.join)
+        if start is not None:
+            stmt = stmt.where(self.time_column >= start)
+        if end is not None:
+            stmt = stmt.where(self.time_column < end)
+        # 第一列为主键，保证同一时间的行顺序稳定
+        return stmt.order_by(self.time_column, self.columns[0][1])
+
+
+# 可导出的数据集
+EXPORT_DATASETS: Dict[str, ExportDataset] = {
+    "history": ExportDataset(
+        name="history",
+        columns=[
+            ("id", QueryHistory.id, "int"),
+            ("city_name", QueryHistory.city_name, "str"),
+            ("query_time", QueryHistory.query_time, "datetime"),
+            ("ip_address", QueryHistory.ip_address, "str"),
+        ],
+        time_column=QueryHistory.query_time,
+    ),
+    "observations": ExportDataset(
+        name="observations",
+        columns=[
+            ("id", WeatherRecord.id, "int"),
+            ("city_id", WeatherRecord.city_id, "int"),
+            ("city_name", City.name, "str"),
+            ("country", City.country, "str"),
+            ("observed_at", WeatherRecord.observed_at, "datetime"),
+            ("query_time", WeatherRecord.query_time, "datetime"),
+            ("temperature", WeatherRecord.temperature, "float"),
+            ("humidity", WeatherRecord.humidity, "float"),
+            ("pressure", WeatherRecord.pressure, "float"),
+            ("wind_speed", WeatherRecord.wind_speed, "float"),
+            ("wind_direction", WeatherRecord.wind_direction, "float"),
+            ("weather_description", WeatherRecord.weather_description, "str"),
+            ("weather_icon", WeatherRecord.weather_icon, "str"),
+            ("extra_data", WeatherRecord.extra_data, "json"),
+        ],
+        time_column=WeatherRecord.observed_at,
+        join=City,
+    ),
+}
+
+
+async def iter_chunks(session: AsyncSession, dataset: ExportDataset,
+                      start: Optional[datetime] = None,
+                      end: Optional[datetime] = None,
+                      chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[List[tuple]]:
+    """
+    使用服务端游标分块读取数据集。
+
+    Args:
+        session: 数据库会话
+        dataset: 数据集
+        start: 起始时间（含，UTC）
+        end: 结束时间（不含，UTC）
+        chunk_size: 每块行数
+
+    Yields:
+        List[tuple]: 一块数据行
+    """
+    stmt = dataset.statement(start, end).execution_options(yield_per=chunk_size)
+    result = await session.stream(stmt)
+    try:
+        async for partition in result.partitions(chunk_size):
+            yield [tuple(row) for row in partition]
+    finally:
+        await result.close()
+
+
+def _text_value(value: Any, kind: str) -> Any:
+    """将单元格转换为CSV文本。"""
+    if value is None:
+        return ""
+    if kind == "datetime":
+        return value.isoformat()
+    if kind == "json":
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _json_value(value: Any, kind: str) -> Any:
+    """将单元格转换为JSON可序列化的值。"""
+    if value is not None and kind == "datetime":
+        return value.isoformat()
+    return value
+
+
+async def _csv_writer(dataset: ExportDataset, chunks: AsyncIterator[List[tuple]]) -> AsyncIterator[bytes]:
+    """将数据块编码为CSV。"""
+    kinds = [kind for _, _, kind in dataset.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(dataset.column_names)
+    yield buffer.getvalue().encode("utf-8")
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [_text_value(value, kind) for value, kind in zip(row, kinds)] for row in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _ndjson_writer(dataset: ExportDataset, chunks: AsyncIterator[List[tuple]]) -> AsyncIterator[bytes]:
+    """将数据块编码为每行一个JSON对象。"""
+    names = dataset.column_names
+    kinds = [kind for _, _, kind in dataset.columns]
+    async for rows in chunks:
+        lines = [
+            json.dumps({name: _json_value(value, kind) for name, value, kind in zip(names, row, kinds)},
+                       ensure_ascii=False)
+            for row in rows
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ByteSink(io.RawIOBase):
+    """收集Parquet写入器输出的字节，每个分块写完后取走。"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(dataset: ExportDataset):
+    """构造数据集的Arrow表结构，JSON列以字符串保存。"""
+    types = {
+        "int": pyarrow.int64(),
+        "float": pyarrow.float64(),
+        "str": pyarrow.string(),
+        "datetime": pyarrow.timestamp("us"),
+        "json": pyarrow.string(),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, _, kind in dataset.columns])
+
+
+async def _parquet_writer(dataset: ExportDataset, chunks: AsyncIterator[List[tuple]]) -> AsyncIterator[bytes]:
+    """将每个数据块写为一个Parquet行组。"""
+    schema = _arrow_schema(dataset)
+    kinds = [kind for _, _, kind in dataset.columns]
+    sink = _ByteSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for rows in chunks:
+            columns = [
+                [json.dumps(v, ensure_ascii=False) if kind == "json" and v is not None else v
+                 for v in values]
+                for values, kind in zip(zip(*rows), kinds)
+            ]
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+_WRITERS = {
+    "csv": _csv_writer,
+    "ndjson": _ndjson_writer,
+    "parquet": _parquet_writer,
+}
+
+
+async def _gzip(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """以gzip格式流式压缩字节流。"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_filename(dataset: str, fmt: str, gzip: bool = False) -> str:
+    """
+    生成导出文件名。
+
+    Args:
+        dataset: 数据集名称
+        fmt: 导出格式
+        gzip: 是否gzip压缩
+
+    Returns:
+        str: 文件名
+    """
+    name = f"{dataset}.{EXPORT_FORMATS[fmt][1]}"
+    return name + ".gz" if gzip else name
+
+
+def check_export(dataset: str, fmt: str) -> None:
+    """
+    检查数据集和导出格式是否支持。
+
+    Args:
+        dataset: 数据集名称（history或observations）
+        fmt: 导出格式（csv、ndjson或parquet）
+
+    Raises:
+        ValueError: 数据集或格式不支持、或未安装pyarrow时抛出
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"不支持的数据集: {dataset}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("导出Parquet需要安装pyarrow")
+
+
+def export_stream(session: AsyncSession, dataset: str, fmt: str = "csv",
+                  start: Optional[datetime] = None,
+                  end: Optional[datetime] = None,
+                  gzip: bool = False,
+                  chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    创建数据集导出的字节流。
+
+    Args:
+        session: 数据库会话，需在字节流消费完之前保持打开
+        dataset: 数据集名称（history或observations）
+        fmt: 导出格式（csv、ndjson或parquet）
+        start: 起始时间（含，UTC）
+        end: 结束时间（不含，UTC）
+        gzip: 是否gzip压缩
+        chunk_size: 每次从数据库读取的行数
+
+    Returns:
+        AsyncIterator[bytes]: 导出内容的字节流
+
+    Raises:
+        ValueError: 数据集或格式不支持、或未安装pyarrow时抛出
+    """
+    check_export(dataset, fmt)
+    definition = EXPORT_DATASETS[dataset]
+    stream = _WRITERS[fmt](definition, iter_chunks(session, definition, start, end, chunk_size))
+    return _gzip(stream) if gzip else stream
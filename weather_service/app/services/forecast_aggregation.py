@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预报聚合模块。
+将列式紧凑预报的3小时预报点按城市当地日期分组，用NumPy分组归约计算每日的最低、最高、平均温度、
+平均湿度、降水量、最大风速、最大降水概率以及出现最多的天气状况。
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .forecast_store import CompactForecast, conditions
+
+# 天气状况元组中描述和图标的位置
+_CONDITION_DESCRIPTION = 2
+_CONDITION_ICON = 3
+
+SECONDS_PER_DAY = 86400
+
+
+def local_days(dt: np.ndarray, timezone_offset: int) -> np.ndarray:
+    """
+    将UTC时间戳转换为城市当地日期（距1970-01-01的天数）。
+
+    Args:
+        dt: UTC时间戳数组（秒）
+        timezone_offset: 城市相对UTC的偏移秒数
+
+    Returns:
+        np.ndarray: 当地日期编号数组（int64）
+    """
+    return (dt + timezone_offset) // SECONDS_PER_DAY
+
+
+def group_mode(groups: np.ndarray, values: np.ndarray, group_count: int) -> np.ndarray:
+    """
+    计算每组中出现次数最多的值，次数相同时取组内最先出现的值。
+
+    Args:
+        groups: 每个元素所属的组编号（0到group_count-1）
+        values: 值数组
+        group_count: 组数
+
+    Returns:
+        np.ndarray: 每组的众数（与values相同类型）
+    """
+    uniques, codes = np.unique(values, return_inverse=True)
+    counts = np.zeros((group_count, len(uniques)), dtype=np.int64)
+    np.add.at(counts, (groups, codes), 1)
+    # 记录每个值在组内首次出现的位置，次数相同时位置靠前的得分更高
+    first = np.full((group_count, len(uniques)), len(values), dtype=np.int64)
+    np.minimum.at(first, (groups, codes), np.arange(len(values)))
+    score = counts * (len(values) + 1) - first
+    return uniques[score.argmax(axis=1)]
+
+
+def aggregate_daily(forecast: CompactForecast) -> Dict[str, np.ndarray]:
+    """
+    将预报按城市当地日期聚合为每日数据。
+
+    Args:
+        forecast: 紧凑预报
+
+    Returns:
+        Dict[str, np.ndarray]: 按日期升序的列：date（YYYY-MM-DD）、min_temp、max_temp、mean_temp、
+            humidity、precipitation、wind_speed_max、pop_max、weather_description、weather_icon
+    """
+    if len(forecast) == 0:
+        return {name: np.empty(0) for name in DAILY_COLUMNS}
+
+    order = np.argsort(forecast.dt, kind="stable")
+    days = local_days(forecast.dt[order], forecast.timezone_offset)
+    day_values, starts, groups = np.unique(days, return_index=True, return_inverse=True)
+
+    def column(name: str) -> np.ndarray:
+        return forecast.column(name)[order].astype(np.float64)
+
+    counts = np.diff(np.append(starts, len(days)))
+    temp = column("temp")
+    # 缺失的降水量表示无降水
+    precipitation = np.nan_to_num(column("rain_3h")) + np.nan_to_num(column("snow_3h"))
+
+    codes = forecast.codes[order]
+    descriptions = conditions.column(_CONDITION_DESCRIPTION, codes).astype(str)
+    icons = conditions.column(_CONDITION_ICON, codes).astype(str)
+
+    with np.errstate(invalid="ignore"):
+        return {
+            "date": (day_values * SECONDS_PER_DAY).astype("datetime64[s]").astype("datetime64[D]").astype(str),
+            "min_temp": np.fmin.reduceat(column("temp_min"), starts),
+            "max_temp": np.fmax.reduceat(column("temp_max"), starts),
+            "mean_temp": np.add.reduceat(temp, starts) / counts,
+            "humidity": np.add.reduceat(column("humidity"), starts) / counts,
+            "precipitation": np.add.reduceat(precipitation, starts),
+            "wind_speed_max": np.fmax.reduceat(column("wind_speed"), starts),
+            "pop_max": np.fmax.reduceat(column("pop"), starts),
+            "weather_description": group_mode(groups, descriptions, len(day_values)),
+            "weather_icon": group_mode(groups, icons, len(day_values)),
+        }
+
+
+# 每日聚合结果的列
+DAILY_COLUMNS: List[str] = [
+    "date", "min_temp", "max_temp", "mean_temp", "humidity", "precipitation",
+    "wind_speed_max", "pop_max", "weather_description", "weather_icon",
+]
+
+
+def daily_records(daily: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    将每日聚合结果转换为字典列表，数值保留两位小数，缺失值为None。
+
+    Args:
+        daily: aggregate_daily返回的列
+
+    Returns:
+        List[Dict[str, Any]]: 每日数据
+    """
+    columns = {}
+    for name in DAILY_COLUMNS:
+        values = daily[name]
+        if values.dtype.kind == "f":
+            columns[name] = [None if value != value else round(value, 2) for value in values.tolist()]
+        else:
+            columns[name] = values.tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def daily_columns(forecast: CompactForecast) -> Dict[str, np.ndarray]:
+    """
+    获取预报的每日聚合列，每个预报对象只计算一次，结果随预报一同缓存和失效。
+
+    Args:
+        forecast: 紧凑预报
+
+    Returns:
+        Dict[str, np.ndarray]: aggregate_daily返回的列（调用方不应修改）
+    """
+    return forecast.memo("daily_columns", lambda: aggregate_daily(forecast))
+
+
+def daily_forecast(forecast: CompactForecast) -> List[Dict[str, Any]]:
+    """
+    获取按城市当地日期汇总的每日预报，每个预报对象只计算一次，结果随预报一同缓存和失效。
+
+    Args:
+        forecast: 紧凑预报
+
+    Returns:
+        List[Dict[str, Any]]: 按日期升序的每日数据（调用方不应修改）
+    """
+    return forecast.memo("daily", lambda: daily_records(daily_columns(forecast)))
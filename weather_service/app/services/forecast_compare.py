@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多城市预报对比模块。
+把多个城市（优先使用缓存）的每日预报堆叠为（城市×日期）矩阵，按日期对城市排名，
+并计算每天的跨城市统计（平均、最值、标准差、极差）和每个城市的跨日期统计，全部以矩阵运算完成。
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+import numpy as np
+from fastapi import HTTPException
+
+from .forecast_store import CompactForecast
+from .forecast_aggregation import daily_columns
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 一次最多对比的城市数
+COMPARE_MAX_CITIES = int(os.getenv("COMPARE_MAX_CITIES", 200))
+# 同时获取预报的城市数
+COMPARE_FETCH_CONCURRENCY = int(os.getenv("COMPARE_FETCH_CONCURRENCY", 10))
+
+# 可对比的每日指标（forecast_aggregation.DAILY_COLUMNS中的数值列）
+COMPARE_METRICS: List[str] = [
+    "max_temp", "min_temp", "mean_temp", "humidity", "precipitation", "wind_speed_max", "pop_max",
+]
+
+
+def _to_list(values: np.ndarray) -> List[Any]:
+    """保留两位小数并把NaN转换为None，支持任意维数组。"""
+    rounded = np.round(values, 2).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
+
+
+def parse_compare_metrics(metrics: Optional[str]) -> List[str]:
+    """
+    解析逗号分隔的对比指标列表。
+
+    Args:
+        metrics: 指标名称，逗号分隔，为空时返回max_temp和min_temp
+
+    Returns:
+        List[str]: 去重后的指标名称
+
+    Raises:
+        ValueError: 指标名称不支持时抛出
+    """
+    if not metrics:
+        return ["max_temp", "min_temp"]
+    names = list(dict.fromkeys(name.strip() for name in metrics.split(",") if name.strip()))
+    unknown = [name for name in names if name not in COMPARE_METRICS]
+    if unknown or not names:
+        raise ValueError(f"不支持的对比指标: {', '.join(unknown)}，可选: {', '.join(COMPARE_METRICS)}")
+    return names
+
+
+def stack_daily(forecasts: Sequence[CompactForecast], days: int,
+                metrics: Sequence[str]) -> Dict[str, Any]:
+    """
+    把各城市的每日预报堆叠为（城市×日期）矩阵。
+
+    日期轴为各城市前days个当地日期的并集，城市在某天没有预报时为NaN。
+
+    Args:
+        forecasts: 紧凑预报列表
+        days: 每个城市使用的天数
+        metrics: 指标名称
+
+    Returns:
+        Dict[str, Any]: dates为升序日期数组，其余键为各指标的矩阵
+    """
+    daily = [daily_columns(forecast) for forecast in forecasts]
+    lengths = np.array([min(len(columns["date"]), days) for columns in daily], dtype=np.int64)
+    if not lengths.sum():
+        return {"dates": np.empty(0, dtype=str),
+                **{metric: np.empty((len(forecasts), 0)) for metric in metrics}}
+
+    rows = np.repeat(np.arange(len(forecasts)), lengths)
+    dates, cols = np.unique(
+        np.concatenate([columns["date"][:days] for columns in daily]), return_inverse=True
+    )
+    stacked: Dict[str, Any] = {"dates": dates}
+    for metric in metrics:
+        matrix = np.full((len(forecasts), len(dates)), np.nan)
+        matrix[rows, cols] = np.concatenate([columns[metric][:days] for columns in daily])
+        stacked[metric] = matrix
+    return stacked
+
+
+def rank_matrix(matrix: np.ndarray, descending: bool = True) -> np.ndarray:
+    """
+    按列对城市排名，并列的值名次相同（如1、1、3），NaN不参与排名。
+
+    Args:
+        matrix: （城市×日期）矩阵
+        descending: True时值越大名次越靠前
+
+    Returns:
+        np.ndarray: 与matrix形状相同的名次矩阵（从1开始，NaN处为0）
+    """
+    if matrix.size == 0:
+        return np.zeros(matrix.shape, dtype=np.int64)
+    missing = np.isnan(matrix)
+    # NaN排在最后
+    key = np.where(missing, np.inf, -matrix if descending else matrix)
+    order = np.argsort(key, axis=0, kind="stable")
+    ordered = np.take_along_axis(key, order, axis=0)
+
+    positions = np.arange(len(matrix))[:, None]
+    changed = np.ones(ordered.shape, dtype=bool)
+    changed[1:] = ordered[1:] != ordered[:-1]
+    # 每个位置的名次为与其相等的第一个值的位置
+    first = np.maximum.accumulate(np.where(changed, positions, 0), axis=0)
+
+    ranks = np.empty(matrix.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, first + 1, axis=0)
+    ranks[missing] = 0
+    return ranks
+
+
+def compare_matrix(matrix: np.ndarray) -> Dict[str, Any]:
+    """
+    计算一个指标矩阵的排名和统计。
+
+    Args:
+        matrix: （城市×日期）矩阵
+
+    Returns:
+        Dict[str, Any]: values、ranks（按天，值越大越靠前），daily为每天的跨城市统计
+            （mean、min、max、std、spread、highest、lowest，后两者为城市下标），
+            city为每个城市的跨日期统计（mean、min、max、rank）
+    """
+    cities, dates = matrix.shape
+    valid = ~np.isnan(matrix)
+    has_day = valid.any(axis=0)
+    has_city = valid.any(axis=1)
+    filled_low = np.where(valid, matrix, -np.inf)
+    filled_high = np.where(valid, matrix, np.inf)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        day_count = valid.sum(axis=0)
+        day_mean = np.where(valid, matrix, 0).sum(axis=0) / day_count
+        day_std = np.sqrt(np.where(valid, (matrix - day_mean) ** 2, 0).sum(axis=0) / day_count)
+        city_mean = np.where(valid, matrix, 0).sum(axis=1) / valid.sum(axis=1)
+    day_max = np.where(has_day, filled_low.max(axis=0, initial=-np.inf), np.nan)
+    day_min = np.where(has_day, filled_high.min(axis=0, initial=np.inf), np.nan)
+
+    # 没有城市时argmax不可用，此时也没有日期
+    highest = filled_low.argmax(axis=0) if cities else np.zeros(dates, dtype=np.int64)
+    lowest = filled_high.argmin(axis=0) if cities else np.zeros(dates, dtype=np.int64)
+    return {
+        "values": _to_list(matrix),
+        "ranks": np.where(valid, rank_matrix(matrix), None).tolist(),
+        "daily": {
+            "mean": _to_list(day_mean),
+            "min": _to_list(day_min),
+            "max": _to_list(day_max),
+            "std": _to_list(day_std),
+            "spread": _to_list(day_max - day_min),
+            "highest": np.where(has_day, highest, None).tolist(),
+            "lowest": np.where(has_day, lowest, None).tolist(),
+        },
+        "city": {
+            "mean": _to_list(city_mean),
+            "min": _to_list(np.where(has_city, filled_high.min(axis=1, initial=np.inf), np.nan)),
+            "max": _to_list(np.where(has_city, filled_low.max(axis=1, initial=-np.inf), np.nan)),
+            "rank": np.where(has_city, rank_matrix(city_mean[:, None])[:, 0], None).tolist(),
+        },
+    }
+
+
+async def compare_forecasts(cities: Sequence[str],
+                            fetch_forecast: Callable[[str], Awaitable[CompactForecast]],
+                            days: int = 5, metrics: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    并发获取多个城市的预报（优先使用缓存）并生成对比矩阵，获取失败的城市不进入矩阵。
+
+    Args:
+        cities: 城市名称列表（重复的城市只保留一次）
+        fetch_forecast: 按城市名称获取紧凑预报的协程函数
+        days: 每个城市使用的天数
+        metrics: 指标名称，默认max_temp和min_temp
+
+    Returns:
+        Dict[str, Any]: dates为日期轴，cities为矩阵各行的城市，errors为获取失败的城市及原因，
+            matrices为每个指标的compare_matrix结果
+
+    Raises:
+        ValueError: 城市数超过上限或指标不支持时抛出
+    """
+    cities = list(dict.fromkeys(city.strip() for city in cities if city.strip()))
+    if not cities:
+        raise ValueError("需要指定至少一个城市")
+    if len(cities) > COMPARE_MAX_CITIES:
+        raise ValueError(f"一次最多对比{COMPARE_MAX_CITIES}个城市")
+    metrics = parse_compare_metrics(",".join(metrics) if metrics else None)
+
+    semaphore = asyncio.Semaphore(COMPARE_FETCH_CONCURRENCY)
+
+    async def fetch(city: str) -> CompactForecast:
+        async with semaphore:
+            return await fetch_forecast(city)
+
+    results = await asyncio.gather(*[fetch(city) for city in cities], return_exceptions=True)
+
+    forecasts: List[CompactForecast] = []
+    rows: List[Dict[str, Any]] = []
+    errors: Dict[str, str] = {}
+    for city, result in zip(cities, results):
+        if isinstance(result, Exception):
+            errors[city] = str(result.detail if isinstance(result, HTTPException) else result)
+            logger.warning(f"获取对比城市{city}的预报失败: {errors[city]}")
+            continue
+        forecasts.append(result)
+        rows.append({"query": city, "name": result.city.get("name", city),
+                     "country": result.city.get("country", "")})
+
+    stacked = stack_daily(forecasts, days, metrics)
+    return {
+        "dates": stacked["dates"].tolist(),
+        "cities": rows,
+        "errors": errors,
+        "matrices": {metric: compare_matrix(stacked[metric]) for metric in metrics},
+    }
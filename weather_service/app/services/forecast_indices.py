@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预报派生指标模块。
+对预报的全部3小时预报点一次性向量化计算体感温度、炎热指数、风寒温度、露点、绝对湿度和舒适度等级，
+并按城市当地日期汇总；结果保存在缓存的预报对象上，每次刷新预报只计算一次。
+当前天气和重采样预报使用同一组公式（见utils.meteo）。
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..utils.meteo import COMFORT_CLASSES, derived_indices
+from .forecast_store import CompactForecast
+from .forecast_aggregation import local_days, group_mode
+
+# 派生指标的数值列
+INDEX_COLUMNS: List[str] = ["feels_like", "heat_index", "wind_chill", "dew_point", "absolute_humidity"]
+
+# 每日派生指标的列
+DAILY_INDEX_COLUMNS: List[str] = [
+    "feels_like_min", "feels_like_max", "heat_index_max", "wind_chill_min",
+    "dew_point", "absolute_humidity", "comfort",
+]
+
+
+def comfort_labels(codes: np.ndarray) -> np.ndarray:
+    """
+    将舒适度等级代码转换为名称。
+
+    Args:
+        codes: COMFORT_CLASSES的下标数组，-1表示缺失
+
+    Returns:
+        np.ndarray: 名称数组（object），缺失为None
+    """
+    labels = np.array(COMFORT_CLASSES + [None], dtype=object)
+    # -1取最后一个元素None
+    return labels[np.asarray(codes, dtype=np.int64)]
+
+
+def index_columns(temperature: np.ndarray, humidity: np.ndarray, wind_speed: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    计算派生指标列，舒适度等级转换为名称。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%）
+        wind_speed: 风速（m/s）
+
+    Returns:
+        Dict[str, np.ndarray]: INDEX_COLUMNS中的列和comfort（名称）
+    """
+    indices = derived_indices(temperature, humidity, wind_speed)
+    indices["comfort"] = comfort_labels(indices["comfort"])
+    return indices
+
+
+def current_indices(temperature: Optional[float], humidity: Optional[float],
+                    wind_speed: Optional[float]) -> Dict[str, Any]:
+    """
+    计算单个观测（当前天气）的派生指标。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%）
+        wind_speed: 风速（m/s）
+
+    Returns:
+        Dict[str, Any]: INDEX_COLUMNS中的值（保留两位小数，无法计算时为None）和comfort（名称）
+    """
+    def value(item: Optional[float]) -> float:
+        return np.nan if item is None else item
+
+    indices = index_columns(np.array([value(temperature)]), np.array([value(humidity)]),
+                            np.array([value(wind_speed)]))
+    result: Dict[str, Any] = {
+        name: None if np.isnan(indices[name][0]) else round(float(indices[name][0]), 2)
+        for name in INDEX_COLUMNS
+    }
+    result["comfort"] = indices["comfort"][0]
+    return result
+
+
+def point_indices(forecast: CompactForecast) -> Dict[str, np.ndarray]:
+    """
+    获取每个预报点的派生指标（与预报点顺序一致），每个预报对象只计算一次。
+
+    Args:
+        forecast: 紧凑预报
+
+    Returns:
+        Dict[str, np.ndarray]: INDEX_COLUMNS中的列和comfort（COMFORT_CLASSES的下标）（调用方不应修改）
+    """
+    return forecast.memo("indices", lambda: derived_indices(
+        forecast.column("temp"), forecast.column("humidity"), forecast.column("wind_speed")
+    ))
+
+
+def aggregate_daily_indices(forecast: CompactForecast) -> Dict[str, np.ndarray]:
+    """
+    将派生指标按城市当地日期汇总，日期与forecast_aggregation.aggregate_daily一致。
+
+    Args:
+        forecast: 紧凑预报
+
+    Returns:
+        Dict[str, np.ndarray]: DAILY_INDEX_COLUMNS中的列：体感温度最低/最高、炎热指数最高、风寒温度最低、
+            平均露点、平均绝对湿度和出现最多的舒适度等级（名称）
+    """
+    if len(forecast) == 0:
+        return {name: np.empty(0) for name in DAILY_INDEX_COLUMNS}
+
+    indices = point_indices(forecast)
+    order = np.argsort(forecast.dt, kind="stable")
+    days = local_days(forecast.dt[order], forecast.timezone_offset)
+    day_values, starts, groups = np.unique(days, return_index=True, return_inverse=True)
+    counts = np.diff(np.append(starts, len(days)))
+
+    def column(name: str) -> np.ndarray:
+        return indices[name][order]
+
+    with np.errstate(invalid="ignore"):
+        return {
+            "feels_like_min": np.fmin.reduceat(column("feels_like"), starts),
+            "feels_like_max": np.fmax.reduceat(column("feels_like"), starts),
+            "heat_index_max": np.fmax.reduceat(column("heat_index"), starts),
+            "wind_chill_min": np.fmin.reduceat(column("wind_chill"), starts),
+            "dew_point": np.add.reduceat(column("dew_point"), starts) / counts,
+            "absolute_humidity": np.add.reduceat(column("absolute_humidity"), starts) / counts,
+            "comfort": comfort_labels(group_mode(groups, column("comfort"), len(day_values))),
+        }
+
+
+def daily_index_columns(forecast: CompactForecast) -> Dict[str, np.ndarray]:
+    """
+    获取按日汇总的派生指标列，每个预报对象只计算一次。
+
+    Args:
+        forecast: 紧凑预报
+
+    Returns:
+        Dict[str, np.ndarray]: aggregate_daily_indices返回的列（调用方不应修改）
+    """
+    return forecast.memo("daily_index_columns", lambda: aggregate_daily_indices(forecast))
+
+
+def daily_indices(forecast: CompactForecast) -> List[Dict[str, Any]]:
+    """
+    获取按城市当地日期汇总的派生指标，每个预报对象只计算一次，结果随预报一同缓存和失效。
+
+    Args:
+        forecast: 紧凑预报
+
+    Returns:
+        List[Dict[str, Any]]: 与daily_forecast逐日对应的派生指标，数值保留两位小数（调用方不应修改）
+    """
+    def build() -> List[Dict[str, Any]]:
+        daily = daily_index_columns(forecast)
+        columns = {}
+        for name in DAILY_INDEX_COLUMNS:
+            values = daily[name]
+            if values.dtype.kind == "f":
+                columns[name] = [None if value != value else round(value, 2) for value in values.tolist()]
+            else:
+                columns[name] = values.tolist()
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    return forecast.memo("daily_indices", build)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预报重采样模块。
+将3小时预报点插值到任意时间间隔（如1小时、30分钟）或指定时间点：温度、气压等数值列线性插值，
+风向按单位向量插值（跨越0°/360°时不会绕远），降水按所在3小时时段折算为每小时降水量，
+天气状况取最近的预报点，体感温度、露点等派生指标由插值后的气温、湿度和风速计算。
+所有列用同一组下标和权重一次性向量化计算。
+"""
+
+import os
+import re
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+import numpy as np
+from fastapi import HTTPException
+
+from .forecast_store import CompactForecast, COLUMN_INDEX, conditions
+from .forecast_indices import index_columns
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 批量重采样一次最多的城市数
+RESAMPLE_BATCH_MAX_CITIES = int(os.getenv("RESAMPLE_BATCH_MAX_CITIES", 20))
+# 批量重采样时同时获取预报的城市数
+RESAMPLE_FETCH_CONCURRENCY = int(os.getenv("RESAMPLE_FETCH_CONCURRENCY", 5))
+
+# 线性插值的数值列
+LINEAR_COLUMNS: List[str] = [
+    "temp", "pressure", "humidity", "clouds", "wind_speed", "wind_gust", "visibility", "pop",
+]
+
+# 天气状况元组中描述和图标的位置
+_CONDITION_DESCRIPTION = 2
+_CONDITION_ICON = 3
+
+# 上游预报点间隔（秒），rain.3h和snow.3h为该时段的累计降水量
+FORECAST_STEP = 10800
+
+# 单次重采样最多的时间点数
+MAX_RESAMPLE_POINTS = 1000
+
+_INTERVAL_PATTERN = re.compile(r"^\s*(\d+)\s*(m|min|h)\s*$", re.IGNORECASE)
+
+
+def parse_interval(interval: str) -> int:
+    """
+    解析时间间隔，如"1h"、"30m"。
+
+    Args:
+        interval: 时间间隔字符串，单位为m（分钟）或h（小时）
+
+    Returns:
+        int: 间隔秒数
+
+    Raises:
+        ValueError: 格式错误或间隔小于5分钟时抛出
+    """
+    match = _INTERVAL_PATTERN.match(interval or "")
+    if not match:
+        raise ValueError(f"时间间隔格式错误: {interval}，示例: 1h、30m")
+    seconds = int(match.group(1)) * (3600 if match.group(2).lower() == "h" else 60)
+    if seconds < 300:
+        raise ValueError("时间间隔不能小于5分钟")
+    return seconds
+
+
+def parse_times(times: Sequence[Any]) -> np.ndarray:
+    """
+    解析指定时间点（ISO格式字符串、datetime或Unix时间戳），无时区的时间按UTC处理。
+
+    Args:
+        times: 时间点列表
+
+    Returns:
+        np.ndarray: UTC时间戳数组（int64秒）
+
+    Raises:
+        ValueError: 时间格式错误或时间点过多时抛出
+    """
+    if len(times) > MAX_RESAMPLE_POINTS:
+        raise ValueError(f"时间点不能超过{MAX_RESAMPLE_POINTS}个")
+    stamps = []
+    for value in times:
+        if isinstance(value, (int, float)):
+            stamps.append(int(value))
+            continue
+        if isinstance(value, str):
+            text = value.strip()
+            if text.lstrip("-").isdigit():
+                stamps.append(int(text))
+                continue
+            try:
+                value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+            except ValueError:
+                raise ValueError(f"时间格式错误: {value}")
+        if not isinstance(value, datetime):
+            raise ValueError(f"时间格式错误: {value}")
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        stamps.append(int(value.timestamp()))
+    return np.array(stamps, dtype=np.int64)
+
+
+def interval_times(forecast: CompactForecast, interval: int) -> np.ndarray:
+    """
+    生成覆盖预报时间范围、按间隔对齐（UTC整点）的时间点。
+
+    Args:
+        forecast: 紧凑预报
+        interval: 间隔秒数
+
+    Returns:
+        np.ndarray: UTC时间戳数组（int64秒）
+
+    Raises:
+        ValueError: 时间点过多时抛出
+    """
+    if len(forecast) == 0:
+        return np.empty(0, dtype=np.int64)
+    first = -(-int(forecast.dt.min()) // interval) * interval
+    last = int(forecast.dt.max())
+    count = (last - first) // interval + 1 if last >= first else 0
+    if count > MAX_RESAMPLE_POINTS:
+        raise ValueError(f"时间点不能超过{MAX_RESAMPLE_POINTS}个，请增大时间间隔")
+    return first + np.arange(count, dtype=np.int64) * interval
+
+
+def resample(forecast: CompactForecast, times: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    将预报插值到指定时间点，超出预报时间范围的时间点为NaN（不外推）。
+
+    Args:
+        forecast: 紧凑预报
+        times: UTC时间戳数组（int64秒）
+
+    Returns:
+        Dict[str, np.ndarray]: dt和LINEAR_COLUMNS中的列，以及wind_deg、precipitation_rate（毫米/小时）、
+            weather_description、weather_icon和forecast_indices.index_columns的派生指标
+    """
+    times = np.asarray(times, dtype=np.int64)
+    count = len(times)
+    result: Dict[str, np.ndarray] = {"dt": times}
+    if len(forecast) == 0 or count == 0:
+        for name in LINEAR_COLUMNS + ["wind_deg", "precipitation_rate"]:
+            result[name] = np.full(count, np.nan)
+        result["weather_description"] = np.full(count, None, dtype=object)
+        result["weather_icon"] = np.full(count, None, dtype=object)
+        result.update(index_columns(result["temp"], result["humidity"], result["wind_speed"]))
+        return result
+
+    order = np.argsort(forecast.dt, kind="stable")
+    dt = forecast.dt[order]
+    values = forecast.values[:, order].astype(np.float64)
+
+    if len(dt) > 1:
+        # 每个时间点落在[dt[right-1], dt[right]]之间，right为右端点下标
+        right = np.clip(np.searchsorted(dt, times, side="left"), 1, len(dt) - 1)
+        left = right - 1
+    else:
+        # 只有一个预报点时，只有与它相同的时间点在范围内，取该点的值
+        right = left = np.zeros(count, dtype=np.intp)
+    span = (dt[right] - dt[left]).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(span > 0, (times - dt[left]) / span, 0.0)
+    inside = (times >= dt[0]) & (times <= dt[-1])
+    weight = np.clip(weight, 0.0, 1.0)
+
+    rows = [COLUMN_INDEX[name] for name in LINEAR_COLUMNS]
+    # 所有线性列一次性插值，形状为(列数, 时间点数)
+    linear = values[rows][:, left] * (1 - weight) + values[rows][:, right] * weight
+    linear[:, ~inside] = np.nan
+    for name, column in zip(LINEAR_COLUMNS, linear):
+        result[name] = column
+
+    # 风向按单位向量插值，再换算回角度
+    radians = np.radians(values[COLUMN_INDEX["wind_deg"]])
+    sin = np.sin(radians[left]) * (1 - weight) + np.sin(radians[right]) * weight
+    cos = np.cos(radians[left]) * (1 - weight) + np.cos(radians[right]) * weight
+    wind_deg = np.degrees(np.arctan2(sin, cos)) % 360
+    wind_deg[~inside] = np.nan
+    result["wind_deg"] = wind_deg
+
+    # 预报点的降水量为之前3小时的累计值，时间点取覆盖它的时段（即右端点）折算为每小时
+    precipitation = (np.nan_to_num(values[COLUMN_INDEX["rain_3h"]])
+                     + np.nan_to_num(values[COLUMN_INDEX["snow_3h"]])) / (FORECAST_STEP / 3600)
+    covering = np.where(times <= dt[0], 0, right)
+    rate = precipitation[covering]
+    rate[~inside] = np.nan
+    result["precipitation_rate"] = rate
+
+    nearest = np.where(weight < 0.5, left, right)
+    codes = forecast.codes[order][nearest]
+    description = conditions.column(_CONDITION_DESCRIPTION, codes).astype(object)
+    icon = conditions.column(_CONDITION_ICON, codes).astype(object)
+    description[~inside] = None
+    icon[~inside] = None
+    result["weather_description"] = description
+    result["weather_icon"] = icon
+    result.update(index_columns(result["temp"], result["humidity"], result["wind_speed"]))
+    return result
+
+
+def resampled_records(resampled: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    将重采样结果转换为字典列表，时间为UTC datetime，数值保留两位小数，缺失值为None。
+
+    Args:
+        resampled: resample返回的列
+
+    Returns:
+        List[Dict[str, Any]]: 每个时间点一条记录
+    """
+    columns: Dict[str, List[Any]] = {
+        "dt": [datetime.fromtimestamp(value, tz=timezone.utc) for value in resampled["dt"].tolist()]
+    }
+    for name, values in resampled.items():
+        if name == "dt":
+            continue
+        if values.dtype.kind == "f":
+            columns[name] = [None if value != value else value for value in np.round(values, 2).tolist()]
+        else:
+            columns[name] = values.tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def resample_forecast(forecast: CompactForecast, interval: Optional[str] = None,
+                      times: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    """
+    按间隔或指定时间点重采样预报；按间隔的结果随预报一同缓存。
+
+    Args:
+        forecast: 紧凑预报
+        interval: 时间间隔（如"1h"），与times二选一
+        times: 指定时间点列表
+
+    Returns:
+        List[Dict[str, Any]]: 每个时间点的插值结果（调用方不应修改）
+
+    Raises:
+        ValueError: 参数缺失或格式错误时抛出
+    """
+    if times:
+        return resampled_records(resample(forecast, parse_times(times)))
+    if not interval:
+        raise ValueError("需要指定时间间隔interval或时间点times")
+    seconds = parse_interval(interval)
+    return forecast.memo(
+        f"resample_{seconds}",
+        lambda: resampled_records(resample(forecast, interval_times(forecast, seconds)))
+    )
+
+
+def resampled_response(forecast: CompactForecast, interval: Optional[str] = None,
+                       times: Optional[Sequence[Any]] = None) -> Dict[str, Any]:
+    """
+    生成单个城市的重采样预报响应数据。
+
+    Args:
+        forecast: 紧凑预报
+        interval: 时间间隔，与times二选一
+        times: 指定时间点列表
+
+    Returns:
+        Dict[str, Any]: 城市信息、时区偏移、时间间隔和重采样结果
+
+    Raises:
+        ValueError: 参数缺失或格式错误时抛出
+    """
+    return {
+        "city": forecast.city.get("name", ""),
+        "country": forecast.city.get("country", ""),
+        "timezone_offset": forecast.timezone_offset,
+        "interval": None if times else interval,
+        "points": resample_forecast(forecast, interval, times),
+    }
+
+
+async def resample_cities(cities: Sequence[str],
+                          fetch_forecast: Callable[[str], Awaitable[CompactForecast]],
+                          interval: Optional[str] = None,
+                          times: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    """
+    并发获取多个城市的预报（优先使用缓存）并重采样，单个城市失败不影响其他城市。
+
+    Args:
+        cities: 城市名称列表
+        fetch_forecast: 按城市名称获取紧凑预报的协程函数
+        interval: 时间间隔，与times二选一
+        times: 指定时间点列表
+
+    Returns:
+        List[Dict[str, Any]]: 按输入顺序排列，每项包含city、forecast和error
+
+    Raises:
+        ValueError: 城市数超过上限或参数格式错误时抛出
+    """
+    if len(cities) > RESAMPLE_BATCH_MAX_CITIES:
+        raise ValueError(f"一次最多重采样{RESAMPLE_BATCH_MAX_CITIES}个城市")
+    # 参数错误对所有城市相同，在获取预报前检查
+    if times:
+        times = parse_times(times).tolist()
+    elif interval:
+        parse_interval(interval)
+    else:
+        raise ValueError("需要指定时间间隔interval或时间点times")
+
+    semaphore = asyncio.Semaphore(RESAMPLE_FETCH_CONCURRENCY)
+
+    async def resample_city(city: str) -> Dict[str, Any]:
+        try:
+            async with semaphore:
+                forecast = await fetch_forecast(city)
+            return {"city": city, "forecast": resampled_response(forecast, interval, times), "error": None}
+        except HTTPException as e:
+            error = e.detail
+        except Exception as e:
+            error = str(e)
+        logger.warning(f"重采样城市{city}的预报失败: {error}")
+        return {"city": city, "forecast": None, "error": error}
+
+    return list(await asyncio.gather(*[resample_city(city) for city in cities]))
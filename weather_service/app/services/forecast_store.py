@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预报紧凑存储模块。
+以列式数组（struct-of-arrays）保存3小时预报数据，天气状况字符串统一驻留为整数编码，
+在API层需要时再按需还原为与第三方API一致的字典结构。
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+# 数值列定义：(列名, 在预报条目中的字段路径, 还原时是否为整数)
+FORECAST_COLUMNS: List[Tuple[str, Tuple[str, ...], bool]] = [
+    ("temp", ("main", "temp"), False),
+    ("feels_like", ("main", "feels_like"), False),
+    ("temp_min", ("main", "temp_min"), False),
+    ("temp_max", ("main", "temp_max"), False),
+    ("pressure", ("main", "pressure"), True),
+    ("sea_level", ("main", "sea_level"), True),
+    ("grnd_level", ("main", "grnd_level"), True),
+    ("humidity", ("main", "humidity"), True),
+    ("temp_kf", ("main", "temp_kf"), False),
+    ("clouds", ("clouds", "all"), True),
+    ("wind_speed", ("wind", "speed"), False),
+    ("wind_deg", ("wind", "deg"), True),
+    ("wind_gust", ("wind", "gust"), False),
+    ("visibility", ("visibility",), True),
+    ("pop", ("pop",), False),
+    ("rain_3h", ("rain", "3h"), False),
+    ("snow_3h", ("snow", "3h"), False),
+]
+
+# 列名到行号的索引
+COLUMN_INDEX: Dict[str, int] = {name: i for i, (name, _, _) in enumerate(FORECAST_COLUMNS)}
+
+
+class ConditionTable:
+    """
+    天气状况驻留表。
+    将(天气ID, 主类, 描述, 图标, 昼夜)组合映射为紧凑的整数编码，所有预报共享同一张表。
+    """
+
+    def __init__(self):
+        """初始化空的驻留表。"""
+        self._codes: Dict[Tuple[Any, ...], int] = {}
+        self._conditions: List[Tuple[Any, ...]] = []
+
+    def intern(self, condition: Tuple[Any, ...]) -> int:
+        """
+        获取天气状况的编码，不存在时新增。
+
+        Args:
+            condition: (天气ID, 主类, 描述, 图标, 昼夜)元组
+
+        Returns:
+            int: 天气状况编码
+        """
+        code = self._codes.get(condition)
+        if code is None:
+            code = self._codes[condition] = len(self._conditions)
+            self._conditions.append(condition)
+        return code
+
+    def lookup(self, code: int) -> Tuple[Any, ...]:
+        """
+        根据编码获取天气状况。
+
+        Args:
+            code: 天气状况编码
+
+        Returns:
+            Tuple[Any, ...]: (天气ID, 主类, 描述, 图标, 昼夜)元组
+        """
+        return self._conditions[code]
+
+    def column(self, field: int, codes: np.ndarray) -> np.ndarray:
+        """
+        将编码数组映射为某个字段的值数组。
+
+        Args:
+            field: 字段在状况元组中的位置
+            codes: 天气状况编码数组
+
+        Returns:
+            np.ndarray: 字段值数组（object类型）
+        """
+        values = np.array([condition[field] for condition in self._conditions], dtype=object)
+        return values[codes]
+
+    def __len__(self) -> int:
+        """返回已驻留的天气状况数量。"""
+        return len(self._conditions)
+
+
+# 全局天气状况驻留表
+conditions = ConditionTable()
+
+
+class CompactForecast:
+    """
+    列式存储的城市天气预报。
+
+    Attributes:
+        city: 城市信息字典（与第三方API的city字段一致）
+        dt: 预报时间戳数组（UTC秒，int64）
+        values: 数值列矩阵（float32，行为FORECAST_COLUMNS中的列，缺失值为NaN）
+        codes: 天气状况编码数组（uint16）
+    """
+
+    __slots__ = ("city", "dt", "values", "codes", "_memo")
+
+    def __init__(self, city: Dict[str, Any], dt: np.ndarray,
+                 values: np.ndarray, codes: np.ndarray):
+        """
+        初始化紧凑预报。
+
+        Args:
+            city: 城市信息字典
+            dt: 预报时间戳数组
+            values: 数值列矩阵
+            codes: 天气状况编码数组
+        """
+        self.city = city
+        self.dt = dt
+        self.values = values
+        self.codes = codes
+        # 基于该预报派生结果的缓存（如按天汇总），随预报一同失效
+        self._memo: Dict[str, Any] = {}
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "CompactForecast":
+        """
+        由第三方API的预报响应构建紧凑预报。
+
+        Args:
+            payload: 第三方API返回的预报字典
+
+        Returns:
+            CompactForecast: 紧凑预报对象
+        """
+        items = payload.get("list", [])
+        count = len(items)
+        dt = np.empty(count, dtype=np.int64)
+        values = np.full((len(FORECAST_COLUMNS), count), np.nan, dtype=np.float32)
+        codes = np.empty(count, dtype=np.uint16)
+
+        for j, item in enumerate(items):
+            dt[j] = item["dt"]
+            for i, (_, path, _) in enumerate(FORECAST_COLUMNS):
+                value = item
+                for part in path:
+                    value = value.get(part) if isinstance(value, dict) else None
+                    if value is None:
+                        break
+                if value is not None:
+                    values[i, j] = value
+            weather = (item.get("weather") or [{}])[0]
+            codes[j] = conditions.intern((
+                weather.get("id"),
+                weather.get("main"),
+                weather.get("description"),
+                weather.get("icon"),
+                (item.get("sys") or {}).get("pod"),
+            ))
+
+        return cls(dict(payload.get("city", {})), dt, values, codes)
+
+    def __len__(self) -> int:
+        """返回预报点数量。"""
+        return int(self.dt.shape[0])
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        获取数值列（只读视图）。
+
+        Args:
+            name: 列名，见FORECAST_COLUMNS
+
+        Returns:
+            np.ndarray: 数值列数组
+        """
+        return self.values[COLUMN_INDEX[name]]
+
+    @property
+    def timezone_offset(self) -> int:
+        """城市相对UTC的偏移秒数。"""
+        return int(self.city.get("timezone") or 0)
+
+    @property
+    def nbytes(self) -> int:
+        """数组数据占用的字节数。"""
+        return int(self.dt.nbytes + self.values.nbytes + self.codes.nbytes)
+
+    def memo(self, key: str, factory) -> Any:
+        """
+        获取基于该预报的派生结果，不存在时调用factory计算并缓存。
+
+        Args:
+            key: 派生结果名称
+            factory: 无参计算函数
+
+        Returns:
+            Any: 派生结果
+        """
+        if key not in self._memo:
+            self._memo[key] = factory()
+        return self._memo[key]
+
+    def item(self, index: int) -> Dict[str, Any]:
+        """
+        还原单个预报点为第三方API格式的字典。
+
+        Args:
+            index: 预报点下标
+
+        Returns:
+            Dict[str, Any]: 预报条目字典
+        """
+        timestamp = int(self.dt[index])
+        item: Dict[str, Any] = {"dt": timestamp}
+        for i, (_, path, is_int) in enumerate(FORECAST_COLUMNS):
+            value = self.values[i, index]
+            if np.isnan(value):
+                continue
+            value = int(round(float(value))) if is_int else round(float(value), 2)
+            target = item
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+
+        weather_id, main, description, icon, pod = conditions.lookup(int(self.codes[index]))
+        item["weather"] = [{
+            "id": weather_id,
+            "main": main,
+            "description": description,
+            "icon": icon,
+        }]
+        if pod is not None:
+            item["sys"] = {"pod": pod}
+        item["dt_txt"] = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        return item
+
+    def to_payload(self, points: Optional[int] = None) -> Dict[str, Any]:
+        """
+        还原为第三方API格式的预报字典。
+
+        Args:
+            points: 只还原前N个预报点，默认全部
+
+        Returns:
+            Dict[str, Any]: 预报字典
+        """
+        count = len(self) if points is None else min(points, len(self))
+        return {
+            "cod": "200",
+            "message": 0,
+            "cnt": count,
+            "list": [self.item(i) for i in range(count)],
+            "city": dict(self.city),
+        }
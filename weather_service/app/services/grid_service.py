@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+区域网格服务模块。
+以经纬度范围内城市的观测为站点，用反距离加权（IDW）插值生成温度、湿度、气压或风速的规则网格。
+站点值优先使用数据库中最近保存的观测，缺少时才通过（带缓存的）实时天气接口获取；
+插值对所有网格点和站点一次性向量化计算，结果按（范围、分辨率、指标、时间桶）缓存。
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+import numpy as np
+from sqlalchemy import select
+
+from ..models import WeatherRecord
+from .cache_service import cache
+from .city_catalog import city_catalog
+from .spatial_index import to_unit_vectors
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 每个网格最多使用的站点（城市）数，超出时按人口取前N个
+GRID_MAX_STATIONS = int(os.getenv("GRID_MAX_STATIONS", 50))
+# 网格每个方向最多的格点数
+GRID_MAX_SIZE = int(os.getenv("GRID_MAX_SIZE", 500))
+# 时间桶长度（秒），同一时间桶内相同请求直接返回缓存的网格
+GRID_TIME_BUCKET = int(os.getenv("GRID_TIME_BUCKET", 600))
+# 已保存观测的有效期（分钟），更早的观测不作为站点值
+GRID_MAX_OBSERVATION_AGE = int(os.getenv("GRID_MAX_OBSERVATION_AGE", 60))
+# 同时获取实时天气的城市数
+GRID_FETCH_CONCURRENCY = int(os.getenv("GRID_FETCH_CONCURRENCY", 5))
+
+# 可插值的指标：观测表列和实时天气响应字段
+GRID_METRICS: Dict[str, Any] = {
+    "temperature": WeatherRecord.temperature,
+    "humidity": WeatherRecord.humidity,
+    "pressure": WeatherRecord.pressure,
+    "wind_speed": WeatherRecord.wind_speed,
+}
+
+
+def grid_axes(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+              resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算网格的纬度和经度坐标。
+
+    Args:
+        min_lat: 最小纬度
+        min_lon: 最小经度
+        max_lat: 最大纬度
+        max_lon: 最大经度
+        resolution: 格点间距（度）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: 升序的纬度数组和经度数组
+
+    Raises:
+        ValueError: 范围无效或格点数超过GRID_MAX_SIZE时抛出
+    """
+    if not (-90 <= min_lat < max_lat <= 90 and -180 <= min_lon < max_lon <= 180):
+        raise ValueError("经纬度范围无效，需要min_lat<max_lat且min_lon<max_lon")
+    if resolution <= 0:
+        raise ValueError("分辨率必须大于0")
+    rows = int(np.floor((max_lat - min_lat) / resolution + 1e-9)) + 1
+    cols = int(np.floor((max_lon - min_lon) / resolution + 1e-9)) + 1
+    if rows > GRID_MAX_SIZE or cols > GRID_MAX_SIZE:
+        raise ValueError(f"网格为{rows}×{cols}，每个方向最多{GRID_MAX_SIZE}个格点，请增大分辨率或缩小范围")
+    return min_lat + np.arange(rows) * resolution, min_lon + np.arange(cols) * resolution
+
+
+def idw_grid(station_lat: np.ndarray, station_lon: np.ndarray, values: np.ndarray,
+             latitudes: np.ndarray, longitudes: np.ndarray, power: float = 2.0) -> np.ndarray:
+    """
+    反距离加权插值。
+
+    距离使用单位球面上的弦长（与大圆距离单调对应），所有格点到所有站点的距离用一次矩阵乘法得到；
+    与站点重合的格点直接取该站点的值。
+
+    Args:
+        station_lat: 站点纬度
+        station_lon: 站点经度
+        values: 站点值
+        latitudes: 网格纬度（升序）
+        longitudes: 网格经度（升序）
+        power: 距离的幂次，越大越接近最近站点的值
+
+    Returns:
+        np.ndarray: 形状为(纬度数, 经度数)的插值结果
+    """
+    lat_grid, lon_grid = np.meshgrid(latitudes, longitudes, indexing="ij")
+    points = to_unit_vectors(lat_grid.ravel(), lon_grid.ravel())
+    stations = to_unit_vectors(station_lat, station_lon)
+    # 单位向量之间的弦长平方为2-2cosθ，原地计算以减少(格点数×站点数)大小的临时数组
+    squared = np.dot(points, stations.T)
+    squared *= -2.0
+    squared += 2.0
+    np.maximum(squared, 0.0, out=squared)
+    exact = squared < 1e-18
+    with np.errstate(divide="ignore"):
+        weights = np.reciprocal(squared, out=squared) if power == 2 else squared ** (-power / 2)
+    if exact.any():
+        # 与站点重合的格点只使用该站点
+        hit = exact.any(axis=1)
+        weights[hit] = exact[hit]
+    grid = (weights @ values) / weights.sum(axis=1)
+    return grid.reshape(lat_grid.shape)
+
+
+async def _latest_observations(session, city_ids: List[int], metric: str,
+                               since: datetime) -> Dict[int, float]:
+    """查询每个城市since之后最近一次观测的指标值。"""
+    column = GRID_METRICS[metric]
+    result = await session.execute(
+        select(WeatherRecord.city_id, column)
+        .where(WeatherRecord.city_id.in_(city_ids), WeatherRecord.observed_at >= since, column.isnot(None))
+        .order_by(WeatherRecord.city_id, WeatherRecord.observed_at.desc())
+    )
+    latest: Dict[int, float] = {}
+    for city_id, value in result.all():
+        latest.setdefault(city_id, value)
+    return latest
+
+
+async def collect_stations(session, cities: List[Dict[str, Any]], metric: str,
+                           fetch_current: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+                           now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    获取每个城市的站点值：优先使用已保存的近期观测，缺少时才获取实时天气。
+
+    Args:
+        session: 数据库会话
+        cities: 城市目录返回的城市列表
+        metric: 指标名称
+        fetch_current: 按城市查询参数获取实时天气（current_weather字典）的协程函数
+        now: 当前时间（UTC），默认使用系统时间
+
+    Returns:
+        List[Dict[str, Any]]: 有值的站点，包含城市信息、value和source（stored或current）
+    """
+    now = now or datetime.utcnow()
+    stored = await _latest_observations(
+        session, [city["id"] for city in cities], metric,
+        now - timedelta(minutes=GRID_MAX_OBSERVATION_AGE)
+    )
+
+    missing = [city for city in cities if city["id"] not in stored]
+    semaphore = asyncio.Semaphore(GRID_FETCH_CONCURRENCY)
+
+    async def fetch(city: Dict[str, Any]) -> Optional[float]:
+        async with semaphore:
+            try:
+                current = await fetch_current(city["query"])
+            except Exception as e:
+                logger.warning(f"获取网格站点{city['query']}的天气失败: {e}")
+                return None
+        return current.get(metric) if current else None
+
+    fetched = dict(zip([city["id"] for city in missing],
+                       await asyncio.gather(*[fetch(city) for city in missing])))
+
+    stations = []
+    for city in cities:
+        if city["id"] in stored:
+            value, source = stored[city["id"]], "stored"
+        else:
+            value, source = fetched.get(city["id"]), "current"
+        if value is not None:
+            stations.append({
+                "name": city["name"],
+                "country": city["country"],
+                "latitude": city["latitude"],
+                "longitude": city["longitude"],
+                "value": float(value),
+                "source": source,
+            })
+    return stations
+
+
+async def build_grid(session, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                     resolution: float, metric: str,
+                     fetch_current: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+                     power: float = 2.0) -> Optional[Dict[str, Any]]:
+    """
+    生成经纬度范围内指标的插值网格，结果按（范围、分辨率、指标、幂次、时间桶）缓存。
+
+    Args:
+        session: 数据库会话
+        min_lat: 最小纬度
+        min_lon: 最小经度
+        max_lat: 最大纬度
+        max_lon: 最大经度
+        resolution: 格点间距（度）
+        metric: 指标名称
+        fetch_current: 获取实时天气的协程函数，见collect_stations
+        power: IDW距离幂次
+
+    Returns:
+        Optional[Dict[str, Any]]: 网格数据，范围内没有可用站点时返回None
+
+    Raises:
+        ValueError: 指标不支持、范围无效或网格过大时抛出
+    """
+    if metric not in GRID_METRICS:
+        raise ValueError(f"不支持的网格指标: {metric}，可选: {', '.join(GRID_METRICS)}")
+    latitudes, longitudes = grid_axes(min_lat, min_lon, max_lat, max_lon, resolution)
+
+    bucket = int(time.time()) // GRID_TIME_BUCKET * GRID_TIME_BUCKET
+    key = "grid_" + "_".join(f"{value:g}" for value in (min_lat, min_lon, max_lat, max_lon, resolution, power))
+    key += f"_{metric}_{bucket}"
+    result = cache.get(key, namespace="grid")
+    if result is not None:
+        return result
+
+    cities = city_catalog.in_box(min_lat, min_lon, max_lat, max_lon, limit=GRID_MAX_STATIONS)
+    stations = await collect_stations(session, cities, metric, fetch_current)
+    if not stations:
+        return None
+
+    values = idw_grid(
+        np.array([station["latitude"] for station in stations]),
+        np.array([station["longitude"] for station in stations]),
+        np.array([station["value"] for station in stations]),
+        latitudes, longitudes, power,
+    )
+    result = {
+        "metric": metric,
+        "bbox": [min_lat, min_lon, max_lat, max_lon],
+        "resolution": resolution,
+        "time_bucket": datetime.utcfromtimestamp(bucket),
+        "latitudes": np.round(latitudes, 6).tolist(),
+        "longitudes": np.round(longitudes, 6).tolist(),
+        "values": np.round(values, 2).tolist(),
+        "stations": stations,
+    }
+    cache.set(key, result, GRID_TIME_BUCKET, namespace="grid")
+    return result
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+查询历史服务模块。
+提供按城市、IP、时间范围过滤的键集（游标）分页查询，
+以及保存最近查询历史的内存环形缓冲区，最近记录的读取无需访问数据库。
+"""
+
+import os
+import base64
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import QueryHistory
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 内存中保留的最近查询历史条数，0表示不使用缓冲区
+HISTORY_BUFFER_SIZE = int(os.getenv("HISTORY_BUFFER_SIZE", 1000))
+
+
+def encode_cursor(query_time: datetime, record_id: int) -> str:
+    """
+    将分页位置编码为游标字符串。
+
+    Args:
+        query_time: 当前页最后一条记录的查询时间
+        record_id: 当前页最后一条记录的ID
+
+    Returns:
+        str: URL安全的游标字符串
+    """
+    raw = f"{query_time.isoformat()}|{record_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析游标字符串。
+
+    Args:
+        cursor: encode_cursor生成的游标
+
+    Returns:
+        Tuple[datetime, int]: (查询时间, 记录ID)
+
+    Raises:
+        ValueError: 游标格式无效时抛出
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        time_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(time_part), int(id_part)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+async def query_history_page(session: AsyncSession,
+                             limit: int = 10,
+                             cursor: Optional[str] = None,
+                             city: Optional[str] = None,
+                             ip_address: Optional[str] = None,
+                             start: Optional[datetime] = None,
+                             end: Optional[datetime] = None
+                             ) -> Tuple[List[QueryHistory], Optional[str]]:
+    """
+    按查询时间倒序分页查询历史记录。
+
+    使用(query_time, id)作为键集游标，每页只扫描索引中的limit+1行，与翻页深度无关。
+
+    Args:
+        session: 数据库会话
+        limit: 每页记录数
+        cursor: 上一页返回的游标，为None时从最新记录开始
+        city: 只返回该城市名称的记录（精确匹配）
+        ip_address: 只返回该客户端IP的记录
+        start: 起始查询时间（含，不带时区的UTC时间）
+        end: 结束查询时间（不含，不带时区的UTC时间）
+
+    Returns:
+        Tuple[List[QueryHistory], Optional[str]]: (本页记录, 下一页游标)
+
+    Raises:
+        ValueError: 游标格式无效时抛出
+    """
+    stmt = select(QueryHistory)
+    if city is not None:
+        stmt = stmt.where(QueryHistory.city_name == city)
+    if ip_address is not None:
+        stmt = stmt.where(QueryHistory.ip_address == ip_address)
+    if start is not None:
+        stmt = stmt.where(QueryHistory.query_time >= start)
+    if end is not None:
+        stmt = stmt.where(QueryHistory.query_time < end)
+    if cursor is not None:
+        cursor_time, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(QueryHistory.query_time, QueryHistory.id) < tuple_(cursor_time, cursor_id)
+        )
+
+    stmt = stmt.order_by(QueryHistory.query_time.desc(), QueryHistory.id.desc()).limit(limit + 1)
+    result = await session.execute(stmt)
+    rows = list(result.scalars().all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].query_time, rows[-1].id)
+    return rows, next_cursor
+
+
+class HistoryRingBuffer:
+    """
+    最近查询历史的环形缓冲区。
+
+    启动时从数据库加载最新的capacity条记录，之后由批量写入器在每批写入成功后追加。
+    缓冲区外的记录都早于缓冲区内最早的记录，因此只要缓冲区内匹配的记录足够一页，
+    或缓冲区包含了全部记录，就可以不访问数据库直接返回结果。
+    """
+
+    def __init__(self, capacity: int = HISTORY_BUFFER_SIZE):
+        """
+        初始化缓冲区。
+
+        Args:
+            capacity: 最多保留的记录数，0表示不使用缓冲区
+        """
+        self.capacity = capacity
+        self._events: deque = deque(maxlen=capacity or None)
+        # 是否已从数据库加载，未加载时缓冲区内容不完整，读取总是回退到数据库
+        self.primed = False
+        # 缓冲区是否包含数据库中的全部记录
+        self.complete = False
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        """缓冲区中的记录数。"""
+        return len(self._events)
+
+    async def prime(self, session: AsyncSession) -> int:
+        """
+        从数据库加载最新的记录。
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            int: 加载的记录数
+        """
+        if self.capacity <= 0:
+            return 0
+        result = await session.execute(
+            select(QueryHistory.id, QueryHistory.city_name,
+                   QueryHistory.query_time, QueryHistory.ip_address)
+            .order_by(QueryHistory.query_time.desc(), QueryHistory.id.desc())
+            .limit(self.capacity)
+        )
+        rows = [dict(row) for row in result.mappings().all()]
+        self._events.clear()
+        self._events.extend(reversed(rows))
+        self.complete = len(rows) < self.capacity
+        self.primed = True
+        logger.info(f"查询历史缓冲区已加载{len(rows)}条记录")
+        return len(rows)
+
+    def extend(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        追加一批已写入数据库的记录。
+
+        Args:
+            rows: 包含id、city_name、query_time、ip_address的记录列表
+        """
+        if self.capacity <= 0:
+            return
+        if len(self._events) + len(rows) > self.capacity:
+            self.complete = False
+        self._events.extend(sorted(rows, key=lambda row: (row["query_time"], row["id"])))
+
+    def evict_before(self, cutoff: datetime) -> int:
+        """
+        移除查询时间早于cutoff的记录，在数据保留任务从数据库清理这些记录后调用。
+
+        缓冲区外的记录都早于被移除的记录，已随之从数据库清理，因此移除了记录时缓冲区包含全部剩余记录。
+
+        Args:
+            cutoff: 截止时间（不含）
+
+        Returns:
+            int: 移除的记录数
+        """
+        kept = [event for event in self._events if event["query_time"] >= cutoff]
+        evicted = len(self._events) - len(kept)
+        if evicted:
+            self._events.clear()
+            self._events.extend(kept)
+            self.complete = True
+        return evicted
+
+    def reset(self) -> None:
+        """清空缓冲区，之后的读取回退到数据库，直到重新加载。"""
+        self._events.clear()
+        self.primed = False
+        self.complete = False
+
+    def recent(self, limit: int,
+               city: Optional[str] = None,
+               ip_address: Optional[str] = None,
+               start: Optional[datetime] = None,
+               end: Optional[datetime] = None,
+               before: Optional[Tuple[datetime, int]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        从缓冲区按查询时间倒序读取最多limit条记录。
+
+        Args:
+            limit: 记录数
+            city: 只返回该城市名称的记录
+            ip_address: 只返回该客户端IP的记录
+            start: 起始查询时间（含，不带时区的UTC时间）
+            end: 结束查询时间（不含，不带时区的UTC时间）
+            before: 只返回(查询时间, ID)小于该位置的记录
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: 记录列表；缓冲区无法确定完整结果时返回None
+        """
+        if not self.primed:
+            self.stats["misses"] += 1
+            return None
+
+        matched: List[Dict[str, Any]] = []
+        for event in reversed(self._events):
+            query_time = event["query_time"]
+            if start is not None and query_time < start:
+                # 更早的记录都不满足时间范围，缓冲区外的记录也不会满足
+                break
+            if end is not None and query_time >= end:
+                continue
+            if before is not None and (query_time, event["id"]) >= before:
+                continue
+            if city is not None and event["city_name"] != city:
+                continue
+            if ip_address is not None and event["ip_address"] != ip_address:
+                continue
+            matched.append(event)
+            if len(matched) >= limit:
+                break
+        else:
+            # 扫描完整个缓冲区仍不足limit条，只有缓冲区包含全部记录时结果才完整
+            if not self.complete:
+                self.stats["misses"] += 1
+                return None
+
+        self.stats["hits"] += 1
+        return matched
+
+    def page(self, limit: int, cursor: Optional[str] = None,
+             **filters: Any) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        从缓冲区读取一页记录，参数和返回值与query_history_page一致。
+
+        Args:
+            limit: 每页记录数
+            cursor: 上一页返回的游标
+            **filters: city、ip_address、start、end过滤条件
+
+        Returns:
+            Optional[Tuple[List[Dict[str, Any]], Optional[str]]]: (本页记录, 下一页游标)；
+                缓冲区无法确定完整结果时返回None
+
+        Raises:
+            ValueError: 游标格式无效时抛出
+        """
+        before = decode_cursor(cursor) if cursor is not None else None
+        rows = self.recent(limit + 1, before=before, **filters)
+        if rows is None:
+            return None
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["query_time"], rows[-1]["id"])
+        return rows, next_cursor
+
+
+# 创建全局查询历史缓冲区
+history_buffer = HistoryRingBuffer()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+观测数据持久化服务模块。
+将从第三方API获取的实时天气观测写入City/WeatherRecord表，形成可查询的时间序列。
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import SessionLocal
+from ..models import City, WeatherRecord
+from .batch_writer import BatchWriter
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 支持INSERT ... ON CONFLICT的数据库方言
+_DIALECT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def dialect_insert(session: AsyncSession, model):
+    """
+    获取当前数据库方言下支持冲突处理的INSERT语句。
+
+    Args:
+        session: 数据库会话
+        model: SQLAlchemy模型类
+
+    Returns:
+        Insert: 支持on_conflict_do_*的INSERT语句
+
+    Raises:
+        NotImplementedError: 数据库方言不支持时抛出
+    """
+    dialect = session.bind.dialect.name
+    if dialect not in _DIALECT_INSERTS:
+        raise NotImplementedError(f"数据库方言'{dialect}'不支持去重写入")
+    return _DIALECT_INSERTS[dialect](model)
+
+
+def observation_from_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将第三方API的实时天气响应转换为观测记录。
+
+    Args:
+        payload: 第三方API返回的实时天气字典
+
+    Returns:
+        Dict[str, Any]: 包含city和record两部分的观测字典
+    """
+    main = payload.get("main", {})
+    wind = payload.get("wind", {})
+    weather = (payload.get("weather") or [{}])[0]
+    return {
+        "city": {
+            "external_id": payload.get("id"),
+            "name": payload["name"],
+            "country": payload.get("sys", {}).get("country", ""),
+            "latitude": payload["coord"]["lat"],
+            "longitude": payload["coord"]["lon"],
+        },
+        "record": {
+            "query_time": datetime.utcnow(),
+            "observed_at": datetime.utcfromtimestamp(payload["dt"]),
+            "temperature": main["temp"],
+            "humidity": main.get("humidity"),
+            "pressure": main.get("pressure"),
+            "wind_speed": wind.get("speed"),
+            "wind_direction": wind.get("deg"),
+            "weather_description": weather.get("description"),
+            "weather_icon": weather.get("icon"),
+            "extra_data": {
+                "feels_like": main.get("feels_like"),
+                "temp_min": main.get("temp_min"),
+                "temp_max": main.get("temp_max"),
+                "wind_gust": wind.get("gust"),
+                "clouds": payload.get("clouds", {}).get("all"),
+                "visibility": payload.get("visibility"),
+                "timezone": payload.get("timezone"),
+            },
+        },
+    }
+
+
+async def ensure_cities(session: AsyncSession, cities: List[Dict[str, Any]]) -> Dict[int, int]:
+    """
+    按第三方城市ID写入尚不存在的城市。
+
+    已存在的城市保持不变：上游响应中的名称可能是本地化名称（如lang=zh_cn），
+    不能覆盖城市目录导入的规范名称和国家。
+
+    Args:
+        session: 数据库会话
+        cities: 城市字典列表，必须包含external_id
+
+    Returns:
+        Dict[int, int]: 第三方城市ID到本地城市ID的映射
+    """
+    unique = {city["external_id"]: city for city in cities if city.get("external_id") is not None}
+    if not unique:
+        return {}
+
+    stmt = dialect_insert(session, City).on_conflict_do_nothing(index_elements=[City.external_id])
+    await session.execute(stmt, list(unique.values()))
+
+    result = await session.execute(
+        select(City.external_id, City.id).where(City.external_id.in_(list(unique)))
+    )
+    return dict(result.all())
+
+
+async def save_observations(session: AsyncSession, observations: List[Dict[str, Any]]) -> None:
+    """
+    写入一批观测记录，同一城市同一观测时间的记录只保留第一条。
+
+    Args:
+        session: 数据库会话
+        observations: observation_from_payload返回的观测字典列表
+    """
+    city_ids = await ensure_cities(session, [obs["city"] for obs in observations])
+
+    records = []
+    for obs in observations:
+        city_id = city_ids.get(obs["city"]["external_id"])
+        if city_id is None:
+            continue
+        records.append({**obs["record"], "city_id": city_id})
+    if not records:
+        return
+
+    stmt = dialect_insert(session, WeatherRecord).on_conflict_do_nothing(
+        index_elements=[WeatherRecord.city_id, WeatherRecord.observed_at]
+    )
+    await session.execute(stmt, records)
+
+
+def observations_handler(session_factory=None):
+    """
+    创建观测数据批量写入处理函数。
+
+    Args:
+        session_factory: 会话工厂，默认使用SessionLocal
+
+    Returns:
+        Callable: 接收观测字典列表的异步处理函数
+    """
+    async def handler(observations: List[Dict[str, Any]]) -> None:
+        async with (session_factory or SessionLocal)() as session:
+            await save_observations(session, observations)
+            await session.commit()
+    return handler
+
+
+async def find_city(session: AsyncSession, city_query: str) -> Optional[City]:
+    """
+    按名称查找本地城市（不区分大小写）。
+
+    Args:
+        session: 数据库会话
+        city_query: 城市名称，支持"城市,国家代码"格式
+
+    Returns:
+        Optional[City]: 城市对象，不存在时返回None
+    """
+    name, _, country = city_query.partition(",")
+
+    stmt = select(City).where(func.lower(City.name) == name.strip().lower())
+    if country:
+        stmt = stmt.where(func.lower(City.country) == country.strip().lower())
+    result = await session.execute(stmt.order_by(City.id).limit(1))
+    return result.scalars().first()
+
+
+async def query_observations(session: AsyncSession, city_id: int,
+                             start: Optional[datetime] = None,
+                             end: Optional[datetime] = None,
+                             limit: int = 1000) -> List[WeatherRecord]:
+    """
+    查询城市在时间范围内的观测记录（按观测时间升序）。
+
+    Args:
+        session: 数据库会话
+        city_id: 本地城市ID
+        start: 起始观测时间（含），UTC
+        end: 结束观测时间（不含），UTC
+        limit: 最多返回的记录数
+
+    Returns:
+        List[WeatherRecord]: 观测记录列表
+    """
+    stmt = select(WeatherRecord).where(WeatherRecord.city_id == city_id)
+    if start is not None:
+        stmt = stmt.where(WeatherRecord.observed_at >= start)
+    if end is not None:
+        stmt = stmt.where(WeatherRecord.observed_at < end)
+    stmt = stmt.order_by(WeatherRecord.observed_at).limit(limit)
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+# 创建全局观测数据写入器
+observation_writer = BatchWriter("observations", observations_handler())
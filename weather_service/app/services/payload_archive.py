@@ -0,0 +1,515 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+原始数据归档服务模块。
+将第三方API的原始响应规范化为JSON后按内容哈希去重，使用共享字典压缩保存，
+供审计和重新计算使用。读取时才按需解压。
+
+压缩算法默认使用zstd（需安装zstandard），未安装时使用标准库zlib的预置字典。
+字典由已归档的响应训练得到，相同结构的小响应共享字典中的键名和常见取值，压缩率远高于单独压缩。
+"""
+
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+from ..database import SessionLocal
+from ..models import RawPayload, PayloadDictionary
+from .batch_writer import BatchWriter
+from .observation_service import dialect_insert
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 压缩算法
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+# 归档配置
+PAYLOAD_ARCHIVE_ENABLED = os.getenv("PAYLOAD_ARCHIVE_ENABLED", "true").lower() == "true"
+PAYLOAD_CODEC = os.getenv("PAYLOAD_CODEC", CODEC_ZSTD if zstandard is not None else CODEC_ZLIB)
+PAYLOAD_COMPRESSION_LEVEL = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", 9))
+# 字典大小（字节），zlib的预置字典最多使用32KB
+PAYLOAD_DICT_SIZE = int(os.getenv("PAYLOAD_DICT_SIZE", 32768))
+# 训练字典时最多使用的最近响应个数
+PAYLOAD_DICT_SAMPLES = int(os.getenv("PAYLOAD_DICT_SAMPLES", 1000))
+
+# zlib预置字典的最大有效长度
+_ZLIB_WINDOW = 32768
+# 训练zlib字典时，只保留在至少该比例的样本中出现的片段
+_ZLIB_MIN_SHARE = 0.05
+# 训练zlib字典时按逗号切分JSON，片段通常为以逗号结尾的"键":值
+_FRAGMENT = re.compile(rb'[^,]*,?')
+# 片段中的键名部分（含前面的结构字符）
+_FRAGMENT_KEY = re.compile(rb'^[^"]*"[^"]*":')
+
+
+def canonical_json(payload: Dict[str, Any]) -> bytes:
+    """
+    将响应规范化为JSON字节串（键排序、无空白），内容相同的响应得到相同的字节串。
+
+    Args:
+        payload: 响应字典
+
+    Returns:
+        bytes: UTF-8编码的JSON
+    """
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _check_codec(codec: str) -> None:
+    """
+    检查压缩算法是否可用。
+
+    Raises:
+        ValueError: 算法不支持或未安装zstandard时抛出
+    """
+    if codec not in (CODEC_ZLIB, CODEC_ZSTD):
+        raise ValueError(f"不支持的压缩算法: {codec}")
+    if codec == CODEC_ZSTD and zstandard is None:
+        raise ValueError("使用zstd压缩需要安装zstandard")
+
+
+@lru_cache(maxsize=8)
+def _zstd_compressor(dictionary: Optional[bytes], level: int):
+    """获取使用指定字典的zstd压缩器，字典只需解析一次。"""
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+    # 内容大小和校验和由数据库保存，不写入帧头
+    return zstandard.ZstdCompressor(
+        level=level, dict_data=dict_data, write_content_size=False, write_checksum=False,
+        write_dict_id=False,
+    )
+
+
+@lru_cache(maxsize=8)
+def _zstd_decompressor(dictionary: Optional[bytes]):
+    """获取使用指定字典的zstd解压器。"""
+    dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+    return zstandard.ZstdDecompressor(dict_data=dict_data)
+
+
+def compress(codec: str, data: bytes, dictionary: Optional[bytes] = None,
+             level: int = PAYLOAD_COMPRESSION_LEVEL) -> bytes:
+    """
+    压缩数据。
+
+    Args:
+        codec: 压缩算法
+        data: 原始数据
+        dictionary: 共享字典，为空时不使用字典
+        level: 压缩级别
+
+    Returns:
+        bytes: 压缩后的数据
+    """
+    _check_codec(codec)
+    if codec == CODEC_ZSTD:
+        return _zstd_compressor(dictionary or None, level).compress(data)
+    # 使用原始deflate流，省去zlib头和校验和
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(codec: str, data: bytes, dictionary: Optional[bytes] = None) -> bytes:
+    """
+    解压数据。
+
+    Args:
+        codec: 压缩算法
+        data: 压缩后的数据
+        dictionary: 压缩时使用的共享字典
+
+    Returns:
+        bytes: 原始数据
+    """
+    _check_codec(codec)
+    if codec == CODEC_ZSTD:
+        # 帧头不含内容大小，使用流式解压
+        return _zstd_decompressor(dictionary or None).decompressobj().decompress(data)
+    if dictionary:
+        decompressor = zlib.decompressobj(-15, zdict=dictionary)
+    else:
+        decompressor = zlib.decompressobj(-15)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def _train_zlib_dictionary(samples: List[bytes], size: int) -> bytes:
+    """
+    训练zlib预置字典。
+
+    将样本切分为"键":值片段及其键名部分，按出现的样本数×片段长度（可节省的字节数）挑选片段，
+    最常用的片段放在字典末尾（距离待压缩数据最近，匹配编码最短），剩余空间用最近的样本原文填充。
+
+    Args:
+        samples: 规范化JSON样本
+        size: 字典大小
+
+    Returns:
+        bytes: 字典
+    """
+    frequency: Counter = Counter()
+    for sample in samples:
+        fragments = set()
+        for fragment in _FRAGMENT.findall(sample):
+            key = _FRAGMENT_KEY.match(fragment)
+            if key:
+                fragments.add(key.group())
+            fragments.add(fragment)
+        frequency.update(fragment for fragment in fragments if len(fragment) > 3)
+    threshold = max(2, int(len(samples) * _ZLIB_MIN_SHARE))
+    ranked = sorted(
+        (fragment for fragment, count in frequency.items() if count >= threshold),
+        key=lambda fragment: frequency[fragment] * len(fragment), reverse=True,
+    )
+    chosen: List[bytes] = []
+    used = 0
+    for fragment in ranked:
+        if used + len(fragment) > size:
+            continue
+        chosen.append(fragment)
+        used += len(fragment)
+    fragments = b"".join(reversed(chosen))
+    # 样本原文保留了片段之间的顺序和结构，越新的样本越靠后
+    filler = b"".join(reversed(samples))[-(size - len(fragments)):] if size > len(fragments) else b""
+    return filler + fragments
+
+
+def train_dictionary(codec: str, samples: List[bytes], size: int = PAYLOAD_DICT_SIZE) -> bytes:
+    """
+    由样本训练共享字典。
+
+    Args:
+        codec: 压缩算法
+        samples: 规范化JSON样本
+        size: 字典大小（字节）
+
+    Returns:
+        bytes: 字典
+
+    Raises:
+        ValueError: 算法不支持或样本太少时抛出
+    """
+    _check_codec(codec)
+    if len(samples) < 10:
+        raise ValueError("训练字典至少需要10个样本")
+    if codec == CODEC_ZSTD:
+        return zstandard.train_dictionary(size, samples).as_bytes()
+    return _train_zlib_dictionary(samples, min(size, _ZLIB_WINDOW))
+
+
+class PayloadArchive:
+    """
+    原始响应归档。
+    缓存已加载的字典，负责压缩新响应和按需解压已归档的响应。
+    """
+
+    def __init__(self, codec: str = PAYLOAD_CODEC, level: int = PAYLOAD_COMPRESSION_LEVEL):
+        """
+        初始化归档。
+
+        Args:
+            codec: 新响应使用的压缩算法
+            level: 压缩级别
+        """
+        self.codec = codec
+        self.level = level
+        # 新响应使用的字典ID，为空时不使用字典
+        self.dictionary_id: Optional[int] = None
+        self._dictionaries: Dict[int, bytes] = {}
+
+    async def load(self, session: AsyncSession) -> Optional[int]:
+        """
+        加载当前压缩算法最新的字典，作为新响应使用的字典。
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            Optional[int]: 字典ID，没有可用字典时返回None
+        """
+        result = await session.execute(
+            select(PayloadDictionary.id, PayloadDictionary.data)
+            .where(PayloadDictionary.codec == self.codec)
+            .order_by(PayloadDictionary.id.desc()).limit(1)
+        )
+        row = result.first()
+        if row is None:
+            self.dictionary_id = None
+            return None
+        self._dictionaries[row.id] = row.data
+        self.dictionary_id = row.id
+        logger.info(f"原始数据归档使用{self.codec}字典{row.id}（{len(row.data)}字节）")
+        return row.id
+
+    async def preload(self, session: AsyncSession) -> None:
+        """
+        缓存全部字典，之后解压不再查询数据库（流式读取期间同一连接不能执行其他查询）。
+
+        Args:
+            session: 数据库会话
+        """
+        result = await session.execute(select(PayloadDictionary.id, PayloadDictionary.data))
+        self._dictionaries.update({row.id: row.data for row in result.all()})
+
+    async def _dictionary(self, session: AsyncSession, dictionary_id: Optional[int]) -> Optional[bytes]:
+        """按ID获取字典，首次使用时从数据库读取。"""
+        if dictionary_id is None:
+            return None
+        if dictionary_id not in self._dictionaries:
+            result = await session.execute(
+                select(PayloadDictionary.data).where(PayloadDictionary.id == dictionary_id)
+            )
+            self._dictionaries[dictionary_id] = result.scalar_one()
+        return self._dictionaries[dictionary_id]
+
+    def encode(self, kind: str, payload: Dict[str, Any], fetched_at: datetime,
+               city_external_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        规范化并压缩响应，生成RawPayload表的行数据。
+
+        Args:
+            kind: 响应类型（current或forecast）
+            payload: 响应字典
+            fetched_at: 获取时间（UTC）
+            city_external_id: 第三方API中的城市ID
+
+        Returns:
+            Dict[str, Any]: 行数据
+        """
+        raw = canonical_json(payload)
+        dictionary = self._dictionaries.get(self.dictionary_id) if self.dictionary_id else None
+        return {
+            "sha256": hashlib.sha256(raw).hexdigest(),
+            "kind": kind,
+            "city_external_id": city_external_id,
+            "fetched_at": fetched_at,
+            "codec": self.codec,
+            "dictionary_id": self.dictionary_id if dictionary else None,
+            "raw_size": len(raw),
+            "data": compress(self.codec, raw, dictionary, self.level),
+        }
+
+    async def decode(self, session: AsyncSession, row: Any) -> Dict[str, Any]:
+        """
+        解压已归档的响应。
+
+        Args:
+            session: 数据库会话（用于读取尚未缓存的字典）
+            row: 包含codec、dictionary_id和data的RawPayload行
+
+        Returns:
+            Dict[str, Any]: 响应字典
+        """
+        dictionary = await self._dictionary(session, row.dictionary_id)
+        return json.loads(decompress(row.codec, row.data, dictionary))
+
+    async def train(self, session: AsyncSession, samples: int = PAYLOAD_DICT_SAMPLES,
+                    size: int = PAYLOAD_DICT_SIZE) -> Optional[int]:
+        """
+        用最近归档的响应训练新字典并保存（不提交事务），之后的新响应使用该字典。
+
+        Args:
+            session: 数据库会话
+            samples: 最多使用的最近响应个数
+            size: 字典大小（字节）
+
+        Returns:
+            Optional[int]: 新字典ID
+        """
+        result = await session.execute(
+            select(RawPayload.codec, RawPayload.dictionary_id, RawPayload.data)
+            .order_by(RawPayload.id.desc()).limit(samples)
+        )
+        payloads = [canonical_json(await self.decode(session, row)) for row in result.all()]
+        data = train_dictionary(self.codec, payloads, size)
+        dictionary = PayloadDictionary(codec=self.codec, data=data, sample_count=len(payloads))
+        session.add(dictionary)
+        await session.flush()
+        self._dictionaries[dictionary.id] = data
+        self.dictionary_id = dictionary.id
+        logger.info(f"已用{len(payloads)}个响应训练{self.codec}字典{dictionary.id}（{len(data)}字节）")
+        return dictionary.id
+
+
+def payloads_handler(archive: "PayloadArchive", session_factory=None):
+    """
+    创建原始响应批量归档处理函数。
+
+    Args:
+        archive: 原始响应归档
+        session_factory: 会话工厂，默认使用SessionLocal
+
+    Returns:
+        Callable: 接收(类型, 响应, 获取时间, 城市ID)元组列表的异步处理函数
+    """
+    async def handler(events: List[Tuple[str, Dict[str, Any], datetime, Optional[int]]]) -> None:
+        rows: Dict[str, Dict[str, Any]] = {}
+        for kind, payload, fetched_at, city_external_id in events:
+            row = archive.encode(kind, payload, fetched_at, city_external_id)
+            rows.setdefault(row["sha256"], row)
+        async with (session_factory or SessionLocal)() as session:
+            stmt = dialect_insert(session, RawPayload).on_conflict_do_nothing(
+                index_elements=[RawPayload.sha256]
+            )
+            await session.execute(stmt, list(rows.values()))
+            await session.commit()
+    return handler
+
+
+async def archive_payload(kind: str, payload: Dict[str, Any]) -> None:
+    """
+    将第三方API的原始响应提交到后台归档队列，失败时只记录日志。
+
+    Args:
+        kind: 响应类型（current或forecast）
+        payload: 响应字典
+    """
+    if not PAYLOAD_ARCHIVE_ENABLED:
+        return
+    city = payload.get("city") if kind == "forecast" else payload
+    try:
+        await payload_writer.submit((kind, payload, datetime.utcnow(), (city or {}).get("id")))
+    except Exception as e:
+        logger.warning(f"提交原始响应归档失败: {e}")
+
+
+async def list_payloads(session: AsyncSession, kind: Optional[str] = None,
+                        city_external_id: Optional[int] = None,
+                        start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    按获取时间倒序列出已归档响应的元数据，不读取压缩数据。
+
+    Args:
+        session: 数据库会话
+        kind: 响应类型
+        city_external_id: 第三方API中的城市ID
+        start: 起始获取时间（含，UTC）
+        end: 结束获取时间（不含，UTC）
+        limit: 最多返回的条数
+
+    Returns:
+        List[Dict[str, Any]]: 元数据列表，包含压缩后的字节数stored_size
+    """
+    stmt = select(
+        RawPayload.sha256, RawPayload.kind, RawPayload.city_external_id, RawPayload.fetched_at,
+        RawPayload.codec, RawPayload.dictionary_id, RawPayload.raw_size,
+        func.length(RawPayload.data).label("stored_size"),
+    )
+    if kind is not None:
+        stmt = stmt.where(RawPayload.kind == kind)
+    if city_external_id is not None:
+        stmt = stmt.where(RawPayload.city_external_id == city_external_id)
+    if start is not None:
+        stmt = stmt.where(RawPayload.fetched_at >= start)
+    if end is not None:
+        stmt = stmt.where(RawPayload.fetched_at < end)
+    result = await session.execute(stmt.order_by(RawPayload.fetched_at.desc()).limit(limit))
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def load_payload(session: AsyncSession, sha256: str) -> Optional[Dict[str, Any]]:
+    """
+    按内容哈希读取并解压一个已归档的响应。
+
+    Args:
+        session: 数据库会话
+        sha256: 内容哈希
+
+    Returns:
+        Optional[Dict[str, Any]]: 响应字典，不存在时返回None
+    """
+    result = await session.execute(
+        select(RawPayload.codec, RawPayload.dictionary_id, RawPayload.data)
+        .where(RawPayload.sha256 == sha256)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return await payload_archive.decode(session, row)
+
+
+async def iter_payloads(session: AsyncSession, kind: str, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, chunk_size: int = 500
+                        ) -> AsyncIterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    按获取时间升序逐个解压已归档的响应，供重新计算使用。
+
+    Args:
+        session: 数据库会话
+        kind: 响应类型
+        start: 起始获取时间（含，UTC）
+        end: 结束获取时间（不含，UTC）
+        chunk_size: 每次从数据库读取的行数
+
+    Yields:
+        Tuple[Dict[str, Any], Dict[str, Any]]: (元数据, 响应字典)
+    """
+    stmt = select(
+        RawPayload.id, RawPayload.sha256, RawPayload.city_external_id, RawPayload.fetched_at,
+        RawPayload.codec, RawPayload.dictionary_id, RawPayload.data,
+    ).where(RawPayload.kind == kind)
+    if start is not None:
+        stmt = stmt.where(RawPayload.fetched_at >= start)
+    if end is not None:
+        stmt = stmt.where(RawPayload.fetched_at < end)
+    stmt = stmt.order_by(RawPayload.fetched_at, RawPayload.id).execution_options(yield_per=chunk_size)
+    await payload_archive.preload(session)
+    result = await session.stream(stmt)
+    async for row in result:
+        meta = {"id": row.id, "sha256": row.sha256, "city_external_id": row.city_external_id,
+                "fetched_at": row.fetched_at}
+        yield meta, await payload_archive.decode(session, row)
+
+
+async def archive_stats(session: AsyncSession) -> Dict[str, Any]:
+    """
+    统计各类型响应的归档条数、原始字节数和压缩后字节数。
+
+    Args:
+        session: 数据库会话
+
+    Returns:
+        Dict[str, Any]: 按类型的统计和当前使用的压缩算法、字典
+    """
+    result = await session.execute(
+        select(RawPayload.kind, func.count(), func.sum(RawPayload.raw_size),
+               func.sum(func.length(RawPayload.data)))
+        .group_by(RawPayload.kind)
+    )
+    kinds = {}
+    for kind, count, raw_size, stored_size in result.all():
+        kinds[kind] = {
+            "payloads": count,
+            "raw_size": raw_size or 0,
+            "stored_size": stored_size or 0,
+            "ratio": round((stored_size or 0) / raw_size, 4) if raw_size else None,
+        }
+    return {"codec": payload_archive.codec, "dictionary_id": payload_archive.dictionary_id, "kinds": kinds}
+
+
+# 创建全局原始响应归档和后台写入器
+payload_archive = PayloadArchive()
+payload_writer = BatchWriter("raw_payloads", payloads_handler(payload_archive))
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+离线重新计算服务模块。
+修改预报聚合规则或新增派生指标后，按ID顺序分块读取归档的预报响应和观测数据，
+分发到进程池并行计算，按块顺序批量写回结果表，每块写入时在同一事务中记录断点，中断后可从断点继续。
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+import numpy as np
+from sqlalchemy import select, delete, func
+
+from ..database import SessionLocal
+from ..models import (
+    RawPayload, PayloadDictionary, WeatherRecord,
+    ForecastDailySummary, ObservationMetric, RecomputeCheckpoint
+)
+from ..utils.meteo import dew_point, feels_like
+from .forecast_store import CompactForecast
+from .forecast_aggregation import aggregate_daily, daily_records
+from .observation_service import dialect_insert
+from .payload_archive import decompress
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 每块读取的源数据行数
+RECOMPUTE_CHUNK_SIZE = int(os.getenv("RECOMPUTE_CHUNK_SIZE", 500))
+# 计算进程数，0表示使用全部CPU核心
+RECOMPUTE_WORKERS = int(os.getenv("RECOMPUTE_WORKERS", 0))
+
+# 计算进程中可用的压缩字典，由进程池初始化函数设置
+_WORKER_DICTIONARIES: Dict[int, bytes] = {}
+
+
+def _init_worker(dictionaries: Dict[int, bytes]) -> None:
+    """计算进程初始化：保存解压预报响应所需的字典。"""
+    _WORKER_DICTIONARIES.clear()
+    _WORKER_DICTIONARIES.update(dictionaries)
+
+
+def compute_forecast_daily(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    解压预报响应并按城市当地日期聚合（在计算进程中执行）。
+
+    Args:
+        rows: (ID, 城市ID, 获取时间, 压缩算法, 字典ID, 压缩数据)元组列表
+
+    Returns:
+        List[Dict[str, Any]]: ForecastDailySummary表的行数据
+    """
+    results = []
+    for payload_id, city_external_id, fetched_at, codec, dictionary_id, data in rows:
+        dictionary = _WORKER_DICTIONARIES[dictionary_id] if dictionary_id is not None else None
+        forecast = CompactForecast.from_payload(json.loads(decompress(codec, data, dictionary)))
+        for record in daily_records(aggregate_daily(forecast)):
+            record["date"] = date.fromisoformat(record["date"])
+            results.append({
+                "payload_id": payload_id,
+                "city_external_id": city_external_id,
+                "issued_at": fetched_at,
+                **record,
+            })
+    return results
+
+
+def compute_observation_metrics(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    计算观测的派生指标（在计算进程中执行），整块数据一次向量化计算。
+
+    Args:
+        rows: (ID, 城市ID, 观测时间, 气温, 湿度, 风速)元组列表
+
+    Returns:
+        List[Dict[str, Any]]: ObservationMetric表的行数据
+    """
+    if not rows:
+        return []
+    ids, city_ids, observed_at, temperature, humidity, wind_speed = zip(*rows)
+    temperature = np.array(temperature, dtype=np.float64)
+    humidity = np.array([np.nan if v is None else v for v in humidity], dtype=np.float64)
+    wind_speed = np.array([np.nan if v is None else v for v in wind_speed], dtype=np.float64)
+    metrics = {
+        "dew_point": np.round(dew_point(temperature, humidity), 2).tolist(),
+        "feels_like": np.round(feels_like(temperature, humidity, wind_speed), 2).tolist(),
+    }
+    return [
+        {
+            "record_id": ids[i],
+            "city_id": city_ids[i],
+            "observed_at": observed_at[i],
+            **{name: None if values[i] != values[i] else values[i] for name, values in metrics.items()},
+        }
+        for i in range(len(ids))
+    ]
+
+
+class RecomputeJob:
+    """
+    重新计算任务定义。
+    描述源数据如何按ID分块读取、每块如何计算，以及结果写入哪张表。
+    """
+
+    def __init__(self, name: str, version: int, columns: List[Any], criteria: List[Any],
+                 compute: Callable[[List[tuple]], List[Dict[str, Any]]],
+                 target_model, conflict_keys: List[str]):
+        """
+        初始化任务。
+
+        Args:
+            name: 任务名称，同时作为断点的键
+            version: 计算规则版本，修改规则后递增，断点版本不一致时从头重新计算
+            columns: 读取的源数据列，第一列为递增的ID
+            criteria: 源数据过滤条件
+            compute: 每块的计算函数，需为模块级函数（可在进程间传递）
+            target_model: 结果模型类
+            conflict_keys: 结果表的唯一键，重复计算时覆盖已有结果
+        """
+        self.name = name
+        self.version = version
+        self.columns = columns
+        self.criteria = criteria
+        self.compute = compute
+        self.target_model = target_model
+        self.conflict_keys = conflict_keys
+
+    @property
+    def id_column(self):
+        """源数据ID列。"""
+        return self.columns[0]
+
+    async def count(self, session, after_id: int) -> int:
+        """统计ID大于after_id的源数据行数。"""
+        result = await session.execute(
+            select(func.count()).select_from(self.id_column.table)
+            .where(self.id_column > after_id, *self.criteria)
+        )
+        return result.scalar()
+
+    async def fetch(self, session, after_id: int, limit: int) -> List[tuple]:
+        """按ID顺序读取after_id之后的一块源数据。"""
+        result = await session.execute(
+            select(*self.columns).where(self.id_column > after_id, *self.criteria)
+            .order_by(self.id_column).limit(limit)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def write(self, session, rows: List[Dict[str, Any]]) -> None:
+        """按唯一键写入或覆盖结果。"""
+        if not rows:
+            return
+        stmt = dialect_insert(session, self.target_model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[getattr(self.target_model, key) for key in self.conflict_keys],
+            set_={name: stmt.excluded[name] for name in rows[0] if name not in self.conflict_keys},
+        )
+        await session.execute(stmt, rows)
+
+
+# 可执行的重新计算任务
+RECOMPUTE_JOBS: Dict[str, RecomputeJob] = {
+    job.name: job for job in [
+        RecomputeJob(
+            name="forecast_daily",
+            version=2,
+            columns=[RawPayload.id, RawPayload.city_external_id, RawPayload.fetched_at,
+                     RawPayload.codec, RawPayload.dictionary_id, RawPayload.data],
+            criteria=[RawPayload.kind == "forecast"],
+            compute=compute_forecast_daily,
+            target_model=ForecastDailySummary,
+            conflict_keys=["payload_id", "date"],
+        ),
+        RecomputeJob(
+            name="observation_metrics",
+            version=2,
+            columns=[WeatherRecord.id, WeatherRecord.city_id, WeatherRecord.observed_at,
+                     WeatherRecord.temperature, WeatherRecord.humidity, WeatherRecord.wind_speed],
+            criteria=[],
+            compute=compute_observation_metrics,
+            target_model=ObservationMetric,
+            conflict_keys=["record_id"],
+        ),
+    ]
+}
+
+
+async def get_checkpoint(session, name: str) -> Optional[RecomputeCheckpoint]:
+    """
+    获取任务断点。
+
+    Args:
+        session: 数据库会话
+        name: 任务名称
+
+    Returns:
+        Optional[RecomputeCheckpoint]: 断点，尚未执行过时返回None
+    """
+    result = await session.execute(
+        select(RecomputeCheckpoint).where(RecomputeCheckpoint.name == name)
+    )
+    return result.scalars().first()
+
+
+async def _save_checkpoint(session, job: RecomputeJob, last_id: int, processed: int) -> None:
+    """在当前事务中更新任务断点。"""
+    stmt = dialect_insert(session, RecomputeCheckpoint)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RecomputeCheckpoint.name],
+        set_={name: stmt.excluded[name] for name in ("version", "last_id", "processed", "updated_at")},
+    )
+    await session.execute(stmt, [{
+        "name": job.name,
+        "version": job.version,
+        "last_id": last_id,
+        "processed": processed,
+        "updated_at": datetime.utcnow(),
+    }])
+
+
+def _log_progress(job: str, processed: int, total: int, elapsed: float) -> None:
+    """默认进度输出：已处理行数、速度和预计剩余时间。"""
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    remaining = (total - processed) / rate if rate > 0 else 0.0
+    percent = processed / total * 100 if total else 100.0
+    logger.info(f"{job}: {processed}/{total} ({percent:.1f}%)，{rate:.0f}行/秒，预计剩余{remaining:.0f}秒")
+
+
+async def run_job(job: RecomputeJob, session_factory=None, workers: int = RECOMPUTE_WORKERS,
+                  chunk_size: int = RECOMPUTE_CHUNK_SIZE, restart: bool = False,
+                  progress: Optional[Callable[[str, int, int, float], None]] = None) -> Dict[str, Any]:
+    """
+    执行一个重新计算任务。
+
+    源数据按ID分块读取，每块提交到进程池计算，同时最多有workers×2块在计算中；
+    结果按块顺序写回，每块的结果和断点在同一事务中提交，因此中断后从断点继续不会遗漏或重复。
+
+    Args:
+        job: 任务
+        session_factory: 会话工厂，默认使用SessionLocal
+        workers: 计算进程数，0表示使用全部CPU核心，1表示在当前进程中计算
+        chunk_size: 每块的源数据行数
+        restart: 忽略断点并清空结果表，从头重新计算
+        progress: 进度回调，参数为(任务名称, 已处理行数, 总行数, 已用秒数)
+
+    Returns:
+        Dict[str, Any]: 本次处理的源数据行数、写入的结果行数和最终断点
+    """
+    factory = session_factory or SessionLocal
+    progress = progress or _log_progress
+    workers = workers or os.cpu_count() or 1
+
+    async with factory() as session:
+        checkpoint = await get_checkpoint(session, job.name)
+        if restart or checkpoint is None or checkpoint.version != job.version:
+            if checkpoint is not None:
+                logger.info(f"{job.name}: 计算规则版本{checkpoint.version}→{job.version}或指定重新计算，清空结果表")
+            await session.execute(delete(job.target_model))
+            await _save_checkpoint(session, job, 0, 0)
+            await session.commit()
+            last_id, processed = 0, 0
+        else:
+            last_id, processed = checkpoint.last_id, checkpoint.processed
+        total = processed + await job.count(session, last_id)
+        result = await session.execute(select(PayloadDictionary.id, PayloadDictionary.data))
+        dictionaries = {row.id: row.data for row in result.all()}
+
+    loop = asyncio.get_running_loop()
+    executor = None
+    if workers > 1:
+        # 使用spawn启动计算进程，避免在已有数据库线程的进程中fork
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(dictionaries,),
+        )
+    else:
+        _init_worker(dictionaries)
+
+    started = time.monotonic()
+    written = 0
+    done = 0
+    pending: deque = deque()
+    fetched_id = last_id
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < workers * 2:
+                async with factory() as session:
+                    rows = await job.fetch(session, fetched_id, chunk_size)
+                if not rows:
+                    exhausted = True
+                    break
+                fetched_id = rows[-1][0]
+                if executor is None:
+                    future = loop.create_future()
+                    future.set_result(job.compute(rows))
+                else:
+                    future = loop.run_in_executor(executor, job.compute, rows)
+                pending.append((fetched_id, len(rows), future))
+            if not pending:
+                break
+
+            chunk_last_id, count, future = pending.popleft()
+            results = await future
+            async with factory() as session:
+                await job.write(session, results)
+                await _save_checkpoint(session, job, chunk_last_id, processed + count)
+                await session.commit()
+            processed += count
+            done += count
+            written += len(results)
+            progress(job.name, processed, total, time.monotonic() - started)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    return {"processed": done, "written": written, "last_id": fetched_id if exhausted else None}
+
+
+async def run_recompute(names: Optional[List[str]] = None, **kwargs) -> Dict[str, Dict[str, Any]]:
+    """
+    依次执行多个重新计算任务。
+
+    Args:
+        names: 任务名称列表，默认执行全部任务
+        **kwargs: 传给run_job的参数
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 每个任务的执行结果
+
+    Raises:
+        ValueError: 任务名称不存在时抛出
+    """
+    names = names or list(RECOMPUTE_JOBS)
+    unknown = [name for name in names if name not in RECOMPUTE_JOBS]
+    if unknown:
+        raise ValueError(f"不支持的重新计算任务: {', '.join(unknown)}")
+    return {name: await run_job(RECOMPUTE_JOBS[name], **kwargs) for name in names}
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+图表渲染进程池模块。
+matplotlib绘图是同步的CPU密集操作，在请求处理协程中直接执行会阻塞整个事件循环；
+这里把渲染分发到独立进程执行，进程启动时预先导入matplotlib并完成一次预热渲染，
+等待和执行中的任务数有上限，超出时直接拒绝，单个任务超时后不再等待结果。
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+from .visualization_service import VisualizationService, IMAGE_FORMATS
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 渲染进程数，0表示使用全部CPU核心
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", 0))
+# 等待和执行中的渲染任务上限
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", 32))
+# 单个渲染任务的超时时间，单位为秒
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", 15))
+
+# 可在渲染进程中执行的图表
+RENDERERS: Dict[str, Callable[..., bytes]] = {
+    "temperature": VisualizationService.render_temperature_chart,
+    "dashboard": VisualizationService.render_weather_dashboard,
+}
+
+
+class RenderQueueFull(Exception):
+    """渲染任务数已达上限。"""
+
+
+class RenderTimeout(Exception):
+    """渲染任务超时。"""
+
+
+def _init_worker() -> None:
+    """渲染进程初始化：matplotlib已随本模块导入，每种图表预热渲染一次，建好本进程的图形模板并加载字体。"""
+    sample = [
+        {"date": f"2025-01-0{day}", "max_temp": 5.0 + day, "min_temp": day, "humidity": 50.0}
+        for day in range(1, 6)
+    ]
+    for kind, renderer in RENDERERS.items():
+        try:
+            renderer(sample, "")
+        except Exception as e:  # pragma: no cover - 预热失败不影响正式渲染
+            logger.warning(f"渲染进程预热{kind}图表失败: {e}")
+
+
+def _render(kind: str, *args: Any) -> bytes:
+    """在渲染进程中生成图表。"""
+    return RENDERERS[kind](*args)
+
+
+def _ping() -> None:
+    """空任务，用于启动时创建渲染进程。"""
+
+
+class RenderPool:
+    """
+    图表渲染进程池。
+
+    进程按需创建（start时预先创建全部进程），提交的任务数超过max_queue时抛出RenderQueueFull；
+    任务超时时抛出RenderTimeout，尚未开始的任务被取消，已开始的任务在进程中执行完后丢弃结果，
+    并继续占用名额直到完成，避免超时的请求堆积在进程池中。
+    """
+
+    def __init__(self, workers: int = RENDER_WORKERS, max_queue: int = RENDER_QUEUE_SIZE,
+                 timeout: float = RENDER_TIMEOUT):
+        """
+        初始化渲染进程池。
+
+        Args:
+            workers: 渲染进程数，0表示使用全部CPU核心
+            max_queue: 等待和执行中的任务上限
+            timeout: 单个任务的超时时间（秒）
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 名额在任务完成时由进程池的管理线程释放
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats: Dict[str, int] = {"completed": 0, "failed": 0, "rejected": 0, "timeouts": 0}
+
+    @property
+    def pending(self) -> int:
+        """等待和执行中的任务数。"""
+        return self._pending
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        """获取进程池，不存在时创建。"""
+        if self._executor is None:
+            # 使用spawn启动渲染进程，避免在已有数据库线程和事件循环的进程中fork
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """创建进程池并预先启动全部渲染进程。"""
+        executor = self._ensure_executor()
+        for _ in range(self.workers):
+            executor.submit(_ping)
+        logger.info(f"图表渲染进程池已启动，进程数{self.workers}")
+
+    def stop(self) -> None:
+        """关闭进程池，取消尚未开始的任务。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在渲染进程中执行函数。
+
+        Args:
+            func: 可序列化的模块级函数
+            *args: 函数参数（需可序列化）
+
+        Returns:
+            Any: 函数返回值
+
+        Raises:
+            RenderQueueFull: 任务数已达上限时抛出
+            RenderTimeout: 任务超时时抛出
+        """
+        timeout = self.timeout
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise RenderQueueFull(f"图表渲染任务已满（{self.max_queue}个），请稍后重试")
+            self._pending += 1
+
+        executor = self._ensure_executor()
+        try:
+            try:
+                future = executor.submit(func, *args)
+            except BrokenProcessPool:
+                # 渲染进程异常退出后进程池不可再用，重建后重试一次
+                logger.error("图表渲染进程池已损坏，重新创建")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                executor = self._ensure_executor()
+                future = executor.submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise RenderTimeout(f"图表渲染超过{timeout:g}秒")
+        except BrokenProcessPool:
+            self.stats["failed"] += 1
+            if self._executor is executor:
+                self._executor = None
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        self.stats["completed"] += 1
+        return result
+
+    def _release(self, _: Optional[Future] = None) -> None:
+        """任务完成或取消后释放名额。"""
+        with self._lock:
+            self._pending -= 1
+
+    async def render(self, kind: str, forecast_data: List[Dict[str, Any]], city: str,
+                     image_format: str = "png") -> bytes:
+        """
+        生成图表。
+
+        Args:
+            kind: 图表类型（RENDERERS中的键）
+            forecast_data: 每日预报数据列表
+            city: 城市名称
+            image_format: 图像格式（IMAGE_FORMATS中的键）
+
+        Returns:
+            bytes: 图像数据
+
+        Raises:
+            ValueError: 图表类型或图像格式不支持时抛出
+            RenderQueueFull: 任务数已达上限时抛出
+            RenderTimeout: 任务超时时抛出
+        """
+        if kind not in RENDERERS:
+            raise ValueError(f"不支持的图表类型: {kind}")
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的图像格式: {image_format}")
+        return await self.submit(_render, kind, forecast_data, city, image_format)
+
+
+# 创建全局渲染进程池
+render_pool = RenderPool()
@@ -0,0 +1,537 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据保留服务模块。
+将查询历史和天气观测的原始数据汇总为按小时、按天的汇总数据，
+并分批清理超过保留期限且已汇总的原始数据，使数据库大小和查询时间保持稳定。
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import select, delete, update, func, case
+
+from ..database import SessionLocal
+from ..models import (
+    QueryHistory, WeatherRecord, QueryHistoryRollup, WeatherRecordRollup, RollupState
+)
+from ..utils.time_buckets import (
+    GRANULARITY_HOUR, GRANULARITY_DAY, floor_time, truncate_time, as_datetime
+)
+from .observation_service import dialect_insert
+from .history_service import history_buffer
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 数据保留配置
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", 3600))
+RETENTION_HISTORY_DAYS = int(os.getenv("RETENTION_HISTORY_DAYS", 30))
+RETENTION_OBSERVATION_DAYS = int(os.getenv("RETENTION_OBSERVATION_DAYS", 90))
+RETENTION_HOURLY_DAYS = int(os.getenv("RETENTION_HOURLY_DAYS", 365))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 1000))
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", 0.05))
+# 只汇总早于当前时间该秒数的完整小时，留出批量写入的延迟
+ROLLUP_SETTLE_SECONDS = int(os.getenv("ROLLUP_SETTLE_SECONDS", 300))
+# 每个事务最多汇总的小时数
+ROLLUP_CHUNK_HOURS = int(os.getenv("ROLLUP_CHUNK_HOURS", 24))
+
+
+def _weighted_avg(column, weight):
+    """按样本数加权平均小时均值，忽略均值为空的小时。"""
+    return func.sum(column * weight) / func.nullif(
+        func.sum(case((column.isnot(None), weight), else_=0)), 0
+    )
+
+
+class RollupSource:
+    """
+    汇总数据源定义。
+    描述原始表如何按小时汇总，以及小时汇总如何合并为天汇总。
+    """
+
+    def __init__(self, name: str, raw_model, time_column, rollup_model, key: str,
+                 hourly_measures: Dict[str, Any], daily_measures: Dict[str, Any],
+                 retention_days: int):
+        """
+        初始化汇总数据源。
+
+        Args:
+            name: 数据源名称，同时作为汇总进度的键
+            raw_model: 原始数据模型类
+            time_column: 原始数据的时间列
+            rollup_model: 汇总数据模型类
+            key: 分组列名，原始表和汇总表中同名
+            hourly_measures: 汇总列名到原始数据聚合表达式的映射
+            daily_measures: 汇总列名到小时汇总聚合表达式的映射
+            retention_days: 原始数据默认保留天数，0表示不清理
+        """
+        self.name = name
+        self.raw_model = raw_model
+        self.time_column = time_column
+        self.rollup_model = rollup_model
+        self.key = key
+        self.hourly_measures = hourly_measures
+        self.daily_measures = daily_measures
+        self.retention_days = retention_days
+
+
+# 需要汇总和清理的数据源
+ROLLUP_SOURCES: List[RollupSource] = [
+    RollupSource(
+        name="query_history",
+        raw_model=QueryHistory,
+        time_column=QueryHistory.query_time,
+        rollup_model=QueryHistoryRollup,
+        key="city_name",
+        hourly_measures={
+            "query_count": func.count(QueryHistory.id),
+        },
+        daily_measures={
+            "query_count": func.sum(QueryHistoryRollup.query_count),
+        },
+        retention_days=RETENTION_HISTORY_DAYS,
+    ),
+    RollupSource(
+        name="weather_records",
+        raw_model=WeatherRecord,
+        time_column=WeatherRecord.observed_at,
+        rollup_model=WeatherRecordRollup,
+        key="city_id",
+        hourly_measures={
+            "sample_count": func.count(WeatherRecord.id),
+            "temperature_avg": func.avg(WeatherRecord.temperature),
+            "temperature_min": func.min(WeatherRecord.temperature),
+            "temperature_max": func.max(WeatherRecord.temperature),
+            "humidity_avg": func.avg(WeatherRecord.humidity),
+            "pressure_avg": func.avg(WeatherRecord.pressure),
+            "wind_speed_avg": func.avg(WeatherRecord.wind_speed),
+            "wind_speed_max": func.max(WeatherRecord.wind_speed),
+        },
+        daily_measures={
+            "sample_count": func.sum(WeatherRecordRollup.sample_count),
+            "temperature_avg": _weighted_avg(
+                WeatherRecordRollup.temperature_avg, WeatherRecordRollup.sample_count),
+            "temperature_min": func.min(WeatherRecordRollup.temperature_min),
+            "temperature_max": func.max(WeatherRecordRollup.temperature_max),
+            "humidity_avg": _weighted_avg(
+                WeatherRecordRollup.humidity_avg, WeatherRecordRollup.sample_count),
+            "pressure_avg": _weighted_avg(
+                WeatherRecordRollup.pressure_avg, WeatherRecordRollup.sample_count),
+            "wind_speed_avg": _weighted_avg(
+                WeatherRecordRollup.wind_speed_avg, WeatherRecordRollup.sample_count),
+            "wind_speed_max": func.max(WeatherRecordRollup.wind_speed_max),
+        },
+        retention_days=RETENTION_OBSERVATION_DAYS,
+    ),
+]
+
+
+async def get_watermark(session, name: str) -> Optional[datetime]:
+    """
+    获取数据源已汇总到的时间点。
+
+    Args:
+        session: 数据库会话
+        name: 数据源名称
+
+    Returns:
+        Optional[datetime]: 汇总进度，尚未汇总过时返回None
+    """
+    result = await session.execute(
+        select(RollupState.watermark).where(RollupState.name == name)
+    )
+    return result.scalar()
+
+
+async def get_last_id(session, name: str) -> Optional[int]:
+    """
+    获取数据源已汇总的最大原始数据ID。
+
+    Args:
+        session: 数据库会话
+        name: 数据源名称
+
+    Returns:
+        Optional[int]: 最大原始数据ID，尚未记录时返回None
+    """
+    result = await session.execute(
+        select(RollupState.last_id).where(RollupState.name == name)
+    )
+    return result.scalar()
+
+
+async def _set_watermark(session, name: str, watermark: datetime) -> None:
+    """在当前事务中更新数据源的汇总进度。"""
+    stmt = dialect_insert(session, RollupState)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RollupState.name],
+        set_={"watermark": stmt.excluded.watermark, "updated_at": stmt.excluded.updated_at},
+    )
+    await session.execute(stmt, [{
+        "name": name,
+        "watermark": watermark,
+        "updated_at": datetime.utcnow(),
+    }])
+
+
+async def _upsert_rollups(session, source: RollupSource, records: List[Dict[str, Any]],
+                          measures: Dict[str, Any]) -> None:
+    """按(粒度, 时间桶, 分组列)写入或覆盖汇总行。"""
+    if not records:
+        return
+    model = source.rollup_model
+    stmt = dialect_insert(session, model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[model.granularity, model.bucket_start, getattr(model, source.key)],
+        set_={name: stmt.excluded[name] for name in measures},
+    )
+    await session.execute(stmt, records)
+
+
+async def _rollup_window(session, source: RollupSource, start: datetime, end: datetime) -> int:
+    """
+    汇总[start, end)内的原始数据，并重新计算受影响日期的天汇总。
+
+    Args:
+        session: 数据库会话
+        source: 数据源
+        start: 起始时间（整点）
+        end: 结束时间（整点）
+
+    Returns:
+        int: 写入的小时汇总行数
+    """
+    raw_key = getattr(source.raw_model, source.key)
+    bucket = truncate_time(session, source.time_column, GRANULARITY_HOUR).label("bucket")
+    stmt = (
+        select(bucket, raw_key.label("key"),
+               *(expr.label(name) for name, expr in source.hourly_measures.items()))
+        .where(source.time_column >= start, source.time_column < end)
+        .group_by(bucket, raw_key)
+    )
+    result = await session.execute(stmt)
+    hourly = [
+        {
+            "granularity": GRANULARITY_HOUR,
+            "bucket_start": as_datetime(row["bucket"]),
+            source.key: row["key"],
+            **{name: row[name] for name in source.hourly_measures},
+        }
+        for row in result.mappings().all()
+    ]
+    await _upsert_rollups(session, source, hourly, source.hourly_measures)
+
+    # 天汇总由该日全部小时汇总重新计算，窗口只覆盖一天的一部分时也保持正确
+    model = source.rollup_model
+    rollup_key = getattr(model, source.key)
+    day_start = floor_time(start, GRANULARITY_DAY)
+    day_end = floor_time(end, GRANULARITY_DAY)
+    if day_end < end:
+        day_end += timedelta(days=1)
+    day_bucket = truncate_time(session, model.bucket_start, GRANULARITY_DAY).label("bucket")
+    stmt = (
+        select(day_bucket, rollup_key.label("key"),
+               *(expr.label(name) for name, expr in source.daily_measures.items()))
+        .where(model.granularity == GRANULARITY_HOUR,
+               model.bucket_start >= day_start, model.bucket_start < day_end)
+        .group_by(day_bucket, rollup_key)
+    )
+    result = await session.execute(stmt)
+    daily = [
+        {
+            "granularity": GRANULARITY_DAY,
+            "bucket_start": as_datetime(row["bucket"]),
+            source.key: row["key"],
+            **{name: row[name] for name in source.daily_measures},
+        }
+        for row in result.mappings().all()
+    ]
+    await _upsert_rollups(session, source, daily, source.daily_measures)
+    return len(hourly)
+
+
+async def rollup_source(source: RollupSource, until: datetime, session_factory=None,
+                        hourly_cutoff: Optional[datetime] = None) -> int:
+    """
+    将数据源中汇总进度到until之间的原始数据汇总，每个事务最多处理ROLLUP_CHUNK_HOURS小时，
+    然后重新汇总迟到数据（上次汇总后写入、时间却早于原汇总进度的数据）所在的小时。
+
+    Args:
+        source: 数据源
+        until: 汇总截止时间（整点，不含）
+        session_factory: 会话工厂，默认使用SessionLocal
+        hourly_cutoff: 小时汇总的清理时间点，早于它的日期不再重新汇总迟到数据
+
+    Returns:
+        int: 写入的小时汇总行数
+    """
+    async with (session_factory or SessionLocal)() as session:
+        previous = await get_watermark(session, source.name)
+        # 本轮只处理此刻已写入的数据，之后写入的数据由下一轮处理
+        max_id = (await session.execute(select(func.max(source.raw_model.id)))).scalar()
+
+    total = await _rollup_until(source, until, session_factory)
+    total += await _rollup_late(source, previous, max_id, session_factory, hourly_cutoff)
+    return total
+
+
+async def _rollup_late(source: RollupSource, previous: Optional[datetime], max_id: Optional[int],
+                       session_factory=None, hourly_cutoff: Optional[datetime] = None) -> int:
+    """
+    重新汇总迟到数据所在的小时，并把已处理的最大原始数据ID更新为max_id。
+
+    所在小时的原始数据已被清理，或所在日期的小时汇总已被清理时，重新汇总只能用剩余的数据
+    覆盖原有的小时和天汇总，这些迟到数据不计入汇总，只记录警告。
+
+    Args:
+        source: 数据源
+        previous: 本轮汇总前的汇总进度
+        max_id: 本轮开始时的最大原始数据ID
+        session_factory: 会话工厂，默认使用SessionLocal
+        hourly_cutoff: 小时汇总的清理时间点
+
+    Returns:
+        int: 写入的小时汇总行数
+    """
+    total = 0
+    async with (session_factory or SessionLocal)() as session:
+        last_id = await get_last_id(session, source.name)
+        # 首次记录ID时，此前的数据已按时间汇总，不再回溯
+        if previous is not None and last_id is not None and max_id is not None:
+            bucket = truncate_time(session, source.time_column, GRANULARITY_HOUR)
+            result = await session.execute(
+                select(bucket).distinct()
+                .where(source.raw_model.id > last_id, source.raw_model.id <= max_id,
+                       source.time_column < previous)
+            )
+            hours = sorted(as_datetime(row[0]) for row in result.all())
+            purged_before = (await session.execute(
+                select(RollupState.purged_before).where(RollupState.name == source.name)
+            )).scalar()
+            skipped = [
+                hour for hour in hours
+                if (purged_before is not None and hour < purged_before)
+                or (hourly_cutoff is not None and floor_time(hour, GRANULARITY_DAY) < hourly_cutoff)
+            ]
+            if skipped:
+                logger.warning(f"数据保留'{source.name}': {len(skipped)}个小时的迟到数据早于已清理的数据，"
+                               f"不计入汇总（最早为{skipped[0]}）")
+                hours = [hour for hour in hours if hour not in skipped]
+            for hour in hours:
+                total += await _rollup_window(session, source, hour, hour + timedelta(hours=1))
+            if hours:
+                logger.info(f"数据保留'{source.name}': 重新汇总迟到数据所在的{len(hours)}个小时")
+        if max_id is not None and max_id != last_id:
+            await session.execute(
+                update(RollupState).where(RollupState.name == source.name).values(last_id=max_id)
+            )
+        await session.commit()
+    return total
+
+
+async def _rollup_until(source: RollupSource, until: datetime, session_factory=None) -> int:
+    """按时间将汇总进度推进到until，返回写入的小时汇总行数。"""
+    total = 0
+    while True:
+        async with (session_factory or SessionLocal)() as session:
+            watermark = await get_watermark(session, source.name)
+            if watermark is not None and watermark >= until:
+                return total
+
+            # 从下一条未汇总数据所在的小时开始，跳过没有数据的时间段
+            stmt = select(func.min(source.time_column)).where(source.time_column < until)
+            if watermark is not None:
+                stmt = stmt.where(source.time_column >= watermark)
+            first = (await session.execute(stmt)).scalar()
+            if first is None:
+                await _set_watermark(session, source.name, until)
+                await session.commit()
+                return total
+
+            start = floor_time(first, GRANULARITY_HOUR)
+            if watermark is not None:
+                start = max(start, watermark)
+            end = min(start + timedelta(hours=ROLLUP_CHUNK_HOURS), until)
+            total += await _rollup_window(session, source, start, end)
+            await _set_watermark(session, source.name, end)
+            await session.commit()
+
+
+async def purge_before(model, time_column, cutoff: datetime, *criteria,
+                       session_factory=None,
+                       batch_size: int = RETENTION_BATCH_SIZE,
+                       pause: float = RETENTION_BATCH_PAUSE) -> int:
+    """
+    分批删除时间早于cutoff的行，每批单独提交，批次之间让出数据库给写入方。
+
+    Args:
+        model: 模型类
+        time_column: 时间列
+        cutoff: 截止时间（不含）
+        *criteria: 附加过滤条件
+        session_factory: 会话工厂，默认使用SessionLocal
+        batch_size: 每批删除的行数
+        pause: 批次之间的等待时间（秒）
+
+    Returns:
+        int: 删除的行数
+    """
+    total = 0
+    while True:
+        ids = (
+            select(model.id)
+            .where(time_column < cutoff, *criteria)
+            .order_by(time_column)
+            .limit(batch_size)
+        )
+        async with (session_factory or SessionLocal)() as session:
+            result = await session.execute(
+                delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+        await asyncio.sleep(pause)
+
+
+async def run_retention(session_factory=None,
+                        now: Optional[datetime] = None,
+                        retention_days: Optional[Dict[str, int]] = None,
+                        hourly_days: int = RETENTION_HOURLY_DAYS,
+                        batch_size: int = RETENTION_BATCH_SIZE,
+                        pause: float = RETENTION_BATCH_PAUSE) -> Dict[str, Dict[str, Any]]:
+    """
+    执行一次数据汇总和清理。
+
+    原始数据只有在计入汇总后才会被清理；小时汇总超过hourly_days天后清理，天汇总长期保留。
+
+    Args:
+        session_factory: 会话工厂，默认使用SessionLocal
+        now: 当前时间（UTC），默认当前时间
+        retention_days: 数据源名称到原始数据保留天数的映射，覆盖默认配置，0表示不清理
+        hourly_days: 小时汇总保留天数，0表示不清理
+        batch_size: 每批删除的行数
+        pause: 删除批次之间的等待时间（秒）
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 每个数据源的汇总进度、写入的小时汇总行数和清理行数
+    """
+    now = now or datetime.utcnow()
+    until = floor_time(now - timedelta(seconds=ROLLUP_SETTLE_SECONDS), GRANULARITY_HOUR)
+    retention_days = retention_days or {}
+    hourly_cutoff = now - timedelta(days=hourly_days) if hourly_days > 0 else None
+    report: Dict[str, Dict[str, Any]] = {}
+
+    for source in ROLLUP_SOURCES:
+        rolled_up = await rollup_source(source, until, session_factory, hourly_cutoff)
+        async with (session_factory or SessionLocal)() as session:
+            watermark = await get_watermark(session, source.name)
+            last_id = await get_last_id(session, source.name)
+
+        purged = 0
+        days = retention_days.get(source.name, source.retention_days)
+        if days > 0 and watermark is not None and last_id is not None:
+            cutoff = min(now - timedelta(days=days), watermark)
+            # 汇总之后写入的迟到数据尚未计入汇总，留到下一轮
+            purged = await purge_before(
+                source.raw_model, source.time_column, cutoff, source.raw_model.id <= last_id,
+                session_factory=session_factory, batch_size=batch_size, pause=pause,
+            )
+            if purged:
+                # 记录清理进度，之后写入的更早的迟到数据不再重新汇总
+                async with (session_factory or SessionLocal)() as session:
+                    await session.execute(
+                        update(RollupState)
+                        .where(RollupState.name == source.name,
+                               (RollupState.purged_before.is_(None)) | (RollupState.purged_before < cutoff))
+                        .values(purged_before=cutoff)
+                    )
+                    await session.commit()
+            if purged and source.raw_model is QueryHistory:
+                # 内存中的最近查询历史不能再返回已清理的记录
+                history_buffer.evict_before(cutoff)
+
+        hourly_purged = 0
+        if hourly_cutoff is not None:
+            model = source.rollup_model
+            hourly_purged = await purge_before(
+                model, model.bucket_start, hourly_cutoff,
+                model.granularity == GRANULARITY_HOUR,
+                session_factory=session_factory, batch_size=batch_size, pause=pause,
+            )
+
+        report[source.name] = {
+            "watermark": watermark,
+            "rolled_up": rolled_up,
+            "purged": purged,
+            "hourly_purged": hourly_purged,
+        }
+        logger.info(f"数据保留'{source.name}': 汇总{rolled_up}个小时桶，"
+                    f"清理{purged}条原始数据、{hourly_purged}条小时汇总")
+    return report
+
+
+class RetentionScheduler:
+    """
+    数据保留定时任务。
+    在应用事件循环中每隔interval秒执行一次run_retention。
+    """
+
+    def __init__(self, interval: float = RETENTION_INTERVAL, session_factory=None):
+        """
+        初始化定时任务。
+
+        Args:
+            interval: 执行间隔（秒），0表示不启用
+            session_factory: 会话工厂，默认使用SessionLocal
+        """
+        self.interval = interval
+        self.session_factory = session_factory
+        self.last_report: Optional[Dict[str, Dict[str, Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """定时任务是否在运行。"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """在当前事件循环中启动定时任务。"""
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="retention-scheduler")
+        logger.info(f"数据保留定时任务已启动，间隔{self.interval}秒")
+
+    async def stop(self) -> None:
+        """停止定时任务，正在执行的删除批次会回滚。"""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("数据保留定时任务已停止")
+
+    async def _run(self) -> None:
+        """后台任务：等待一个间隔后执行，失败时记录日志并等待下次执行。"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.last_report = await run_retention(self.session_factory)
+            except Exception as e:
+                logger.error(f"数据保留任务执行失败: {e}", exc_info=True)
+
+
+# 创建全局数据保留定时任务
+retention_scheduler = RetentionScheduler()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+空间索引模块。
+将经纬度转换为单位球面上的三维坐标后建立KD树：球面上两点的弦长随大圆距离单调增加，
+因此按弦长查找最近邻和半径范围内的点即等价于按大圆（haversine）距离查找，查询只访问O(log n)个节点。
+"""
+
+import heapq
+from typing import List, Tuple
+
+import numpy as np
+
+# 地球平均半径（千米）
+EARTH_RADIUS_KM = 6371.0088
+
+# 叶子节点最多包含的点数，叶子内的点用向量化计算距离
+_LEAF_SIZE = 16
+
+
+def to_unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """
+    将经纬度转换为单位球面上的三维坐标。
+
+    Args:
+        latitudes: 纬度（度）
+        longitudes: 经度（度）
+
+    Returns:
+        np.ndarray: 形状为(n, 3)的坐标数组
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord):
+    """将单位球面上的弦长转换为大圆距离（千米）。"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+def km_to_chord(distance_km: float) -> float:
+    """将大圆距离（千米）转换为单位球面上的弦长。"""
+    angle = min(distance_km / EARTH_RADIUS_KM, np.pi)
+    return float(2 * np.sin(angle / 2))
+
+
+class SpatialIndex:
+    """
+    球面点的KD树索引。
+
+    树以数组形式保存：每个节点记录切分维度、切分值和左右子节点，
+    叶子节点记录其点在重排后下标数组中的区间。
+    """
+
+    def __init__(self, latitudes, longitudes):
+        """
+        建立索引。
+
+        Args:
+            latitudes: 纬度数组（度）
+            longitudes: 经度数组（度），与纬度一一对应
+        """
+        self.points = to_unit_vectors(latitudes, longitudes).reshape(-1, 3)
+        self.order = np.arange(len(self.points))
+        # 节点属性：切分维度（叶子为-1）、切分值、左子节点、右子节点、区间起点、区间终点
+        self._dim: List[int] = []
+        self._value: List[float] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._start: List[int] = []
+        self._end: List[int] = []
+        if len(self.points):
+            self._build(0, len(self.points))
+
+    def __len__(self) -> int:
+        """索引中的点数。"""
+        return len(self.points)
+
+    def _build(self, start: int, end: int) -> int:
+        """递归建立区间[start, end)的子树，返回节点编号。"""
+        node = len(self._dim)
+        self._dim.append(-1)
+        self._value.append(0.0)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._start.append(start)
+        self._end.append(end)
+        if end - start <= _LEAF_SIZE:
+            return node
+
+        indices = self.order[start:end]
+        coords = self.points[indices]
+        # 沿跨度最大的维度按中位数切分
+        dim = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+        middle = (end - start) // 2
+        partition = np.argpartition(coords[:, dim], middle)
+        self.order[start:end] = indices[partition]
+        self._dim[node] = dim
+        self._value[node] = float(self.points[self.order[start + middle], dim])
+        self._left[node] = self._build(start, start + middle)
+        self._right[node] = self._build(start + middle, end)
+        return node
+
+    def _leaf_distances(self, node: int, target: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """计算叶子节点中每个点到目标的弦长。"""
+        indices = self.order[self._start[node]:self._end[node]]
+        return indices, np.sqrt(((self.points[indices] - target) ** 2).sum(axis=1))
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        查找离目标最近的k个点。
+
+        Args:
+            latitude: 目标纬度（度）
+            longitude: 目标经度（度）
+            k: 返回的点数
+
+        Returns:
+            List[Tuple[int, float]]: (点下标, 大圆距离千米)列表，按距离从近到远排列
+        """
+        if k <= 0 or not len(self.points):
+            return []
+        target = to_unit_vectors(latitude, longitude)
+        # 大顶堆保存当前最近的k个点（存负弦长）
+        best: List[Tuple[float, int]] = []
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            dim = self._dim[node]
+            if dim < 0:
+                indices, distances = self._leaf_distances(node, target)
+                for index, distance in zip(indices.tolist(), distances.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, index))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, index))
+                continue
+            diff = float(target[dim]) - self._value[node]
+            near, far = (self._left[node], self._right[node]) if diff < 0 else (self._right[node], self._left[node])
+            # 先压入较远的一侧，后压入的较近一侧先被访问
+            stack.append((far, max(bound, abs(diff))))
+            stack.append((near, bound))
+
+        ordered = sorted((-distance, index) for distance, index in best)
+        return [(index, float(chord_to_km(distance))) for distance, index in ordered]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[int, float]]:
+        """
+        查找目标周围半径范围内的所有点。
+
+        Args:
+            latitude: 目标纬度（度）
+            longitude: 目标经度（度）
+            radius_km: 半径（千米）
+
+        Returns:
+            List[Tuple[int, float]]: (点下标, 大圆距离千米)列表，按距离从近到远排列
+        """
+        if radius_km < 0 or not len(self.points):
+            return []
+        target = to_unit_vectors(latitude, longitude)
+        radius = km_to_chord(radius_km)
+        found_indices = []
+        found_distances = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            dim = self._dim[node]
+            if dim < 0:
+                indices, distances = self._leaf_distances(node, target)
+                mask = distances <= radius
+                found_indices.append(indices[mask])
+                found_distances.append(distances[mask])
+                continue
+            diff = float(target[dim]) - self._value[node]
+            if diff - radius < 0:
+                stack.append(self._left[node])
+            if diff + radius >= 0:
+                stack.append(self._right[node])
+
+        if not found_indices:
+            return []
+        indices = np.concatenate(found_indices)
+        distances = np.concatenate(found_distances)
+        order = np.argsort(distances, kind="stable")
+        return list(zip(indices[order].tolist(), chord_to_km(distances[order]).tolist()))
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+历史统计服务模块。
+一次查询读取城市在时间范围内的观测列，转换为NumPy数组后向量化计算最小值、最大值、平均值、分位数、
+按UTC日期的日统计和滑动平均，以及采暖/制冷度日数，结果按城市、时间范围和指标缓存。
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+import numpy as np
+from sqlalchemy import select
+
+from ..models import WeatherRecord
+from .cache_service import cache
+
+# 加载环境变量
+load_dotenv()
+
+# 计算度日数的默认基础温度（摄氏度）
+STATS_BASE_TEMPERATURE = float(os.getenv("STATS_BASE_TEMPERATURE", 18.0))
+# 统计结果缓存时间（秒）
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", 300))
+
+# 可统计的观测指标
+STATS_METRICS: Dict[str, Any] = {
+    "temperature": WeatherRecord.temperature,
+    "humidity": WeatherRecord.humidity,
+    "pressure": WeatherRecord.pressure,
+    "wind_speed": WeatherRecord.wind_speed,
+}
+
+# 默认输出的分位数
+DEFAULT_PERCENTILES = (10.0, 50.0, 90.0)
+
+
+def _round(values: np.ndarray) -> List[Optional[float]]:
+    """保留两位小数并把NaN转换为None。"""
+    return [None if value != value else value for value in np.round(values, 2).tolist()]
+
+
+def daily_groups(observed_at: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    按UTC日期对已按时间升序排列的观测分组。
+
+    Args:
+        observed_at: 观测时间数组（datetime64）
+
+    Returns:
+        Dict[str, np.ndarray]: days为每组的日期（datetime64[D]），starts为每组第一个元素的下标
+    """
+    days = observed_at.astype("datetime64[D]")
+    starts = np.flatnonzero(np.concatenate((days[:1] == days[:1], days[1:] != days[:-1])))
+    return {"days": days[starts], "starts": starts}
+
+
+def daily_sums(values: np.ndarray, starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    计算每日分组中有效值（非NaN）的和与个数。
+
+    Args:
+        values: 数值数组
+        starts: 每日分组第一个元素的下标
+
+    Returns:
+        Dict[str, np.ndarray]: sum和count
+    """
+    if starts.size == 0:
+        return {"sum": np.empty(0), "count": np.empty(0, dtype=np.int64)}
+    valid = ~np.isnan(values)
+    return {
+        "sum": np.add.reduceat(np.where(valid, values, 0.0), starts),
+        "count": np.add.reduceat(valid.astype(np.int64), starts),
+    }
+
+
+def metric_statistics(values: np.ndarray, days: np.ndarray, starts: np.ndarray,
+                      percentiles: Sequence[float], rolling_days: int) -> Dict[str, Any]:
+    """
+    计算一个指标的整体统计、日统计和滑动平均，缺失值（NaN）不参与计算。
+
+    Args:
+        values: 指标数组（float64，与观测时间对应）
+        days: 每日分组的日期
+        starts: 每日分组第一个元素的下标
+        percentiles: 需要的分位数（0-100）
+        rolling_days: 滑动平均的窗口天数（含当天）
+
+    Returns:
+        Dict[str, Any]: count、min、max、mean、std、percentiles和daily
+    """
+    present = values[~np.isnan(values)]
+    count = int(present.size)
+
+    sums = daily_sums(values, starts)
+    daily_sum, daily_count = sums["sum"], sums["count"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily_mean = daily_sum / daily_count
+        # 滑动窗口按日历天计算，缺少数据的日期不占用窗口；平均值按窗口内的观测次数加权
+        day_numbers = days.astype(np.int64)
+        window_start = np.searchsorted(day_numbers, day_numbers - rolling_days + 1)
+        sum_cumulative = np.concatenate(([0.0], np.cumsum(daily_sum)))
+        count_cumulative = np.concatenate(([0], np.cumsum(daily_count)))
+        index = np.arange(1, len(days) + 1)
+        rolling_mean = ((sum_cumulative[index] - sum_cumulative[window_start])
+                        / (count_cumulative[index] - count_cumulative[window_start]))
+        daily_min = np.fmin.reduceat(values, starts) if starts.size else np.empty(0)
+        daily_max = np.fmax.reduceat(values, starts) if starts.size else np.empty(0)
+
+    columns = {
+        "mean": _round(daily_mean),
+        "min": _round(daily_min),
+        "max": _round(daily_max),
+        "rolling_mean": _round(rolling_mean),
+    }
+    daily = [
+        {"date": str(day), "count": int(n), **{name: column[i] for name, column in columns.items()}}
+        for i, (day, n) in enumerate(zip(days, daily_count.tolist()))
+        if n
+    ]
+
+    if count == 0:
+        return {"count": 0, "min": None, "max": None, "mean": None, "std": None,
+                "percentiles": {}, "daily": daily}
+    summary = _round(np.array([present.min(), present.max(), present.mean(),
+                               present.std(ddof=1) if count > 1 else np.nan]))
+    percentile_values = _round(np.percentile(present, percentiles)) if percentiles else []
+    return {
+        "count": count,
+        "min": summary[0],
+        "max": summary[1],
+        "mean": summary[2],
+        "std": summary[3],
+        "percentiles": {f"p{p:g}": value for p, value in zip(percentiles, percentile_values)},
+        "daily": daily,
+    }
+
+
+def degree_days(daily_mean: np.ndarray, base: float) -> Dict[str, Any]:
+    """
+    由日平均气温计算采暖度日数和制冷度日数。
+
+    Args:
+        daily_mean: 日平均气温数组（缺少数据的日期为NaN，不计入）
+        base: 基础温度（摄氏度）
+
+    Returns:
+        Dict[str, Any]: base、heating、cooling和参与计算的天数days
+    """
+    present = daily_mean[~np.isnan(daily_mean)]
+    return {
+        "base": base,
+        "heating": round(float(np.maximum(base - present, 0).sum()), 2),
+        "cooling": round(float(np.maximum(present - base, 0).sum()), 2),
+        "days": int(present.size),
+    }
+
+
+def compute_statistics(observed_at: np.ndarray, columns: Dict[str, np.ndarray],
+                       percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                       rolling_days: int = 7,
+                       base_temperature: float = STATS_BASE_TEMPERATURE) -> Dict[str, Any]:
+    """
+    对已加载为数组的观测数据计算统计结果。
+
+    Args:
+        observed_at: 按升序排列的观测时间数组（datetime64）
+        columns: 指标名称到数值数组（float64，缺失值为NaN）的映射
+        percentiles: 需要的分位数（0-100）
+        rolling_days: 滑动平均的窗口天数
+        base_temperature: 度日数的基础温度
+
+    Returns:
+        Dict[str, Any]: count、metrics（每个指标的统计）和degree_days（包含温度指标时）
+    """
+    groups = daily_groups(observed_at)
+    metrics = {
+        name: metric_statistics(values, groups["days"], groups["starts"], percentiles, rolling_days)
+        for name, values in columns.items()
+    }
+    result: Dict[str, Any] = {"count": int(observed_at.size), "metrics": metrics}
+    if "temperature" in columns:
+        sums = daily_sums(columns["temperature"], groups["starts"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            daily_mean = sums["sum"] / sums["count"]
+        result["degree_days"] = degree_days(daily_mean, base_temperature)
+    return result
+
+
+async def load_observation_arrays(session, city_id: int, metrics: Sequence[str],
+                                  start: Optional[datetime] = None,
+                                  end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+    """
+    一次查询读取城市在时间范围内的观测列并转换为NumPy数组。
+
+    Args:
+        session: 数据库会话
+        city_id: 本地城市ID
+        metrics: 需要读取的指标名称
+        start: 起始观测时间（含），UTC
+        end: 结束观测时间（不含），UTC
+
+    Returns:
+        Dict[str, np.ndarray]: observed_at（datetime64[s]）和每个指标的float64数组（缺失值为NaN）
+    """
+    stmt = select(WeatherRecord.observed_at, *[STATS_METRICS[name] for name in metrics]).where(
+        WeatherRecord.city_id == city_id, WeatherRecord.observed_at.isnot(None)
+    )
+    if start is not None:
+        stmt = stmt.where(WeatherRecord.observed_at >= start)
+    if end is not None:
+        stmt = stmt.where(WeatherRecord.observed_at < end)
+    result = await session.execute(stmt.order_by(WeatherRecord.observed_at))
+    rows = result.all()
+
+    columns = list(zip(*rows)) if rows else [()] * (len(metrics) + 1)
+    arrays = {"observed_at": np.array(columns[0], dtype="datetime64[s]")}
+    for name, column in zip(metrics, columns[1:]):
+        # None转换为NaN
+        arrays[name] = np.array(column, dtype=np.float64)
+    return arrays
+
+
+def parse_metrics(metrics: Optional[str]) -> List[str]:
+    """
+    解析逗号分隔的指标列表。
+
+    Args:
+        metrics: 指标名称，逗号分隔，为空时返回全部指标
+
+    Returns:
+        List[str]: 去重后的指标名称
+
+    Raises:
+        ValueError: 指标名称不支持时抛出
+    """
+    if not metrics:
+        return list(STATS_METRICS)
+    names = list(dict.fromkeys(name.strip() for name in metrics.split(",") if name.strip()))
+    unknown = [name for name in names if name not in STATS_METRICS]
+    if unknown or not names:
+        raise ValueError(f"不支持的统计指标: {', '.join(unknown)}，可选: {', '.join(STATS_METRICS)}")
+    return names
+
+
+def parse_percentiles(percentiles: Optional[str]) -> List[float]:
+    """
+    解析逗号分隔的分位数列表。
+
+    Args:
+        percentiles: 分位数（0-100），逗号分隔，为空时使用默认分位数
+
+    Returns:
+        List[float]: 升序排列的分位数
+
+    Raises:
+        ValueError: 不是0到100之间的数字时抛出
+    """
+    if percentiles is None:
+        return list(DEFAULT_PERCENTILES)
+    try:
+        values = sorted({float(value) for value in percentiles.split(",") if value.strip()})
+    except ValueError:
+        raise ValueError(f"分位数格式错误: {percentiles}")
+    if any(not 0 <= value <= 100 for value in values):
+        raise ValueError("分位数必须在0到100之间")
+    return values
+
+
+async def observation_statistics(session, city_id: int, metrics: Sequence[str],
+                                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                 percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                                 rolling_days: int = 7,
+                                 base_temperature: float = STATS_BASE_TEMPERATURE,
+                                 city: Optional[str] = None) -> Dict[str, Any]:
+    """
+    获取城市在时间范围内的观测统计，结果按（城市、时间范围、指标及参数）缓存。
+
+    Args:
+        session: 数据库会话
+        city_id: 本地城市ID
+        metrics: 指标名称
+        start: 起始观测时间（含），UTC
+        end: 结束观测时间（不含），UTC
+        percentiles: 需要的分位数
+        rolling_days: 滑动平均的窗口天数
+        base_temperature: 度日数的基础温度
+        city: 城市名称，用于按城市定向失效缓存
+
+    Returns:
+        Dict[str, Any]: compute_statistics的结果
+    """
+    key = "stats_" + "_".join(str(part) for part in (
+        city_id, start, end, ",".join(metrics), ",".join(f"{p:g}" for p in percentiles),
+        rolling_days, base_temperature,
+    ))
+    result = cache.get(key, namespace="stats")
+    if result is not None:
+        return result
+
+    arrays = await load_observation_arrays(session, city_id, metrics, start, end)
+    observed_at = arrays.pop("observed_at")
+    result = compute_statistics(observed_at, arrays, percentiles, rolling_days, base_temperature)
+    cache.set(key, result, STATS_CACHE_TTL, namespace="stats", city=city)
+    return result
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+热门城市统计服务模块。
+在记录查询时更新滑动时间窗口内的Space-Saving候选集和Count-Min计数草图，
+无需对查询历史表执行GROUP BY即可获得最近一小时、一天内查询最多的城市。
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import QueryHistory
+from ..utils.time_buckets import (
+    GRANULARITY_MINUTE, GRANULARITY_HOUR, truncate_time, as_datetime
+)
+
+# 加载环境变量
+load_dotenv()
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 每个时间桶中Space-Saving跟踪的候选城市数
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", 100))
+# Count-Min草图的宽度和深度
+TRENDING_CM_WIDTH = int(os.getenv("TRENDING_CM_WIDTH", 1024))
+TRENDING_CM_DEPTH = int(os.getenv("TRENDING_CM_DEPTH", 4))
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class SpaceSaving:
+    """
+    Space-Saving频繁项统计。
+    最多保留capacity个计数器，新项在计数器已满时替换计数最小的项并继承其计数，
+    出现次数超过总数/capacity的项一定会被保留。
+    """
+
+    __slots__ = ("capacity", "counts")
+
+    def __init__(self, capacity: int):
+        """
+        初始化统计。
+
+        Args:
+            capacity: 计数器个数
+        """
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        """
+        记录一个项出现count次。
+
+        Args:
+            key: 项
+            count: 次数
+        """
+        if key in self.counts or len(self.counts) < self.capacity:
+            self.counts[key] = self.counts.get(key, 0) + count
+            return
+        victim = min(self.counts, key=self.counts.__getitem__)
+        self.counts[key] = self.counts.pop(victim) + count
+
+
+class CountMinSketch:
+    """
+    Count-Min计数草图。
+    每个项在depth行中各映射到一个计数器，估计值取各行计数的最小值，只会高估不会低估。
+    """
+
+    __slots__ = ("table",)
+
+    def __init__(self, width: int, depth: int):
+        """
+        初始化草图。
+
+        Args:
+            width: 每行计数器个数
+            depth: 行数（哈希函数个数）
+        """
+        self.table = np.zeros((depth, width), dtype=np.int32)
+
+    @staticmethod
+    def indexes(key: str, width: int, depth: int) -> List[int]:
+        """
+        计算项在每一行中的计数器位置。
+
+        Args:
+            key: 项
+            width: 每行计数器个数
+            depth: 行数
+
+        Returns:
+            List[int]: 每行的计数器位置
+        """
+        return [hash((row, key)) % width for row in range(depth)]
+
+    def add(self, key: str, count: int = 1) -> None:
+        """
+        记录一个项出现count次。
+
+        Args:
+            key: 项
+            count: 次数
+        """
+        depth, width = self.table.shape
+        self.table[np.arange(depth), self.indexes(key, width, depth)] += count
+
+    @staticmethod
+    def estimate(table: np.ndarray, key: str) -> int:
+        """
+        从计数表估计项的出现次数。
+
+        Args:
+            table: 计数表（可以是多个草图之和）
+            key: 项
+
+        Returns:
+            int: 估计次数
+        """
+        depth, width = table.shape
+        return int(table[np.arange(depth), CountMinSketch.indexes(key, width, depth)].min())
+
+
+class SlidingTopK:
+    """
+    滑动时间窗口内的高频项统计。
+
+    窗口被划分为固定长度的时间桶，每个桶有独立的Space-Saving候选集和Count-Min草图，
+    桶按环形复用。查询时合并窗口内各桶：候选项取各桶候选集的并集，次数由草图之和估计。
+    """
+
+    def __init__(self, window: timedelta, bucket: timedelta,
+                 capacity: int = TRENDING_CAPACITY,
+                 width: int = TRENDING_CM_WIDTH,
+                 depth: int = TRENDING_CM_DEPTH):
+        """
+        初始化窗口统计。
+
+        Args:
+            window: 窗口长度
+            bucket: 时间桶长度，需整除窗口长度
+            capacity: 每个桶的候选项数
+            width: Count-Min草图宽度
+            depth: Count-Min草图深度
+        """
+        self.window = window
+        self.bucket = bucket
+        self.size = window // bucket
+        self.capacity = capacity
+        self.width = width
+        self.depth = depth
+        self._bucket_ids: List[Optional[int]] = [None] * self.size
+        self._candidates: List[Optional[SpaceSaving]] = [None] * self.size
+        self._sketches: List[Optional[CountMinSketch]] = [None] * self.size
+        self._totals: List[int] = [0] * self.size
+
+    def _bucket_id(self, when: datetime) -> int:
+        """时间所在的桶编号。"""
+        return (when - _EPOCH) // self.bucket
+
+    def add(self, key: str, when: datetime, count: int = 1) -> None:
+        """
+        记录一个项在指定时间出现count次。
+
+        Args:
+            key: 项
+            when: 时间（UTC）
+            count: 次数
+        """
+        bucket_id = self._bucket_id(when)
+        slot = bucket_id % self.size
+        current = self._bucket_ids[slot]
+        if current is not None and current > bucket_id:
+            # 早于该位置当前桶的事件已滑出窗口
+            return
+        if current != bucket_id:
+            self._bucket_ids[slot] = bucket_id
+            self._candidates[slot] = SpaceSaving(self.capacity)
+            self._sketches[slot] = CountMinSketch(self.width, self.depth)
+            self._totals[slot] = 0
+        self._candidates[slot].add(key, count)
+        self._sketches[slot].add(key, count)
+        self._totals[slot] += count
+
+    def top(self, k: int, now: datetime) -> Dict[str, Any]:
+        """
+        获取窗口内出现次数最多的k个项。
+
+        Args:
+            k: 项数
+            now: 当前时间（UTC），窗口为当前桶及之前的size-1个桶
+
+        Returns:
+            Dict[str, Any]: 窗口起止时间、总次数和按次数降序排列的项
+        """
+        newest = self._bucket_id(now)
+        active = [
+            slot for slot, bucket_id in enumerate(self._bucket_ids)
+            if bucket_id is not None and newest - self.size < bucket_id <= newest
+        ]
+        total = sum(self._totals[slot] for slot in active)
+        items: List[Dict[str, Any]] = []
+        if active:
+            table = np.sum([self._sketches[slot].table for slot in active], axis=0)
+            candidates = set()
+            for slot in active:
+                candidates.update(self._candidates[slot].counts)
+            estimates = sorted(
+                ((CountMinSketch.estimate(table, key), key) for key in candidates),
+                key=lambda item: (-item[0], item[1]),
+            )
+            items = [{"city": key, "count": count} for count, key in estimates[:k]]
+
+        return {
+            "start": _EPOCH + self.bucket * (newest - self.size + 1),
+            "end": _EPOCH + self.bucket * (newest + 1),
+            "total": total,
+            "cities": items,
+        }
+
+    def clear(self) -> None:
+        """清空全部时间桶。"""
+        self._bucket_ids = [None] * self.size
+        self._candidates = [None] * self.size
+        self._sketches = [None] * self.size
+        self._totals = [0] * self.size
+
+
+class TrendingTracker:
+    """
+    热门城市统计，维护最近一小时（按分钟分桶）和最近一天（按小时分桶）两个窗口。
+    """
+
+    # 窗口名称到(窗口长度, 时间桶长度, 重建时的SQL分桶粒度)的映射
+    WINDOWS = {
+        "hour": (timedelta(hours=1), timedelta(minutes=1), GRANULARITY_MINUTE),
+        "day": (timedelta(days=1), timedelta(hours=1), GRANULARITY_HOUR),
+    }
+
+    def __init__(self):
+        """初始化各窗口。"""
+        self.windows: Dict[str, SlidingTopK] = {
+            name: SlidingTopK(window, bucket)
+            for name, (window, bucket, _) in self.WINDOWS.items()
+        }
+
+    def record(self, city_name: str, when: Optional[datetime] = None, count: int = 1) -> None:
+        """
+        记录一次城市查询。
+
+        Args:
+            city_name: 城市名称
+            when: 查询时间（UTC），默认当前时间
+            count: 次数
+        """
+        when = when or datetime.utcnow()
+        for window in self.windows.values():
+            window.add(city_name, when, count)
+
+    def top(self, window: str = "hour", k: int = 10,
+            now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        获取窗口内查询最多的城市。
+
+        Args:
+            window: 窗口名称（hour或day）
+            k: 城市数
+            now: 当前时间（UTC），默认当前时间
+
+        Returns:
+            Dict[str, Any]: 窗口名称、起止时间、总查询次数和热门城市列表
+
+        Raises:
+            ValueError: 窗口名称不支持时抛出
+        """
+        if window not in self.windows:
+            raise ValueError(f"不支持的时间窗口: {window}")
+        result = self.windows[window].top(k, now or datetime.utcnow())
+        return {"window": window, **result}
+
+    async def rebuild(self, session: AsyncSession, now: Optional[datetime] = None) -> int:
+        """
+        从查询历史表重建各窗口，按时间桶和城市聚合后写入，不逐行读取。
+
+        Args:
+            session: 数据库会话
+            now: 当前时间（UTC），默认当前时间
+
+        Returns:
+            int: 计入的查询次数（最长窗口）
+        """
+        now = now or datetime.utcnow()
+        total = 0
+        for name, (window_length, _, granularity) in self.WINDOWS.items():
+            window = self.windows[name]
+            window.clear()
+            bucket = truncate_time(session, QueryHistory.query_time, granularity).label("bucket")
+            result = await session.execute(
+                select(bucket, QueryHistory.city_name, func.count().label("count"))
+                .where(QueryHistory.query_time >= now - window_length)
+                .group_by(bucket, QueryHistory.city_name)
+            )
+            counted = 0
+            for row in result.all():
+                window.add(row.city_name, as_datetime(row.bucket), row.count)
+                counted += row.count
+            total = max(total, counted)
+        logger.info(f"热门城市统计已重建，计入{total}次查询")
+        return total
+
+
+# 创建全局热门城市统计
+trending_tracker = TrendingTracker()
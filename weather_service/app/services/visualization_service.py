@@ -3,25 +3,339 @@
 
 """
 数据可视化服务模块。
-提供天气数据的可视化功能，生成图表。
+提供天气数据的可视化功能，生成PNG、SVG或WebP格式的图表。
+每个工作进程（线程）为每种图表保留一个预先建好的图形模板，渲染时只更新曲线、柱状图数据和标题，
+使用固定布局，不再每次创建坐标轴、格式化器和执行tight_layout。
 """
 
-import os
 import io
+import re
 import base64
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+import threading
+from typing import List, Dict, Any, Optional, Callable
+from datetime import datetime
 
 import matplotlib
 matplotlib.use('Agg')  # 使用非交互式后端
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib import font_manager
+from matplotlib.axes import Axes
+from matplotlib.artist import Artist
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure
 import numpy as np
 
+# 中文字体候选，只保留已安装的字体，避免每次绘制时查找不存在的字体
+CHINESE_FONTS = ['SimHei', 'Microsoft YaHei', 'PingFang SC', 'Noto Sans CJK SC', 'WenQuanYi Micro Hei']
+_installed_fonts = {font.name for font in font_manager.fontManager.ttflist}
+
 # 设置中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 指定默认字体
-plt.rcParams['axes.unicode_minus'] = False  # 解决保存图像时负号'-'显示为方块的问题
+matplotlib.rcParams['font.sans-serif'] = (
+    [font for font in CHINESE_FONTS if font in _installed_fonts] + ['DejaVu Sans']
+)
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决保存图像时负号'-'显示为方块的问题
+matplotlib.rcParams['svg.hashsalt'] = 'weather-service'  # SVG元素ID固定，相同图表生成相同数据
+
+# 固定布局（与tight_layout对典型数据的结果一致并留出余量）
+TEMPERATURE_LAYOUT = dict(left=0.09, right=0.98, bottom=0.10, top=0.93)
+DASHBOARD_LAYOUT = dict(left=0.06, right=0.98, bottom=0.04, top=0.96, wspace=0.16, hspace=0.16)
+
+# 平均温度分布的分级：分级上界、标签和颜色
+TEMP_LEVEL_BOUNDS = [10, 20, 30]
+TEMP_LEVELS = ['寒冷 (<10°C)', '凉爽 (10-20°C)', '温暖 (20-30°C)', '炎热 (>30°C)']
+TEMP_LEVEL_COLORS = ['#2196F3', '#BBDEFB', '#FFA726', '#FF5722']
+
+# 温度范围柱状图的柱宽
+BAR_WIDTH = 0.35
+
+# 支持的图像格式及其媒体类型（WebP由Pillow编码）
+IMAGE_FORMATS: Dict[str, str] = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
+# If-None-Match中的实体标签，捕获引号内（含引号）的部分
+_ENTITY_TAG = re.compile(r'(?:W/)?("[^"]*")')
+
+
+def negotiate_image_format(image_format: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    确定图像格式：优先使用format参数，否则按Accept请求头的q值选择，q值相同时优先更具体的媒体类型和靠前的项。
+
+    Args:
+        image_format: format参数（png、webp、svg）
+        accept: Accept请求头
+
+    Returns:
+        Optional[str]: 图像格式，Accept中没有可接受的图像类型时为None
+
+    Raises:
+        ValueError: format参数不支持时抛出
+    """
+    if image_format:
+        image_format = image_format.lower()
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的图像格式: {image_format}，可选: {', '.join(IMAGE_FORMATS)}")
+        return image_format
+    if not accept or not accept.strip():
+        return "png"
+
+    ranges = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((parts[0].lower(), quality, position))
+
+    candidates = []
+    for order, (name, media_type) in enumerate(IMAGE_FORMATS.items()):
+        # 使用最具体的匹配项的q值
+        best = None
+        for media_range, quality, position in ranges:
+            specificity = {media_type: 2, "image/*": 1, "*/*": 0}.get(media_range)
+            if specificity is not None and (best is None or specificity > best[1]):
+                best = (quality, specificity, -position, -order)
+        if best is not None and best[0] > 0:
+            candidates.append((best, name))
+    return max(candidates)[1] if candidates else None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    按RFC 9110判断If-None-Match请求头是否匹配当前ETag：请求头可以是逗号分隔的多个实体标签或“*”，
+    使用弱比较（忽略W/前缀，只比较引号内的标签）。
+
+    Args:
+        if_none_match: If-None-Match请求头
+        etag: 当前响应的ETag（带引号）
+
+    Returns:
+        bool: 是否匹配（匹配时应返回304）
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return opaque in _ENTITY_TAG.findall(if_none_match)
+
+
+def figure_bytes(fig: Figure, image_format: str = "png") -> bytes:
+    """
+    将图形编码为图像数据。
+
+    Args:
+        fig: 图形
+        image_format: 图像格式（IMAGE_FORMATS中的键）
+
+    Returns:
+        bytes: 图像数据
+    """
+    buffer = io.BytesIO()
+    try:
+        # SVG不写入生成时间，相同图表的数据（和ETag）保持不变
+        metadata = {"Date": None} if image_format == "svg" else None
+        fig.savefig(buffer, format=image_format, dpi=100, metadata=metadata)
+        return buffer.getvalue()
+    finally:
+        buffer.close()
+
+
+def _dates(forecast_data: List[Dict[str, Any]]) -> List[datetime]:
+    """解析预报日期。"""
+    return [datetime.fromisoformat(item['date'].replace('Z', '+00:00')) for item in forecast_data]
+
+
+def _date_numbers(dates: List[datetime]) -> np.ndarray:
+    """将日期转换为matplotlib的日期数值。"""
+    return np.asarray(mdates.date2num(dates), dtype=float) if dates else np.empty(0)
+
+
+def _values(forecast_data: List[Dict[str, Any]], name: str) -> np.ndarray:
+    """提取预报数值列，缺失值为NaN。"""
+    return np.array([item[name] for item in forecast_data], dtype=float)
+
+
+def _date_axis(ax: Axes) -> None:
+    """设置日期横轴：月-日格式。"""
+    ax.xaxis_date()
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+
+
+def _rescale(ax: Axes) -> None:
+    """按可见数据重新计算坐标范围。"""
+    ax.relim(visible_only=True)
+    ax.autoscale_view()
+
+
+class TemperatureChartTemplate:
+    """温度趋势图模板：一条最高温度曲线。"""
+
+    def __init__(self):
+        """创建图形、坐标轴和空曲线。"""
+        self.fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.line, = self.ax.plot([], [], 'o-', color='#FF5722', linewidth=2, markersize=8)
+        self.ax.set_title(' ', fontsize=16)
+        self.ax.set_xlabel('日期', fontsize=12)
+        self.ax.set_ylabel('温度 (°C)', fontsize=12)
+        _date_axis(self.ax)
+        self.ax.grid(True, linestyle='--', alpha=0.7)
+        self.fig.subplots_adjust(**TEMPERATURE_LAYOUT)
+
+    def update(self, forecast_data: List[Dict[str, Any]], city: str) -> Figure:
+        """
+        更新曲线数据和标题。
+
+        Args:
+            forecast_data: 天气预报数据列表
+            city: 城市名称
+
+        Returns:
+            Figure: 模板图形
+        """
+        self.line.set_data(_date_numbers(_dates(forecast_data)), _values(forecast_data, 'max_temp'))
+        _rescale(self.ax)
+        self.ax.title.set_text(f'{city}未来天气温度趋势')
+        return self.fig
+
+
+class DashboardTemplate:
+    """
+    天气仪表板模板：温度趋势、湿度趋势、温度范围柱状图和平均温度分布饼图。
+
+    柱子按需增加，多余的隐藏；饼图只有四种状态，预先各画一个，渲染时只显示对应分级的一个。
+    """
+
+    def __init__(self):
+        """创建图形、2x2坐标轴和空的曲线、柱子、饼图。"""
+        self.fig = Figure(figsize=(12, 10))
+        FigureCanvasAgg(self.fig)
+        self.temp_ax, self.humidity_ax, self.range_ax, self.pie_ax = self.fig.subplots(2, 2).flat
+
+        # 1. 温度趋势图（左上）
+        self.max_line, = self.temp_ax.plot([], [], 'o-', color='#FF5722', label='最高温度')
+        self.min_line, = self.temp_ax.plot([], [], 'o-', color='#2196F3', label='最低温度')
+        self.temp_ax.set_ylabel('温度 (°C)')
+        _date_axis(self.temp_ax)
+        self.temp_ax.legend()
+        self.temp_ax.grid(True, linestyle='--', alpha=0.7)
+
+        # 2. 湿度趋势图（右上）
+        self.humidity_line, = self.humidity_ax.plot([], [], 'o-', color='#4CAF50')
+        self.humidity_ax.set_ylabel('湿度 (%)')
+        _date_axis(self.humidity_ax)
+        self.humidity_ax.grid(True, linestyle='--', alpha=0.7)
+
+        # 3. 温度范围柱状图（左下）
+        self.bars: List[Artist] = []
+        self.range_ax.set_ylabel('温度 (°C)')
+        self.range_ax.grid(True, linestyle='--', alpha=0.7)
+
+        # 4. 平均温度饼图（右下）
+        self.pies = [self._add_pie(level) for level in range(len(TEMP_LEVELS))]
+
+        for ax in (self.temp_ax, self.humidity_ax, self.range_ax, self.pie_ax):
+            ax.set_title(' ')
+        self.fig.subplots_adjust(**DASHBOARD_LAYOUT)
+
+    def _add_pie(self, level: int) -> List[Artist]:
+        """画出平均温度属于某个分级时的饼图并隐藏，返回其全部图元。"""
+        patches, texts = len(self.pie_ax.patches), len(self.pie_ax.texts)
+        sizes = [100 if index == level else 0 for index in range(len(TEMP_LEVELS))]
+        self.pie_ax.pie(sizes, labels=TEMP_LEVELS, colors=TEMP_LEVEL_COLORS, autopct='%1.1f%%',
+                        shadow=True, startangle=90)
+        artists = list(self.pie_ax.patches[patches:]) + list(self.pie_ax.texts[texts:])
+        for artist in artists:
+            artist.set_visible(False)
+        return artists
+
+    def _bars(self, count: int) -> List[Artist]:
+        """获取前count根柱子，不够时增加，其余隐藏。"""
+        while len(self.bars) < count:
+            self.bars.extend(self.range_ax.bar([len(self.bars)], [0], BAR_WIDTH, color='#FF9800').patches)
+        for index, bar in enumerate(self.bars):
+            bar.set_visible(index < count)
+        return self.bars[:count]
+
+    def update(self, forecast_data: List[Dict[str, Any]], city: str) -> Figure:
+        """
+        更新曲线、柱子、饼图分级和标题。
+
+        Args:
+            forecast_data: 天气预报数据列表
+            city: 城市名称
+
+        Returns:
+            Figure: 模板图形
+        """
+        dates = _dates(forecast_data)
+        numbers = _date_numbers(dates)
+        temps_max = _values(forecast_data, 'max_temp')
+        temps_min = _values(forecast_data, 'min_temp')
+
+        self.max_line.set_data(numbers, temps_max)
+        self.min_line.set_data(numbers, temps_min)
+        _rescale(self.temp_ax)
+        self.temp_ax.title.set_text(f'{city}温度趋势')
+
+        self.humidity_line.set_data(numbers, _values(forecast_data, 'humidity'))
+        _rescale(self.humidity_ax)
+        self.humidity_ax.title.set_text(f'{city}湿度趋势')
+
+        for bar, low, high in zip(self._bars(len(dates)), temps_min, temps_max):
+            bar.set_y(low)
+            bar.set_height(high - low)
+            bar.sticky_edges.y[:] = [low]
+        self.range_ax.set_xticks(np.arange(len(dates)))
+        self.range_ax.set_xticklabels([date.strftime('%m-%d') for date in dates])
+        _rescale(self.range_ax)
+        self.range_ax.title.set_text(f'{city}温度范围')
+
+        avg_temp = float(np.mean((temps_max + temps_min) / 2))
+        level = int(np.searchsorted(TEMP_LEVEL_BOUNDS, avg_temp, side='right'))
+        for index, artists in enumerate(self.pies):
+            for artist in artists:
+                artist.set_visible(index == level)
+        self.pie_ax.title.set_text(f'{city}平均温度分布 ({avg_temp:.1f}°C)')
+        return self.fig
+
+
+# 图表类型与模板类
+CHART_TEMPLATES: Dict[str, Callable[[], Any]] = {
+    "temperature": TemperatureChartTemplate,
+    "dashboard": DashboardTemplate,
+}
+
+# 每个线程各自的模板（渲染进程池中每个进程一份）
+_local = threading.local()
+
+
+def chart_template(kind: str) -> Any:
+    """
+    获取当前线程的图表模板，第一次使用时创建。
+
+    Args:
+        kind: 图表类型（CHART_TEMPLATES中的键）
+
+    Returns:
+        Any: 图表模板
+    """
+    templates = getattr(_local, "templates", None)
+    if templates is None:
+        templates = _local.templates = {}
+    if kind not in templates:
+        templates[kind] = CHART_TEMPLATES[kind]()
+    return templates[kind]
 
 
 class VisualizationService:
@@ -30,6 +344,36 @@ class VisualizationService:
     提供各种天气数据可视化功能。
     """
     
+    @staticmethod
+    def temperature_figure(forecast_data: List[Dict[str, Any]], city: str) -> Figure:
+        """
+        绘制温度趋势图。
+        
+        Args:
+            forecast_data: 天气预报数据列表
+            city: 城市名称
+            
+        Returns:
+            Figure: 当前线程的模板图形，下次绘制时被覆盖，调用方不应关闭
+        """
+        return chart_template("temperature").update(forecast_data, city)
+    
+    @staticmethod
+    def render_temperature_chart(forecast_data: List[Dict[str, Any]], city: str,
+                                 image_format: str = "png") -> bytes:
+        """
+        生成温度趋势图的图像数据。
+        
+        Args:
+            forecast_data: 天气预报数据列表
+            city: 城市名称
+            image_format: 图像格式（IMAGE_FORMATS中的键）
+            
+        Returns:
+            bytes: 图像数据
+        """
+        return figure_bytes(VisualizationService.temperature_figure(forecast_data, city), image_format)
+    
     @staticmethod
     def generate_temperature_chart(forecast_data: List[Dict[str, Any]], 
                                   city: str) -> str:
@@ -41,47 +385,40 @@ class VisualizationService:
             city: 城市名称
             
         Returns:
-            str: Base64编码的图像数据
+            str: Base64编码的PNG图像数据
         """
-        # 创建图形和坐标轴
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # 提取日期和温度数据
-        dates = []
-        temps = []
-        
-        for item in forecast_data:
-            date = datetime.fromisoformat(item['date'].replace('Z', '+00:00'))
-            dates.append(date)
-            temps.append(item['max_temp'])
-        
-        # 绘制温度曲线
-        ax.plot(dates, temps, 'o-', color='#FF5722', linewidth=2, markersize=8)
-        
-        # 设置图表标题和标签
-        ax.set_title(f'{city}未来天气温度趋势', fontsize=16)
-        ax.set_xlabel('日期', fontsize=12)
-        ax.set_ylabel('温度 (°C)', fontsize=12)
-        
-        # 设置日期格式
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-        
-        # 添加网格线
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # 美化图表
-        plt.tight_layout()
+        image_png = VisualizationService.render_temperature_chart(forecast_data, city)
+        return base64.b64encode(image_png).decode('utf-8')
+    
+    @staticmethod
+    def dashboard_figure(forecast_data: List[Dict[str, Any]], city: str) -> Figure:
+        """
+        绘制天气数据仪表板，包含温度、湿度等多个指标。
         
-        # 将图形转换为Base64编码的数据
-        buffer = io.BytesIO()
-        fig.savefig(buffer, format='png', dpi=100)
-        buffer.seek(0)
-        image_png = buffer.getvalue()
-        buffer.close()
-        plt.close(fig)
+        Args:
+            forecast_data: 天气预报数据列表
+            city: 城市名称
+            
+        Returns:
+            Figure: 当前线程的模板图形，下次绘制时被覆盖，调用方不应关闭
+        """
+        return chart_template("dashboard").update(forecast_data, city)
+    
+    @staticmethod
+    def render_weather_dashboard(forecast_data: List[Dict[str, Any]], city: str,
+                                 image_format: str = "png") -> bytes:
+        """
+        生成天气数据仪表板的图像数据。
         
-        # 返回Base64编码的图像数据
-        return base64.b64encode(image_png).decode('utf-8')
+        Args:
+            forecast_data: 天气预报数据列表
+            city: 城市名称
+            image_format: 图像格式（IMAGE_FORMATS中的键）
+            
+        Returns:
+            bytes: 图像数据
+        """
+        return figure_bytes(VisualizationService.dashboard_figure(forecast_data, city), image_format)
     
     @staticmethod
     def generate_weather_dashboard(forecast_data: List[Dict[str, Any]], 
@@ -94,88 +431,11 @@ class VisualizationService:
             city: 城市名称
             
         Returns:
-            str: Base64编码的图像数据
+            str: Base64编码的PNG图像数据
         """
-        # 创建2x2网格的图表
-        fig, axs = plt.subplots(2, 2, figsize=(12, 10))
-        
-        # 提取数据
-        dates = []
-        temps_max = []
-        temps_min = []
-        humidity = []
-        
-        for item in forecast_data:
-            date = datetime.fromisoformat(item['date'].replace('Z', '+00:00'))
-            dates.append(date)
-            temps_max.append(item['max_temp'])
-            temps_min.append(item['min_temp'])
-            humidity.append(item['humidity'])
-        
-        # 1. 温度趋势图（左上）
-        axs[0, 0].plot(dates, temps_max, 'o-', color='#FF5722', label='最高温度')
-        axs[0, 0].plot(dates, temps_min, 'o-', color='#2196F3', label='最低温度')
-        axs[0, 0].set_title(f'{city}温度趋势')
-        axs[0, 0].set_ylabel('温度 (°C)')
-        axs[0, 0].xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-        axs[0, 0].legend()
-        axs[0, 0].grid(True, linestyle='--', alpha=0.7)
-        
-        # 2. 湿度趋势图（右上）
-        axs[0, 1].plot(dates, humidity, 'o-', color='#4CAF50')
-        axs[0, 1].set_title(f'{city}湿度趋势')
-        axs[0, 1].set_ylabel('湿度 (%)')
-        axs[0, 1].xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-        axs[0, 1].grid(True, linestyle='--', alpha=0.7)
-        
-        # 3. 温度范围柱状图（左下）
-        x = np.arange(len(dates))
-        width = 0.35
-        date_labels = [d.strftime('%m-%d') for d in dates]
-        
-        temp_range = axs[1, 0].bar(x, np.array(temps_max) - np.array(temps_min), width,
-                                  bottom=temps_min, color='#FF9800')
-        axs[1, 0].set_title(f'{city}温度范围')
-        axs[1, 0].set_ylabel('温度 (°C)')
-        axs[1, 0].set_xticks(x)
-        axs[1, 0].set_xticklabels(date_labels)
-        axs[1, 0].grid(True, linestyle='--', alpha=0.7)
-        
-        # 4. 平均温度饼图（右下）
-        avg_temp = sum([(max_t + min_t) / 2 for max_t, min_t in zip(temps_max, temps_min)]) / len(temps_max)
-        temp_levels = ['寒冷 (<10°C)', '凉爽 (10-20°C)', '温暖 (20-30°C)', '炎热 (>30°C)']
-        
-        if avg_temp < 10:
-            sizes = [100, 0, 0, 0]
-            colors = ['#2196F3', '#BBDEFB', '#FFA726', '#FF5722']
-        elif avg_temp < 20:
-            sizes = [0, 100, 0, 0]
-            colors = ['#2196F3', '#BBDEFB', '#FFA726', '#FF5722']
-        elif avg_temp < 30:
-            sizes = [0, 0, 100, 0]
-            colors = ['#2196F3', '#BBDEFB', '#FFA726', '#FF5722']
-        else:
-            sizes = [0, 0, 0, 100]
-            colors = ['#2196F3', '#BBDEFB', '#FFA726', '#FF5722']
-        
-        axs[1, 1].pie(sizes, labels=temp_levels, colors=colors, autopct='%1.1f%%',
-                     shadow=True, startangle=90)
-        axs[1, 1].set_title(f'{city}平均温度分布 ({avg_temp:.1f}°C)')
-        
-        # 调整布局
-        plt.tight_layout()
-        
-        # 将图形转换为Base64编码的数据
-        buffer = io.BytesIO()
-        fig.savefig(buffer, format='png', dpi=100)
-        buffer.seek(0)
-        image_png = buffer.getvalue()
-        buffer.close()
-        plt.close(fig)
-        
-        # 返回Base64编码的图像数据
+        image_png = VisualizationService.render_weather_dashboard(forecast_data, city)
         return base64.b64encode(image_png).decode('utf-8')
 
 
 # 创建全局可视化服务实例
-visualization_service = VisualizationService() 
\ No newline at end of file
+visualization_service = VisualizationService() 
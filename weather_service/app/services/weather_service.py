@@ -15,6 +15,15 @@ import httpx
 from dotenv import load_dotenv
 from fastapi import HTTPException
 
+from .cache_service import cache
+from .city_catalog import city_catalog
+from .forecast_store import CompactForecast
+from .forecast_aggregation import daily_forecast
+from .forecast_indices import daily_indices
+from .alert_service import dispatch_alerts
+from .observation_service import observation_writer, observation_from_payload
+from .payload_archive import archive_payload
+
 # 加载环境变量
 load_dotenv()
 
@@ -25,6 +34,9 @@ logger = logging.getLogger(__name__)
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 WEATHER_API_BASE_URL = os.getenv("WEATHER_API_BASE_URL", "https://api.openweathermap.org/data/2.5")
 
+# 第三方预报接口单次最多返回的3小时预报点数（5天×每天8个）
+FORECAST_MAX_POINTS = 40
+
 # 中文城市名称映射表
 CHINESE_CITY_MAP = {
     "北京": "Beijing,CN",
@@ -111,8 +123,12 @@ class WeatherService:
             logger.info(f"使用带国家代码的城市名: {city}")
             return city
         
-        # 对于中文城市名但不在映射表中的，尝试添加中国国家代码
+        # 对于中文城市名但不在映射表中的，先从城市目录中查找，找不到时尝试添加中国国家代码
         if any('\u4e00' <= char <= '\u9fff' for char in city):
+            match = city_catalog.resolve(city)
+            if match is not None:
+                logger.info(f"从城市目录将中文城市名'{city}'映射为'{match['query']}'")
+                return match["query"]
             city_query = f"{city},CN"
             logger.info(f"未找到中文城市'{city}'的映射，尝试使用'{city_query}'")
             return city_query
@@ -121,6 +137,18 @@ class WeatherService:
         logger.info(f"使用原始城市名: {city}")
         return city
     
+    def city_cache_key(self, city: str) -> str:
+        """
+        获取城市的缓存标签，同一城市的中文名、英文名和带国家代码的写法得到相同标签。
+
+        Args:
+            city: 城市名称
+
+        Returns:
+            str: 去掉国家代码并转为小写的城市查询名称
+        """
+        return self._get_city_query(city).split(",")[0].strip().lower()
+
     async def get_current_weather(self, city: str) -> Dict[str, Any]:
         """
         获取指定城市的当前天气。
@@ -152,7 +180,11 @@ class WeatherService:
                 response.raise_for_status()
                 data = response.json()
                 logger.debug(f"获取天气数据成功: {data}")
-                return data
+            
+            # 后台保存观测数据和压缩后的原始响应，不阻塞请求
+            await self._record_observation(data)
+            await archive_payload("current", data)
+            return data
         except httpx.HTTPStatusError as e:
             error_msg = f"HTTP错误: {e.response.status_code}"
             try:
@@ -178,6 +210,18 @@ class WeatherService:
             raise HTTPException(status_code=500, 
                                detail=f"处理天气数据时发生错误: {str(e)}")
     
+    async def _record_observation(self, data: Dict[str, Any]) -> None:
+        """
+        将实时天气观测提交到后台写入队列，失败时只记录日志。
+        
+        Args:
+            data: 第三方API返回的实时天气字典
+        """
+        try:
+            await observation_writer.submit(observation_from_payload(data))
+        except Exception as e:
+            logger.warning(f"提交观测数据失败: {e}")
+    
     async def get_weather_forecast(self, city: str, days: int = 5) -> Dict[str, Any]:
         """
         获取指定城市的天气预报。
@@ -192,22 +236,91 @@ class WeatherService:
         Raises:
             HTTPException: 当API请求失败时抛出
         """
-        endpoint = f"{self.base_url}/forecast"
+        forecast = await self.get_compact_forecast(city)
+        # OpenWeatherMap每天8个3小时预报点
+        return forecast.to_payload(points=days * 8)
+    
+    async def get_daily_forecast(self, city: str, days: int = 5) -> Dict[str, Any]:
+        """
+        获取指定城市按当地日期汇总的每日预报。
+        
+        Args:
+            city: 城市名称
+            days: 预报天数，默认5天
+            
+        Returns:
+            Dict[str, Any]: city为城市信息，daily为每日数据列表（见forecast_aggregation.DAILY_COLUMNS），
+                indices为逐日对应的派生指标列表（见forecast_indices.DAILY_INDEX_COLUMNS）
+            
+        Raises:
+            HTTPException: 当API请求失败时抛出
+        """
+        forecast = await self.get_compact_forecast(city)
+        return {
+            "city": forecast.city,
+            "daily": daily_forecast(forecast)[:days],
+            "indices": daily_indices(forecast)[:days],
+        }
+    
+    async def get_compact_forecast(self, city: str) -> CompactForecast:
+        """
+        获取指定城市的列式紧凑预报，优先从缓存读取。
+        
+        每个城市只缓存一份完整的5天预报，不同天数的请求共享同一缓存条目；
+        缓存未命中、从第三方API刷新预报后检查该城市的预警规则。
+        
+        Args:
+            city: 城市名称
+            
+        Returns:
+            CompactForecast: 紧凑预报对象
+            
+        Raises:
+            HTTPException: 当API请求失败时抛出
+        """
         city_query = self._get_city_query(city)
+        cache_key = f"upstream_forecast_{city_query.lower()}"
+        
+        forecast = cache.get(cache_key, namespace="upstream_forecast")
+        if forecast is None:
+            payload = await self._fetch_forecast(city, city_query)
+            forecast = CompactForecast.from_payload(payload)
+            cache.set(cache_key, forecast, namespace="upstream_forecast", city=city)
+            # 预报刷新时检查该城市的预警规则
+            await dispatch_alerts(forecast)
+        return forecast
+    
+    async def _fetch_forecast(self, city: str, city_query: str) -> Dict[str, Any]:
+        """
+        从第三方API请求完整的5天预报。
+        
+        Args:
+            city: 用户输入的城市名称
+            city_query: 用于API查询的城市名称参数
+            
+        Returns:
+            Dict[str, Any]: 第三方API返回的预报数据字典
+            
+        Raises:
+            HTTPException: 当API请求失败时抛出
+        """
+        endpoint = f"{self.base_url}/forecast"
         
         params = {
             "q": city_query,
             "appid": self.api_key,
             "units": "metric",  # 使用摄氏度
             "lang": "zh_cn",    # 使用中文返回天气描述
-            "cnt": min(days * 8, 40)  # OpenWeatherMap API限制最多5天/3小时预报(每天8个数据点)
+            "cnt": FORECAST_MAX_POINTS  # OpenWeatherMap API限制最多5天/3小时预报(每天8个数据点)
         }
         
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.get(endpoint, params=params)
                 response.raise_for_status()
-                return response.json()
+                data = response.json()
+            await archive_payload("forecast", data)
+            return data
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 raise HTTPException(status_code=404, detail=f"城市'{city}'未找到")
@@ -219,13 +332,15 @@ class WeatherService:
     
     async def search_city(self, query: str) -> List[Dict[str, Any]]:
         """
-        搜索城市。
+        通过第三方API的/find接口搜索城市。
+        
+        本地城市目录的前缀查询使用city_catalog.search（/weather/cities/autocomplete接口）。
         
         Args:
             query: 城市名称查询字符串
             
         Returns:
-            List[Dict[str, Any]]: 匹配的城市列表
+            List[Dict[str, Any]]: /find接口返回的list，每项为一个城市的当前天气（格式同/weather接口）
             
         Raises:
             HTTPException: 当API请求失败时抛出
@@ -262,4 +377,6 @@ class WeatherService:
 
 
 # 创建全局服务实例
-weather_service = WeatherService() 
\ No newline at end of file
+weather_service = WeatherService()
+# 缓存条目按城市查询参数打标签，按城市失效时不区分中英文写法
+cache.city_key = weather_service.city_cache_key 
\ No newline at end of file
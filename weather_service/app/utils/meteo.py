@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+气象计算工具模块。
+提供对NumPy数组逐元素计算的气象派生量公式，输入缺失（NaN）时结果为NaN。
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# Magnus公式系数（水面，-45°C至60°C）
+_MAGNUS_A = 17.27
+_MAGNUS_B = 237.7
+
+
+def vapour_pressure(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """
+    计算水汽压。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%）
+
+    Returns:
+        np.ndarray: 水汽压（hPa）
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    return np.asarray(humidity, dtype=np.float64) / 100 * 6.105 * np.exp(
+        _MAGNUS_A * temperature / (_MAGNUS_B + temperature)
+    )
+
+
+def dew_point(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """
+    用Magnus公式计算露点温度。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%），为0时结果为NaN
+
+    Returns:
+        np.ndarray: 露点温度（摄氏度）
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    humidity = np.asarray(humidity, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = np.log(np.where(humidity > 0, humidity, np.nan) / 100) + \
+            _MAGNUS_A * temperature / (_MAGNUS_B + temperature)
+        return _MAGNUS_B * gamma / (_MAGNUS_A - gamma)
+
+
+def absolute_humidity(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """
+    计算绝对湿度（每立方米空气中水汽的质量）。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%）
+
+    Returns:
+        np.ndarray: 绝对湿度（g/m³）
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    return 216.7 * vapour_pressure(temperature, humidity) / (temperature + 273.15)
+
+
+def heat_index(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """
+    用美国国家气象局（NWS）的算法计算炎热指数：先用简化公式估算，
+    估算值与气温的平均不低于80°F时改用Rothfusz回归式并做低湿/高湿修正。
+    仅在气温不低于26.7°C（80°F）时有效，其余情况返回气温。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%）
+
+    Returns:
+        np.ndarray: 炎热指数（摄氏度）
+    """
+    t = np.asarray(temperature, dtype=np.float64) * 9 / 5 + 32
+    rh = np.asarray(humidity, dtype=np.float64)
+    simple = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    regression = (-42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+                  - 6.83783e-3 * t ** 2 - 5.481717e-2 * rh ** 2 + 1.22874e-3 * t ** 2 * rh
+                  + 8.5282e-4 * t * rh ** 2 - 1.99e-6 * t ** 2 * rh ** 2)
+    with np.errstate(invalid="ignore"):
+        dry = (rh < 13) & (t >= 80) & (t <= 112)
+        regression -= np.where(dry, (13 - rh) / 4 * np.sqrt(np.clip(17 - np.abs(t - 95), 0, None) / 17), 0)
+        humid = (rh > 85) & (t >= 80) & (t <= 87)
+        regression += np.where(humid, (rh - 85) / 10 * (87 - t) / 5, 0)
+        index = np.where((simple + t) / 2 >= 80, regression, simple)
+        return np.where(t >= 80, (index - 32) * 5 / 9, np.asarray(temperature, dtype=np.float64))
+
+
+def wind_chill(temperature: np.ndarray, wind_speed: np.ndarray) -> np.ndarray:
+    """
+    用北美风寒指数公式（加拿大环境部/NWS）计算风寒温度，
+    仅在气温不高于10°C且风速不低于4.8km/h时有效，其余情况返回气温。
+
+    Args:
+        temperature: 气温（摄氏度）
+        wind_speed: 10米风速（m/s）
+
+    Returns:
+        np.ndarray: 风寒温度（摄氏度）
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    speed = np.asarray(wind_speed, dtype=np.float64) * 3.6
+    with np.errstate(invalid="ignore"):
+        factor = np.power(np.where(speed > 0, speed, 0.0), 0.16)
+        chill = 13.12 + 0.6215 * temperature - 11.37 * factor + 0.3965 * temperature * factor
+        return np.where((temperature <= 10) & (speed >= 4.8), chill, temperature)
+
+
+def feels_like(temperature: np.ndarray, humidity: np.ndarray, wind_speed: np.ndarray,
+               heat: Optional[np.ndarray] = None, chill: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    按NWS的做法计算体感温度：气温不低于26.7°C（80°F）时取炎热指数，
+    风寒条件下取风寒温度，其余情况取气温。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%）
+        wind_speed: 10米风速（m/s）
+        heat: 已算出的炎热指数，为None时重新计算
+        chill: 已算出的风寒温度，为None时重新计算
+
+    Returns:
+        np.ndarray: 体感温度（摄氏度）
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    if heat is None:
+        heat = heat_index(temperature, humidity)
+    if chill is None:
+        chill = wind_chill(temperature, wind_speed)
+    with np.errstate(invalid="ignore"):
+        return np.where(temperature >= 26.7, heat, chill)
+
+
+# 舒适度等级，comfort_class返回的代码为该列表的下标
+COMFORT_CLASSES = ["严寒", "寒冷", "凉爽", "舒适", "温暖", "闷热", "炎热"]
+
+# 按体感温度划分严寒/寒冷/凉爽/舒适/温暖/炎热的分界（摄氏度）
+_COMFORT_BINS = [-10.0, 5.0, 15.0, 24.0, 29.0]
+# 露点不低于该值时，舒适和温暖记为闷热
+_MUGGY_DEW_POINT = 20.0
+
+
+def comfort_class(apparent: np.ndarray, dew: np.ndarray) -> np.ndarray:
+    """
+    按体感温度和露点划分舒适度等级。
+
+    Args:
+        apparent: 体感温度（摄氏度）
+        dew: 露点温度（摄氏度）
+
+    Returns:
+        np.ndarray: COMFORT_CLASSES的下标（int8），体感温度缺失时为-1
+    """
+    apparent = np.asarray(apparent, dtype=np.float64)
+    dew = np.asarray(dew, dtype=np.float64)
+    codes = np.digitize(apparent, _COMFORT_BINS).astype(np.int8)
+    # 最高的区间为炎热
+    codes[codes == len(_COMFORT_BINS)] = COMFORT_CLASSES.index("炎热")
+    with np.errstate(invalid="ignore"):
+        muggy = (dew >= _MUGGY_DEW_POINT) & ((codes == 3) | (codes == 4))
+    codes[muggy] = COMFORT_CLASSES.index("闷热")
+    codes[np.isnan(apparent)] = -1
+    return codes
+
+
+def derived_indices(temperature: np.ndarray, humidity: np.ndarray,
+                    wind_speed: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    一次计算全部派生指标。
+
+    Args:
+        temperature: 气温（摄氏度）
+        humidity: 相对湿度（%）
+        wind_speed: 10米风速（m/s）
+
+    Returns:
+        Dict[str, np.ndarray]: feels_like、heat_index、wind_chill、dew_point（摄氏度）、absolute_humidity（g/m³）
+            和comfort（COMFORT_CLASSES的下标，缺失为-1）数组
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    humidity = np.asarray(humidity, dtype=np.float64)
+    wind_speed = np.asarray(wind_speed, dtype=np.float64)
+    heat = heat_index(temperature, humidity)
+    chill = wind_chill(temperature, wind_speed)
+    apparent = feels_like(temperature, humidity, wind_speed, heat=heat, chill=chill)
+    dew = dew_point(temperature, humidity)
+    return {
+        "feels_like": apparent,
+        "heat_index": heat,
+        "wind_chill": chill,
+        "dew_point": dew,
+        "absolute_humidity": absolute_humidity(temperature, humidity),
+        "comfort": comfort_class(apparent, dew),
+    }
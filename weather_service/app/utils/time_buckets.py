@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+时间分桶工具模块。
+提供在Python和SQL中将时间截断到分钟、小时或天的函数，以及查询参数的UTC时间转换。
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import func
+
+# 时间粒度
+GRANULARITY_MINUTE = "minute"
+GRANULARITY_HOUR = "hour"
+GRANULARITY_DAY = "day"
+
+# SQLite中按粒度截断时间的格式
+_SQLITE_BUCKET_FORMATS = {
+    GRANULARITY_MINUTE: "%Y-%m-%d %H:%M:00",
+    GRANULARITY_HOUR: "%Y-%m-%d %H:00:00",
+    GRANULARITY_DAY: "%Y-%m-%d 00:00:00",
+}
+
+
+def floor_time(value: datetime, granularity: str) -> datetime:
+    """
+    将时间向下截断到分钟、小时或天。
+
+    Args:
+        value: 时间
+        granularity: 粒度（minute、hour或day）
+
+    Returns:
+        datetime: 截断后的时间
+    """
+    value = value.replace(second=0, microsecond=0)
+    if granularity in (GRANULARITY_HOUR, GRANULARITY_DAY):
+        value = value.replace(minute=0)
+    if granularity == GRANULARITY_DAY:
+        value = value.replace(hour=0)
+    return value
+
+
+def truncate_time(session, column, granularity: str):
+    """
+    构造按粒度截断时间列的SQL表达式。
+
+    Args:
+        session: 数据库会话
+        column: 时间列
+        granularity: 粒度（minute、hour或day）
+
+    Returns:
+        ColumnElement: SQL表达式
+
+    Raises:
+        NotImplementedError: 数据库方言不支持时抛出
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "sqlite":
+        return func.strftime(_SQLITE_BUCKET_FORMATS[granularity], column)
+    if dialect == "postgresql":
+        return func.date_trunc(granularity, column)
+    raise NotImplementedError(f"数据库方言'{dialect}'不支持按时间分桶")
+
+
+def as_datetime(value: Any) -> datetime:
+    """
+    将截断表达式的结果（SQLite中为字符串）转换为datetime。
+
+    Args:
+        value: 截断表达式的结果
+
+    Returns:
+        datetime: 时间
+    """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    将带时区的时间转换为不带时区的UTC时间，与数据库中保存的时间比较；不带时区的时间视为UTC，原样返回。
+
+    Args:
+        value: 时间
+
+    Returns:
+        Optional[datetime]: 不带时区的UTC时间
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+图表渲染基准测试脚本。
+在单个进程中比较每次重新创建图形（plt.subplots + tight_layout，原实现）与复用图形模板的渲染速度，
+即渲染进程池中每个进程的吞吐量。
+
+用法（在weather_service目录下运行）:
+    python -m benchmarks.bench_chart_render --seconds 5 --formats png svg
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+import warnings
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import matplotlib
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import numpy as np
+
+from app.services.visualization_service import VisualizationService
+
+# 缺少中文字体时matplotlib会对每个字形输出警告，基准测试保留查找开销但丢弃输出内容
+warnings.filterwarnings("ignore", category=UserWarning)
+logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+
+
+def legacy_temperature_chart(forecast_data: List[Dict[str, Any]], city: str, image_format: str) -> bytes:
+    """原实现：每次创建图形和坐标轴，执行tight_layout。"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    dates = [datetime.fromisoformat(item['date'].replace('Z', '+00:00')) for item in forecast_data]
+    temps = [item['max_temp'] for item in forecast_data]
+    ax.plot(dates, temps, 'o-', color='#FF5722', linewidth=2, markersize=8)
+    ax.set_title(f'{city}未来天气温度趋势', fontsize=16)
+    ax.set_xlabel('日期', fontsize=12)
+    ax.set_ylabel('温度 (°C)', fontsize=12)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+    ax.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=image_format, dpi=100)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def legacy_weather_dashboard(forecast_data: List[Dict[str, Any]], city: str, image_format: str) -> bytes:
+    """原实现：每次创建2x2图形、重新画全部图元，执行tight_layout。"""
+    fig, axs = plt.subplots(2, 2, figsize=(12, 10))
+    dates = [datetime.fromisoformat(item['date'].replace('Z', '+00:00')) for item in forecast_data]
+    temps_max = [item['max_temp'] for item in forecast_data]
+    temps_min = [item['min_temp'] for item in forecast_data]
+    humidity = [item['humidity'] for item in forecast_data]
+
+    axs[0, 0].plot(dates, temps_max, 'o-', color='#FF5722', label='最高温度')
+    axs[0, 0].plot(dates, temps_min, 'o-', color='#2196F3', label='最低温度')
+    axs[0, 0].set_title(f'{city}温度趋势')
+    axs[0, 0].set_ylabel('温度 (°C)')
+    axs[0, 0].xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+    axs[0, 0].legend()
+    axs[0, 0].grid(True, linestyle='--', alpha=0.7)
+
+    axs[0, 1].plot(dates, humidity, 'o-', color='#4CAF50')
+    axs[0, 1].set_title(f'{city}湿度趋势')
+    axs[0, 1].set_ylabel('湿度 (%)')
+    axs[0, 1].xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+    axs[0, 1].grid(True, linestyle='--', alpha=0.7)
+
+    x = np.arange(len(dates))
+    axs[1, 0].bar(x, np.array(temps_max) - np.array(temps_min), 0.35, bottom=temps_min, color='#FF9800')
+    axs[1, 0].set_title(f'{city}温度范围')
+    axs[1, 0].set_ylabel('温度 (°C)')
+    axs[1, 0].set_xticks(x)
+    axs[1, 0].set_xticklabels([d.strftime('%m-%d') for d in dates])
+    axs[1, 0].grid(True, linestyle='--', alpha=0.7)
+
+    avg_temp = sum((max_t + min_t) / 2 for max_t, min_t in zip(temps_max, temps_min)) / len(temps_max)
+    level = int(np.searchsorted([10, 20, 30], avg_temp, side='right'))
+    sizes = [100 if index == level else 0 for index in range(4)]
+    axs[1, 1].pie(sizes, labels=['寒冷 (<10°C)', '凉爽 (10-20°C)', '温暖 (20-30°C)', '炎热 (>30°C)'],
+                  colors=['#2196F3', '#BBDEFB', '#FFA726', '#FF5722'], autopct='%1.1f%%',
+                  shadow=True, startangle=90)
+    axs[1, 1].set_title(f'{city}平均温度分布 ({avg_temp:.1f}°C)')
+
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=image_format, dpi=100)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def sample_forecasts(count: int, days: int) -> List[Dict[str, Any]]:
+    """生成count个城市的每日预报，各城市的温度和日期不同。"""
+    rng = np.random.default_rng(0)
+    forecasts = []
+    for index in range(count):
+        base = rng.uniform(-15, 35)
+        forecasts.append([
+            {
+                "date": f"2025-0{1 + index % 9}-{10 + day:02d}",
+                "max_temp": round(base + rng.uniform(2, 8), 1),
+                "min_temp": round(base - rng.uniform(2, 8), 1),
+                "humidity": round(rng.uniform(20, 100), 1),
+            }
+            for day in range(days)
+        ])
+    return forecasts
+
+
+def measure(render: Callable[..., bytes], forecasts: List[List[Dict[str, Any]]], image_format: str,
+            seconds: float) -> float:
+    """
+    在指定时长内循环渲染不同城市的图表。
+
+    Args:
+        render: 渲染函数
+        forecasts: 各城市的每日预报
+        image_format: 图像格式
+        seconds: 运行时长（秒）
+
+    Returns:
+        float: 每秒渲染次数
+    """
+    # 预热：加载字体、后端，建好模板
+    render(forecasts[0], "预热", image_format)
+    renders = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        render(forecasts[renders % len(forecasts)], f"城市{renders % len(forecasts)}", image_format)
+        renders += 1
+    return renders / (time.perf_counter() - started)
+
+
+def main() -> None:
+    """解析命令行参数，依次比较两种图表在各格式下的渲染速度。"""
+    parser = argparse.ArgumentParser(description="图表渲染基准测试")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每种组合的运行时长（秒）")
+    parser.add_argument("--formats", nargs="+", default=["png"], help="图像格式（png、webp、svg）")
+    parser.add_argument("--days", type=int, default=5, help="每个城市的预报天数")
+    parser.add_argument("--cities", type=int, default=20, help="轮流渲染的城市数")
+    args = parser.parse_args()
+
+    forecasts = sample_forecasts(args.cities, args.days)
+    charts = [
+        ("temperature", legacy_temperature_chart, VisualizationService.render_temperature_chart),
+        ("dashboard", legacy_weather_dashboard, VisualizationService.render_weather_dashboard),
+    ]
+    print(f"{'chart':<12} {'format':<7} {'before/s':>10} {'after/s':>10} {'speedup':>8}")
+    for image_format in args.formats:
+        for name, legacy, template in charts:
+            # 原实现在导入时只指定SimHei字体
+            with matplotlib.rc_context({"font.sans-serif": ["SimHei"]}):
+                before = measure(legacy, forecasts, image_format, args.seconds)
+            after = measure(template, forecasts, image_format, args.seconds)
+            print(f"{name:<12} {image_format:<7} {before:>10.1f} {after:>10.1f} {after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库引擎配置基准测试脚本。
+在临时SQLite文件上并发执行查询历史写入和读取，比较development与production配置的吞吐量和读延迟。
+
+用法（在weather_service目录下运行）:
+    python -m benchmarks.bench_db_profiles --writers 4 --readers 4 --seconds 5
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.database import Base, create_engines
+from app.models import QueryHistory
+
+
+@contextmanager
+def _discard_sql_log() -> Iterator[None]:
+    """development配置会输出SQL日志，基准测试保留日志开销但丢弃输出内容，结束后恢复原输出。"""
+    handlers = logging.getLogger("sqlalchemy.engine.Engine").handlers
+    with open(os.devnull, "w") as devnull:
+        previous = [handler.setStream(devnull) for handler in handlers]
+        try:
+            yield
+        finally:
+            for handler, stream in zip(handlers, previous):
+                if stream is not None:
+                    handler.setStream(stream)
+
+
+async def run_profile(profile: str, writers: int, readers: int, seconds: float) -> Dict[str, Any]:
+    """
+    在指定配置下运行一轮读写混合负载。
+
+    Args:
+        profile: 引擎配置名称
+        writers: 并发写入任务数（每次写入单独提交事务）
+        readers: 并发读取任务数（读取最近10条查询历史）
+        seconds: 运行时长（秒）
+
+    Returns:
+        Dict[str, Any]: 写入/读取吞吐量和读延迟统计
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine, read_engine = create_engines(url, profile)
+        with _discard_sql_log():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+            write_session = sessionmaker(bind=engine, class_=AsyncSession)
+            read_session = sessionmaker(bind=read_engine, class_=AsyncSession)
+            deadline = time.perf_counter() + seconds
+            writes = 0
+            latencies: List[float] = []
+
+            async def writer(worker: int) -> None:
+                nonlocal writes
+                while time.perf_counter() < deadline:
+                    async with write_session() as session:
+                        session.add(QueryHistory(
+                            city_name=f"city-{worker}-{writes % 50}",
+                            query_time=datetime.utcnow(),
+                            ip_address="127.0.0.1",
+                        ))
+                        await session.commit()
+                    writes += 1
+
+            async def reader() -> None:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    async with read_session() as session:
+                        result = await session.execute(
+                            select(QueryHistory).order_by(QueryHistory.query_time.desc()).limit(10)
+                        )
+                        result.scalars().all()
+                    latencies.append(time.perf_counter() - start)
+
+            await asyncio.gather(
+                *(writer(i) for i in range(writers)),
+                *(reader() for _ in range(readers)),
+            )
+
+            await engine.dispose()
+            if read_engine is not engine:
+                await read_engine.dispose()
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "writes_per_sec": writes / seconds,
+        "reads_per_sec": len(latencies) / seconds,
+        "read_p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "read_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    """解析命令行参数并依次运行各配置的基准测试。"""
+    parser = argparse.ArgumentParser(description="数据库引擎配置基准测试")
+    parser.add_argument("--profiles", nargs="+", default=["development", "production"],
+                        help="要比较的引擎配置")
+    parser.add_argument("--writers", type=int, default=4, help="并发写入任务数")
+    parser.add_argument("--readers", type=int, default=4, help="并发读取任务数")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每个配置的运行时长（秒）")
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'writes/s':>10} {'reads/s':>10} {'read p50 ms':>12} {'read p95 ms':>12}")
+    for profile in args.profiles:
+        result = asyncio.run(run_profile(profile, args.writers, args.readers, args.seconds))
+        print(f"{result['profile']:<12} {result['writes_per_sec']:>10.1f} "
+              f"{result['reads_per_sec']:>10.1f} {result['read_p50_ms']:>12.2f} "
+              f"{result['read_p95_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,9 +20,13 @@ from httpx import AsyncClient
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
 from app.main import app
 from app.models import City, WeatherRecord, QueryHistory
+from app.services import (
+    history_writer, bulk_insert_handler, observation_writer, observations_handler
+)
+from app.services.history_service import history_buffer
 
 
 # 测试数据库URL
@@ -65,6 +69,13 @@ async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
 
 # Override app的依赖项
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+# 后台写入器写入测试数据库
+history_writer.handler = bulk_insert_handler(
+    QueryHistory, TestSessionLocal, on_inserted=history_buffer.extend
+)
+observation_writer.handler = observations_handler(TestSessionLocal)
 
 
 # 测试客户端夹具
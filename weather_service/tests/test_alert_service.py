@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+阈值预警服务单元测试模块。
+测试规则索引的比较方式和检查天数、同一预报日期的去重（包括重建索引和重启后）、大量规则时与逐条检查结果一致，以及规则的保存和加载。
+"""
+
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import AlertNotification
+from app.services.forecast_store import CompactForecast
+from app.services.forecast_aggregation import daily_columns
+from app.services.alert_service import (
+    ALERT_DAILY_METRICS, ALERT_MAX_HORIZON, AlertEngine, alert_engine, alert_writer, create_rule, delete_rule
+)
+from tests.test_forecast_store import make_forecast_payload
+
+
+async def make_session_factory():
+    """
+    创建基于内存SQLite的会话工厂。
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def make_rule(rule_id: int, metric: str, operator: str, threshold: float, horizon_days: int = 3,
+              key: str = "1816670") -> dict:
+    """构造规则字典。"""
+    return {
+        "id": rule_id, "subscriber": "user", "city_key": key, "city_name": "Beijing",
+        "metric": metric, "operator": operator, "threshold": threshold, "horizon_days": horizon_days,
+    }
+
+
+def make_forecast(cooled_date: Optional[str] = None, start: int = 1617260400) -> CompactForecast:
+    """
+    构造测试预报：每日最高气温为23.75、28.75……，最低气温为19.25……
+
+    Args:
+        cooled_date: 将该城市当地日期的气温降低10度
+        start: 第一个预报点的时间戳
+    """
+    payload = make_forecast_payload(start=start)
+    offset = payload["city"]["timezone"]
+    for item in payload["list"]:
+        if datetime.utcfromtimestamp(item["dt"] + offset).date().isoformat() == cooled_date:
+            for field in ("temp", "temp_min", "temp_max"):
+                item["main"][field] -= 10
+    return CompactForecast.from_payload(payload)
+
+
+class TestAlertService:
+    """阈值预警服务测试类。"""
+
+    def test_operators_and_horizon(self):
+        """测试各比较方式的边界、检查天数和城市匹配，通知带有第一个满足条件的日期和预报值。"""
+        engine = AlertEngine()
+        engine.build([
+            make_rule(1, "max_temp", ">", 25, horizon_days=1),
+            make_rule(2, "max_temp", ">", 25, horizon_days=2),
+            make_rule(3, "max_temp", ">=", 28.75),
+            make_rule(4, "max_temp", ">", 28.75),
+            make_rule(5, "min_temp", "<", 19.25),
+            make_rule(6, "min_temp", "<=", 19.25),
+            make_rule(7, "max_temp", ">", 0, key="london,gb"),
+        ])
+        notifications = {item["rule_id"]: item for item in engine.evaluate(make_forecast())}
+
+        assert sorted(notifications) == [2, 3, 6]
+        assert notifications[2]["forecast_date"].isoformat() == "2021-04-02"
+        assert notifications[2]["value"] == 28.75
+        assert notifications[6]["forecast_date"].isoformat() == "2021-04-01"
+        assert engine.summary()["rules"] == 7 and engine.summary()["cities"] == 2
+
+    def test_dedupe_and_remove(self):
+        """测试同一规则对同一预报日期只通知一次，删除后不再检查。"""
+        engine = AlertEngine()
+        engine.build([make_rule(1, "max_temp", ">", 25), make_rule(2, "pop_max", ">=", 0)])
+        assert len(engine.evaluate(make_forecast())) == 2
+        # 预报刷新但触发日期不变
+        assert engine.evaluate(make_forecast()) == []
+        assert engine.stats["suppressed"] == 2
+
+        # 重建索引保留仍存在的规则的通知记录
+        engine.build([make_rule(1, "max_temp", ">", 25), make_rule(2, "pop_max", ">=", 0)])
+        assert engine.evaluate(make_forecast()) == []
+
+        assert engine.remove(1) and not engine.remove(1)
+        assert engine.evaluate(make_forecast()) == []
+        # 重新添加的规则重新开始通知
+        engine.add(make_rule(1, "max_temp", ">", 25))
+        assert [item["rule_id"] for item in engine.evaluate(make_forecast())] == [1]
+
+    def test_dedupe_flip_flop(self):
+        """测试第一个满足条件的日期来回变化时，已通知过的日期不再通知，早于预报首日的日期被清理。"""
+        engine = AlertEngine()
+        engine.build([make_rule(1, "max_temp", ">", 25)])
+        assert [item["forecast_date"].isoformat() for item in engine.evaluate(make_forecast())] == ["2021-04-02"]
+        # 4月2日降温后第一个满足条件的日期变为4月3日，再恢复为4月2日
+        fired = engine.evaluate(make_forecast(cooled_date="2021-04-02"))
+        assert [item["forecast_date"].isoformat() for item in fired] == ["2021-04-03"]
+        assert engine.evaluate(make_forecast()) == []
+        assert engine.evaluate(make_forecast(cooled_date="2021-04-02")) == []
+
+        # 预报首日推进到4月3日后，4月2日的记录被清理
+        fired = engine.evaluate(make_forecast(start=1617260400 + 2 * 86400))
+        assert [item["forecast_date"].isoformat() for item in fired] == ["2021-04-04"]
+        assert engine._notified[1] == {"2021-04-03", "2021-04-04"}
+
+    def test_many_rules_match_brute_force(self):
+        """测试大量规则时索引结果与逐条检查一致，且只检查阈值被越过的候选规则。"""
+        rng = np.random.default_rng(7)
+        operators = [">", ">=", "<", "<="]
+        rules = [
+            make_rule(i, ALERT_DAILY_METRICS[rng.integers(3)], operators[rng.integers(4)],
+                      float(rng.choice([rng.uniform(10, 35), 19.25, 28.75])), int(rng.integers(1, 6)))
+            for i in range(100000)
+        ]
+        engine = AlertEngine()
+        engine.build(rules)
+        forecast = make_forecast()
+        fired = {item["rule_id"]: item["forecast_date"].isoformat() for item in engine.evaluate(forecast)}
+
+        daily = daily_columns(forecast)
+        expected = {}
+        for rule in rules:
+            values = daily[rule["metric"]][:min(rule["horizon_days"], ALERT_MAX_HORIZON)]
+            hits = {
+                ">": values > rule["threshold"], ">=": values >= rule["threshold"],
+                "<": values < rule["threshold"], "<=": values <= rule["threshold"],
+            }[rule["operator"]]
+            if hits.any():
+                expected[rule["id"]] = str(daily["date"][hits.argmax()])
+        assert fired == expected
+        assert engine.stats["candidates"] < len(rules)
+
+    @pytest.mark.asyncio
+    async def test_create_and_load(self, monkeypatch):
+        """测试保存规则后立即用创建时的预报检查，删除后从索引中移除，重启时从数据库加载启用的规则。"""
+        factory = await make_session_factory()
+        forecast = make_forecast()
+        queued = []
+
+        async def submit(notification):
+            queued.append(notification)
+            return True
+        monkeypatch.setattr(alert_writer, "submit", submit)
+        async with factory() as session:
+            rule = await create_rule(session, "user", forecast, "max_temp", ">=", 28.75, horizon_days=2)
+            other = await create_rule(session, "user", forecast, "min_temp", "<", 0)
+            with pytest.raises(ValueError):
+                await create_rule(session, "user", forecast, "snow", ">", 1)
+            with pytest.raises(ValueError):
+                await create_rule(session, "user", forecast, "max_temp", ">", 1, horizon_days=6)
+        try:
+            assert rule["city_key"] == "1816670" and rule["city_name"] == "Beijing"
+            # 创建时已满足条件的规则立即通知，之后同一预报日期不再重复
+            assert [item["rule_id"] for item in queued] == [rule["id"]]
+            assert queued[0]["forecast_date"].isoformat() == "2021-04-02"
+            assert alert_engine.evaluate(forecast) == []
+
+            async with factory() as session:
+                # 只能删除自己的规则
+                assert not await delete_rule(session, other["id"], "someone-else")
+                assert await delete_rule(session, other["id"], "user")
+                assert not await delete_rule(session, other["id"], "user")
+            engine = AlertEngine()
+            async with factory() as session:
+                assert await engine.load(session) == 1
+            assert [item["rule_id"] for item in engine.evaluate(forecast)] == [rule["id"]]
+
+            # 已写入数据库的通知在重启后继续去重
+            async with factory() as session:
+                session.add_all([AlertNotification(**item) for item in queued])
+                await session.commit()
+            engine = AlertEngine()
+            async with factory() as session:
+                assert await engine.load(session) == 1
+            assert engine.evaluate(forecast) == []
+        finally:
+            alert_engine.remove(rule["id"])
+            alert_engine.remove(other["id"])
@@ -13,8 +13,11 @@ from datetime import datetime
 from httpx import AsyncClient
 from fastapi import Request, status
 from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 
+from app.database import Base
+from app.main import app
 from app.models import City, QueryHistory
 from app.services.weather_service import weather_service
 
@@ -211,4 +214,148 @@ class TestWeatherAPI:
         response = client.get("/health")
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
-        assert data["status"] == "healthy" 
\ No newline at end of file
+        assert data["status"] == "healthy" 
+
+# 测试使用的管理令牌
+ADMIN_HEADERS = {"X-Admin-Token": "test-admin-token"}
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    """配置管理令牌。"""
+    monkeypatch.setattr("app.api.admin.ADMIN_TOKEN", ADMIN_HEADERS["X-Admin-Token"])
+
+
+class TestAdminAPI:
+    """管理API测试类。"""
+    
+    def test_requires_configured_token(self, client, monkeypatch):
+        """
+        测试未配置令牌时拒绝所有管理请求，配置后令牌不匹配时返回403。
+        
+        Args:
+            client: 测试客户端
+            monkeypatch: pytest的monkeypatch夹具
+        """
+        monkeypatch.setattr("app.api.admin.ADMIN_TOKEN", None)
+        response = client.delete("/admin/cache", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        
+        monkeypatch.setattr("app.api.admin.ADMIN_TOKEN", ADMIN_HEADERS["X-Admin-Token"])
+        assert client.get("/admin/cache/stats").status_code == status.HTTP_403_FORBIDDEN
+        response = client.get("/admin/cache/stats", headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_cache_stats_and_invalidate(self, client, admin_token):
+        """
+        测试缓存统计和定向失效API。
+        
+        Args:
+            client: 测试客户端
+        """
+        from app.services.cache_service import cache
+        cache.set("test_admin_key", {"temp": 1}, namespace="current", city="Beijing")
+        
+        response = client.get("/admin/cache/stats?namespace=current", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["namespaces"]["current"]["entries"] >= 1
+        
+        response = client.delete("/admin/cache?namespace=current&city=Beijing", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["removed"] >= 1
+        assert cache.get("test_admin_key") is None
+    
+    def test_export_rejects_unknown_dataset(self, client, admin_token):
+        """
+        测试导出不支持的数据集或格式时返回400。
+        
+        Args:
+            client: 测试客户端
+        """
+        response = client.get("/admin/export/unknown", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+        response = client.get("/admin/export/history?format=xml", headers=ADMIN_HEADERS)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    @pytest.mark.asyncio
+    async def test_export_csv_download(self, admin_token, monkeypatch):
+        """
+        测试通过HTTP下载CSV导出，只读会话在响应流内打开。
+        
+        Args:
+            admin_token: 管理令牌夹具
+            monkeypatch: pytest的monkeypatch夹具
+        """
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as session:
+            session.add_all([
+                QueryHistory(city_name=city, query_time=datetime(2025, 4, 1, hour), ip_address="127.0.0.1")
+                for hour, city in enumerate(["Beijing", "Shanghai", "Guangzhou"])
+            ])
+            await session.commit()
+        monkeypatch.setattr("app.api.admin.ReadSessionLocal", factory)
+        
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/admin/export/history?format=csv&start=2025-04-01T01:00:00",
+                                        headers=ADMIN_HEADERS)
+        await engine.dispose()
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers["content-disposition"]
+        lines = response.text.strip().splitlines()
+        assert lines[0] == "id,city_name,query_time,ip_address"
+        assert [line.split(",")[1] for line in lines[1:]] == ["Shanghai", "Guangzhou"]
+
+
+class TestChartImageAPI:
+    """图表图像API测试类。"""
+    
+    @staticmethod
+    def mock_forecast(city: str):
+        """构造每日预报服务方法的模拟返回值。"""
+        return mock.AsyncMock(return_value={
+            "city": {"name": city, "country": "CN"},
+            "daily": [{"date": "2025-04-01", "max_temp": 25.0, "min_temp": 15.0, "humidity": 50.0}],
+        })
+    
+    def test_conditional_request(self, client):
+        """
+        测试If-None-Match的逗号列表、弱验证器和“*”匹配时返回304。
+        
+        Args:
+            client: 测试客户端
+        """
+        from app.services import render_pool
+        with mock.patch.object(weather_service, "get_daily_forecast", self.mock_forecast("ETagCity")), \
+                mock.patch.object(render_pool, "render", mock.AsyncMock(return_value=b"\x89PNG-etag")):
+            response = client.get("/weather/visualization/temperature/ETagCity/image?format=png")
+            assert response.status_code == status.HTTP_200_OK
+            etag = response.headers["etag"]
+            
+            for header in (etag, f'"other", W/{etag}', "*"):
+                response = client.get("/weather/visualization/temperature/ETagCity/image?format=png",
+                                      headers={"If-None-Match": header})
+                assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            response = client.get("/weather/visualization/temperature/ETagCity/image?format=png",
+                                  headers={"If-None-Match": '"other"'})
+            assert response.status_code == status.HTTP_200_OK
+    
+    def test_render_error(self, client):
+        """
+        测试渲染失败时返回500和错误说明。
+        
+        Args:
+            client: 测试客户端
+        """
+        from app.services import render_pool
+        with mock.patch.object(weather_service, "get_daily_forecast", self.mock_forecast("BrokenCity")), \
+                mock.patch.object(render_pool, "render", mock.AsyncMock(side_effect=RuntimeError("渲染进程崩溃"))):
+            response = client.get("/weather/visualization/dashboard/BrokenCity/image?format=svg")
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert response.json()["detail"] == "生成图表图像失败: 渲染进程崩溃"
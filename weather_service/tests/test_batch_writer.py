@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量写入服务单元测试模块。
+测试攒批写入、队列策略和停止时的剩余事件写入。
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.batch_writer import BatchWriter, QueryHistoryWriter
+
+
+class TestBatchWriter:
+    """批量写入器测试类。"""
+    
+    @pytest.mark.asyncio
+    async def test_flush_by_size(self):
+        """测试攒够批量大小后立即写入。"""
+        batches = []
+        
+        async def handler(batch):
+            batches.append(list(batch))
+        
+        writer = BatchWriter("test", handler, batch_size=3, flush_interval=60)
+        for i in range(6):
+            await writer.submit(i)
+        await asyncio.sleep(0.05)
+        
+        assert batches == [[0, 1, 2], [3, 4, 5]]
+        await writer.stop()
+    
+    @pytest.mark.asyncio
+    async def test_flush_by_interval(self):
+        """测试未攒够批量时按时间间隔写入。"""
+        batches = []
+        
+        async def handler(batch):
+            batches.append(list(batch))
+        
+        writer = BatchWriter("test", handler, batch_size=100, flush_interval=0.05)
+        await writer.submit("a")
+        await writer.submit("b")
+        await asyncio.sleep(0.2)
+        
+        assert batches == [["a", "b"]]
+        await writer.stop()
+    
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending(self):
+        """测试停止时写入队列中剩余的事件。"""
+        written = []
+        
+        async def handler(batch):
+            written.extend(batch)
+        
+        writer = BatchWriter("test", handler, batch_size=2, flush_interval=60)
+        for i in range(5):
+            await writer.submit(i)
+        await writer.stop()
+        
+        assert written == [0, 1, 2, 3, 4]
+        assert writer.stats["written"] == 5
+    
+    @pytest.mark.asyncio
+    async def test_drop_policy(self):
+        """测试drop策略在队列满时丢弃事件而不等待。"""
+        release = asyncio.Event()
+        written = []
+        
+        async def handler(batch):
+            await release.wait()
+            written.extend(batch)
+        
+        writer = BatchWriter("test", handler, max_queue=2, batch_size=1,
+                             flush_interval=60, policy="drop")
+        results = [await writer.submit(i) for i in range(5)]
+        
+        # 第一个事件被后台任务取出，队列容量为2
+        assert results.count(False) == writer.stats["dropped"] >= 1
+        release.set()
+        await writer.stop()
+        assert len(written) == results.count(True)
+    
+    @pytest.mark.asyncio
+    async def test_handler_failure_is_isolated(self):
+        """测试写入失败不影响后续批次。"""
+        written = []
+        
+        async def handler(batch):
+            if batch == ["bad"]:
+                raise RuntimeError("boom")
+            written.extend(batch)
+        
+        writer = BatchWriter("test", handler, batch_size=1, flush_interval=60)
+        await writer.submit("bad")
+        await writer.submit("good")
+        await writer.stop()
+        
+        assert written == ["good"]
+        assert writer.stats["failures"] == 1
+    
+    def test_invalid_policy(self):
+        """测试不支持的队列策略。"""
+        with pytest.raises(ValueError):
+            BatchWriter("test", None, policy="retry")
+    
+    @pytest.mark.asyncio
+    async def test_query_history_record(self):
+        """测试查询历史事件格式。"""
+        rows = []
+        
+        async def handler(batch):
+            rows.extend(batch)
+        
+        writer = QueryHistoryWriter("history", handler, flush_interval=0.01)
+        await writer.record(city_name="Beijing", ip_address="127.0.0.1")
+        await writer.stop()
+        
+        assert rows[0]["city_name"] == "Beijing"
+        assert rows[0]["ip_address"] == "127.0.0.1"
+        assert rows[0]["query_time"] is not None
@@ -161,4 +161,97 @@ class TestCachedDecorator:
         
         result4 = await test_function("x", "y")
         assert result4 == "result_x_y_None"
-        assert counter == 3 
\ No newline at end of file
+        assert counter == 3 
+
+class TestCacheStats:
+    """缓存统计与定向失效测试。"""
+    
+    def test_namespace_counters(self):
+        """测试按命名空间统计命中、未命中和过期。"""
+        cache = SimpleCache(ttl=60)
+        
+        cache.set("current_a", {"temp": 1}, namespace="current", city="Beijing")
+        cache.get("current_a")
+        cache.get("current_a")
+        cache.get("current_b", namespace="current")
+        cache.set("forecast_a", [1, 2, 3], ttl=-1, namespace="forecast")
+        cache.get("forecast_a")
+        
+        stats = cache.stats()
+        current = stats["namespaces"]["current"]
+        assert current["hits"] == 2
+        assert current["misses"] == 1
+        assert current["entries"] == 1
+        assert current["hit_ratio"] == round(2 / 3, 4)
+        assert current["avg_entry_size"] > 0
+        assert current["age_distribution"]["<1m"] == 1
+        assert current["top_keys"][0]["key"] == "current_a"
+        assert current["top_keys"][0]["hits"] == 2
+        
+        forecast = stats["namespaces"]["forecast"]
+        assert forecast["expirations"] == 1
+        assert forecast["misses"] == 1
+        assert forecast["entries"] == 0
+    
+    def test_max_entries_eviction(self):
+        """测试超出容量时按最近最少使用淘汰。"""
+        cache = SimpleCache(ttl=60, max_entries=2)
+        
+        cache.set("k1", 1, namespace="current")
+        cache.set("k2", 2, namespace="current")
+        cache.get("k1")
+        cache.set("k3", 3, namespace="current")
+        
+        assert cache.get("k2") is None
+        assert cache.get("k1") == 1
+        assert cache.stats(namespace="current")["namespaces"]["current"]["evictions"] == 1
+    
+    def test_invalidate_by_namespace_and_city(self):
+        """测试按命名空间或城市定向失效。"""
+        cache = SimpleCache(ttl=60)
+        
+        cache.set("c_bj", 1, namespace="current", city="Beijing")
+        cache.set("c_sh", 2, namespace="current", city="Shanghai")
+        cache.set("f_bj", 3, namespace="forecast", city="Beijing")
+        
+        assert cache.invalidate(city="beijing") == 2
+        assert cache.get("c_sh") == 2
+        assert cache.invalidate(namespace="current") == 1
+        assert cache.stats()["entries"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_cached_ignores_injected_objects(self):
+        """测试缓存装饰器构建键时忽略注入对象，并记录城市和命名空间。"""
+        counter = 0
+        
+        @cached("inject_", namespace="inject")
+        async def test_function(city, db=None):
+            nonlocal counter
+            counter += 1
+            return city
+        
+        await test_function(city="Paris", db=object())
+        await test_function(city="Paris", db=object())
+        
+        assert counter == 1
+        from app.services.cache_service import cache
+        assert cache.invalidate(namespace="inject", city="paris") == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_city_spellings(self):
+        """测试按城市失效时同一城市的中文名、英文名和带国家代码的写法互相匹配。"""
+        from app.services.cache_service import cache
+        from app.services.weather_service import weather_service
+        assert cache.city_key == weather_service.city_cache_key
+        
+        @cached("spelling_", namespace="spelling")
+        async def test_function(city):
+            return city
+        
+        await test_function(city="北京")
+        await test_function(city="beijing,cn")
+        await test_function(city="上海")
+        cache.set("upstream_spelling", 1, namespace="spelling", city="Beijing,CN")
+        
+        assert cache.invalidate(namespace="spelling", city="Beijing") == 3
+        assert cache.invalidate(namespace="spelling", city="shanghai,cn") == 1
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+城市目录单元测试模块。
+测试GeoNames数据解析、批量导入、名称前缀索引和附近城市查询。
+"""
+
+import copy
+from unittest import mock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import City
+from app.services.cache_service import cache
+from app.services.city_catalog import (
+    CityCatalog, city_catalog, parse_geonames, load_geonames, normalize_name
+)
+from app.services.weather_service import WeatherService
+from tests.test_api import MOCK_CURRENT_WEATHER
+
+
+def geonames_line(geoname_id: int, name: str, ascii_name: str, alternate_names: str,
+                  lat: float, lon: float, country: str, population: int) -> str:
+    """
+    构造一行GeoNames城市数据。
+
+    Returns:
+        str: 制表符分隔的19列数据
+    """
+    fields = [str(geoname_id), name, ascii_name, alternate_names, str(lat), str(lon),
+              "P", "PPLA", country, "", "", "", "", "", str(population), "", "50",
+              "Asia/Shanghai", "2024-01-01"]
+    return "\t".join(fields) + "\n"
+
+
+GEONAMES_LINES = [
+    geonames_line(1816670, "Beijing", "Beijing", "Pekin,Peking,Пекин,北京,北京市",
+                  39.9075, 116.39723, "CN", 18960744),
+    geonames_line(1790630, "Xi’an", "Xi'an", "Xian,Xi'an,西安,西安市",
+                  34.25833, 108.92861, "CN", 12328200),
+    geonames_line(1811103, "Foshan", "Foshan", "Fo-shan,佛山",
+                  23.02677, 113.13148, "CN", 9498863),
+    geonames_line(1816440, "Bengbu", "Bengbu", "蚌埠",
+                  32.94083, 117.36083, "CN", 3296408),
+    geonames_line(3117735, "Madrid", "Madrid", "Madrid,Мадрид", 40.4165, -3.70256, "ES", 3255944),
+    geonames_line(2968815, "Paris", "Paris", "Paris,Parigi", 48.85341, 2.3488, "FR", 2138551),
+    geonames_line(4717560, "Paris", "Paris", "", 33.66094, -95.55551, "US", 24171),
+]
+
+
+class TestCityCatalog:
+    """城市目录测试类。"""
+
+    def test_parse_geonames_filters_names(self):
+        """测试解析时只保留中文和拉丁字母别名。"""
+        rows = list(parse_geonames(GEONAMES_LINES, min_population=100000))
+        assert len(rows) == 6
+        beijing = rows[0]
+        assert beijing["external_id"] == 1816670
+        assert beijing["alternate_names"] == "Pekin,Peking,北京,北京市"
+        assert beijing["population"] == 18960744
+        assert beijing["timezone"] == "Asia/Shanghai"
+
+    def test_normalize_name(self):
+        """测试名称归一化忽略大小写、重音和分隔符。"""
+        assert normalize_name("Xi’an") == "xian"
+        assert normalize_name("São Paulo") == "saopaulo"
+        assert normalize_name("北京") == "北京"
+
+    def test_prefix_search_ranking(self):
+        """测试前缀查询：完全匹配优先，其余按人口排序，同一城市只出现一次。"""
+        catalog = CityCatalog()
+        catalog.build([
+            {"id": i + 1, **row} for i, row in enumerate(parse_geonames(GEONAMES_LINES))
+        ])
+
+        results = catalog.search("be")
+        assert [r["name"] for r in results] == ["Beijing", "Bengbu"]
+        assert results[0]["query"] == "Beijing,CN"
+
+        assert [r["name"] for r in catalog.search("北")] == ["Beijing"]
+        assert [r["name"] for r in catalog.search("pek")] == ["Beijing"]
+        assert catalog.search("xi a")[0]["query"] == "Xi'an,CN"
+
+        paris = catalog.search("Paris")
+        assert [r["country"] for r in paris] == ["FR", "US"]
+        assert catalog.search("pa", limit=1)[0]["country"] == "FR"
+        assert catalog.search("zzz") == []
+
+    def test_resolve(self):
+        """测试按名称精确查找城市。"""
+        catalog = CityCatalog()
+        catalog.build([
+            {"id": i + 1, **row} for i, row in enumerate(parse_geonames(GEONAMES_LINES))
+        ])
+        assert catalog.resolve("佛山")["query"] == "Foshan,CN"
+        assert catalog.resolve("佛") is None
+
+    @pytest.mark.asyncio
+    async def test_load_geonames(self, tmp_path):
+        """测试批量导入城市目录，重复导入时按external_id更新。"""
+        path = tmp_path / "cities.txt"
+        path.write_text("".join(GEONAMES_LINES), encoding="utf-8")
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        assert await load_geonames(str(path), factory, batch_size=3) == 7
+        assert await load_geonames(str(path), factory, min_population=1000000) == 6
+
+        catalog = CityCatalog()
+        async with factory() as session:
+            assert await catalog.load(session) == 7
+            result = await session.execute(select(City).where(City.external_id == 1790630))
+            assert result.scalars().one().ascii_name == "Xi'an"
+        assert catalog.search("西安")[0]["population"] == 12328200
+
+    def test_autocomplete_api(self, client):
+        """
+        测试城市自动补全API。
+
+        Args:
+            client: 测试客户端
+        """
+        city_catalog.build([
+            {"id": i + 1, **row} for i, row in enumerate(parse_geonames(GEONAMES_LINES))
+        ])
+        try:
+            response = client.get("/weather/cities/autocomplete?q=fo")
+            assert response.status_code == 200
+            data = response.json()
+            assert data[0]["name"] == "Foshan"
+            assert data[0]["query"] == "Foshan,CN"
+        finally:
+            city_catalog.build([])
+
+    def test_nearest_and_within(self):
+        """测试按坐标查找最近的城市和半径范围内的城市。"""
+        catalog = CityCatalog()
+        catalog.build([
+            {"id": i + 1, **row} for i, row in enumerate(parse_geonames(GEONAMES_LINES))
+        ])
+        # 天津附近：北京约110千米
+        nearest = catalog.nearest(39.13, 117.2, k=2)
+        assert [city["name"] for city in nearest] == ["Beijing", "Bengbu"]
+        assert 100 < nearest[0]["distance_km"] < 120
+        assert nearest[0]["query"] == "Beijing,CN"
+
+        # 巴黎与马德里相距约1050千米
+        assert [city["name"] for city in catalog.within(48.85, 2.35, 1100)] == ["Paris", "Madrid"]
+        assert [city["name"] for city in catalog.within(48.85, 2.35, 1100, limit=1)] == ["Paris"]
+        assert catalog.within(0, 0, 100) == []
+        assert CityCatalog().nearest(0, 0) == []
+
+    def test_nearby_api(self, client):
+        """
+        测试附近城市API附带每个城市的当前天气，单个城市获取失败时天气为空。
+
+        Args:
+            client: 测试客户端
+        """
+        async def fake_current_weather(self, city):
+            if city.startswith("Xi"):
+                raise RuntimeError("上游错误")
+            payload = copy.deepcopy(MOCK_CURRENT_WEATHER)
+            payload["name"] = city.split(",")[0]
+            return payload
+
+        city_catalog.build([
+            {"id": i + 1, **row} for i, row in enumerate(parse_geonames(GEONAMES_LINES))
+        ])
+        cache.invalidate(namespace="current")
+        try:
+            with mock.patch.object(WeatherService, "get_current_weather", fake_current_weather):
+                response = client.get("/weather/cities/nearest?lat=36&lon=112&k=2")
+                assert response.status_code == 200
+                data = response.json()
+                assert [city["name"] for city in data] == ["Xi’an", "Beijing"]
+                assert data[0]["current_weather"] is None
+                assert data[1]["current_weather"]["temperature"] == MOCK_CURRENT_WEATHER["main"]["temp"]
+
+                response = client.get("/weather/cities/within?lat=39.9&lon=116.4&radius_km=50&weather=false")
+                assert [city["name"] for city in response.json()] == ["Beijing"]
+                assert response.json()[0]["current_weather"] is None
+
+                assert client.get("/weather/cities/nearest?lat=91&lon=0").status_code == 422
+        finally:
+            city_catalog.build([])
+            cache.invalidate(namespace="current")
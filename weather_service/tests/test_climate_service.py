@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+气候基准服务单元测试模块。
+测试日序编号、常年值统计、由观测数据或CSV批量计算基准，以及内存基准的距平查询。
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import City, WeatherRecord, ClimateNormal
+from app.services.climate_service import (
+    ClimateBaselines, day_slot, compute_normals, build_climate_normals
+)
+from app.services.retention_service import run_retention
+
+
+async def make_session_factory():
+    """
+    创建基于内存SQLite的会话工厂。
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def add_city(factory, name: str = "Beijing", external_id: int = 1816670) -> int:
+    """写入一个城市并返回其ID。"""
+    async with factory() as session:
+        city = City(external_id=external_id, name=name, country="CN",
+                    latitude=39.9, longitude=116.4)
+        session.add(city)
+        await session.commit()
+        return city.id
+
+
+class TestClimateService:
+    """气候基准服务测试类。"""
+
+    def test_day_slot(self):
+        """测试日序按闰年日历编号，同一日期各年份一致。"""
+        assert day_slot(date(2023, 1, 1)) == 0
+        assert day_slot(date(2024, 2, 29)) == 59
+        assert day_slot(date(2023, 3, 1)) == day_slot(date(2024, 3, 1)) == 60
+        assert day_slot(date(2023, 12, 31)) == 365
+
+    def test_compute_normals(self):
+        """测试常年值统计：窗口跨年循环，分位数与numpy一致，样本不足的日序不输出。"""
+        rng = np.random.default_rng(0)
+        years = 30
+        slots = np.tile([0, 1, 365], years)
+        values = rng.normal(5.0, 2.0, len(slots))
+        city_ids = np.full(len(slots), 7)
+
+        normals = compute_normals(city_ids, slots, values, window=1, min_samples=years * 2)
+
+        # 日序1的窗口包含12月31日、1月1日和1月2日（跨年），日序365只包含12月31日一天
+        by_day = {int(d): i for i, d in enumerate(normals["day_of_year"])}
+        assert set(by_day) == {1, 2, 366}
+        first = by_day[1]
+        assert normals["city_id"][first] == 7
+        assert normals["sample_count"][first] == years * 3
+        assert normals["temperature_mean"][first] == pytest.approx(values.mean())
+        assert normals["temperature_std"][first] == pytest.approx(values.std(ddof=1))
+        assert normals["temperature_p10"][first] == pytest.approx(np.percentile(values, 10))
+        assert normals["temperature_p90"][first] == pytest.approx(np.percentile(values, 90))
+        assert normals["sample_count"][by_day[366]] == years * 2
+
+    def test_anomaly_lookup(self):
+        """测试按第三方城市ID或名称查询距平，没有基准时返回None。"""
+        baselines = ClimateBaselines()
+        normals = compute_normals(np.full(10, 3), np.full(10, day_slot(date(2020, 7, 1))),
+                                  np.arange(20.0, 30.0), window=0, min_samples=5)
+        baselines.build([{"id": 3, "external_id": 1816670, "name": "Beijing",
+                          "ascii_name": "Beijing", "country": "CN"}], normals)
+
+        anomaly = baselines.anomaly({"id": 1816670, "name": "Beijing", "country": "CN"},
+                                    date(2025, 7, 1), 30.5)
+        assert anomaly["normal"] == 24.5
+        assert anomaly["difference"] == 6.0
+        assert anomaly["z_score"] == pytest.approx(6.0 / np.std(np.arange(20.0, 30.0), ddof=1), abs=0.01)
+        assert anomaly["sample_count"] == 10
+
+        assert baselines.anomaly({"name": "beijing", "country": "cn"}, date(2025, 7, 1), 24.5)["difference"] == 0
+        assert baselines.anomaly({"id": 1, "name": "Shanghai", "country": "CN"}, date(2025, 7, 1), 20) is None
+        assert baselines.lookup({"id": 1816670}, date(2025, 7, 2)) is None
+
+    @pytest.mark.asyncio
+    async def test_build_from_observations(self):
+        """测试由观测数据计算基准：已汇总的日期读取天汇总，原始数据已清理也不影响结果。"""
+        factory = await make_session_factory()
+        city_id = await add_city(factory)
+        start = datetime(2025, 3, 1)
+        async with factory() as session:
+            for day in range(20):
+                for hour in (0, 12):
+                    session.add(WeatherRecord(
+                        city_id=city_id,
+                        observed_at=start + timedelta(days=day, hours=hour),
+                        temperature=10.0 + day + hour / 6,
+                    ))
+            await session.commit()
+
+        # 汇总并清理前10天的原始数据
+        await run_retention(factory, now=start + timedelta(days=40),
+                            retention_days={"weather_records": 30})
+        async with factory() as session:
+            remaining = await session.execute(select(func.count()).select_from(WeatherRecord))
+            assert remaining.scalar() == 20
+
+        report = await build_climate_normals(factory, window=2, min_samples=3)
+        assert report["days"] == 20
+        assert report["cities"] == 1
+
+        baselines = ClimateBaselines()
+        async with factory() as session:
+            assert await baselines.load(session) == 1
+        normal = baselines.lookup({"id": 1816670}, date(2030, 3, 10))
+        # 3月8日至12日的日平均气温为18、19、20、21、22度
+        assert normal["sample_count"] == 5
+        assert normal["temperature_mean"] == pytest.approx(20.0)
+        assert normal["temperature_p50"] == pytest.approx(20.0)
+        # 3月1日只有3月1日至3日的样本
+        assert baselines.lookup({"id": 1816670}, date(2030, 3, 1))["sample_count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_build_from_csv(self, tmp_path):
+        """测试由历史CSV计算基准，重新计算时替换该城市的旧基准。"""
+        factory = await make_session_factory()
+        city_id = await add_city(factory, name="Xi'an", external_id=1790630)
+        path = tmp_path / "daily.csv"
+        lines = ["date,city,country,temperature"]
+        for year in range(2000, 2020):
+            lines.append(f"{year}-01-15,xian,CN,{year - 2000}")
+            lines.append(f"{year}-01-15,Nowhere,CN,0")
+        path.write_text("\n".join(lines), encoding="utf-8")
+
+        for _ in range(2):
+            report = await build_climate_normals(factory, csv_path=str(path), window=0, min_samples=10)
+            assert report == {"days": 20, "cities": 1, "normals": 1}
+
+        async with factory() as session:
+            result = await session.execute(select(ClimateNormal))
+            normals = result.scalars().all()
+        assert len(normals) == 1
+        assert normals[0].city_id == city_id
+        assert normals[0].day_of_year == 15
+        assert normals[0].temperature_mean == pytest.approx(9.5)
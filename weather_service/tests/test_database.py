@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库引擎配置单元测试模块。
+测试引擎配置的选择和环境变量覆盖、连接上执行的PRAGMA设置，以及只读引擎禁止写入。
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import create_engines
+from app.database.database import ENGINE_PROFILES, get_profile
+
+# 覆盖引擎配置的环境变量
+OVERRIDE_VARIABLES = ["DB_ECHO", "DB_POOL_SIZE", "SQLITE_MMAP_SIZE", "SQLITE_CACHE_SIZE", "SQLITE_BUSY_TIMEOUT"]
+
+
+@pytest.fixture
+def clean_env(monkeypatch):
+    """清除覆盖引擎配置的环境变量。"""
+    for name in OVERRIDE_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+async def pragma(engine, name: str):
+    """读取一个新连接上的PRAGMA取值。"""
+    async with engine.connect() as conn:
+        return (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+
+
+class TestDatabaseProfiles:
+    """数据库引擎配置测试类。"""
+
+    def test_get_profile(self, clean_env):
+        """测试按名称选择配置，环境变量覆盖对应项且不修改内置配置，名称不存在时抛出ValueError。"""
+        assert get_profile("development")["echo"] is True
+        assert get_profile("production")["pragmas"]["journal_mode"] == "WAL"
+        with pytest.raises(ValueError):
+            get_profile("staging")
+
+        clean_env.setenv("DB_ECHO", "false")
+        clean_env.setenv("DB_POOL_SIZE", "2")
+        clean_env.setenv("SQLITE_BUSY_TIMEOUT", "100")
+        profile = get_profile("production")
+        assert profile["echo"] is False
+        assert profile["pool_size"] == 2
+        assert profile["pragmas"]["busy_timeout"] == 100
+        assert profile["pragmas"]["synchronous"] == "NORMAL"
+        assert ENGINE_PROFILES["production"]["pool_size"] == 5
+        assert ENGINE_PROFILES["production"]["pragmas"]["busy_timeout"] == 5000
+
+    @pytest.mark.asyncio
+    async def test_production_engines(self, clean_env, tmp_path):
+        """测试production配置在每个连接上设置PRAGMA，只读引擎为query_only且不能写入。"""
+        clean_env.setenv("SQLITE_CACHE_SIZE", "-2048")
+        clean_env.setenv("SQLITE_BUSY_TIMEOUT", "1234")
+        engine, read_engine = create_engines(f"sqlite+aiosqlite:///{tmp_path / 'prod.db'}", "production")
+        try:
+            assert read_engine is not engine
+            assert engine.echo is False
+            async with engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+
+            assert await pragma(engine, "journal_mode") == "wal"
+            assert await pragma(engine, "synchronous") == 1
+            assert await pragma(engine, "busy_timeout") == 1234
+            assert await pragma(engine, "temp_store") == 2
+            assert await pragma(engine, "cache_size") == -2048
+            assert await pragma(engine, "query_only") == 0
+            assert await pragma(read_engine, "busy_timeout") == 1234
+            assert await pragma(read_engine, "query_only") == 1
+
+            async with read_engine.connect() as conn:
+                assert (await conn.execute(text("SELECT COUNT(*) FROM items"))).scalar() == 0
+                with pytest.raises(OperationalError):
+                    await conn.execute(text("INSERT INTO items (id) VALUES (1)"))
+        finally:
+            await engine.dispose()
+            await read_engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_single_engine(self, clean_env, tmp_path):
+        """测试development配置和内存数据库只使用一个引擎，development不设置PRAGMA。"""
+        engine, read_engine = create_engines(f"sqlite+aiosqlite:///{tmp_path / 'dev.db'}", "development")
+        try:
+            assert read_engine is engine
+            assert engine.echo is True
+            assert await pragma(engine, "journal_mode") == "delete"
+        finally:
+            await engine.dispose()
+
+        engine, read_engine = create_engines("sqlite+aiosqlite:///:memory:", "production")
+        try:
+            assert read_engine is engine
+            assert await pragma(engine, "query_only") == 0
+        finally:
+            await engine.dispose()
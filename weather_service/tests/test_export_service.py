@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据导出服务单元测试模块。
+测试CSV、NDJSON、Parquet格式的分块流式导出、时间范围过滤和gzip压缩。
+"""
+
+import io
+import csv
+import json
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import City, QueryHistory, WeatherRecord
+from app.services.export_service import export_stream, export_filename
+
+
+BASE_TIME = datetime(2025, 4, 1, 0, 0, 0)
+
+
+async def make_session():
+    """
+    创建内存SQLite会话并写入25条查询历史和3条观测数据。
+
+    Returns:
+        AsyncSession: 数据库会话
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)()
+    for i in range(25):
+        session.add(QueryHistory(
+            city_name=f"城市{i % 3}",
+            query_time=BASE_TIME + timedelta(hours=i),
+            ip_address=None if i == 0 else "127.0.0.1",
+        ))
+    city = City(name="Beijing", country="CN", latitude=39.9, longitude=116.4)
+    session.add(city)
+    await session.flush()
+    for i in range(3):
+        session.add(WeatherRecord(
+            city_id=city.id,
+            observed_at=BASE_TIME + timedelta(hours=i),
+            temperature=20.0 + i,
+            extra_data={"feels_like": 19.0 + i},
+        ))
+    await session.commit()
+    return session
+
+
+async def collect(stream) -> bytes:
+    """读取完整字节流。"""
+    return b"".join([data async for data in stream])
+
+
+class TestExportService:
+    """数据导出服务测试类。"""
+
+    @pytest.mark.asyncio
+    async def test_csv_export_in_chunks(self):
+        """测试分块导出CSV，多块输出拼接后与完整数据一致。"""
+        session = await make_session()
+        chunks = [data async for data in export_stream(session, "history", "csv", chunk_size=4)]
+
+        # 表头一块，25行分为7块
+        assert len(chunks) == 8
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+        assert rows[0] == ["id", "city_name", "query_time", "ip_address"]
+        assert len(rows) == 26
+        assert rows[1] == ["1", "城市0", "2025-04-01T00:00:00", ""]
+        assert rows[-1][2] == "2025-04-02T00:00:00"
+
+    @pytest.mark.asyncio
+    async def test_ndjson_time_range(self):
+        """测试按时间范围导出NDJSON。"""
+        session = await make_session()
+        data = await collect(export_stream(
+            session, "history", "ndjson",
+            start=BASE_TIME + timedelta(hours=5), end=BASE_TIME + timedelta(hours=8),
+        ))
+        lines = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+        assert [line["id"] for line in lines] == [6, 7, 8]
+        assert lines[0]["query_time"] == "2025-04-01T05:00:00"
+
+    @pytest.mark.asyncio
+    async def test_observations_gzip(self):
+        """测试观测数据导出包含城市信息和扩展数据，gzip输出可以解压。"""
+        session = await make_session()
+        data = await collect(export_stream(session, "observations", "ndjson", gzip=True))
+        lines = [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines()]
+        assert len(lines) == 3
+        assert lines[0]["city_name"] == "Beijing"
+        assert lines[0]["country"] == "CN"
+        assert lines[2]["temperature"] == 22.0
+        assert lines[2]["extra_data"] == {"feels_like": 21.0}
+        assert export_filename("observations", "ndjson", gzip=True) == "observations.ndjson.gz"
+
+    @pytest.mark.asyncio
+    async def test_parquet_export(self):
+        """测试Parquet导出，每个数据块对应一个行组。"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        session = await make_session()
+        data = await collect(export_stream(session, "history", "parquet", chunk_size=10))
+
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+        assert parquet_file.metadata.num_row_groups == 3
+        table = parquet_file.read()
+        assert table.num_rows == 25
+        assert table.column("city_name")[1].as_py() == "城市1"
+        assert table.column("ip_address")[0].as_py() is None
+        assert table.column("query_time")[24].as_py() == datetime(2025, 4, 2, 0, 0, 0)
+
+    def test_unsupported_format(self):
+        """测试不支持的数据集和格式。"""
+        with pytest.raises(ValueError):
+            export_stream(None, "unknown", "csv")
+        with pytest.raises(ValueError):
+            export_stream(None, "history", "xml")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预报聚合单元测试模块。
+测试3小时预报点按城市当地日期分组的每日统计、众数选择，以及每份预报只汇总一次。
+"""
+
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from app.services.forecast_aggregation import aggregate_daily, daily_records, daily_forecast, group_mode
+from app.services.forecast_store import CompactForecast
+from app.services.weather_service import WeatherService
+from tests.test_forecast_store import make_forecast_payload
+
+
+class TestForecastAggregation:
+    """预报聚合测试类。"""
+
+    def test_aggregate_daily(self):
+        """测试预报按城市当地日期分组：北京时间（UTC+8）的日界与UTC不同。"""
+        forecast = CompactForecast.from_payload(make_forecast_payload(points=16))
+        days = daily_records(aggregate_daily(forecast))
+
+        # 1617260400为北京时间2021-04-01 15:00，16个3小时预报点覆盖3个当地日期
+        assert [day["date"] for day in days] == ["2021-04-01", "2021-04-02", "2021-04-03"]
+        first = days[0]
+        temps = [20.5 + i % 8 for i in range(3)]
+        assert first["mean_temp"] == round(sum(temps) / 3, 2)
+        assert first["min_temp"] == 19.25
+        assert first["max_temp"] == 21.75 + 2
+        # 当天3个预报点中1个为小雨，2个为晴
+        assert first["weather_description"] == "晴"
+        assert first["precipitation"] == 0
+        assert days[1]["weather_description"] == "晴"
+
+    def test_timezone_offset(self):
+        """测试同一组预报点在不同时区分到不同的当地日期。"""
+        payload = make_forecast_payload(points=8)
+        payload["city"]["timezone"] = 0
+        assert [day["date"] for day in daily_records(aggregate_daily(CompactForecast.from_payload(payload)))] == [
+            "2021-04-01", "2021-04-02"
+        ]
+        payload["city"]["timezone"] = -5 * 3600
+        days = daily_records(aggregate_daily(CompactForecast.from_payload(payload)))
+        # UTC-5：第一个预报点为当地2021-04-01 02:00，8个点都在当天
+        assert [day["date"] for day in days] == ["2021-04-01"]
+        assert days[0]["max_temp"] == 21.75 + 7
+
+    def test_group_mode(self):
+        """测试众数次数相同时取组内最先出现的值。"""
+        groups = np.array([0, 0, 0, 1, 1, 1, 1])
+        values = np.array(["b", "a", "a", "c", "b", "b", "c"])
+        assert group_mode(groups, values, 2).tolist() == ["a", "c"]
+
+    def test_empty_forecast(self):
+        """测试没有预报点时返回空列表。"""
+        forecast = CompactForecast.from_payload({"city": {"timezone": 0}, "list": []})
+        assert daily_records(aggregate_daily(forecast)) == []
+
+    @pytest.mark.asyncio
+    async def test_daily_forecast_computed_once(self):
+        """测试每份预报只汇总一次，不同天数的请求共享结果。"""
+        forecast = CompactForecast.from_payload(make_forecast_payload())
+        service = WeatherService(api_key="test")
+        with mock.patch.object(WeatherService, "get_compact_forecast", mock.AsyncMock(return_value=forecast)), \
+                mock.patch("app.services.forecast_aggregation.aggregate_daily", wraps=aggregate_daily) as aggregate:
+            three = await service.get_daily_forecast("Beijing", 3)
+            five = await service.get_daily_forecast("Beijing", 5)
+        assert aggregate.call_count == 1
+        assert [day["date"] for day in three["daily"]] == [day["date"] for day in five["daily"]][:3]
+        assert five["city"]["name"] == forecast.city["name"]
+        assert daily_forecast(forecast) is daily_forecast(forecast)
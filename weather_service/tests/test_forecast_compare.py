@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多城市预报对比单元测试模块。
+测试并列和缺失值的排名、矩阵统计、不同时区城市的日期对齐，以及并发获取和失败城市的处理。
+"""
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.services.forecast_store import CompactForecast
+from app.services.forecast_aggregation import daily_forecast
+from app.services.forecast_compare import (
+    rank_matrix, compare_matrix, stack_daily, compare_forecasts, parse_compare_metrics
+)
+from tests.test_forecast_store import make_forecast_payload
+
+
+def make_forecast(name: str, timezone: int = 28800, offset: float = 0.0) -> CompactForecast:
+    """
+    创建指定城市、时区的紧凑预报，所有温度加上offset。
+
+    Args:
+        name: 城市名称
+        timezone: 时区偏移（秒）
+        offset: 温度偏移
+
+    Returns:
+        CompactForecast: 紧凑预报
+    """
+    payload = make_forecast_payload()
+    payload["city"]["name"] = name
+    payload["city"]["timezone"] = timezone
+    for item in payload["list"]:
+        for key in ("temp", "temp_min", "temp_max", "feels_like"):
+            item["main"][key] += offset
+    return CompactForecast.from_payload(payload)
+
+
+class TestForecastCompare:
+    """多城市预报对比测试类。"""
+
+    def test_rank_matrix(self):
+        """测试按列排名：并列名次相同，NaN不参与排名，支持升序。"""
+        matrix = np.array([[1.0, 5.0, np.nan],
+                           [3.0, 5.0, 2.0],
+                           [3.0, np.nan, 1.0]])
+        assert rank_matrix(matrix).tolist() == [[3, 1, 0], [1, 1, 1], [1, 0, 2]]
+        assert rank_matrix(matrix, descending=False).tolist() == [[1, 1, 0], [2, 1, 2], [2, 0, 1]]
+        assert rank_matrix(np.empty((0, 3))).shape == (0, 3)
+
+    def test_compare_matrix(self):
+        """测试每天的跨城市统计和每个城市的跨日期统计忽略缺失值。"""
+        matrix = np.array([[10.0, 20.0, np.nan],
+                           [14.0, 16.0, 30.0],
+                           [np.nan, np.nan, np.nan]])
+        result = compare_matrix(matrix)
+        assert result["values"][0] == [10.0, 20.0, None]
+        assert result["ranks"] == [[2, 1, None], [1, 2, 1], [None, None, None]]
+        daily = result["daily"]
+        assert daily["mean"] == [12.0, 18.0, 30.0]
+        assert daily["std"] == [2.0, 2.0, 0.0]
+        assert daily["spread"] == [4.0, 4.0, 0.0]
+        assert daily["highest"] == [1, 0, 1]
+        assert daily["lowest"] == [0, 1, 1]
+        city = result["city"]
+        assert city["mean"] == [15.0, 20.0, None]
+        assert city["min"] == [10.0, 14.0, None]
+        assert city["rank"] == [2, 1, None]
+
+    def test_stack_daily(self):
+        """测试不同时区的城市按当地日期的并集对齐，没有预报的日期为NaN。"""
+        east = make_forecast("Beijing")
+        # UTC-10的城市第一天为3月31日，与东八区城市的日期错开一天
+        west = make_forecast("Honolulu", timezone=-36000, offset=-5)
+        stacked = stack_daily([east, west], 2, ["max_temp"])
+        dates = sorted({day["date"] for forecast in (east, west) for day in daily_forecast(forecast)[:2]})
+        assert stacked["dates"].tolist() == dates == ["2021-03-31", "2021-04-01", "2021-04-02"]
+        matrix = stacked["max_temp"]
+        assert matrix.shape == (2, len(dates))
+        for row, forecast in enumerate((east, west)):
+            by_date = {day["date"]: day["max_temp"] for day in daily_forecast(forecast)[:2]}
+            for col, value in enumerate(dates):
+                if value in by_date:
+                    assert matrix[row, col] == pytest.approx(by_date[value], abs=0.01)
+                else:
+                    assert np.isnan(matrix[row, col])
+
+    @pytest.mark.asyncio
+    async def test_compare_forecasts(self):
+        """测试重复城市只获取一次，失败的城市进入errors而不进入矩阵，指标不支持时报错。"""
+        forecasts = {"Beijing": make_forecast("Beijing", offset=2), "Shanghai": make_forecast("Shanghai")}
+        fetched = []
+
+        async def fetch_forecast(city):
+            fetched.append(city)
+            if city not in forecasts:
+                raise HTTPException(status_code=404, detail="城市不存在")
+            return forecasts[city]
+
+        result = await compare_forecasts(["Shanghai", "Nowhere", "Beijing", "Shanghai"], fetch_forecast,
+                                         days=3, metrics=["max_temp", "min_temp"])
+        assert sorted(fetched) == ["Beijing", "Nowhere", "Shanghai"]
+        assert [city["name"] for city in result["cities"]] == ["Shanghai", "Beijing"]
+        assert result["errors"] == {"Nowhere": "城市不存在"}
+        assert len(result["dates"]) == 3
+        max_temp = result["matrices"]["max_temp"]
+        assert max_temp["daily"]["highest"] == [1, 1, 1]
+        assert max_temp["daily"]["spread"] == [2.0, 2.0, 2.0]
+        assert max_temp["city"]["rank"] == [2, 1]
+
+        assert parse_compare_metrics(None) == ["max_temp", "min_temp"]
+        with pytest.raises(ValueError):
+            await compare_forecasts(["Beijing"], fetch_forecast, metrics=["visibility"])
+        with pytest.raises(ValueError):
+            await compare_forecasts([" "], fetch_forecast)
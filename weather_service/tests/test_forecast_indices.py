@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+派生气象指标单元测试模块。
+测试炎热指数、风寒温度、绝对湿度和舒适度等级的公式，以及预报派生指标的按日汇总和缓存。
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.meteo import (
+    absolute_humidity, heat_index, wind_chill, feels_like, comfort_class, derived_indices
+)
+from app.services.forecast_store import CompactForecast
+from app.services.forecast_aggregation import daily_forecast
+from app.services.forecast_indices import current_indices, daily_indices, point_indices
+from tests.test_forecast_store import make_forecast_payload
+
+
+class TestForecastIndices:
+    """派生气象指标测试类。"""
+
+    def test_formulas(self):
+        """测试公式与NWS/加拿大环境部的参考值一致，缺失值结果为NaN。"""
+        # NWS炎热指数表：90°F、70%为106°F；80°F、40%时使用简化公式，约80°F；低于80°F时等于气温
+        assert heat_index([32.22, 26.67, 21.11, -5], [70, 40, 50, 80]) == pytest.approx(
+            [41.1, 26.7, 21.11, -5], abs=0.3)
+        # 寒冷时不使用简化公式的外推值（-5°C时约为-8.1°C）
+        assert heat_index([-5.0], [80.0]).tolist() == [-5.0]
+        # 风寒指数表：-10°C、风速20km/h时为-18°C；风速过小或气温过高时等于气温
+        assert wind_chill([-10, -10, 15], [20 / 3.6, 1, 10]) == pytest.approx([-17.9, -10, 15], abs=0.1)
+        # 20°C饱和空气的绝对湿度约为17.3g/m³
+        assert absolute_humidity([20.0], [100.0]) == pytest.approx([17.3], abs=0.1)
+        assert np.isnan(heat_index([np.nan], [50])[0])
+
+        codes = comfort_class([-20, 0, 10, 20, 20, 26, 35, np.nan], [-25, -5, 0, 10, 22, 22, 25, np.nan])
+        assert codes.tolist() == [0, 1, 2, 3, 5, 5, 6, -1]
+
+        indices = derived_indices([35.0, -5.0], [60.0, 50.0], [1.0, 8.0])
+        # 炎热时体感温度为炎热指数，寒冷有风时为风寒温度
+        assert indices["feels_like"].tolist() == [indices["heat_index"][0], indices["wind_chill"][1]]
+        assert feels_like([35.0, -5.0], [60.0, 50.0], [1.0, 8.0]).tolist() == indices["feels_like"].tolist()
+
+    def test_current_indices(self):
+        """测试单个观测的派生指标，缺少湿度时相关指标为空。"""
+        indices = current_indices(25.5, 80.0, 5.2)
+        assert indices["dew_point"] == pytest.approx(21.79, abs=0.01)
+        assert indices["comfort"] == "闷热"
+        indices = current_indices(-5.0, None, 8.0)
+        assert indices["dew_point"] is None and indices["absolute_humidity"] is None
+        assert indices["wind_chill"] < -5 and indices["comfort"] == "严寒"
+
+    def test_daily_indices(self):
+        """测试派生指标按当地日期汇总、与每日预报逐日对应，并随预报对象缓存。"""
+        forecast = CompactForecast.from_payload(make_forecast_payload())
+        daily = daily_indices(forecast)
+        assert len(daily) == len(daily_forecast(forecast))
+        assert daily_indices(forecast) is daily
+
+        points = point_indices(forecast)
+        assert point_indices(forecast) is points
+        assert len(points["dew_point"]) == len(forecast)
+        # 第一天（东八区）的预报点
+        first_day = slice(0, 3)
+        assert daily[0]["feels_like_min"] == pytest.approx(points["feels_like"][first_day].min(), abs=0.01)
+        assert daily[0]["dew_point"] == pytest.approx(points["dew_point"][first_day].mean(), abs=0.01)
+        assert all(day["comfort"] in ("凉爽", "舒适", "温暖", "闷热") for day in daily)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预报重采样单元测试模块。
+测试时间间隔和时间点解析、线性与风向插值、只有一个预报点时的取值、降水强度换算、按间隔结果的缓存，以及批量重采样。
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.services.forecast_store import CompactForecast
+from app.services.forecast_resample import (
+    parse_interval, parse_times, interval_times, resample, resample_forecast, resample_cities
+)
+from tests.test_forecast_store import make_forecast_payload
+
+# make_forecast_payload的第一个预报点：2021-04-01 07:00 UTC
+START = 1617260400
+
+
+def make_forecast() -> CompactForecast:
+    """
+    创建风向在350°和10°之间交替、第二个预报点有降水的紧凑预报。
+
+    Returns:
+        CompactForecast: 紧凑预报
+    """
+    payload = make_forecast_payload()
+    for index, item in enumerate(payload["list"]):
+        item["wind"]["deg"] = 350 if index % 2 == 0 else 10
+    payload["list"][1]["rain"] = {"3h": 3.0}
+    return CompactForecast.from_payload(payload)
+
+
+class TestForecastResample:
+    """预报重采样测试类。"""
+
+    def test_parse_arguments(self):
+        """测试时间间隔和时间点解析。"""
+        assert parse_interval("1h") == 3600
+        assert parse_interval("30m") == 1800
+        assert parse_interval("90min") == 5400
+        for value in ("", "2d", "1m", "h"):
+            with pytest.raises(ValueError):
+                parse_interval(value)
+
+        stamps = parse_times(["2021-04-01T08:00:00Z", "2021-04-01T16:00:00+08:00", "2021-04-01T08:00:00",
+                              str(START), START, datetime(2021, 4, 1, 8, tzinfo=timezone.utc)])
+        assert stamps.tolist() == [START + 3600] * 3 + [START] * 2 + [START + 3600]
+        with pytest.raises(ValueError):
+            parse_times(["tomorrow"])
+
+    def test_resample_interpolation(self):
+        """测试数值列线性插值、风向跨越0°插值、降水按3小时时段折算，超出范围为空。"""
+        forecast = make_forecast()
+        times = interval_times(forecast, 3600)
+        assert times[0] == START and times[-1] == forecast.dt.max()
+        assert len(times) == (forecast.dt.max() - START) // 3600 + 1
+
+        result = resample(forecast, np.array([START, START + 3600, START + 5400, START - 1]))
+        temperature = forecast.column("temp")
+        expected = temperature[0] + (temperature[1] - temperature[0]) * np.array([0, 1 / 3, 0.5])
+        assert result["temp"][:3] == pytest.approx(expected, abs=1e-4)
+        assert np.isnan(result["temp"][3])
+        # 350°和10°之间插值经过0°，而不是经过180°
+        assert result["wind_deg"][0] == pytest.approx(350)
+        assert min(result["wind_deg"][2], 360 - result["wind_deg"][2]) == pytest.approx(0, abs=1e-6)
+        assert result["wind_deg"][1] == pytest.approx(356.64, abs=0.01)
+        # 第二个预报点之前3小时降水3毫米，即每小时1毫米
+        assert result["precipitation_rate"][:3].tolist() == [0.0, 1.0, 1.0]
+        assert result["weather_description"][3] is None
+
+    def test_resample_single_point(self):
+        """测试只有一个预报点时，只有与它相同的时间点有值，其余为空。"""
+        forecast = CompactForecast.from_payload(make_forecast_payload(points=1))
+        assert interval_times(forecast, 3600).tolist() == [START]
+
+        result = resample(forecast, np.array([START, START + 3600, START - 3600]))
+        assert result["temp"][0] == pytest.approx(forecast.column("temp")[0])
+        assert np.isnan(result["temp"][1:]).all()
+        assert result["weather_description"].tolist() == ["小雨", None, None]
+        assert resample_forecast(forecast, "1h")[0]["temp"] == pytest.approx(20.5)
+
+    def test_resample_forecast_cached(self):
+        """测试按间隔的结果随预报缓存，指定时间点时每次计算，缺少参数时报错。"""
+        forecast = make_forecast()
+        hourly = resample_forecast(forecast, "1h")
+        assert resample_forecast(forecast, "60m") is hourly
+        assert hourly[0]["dt"] == datetime.fromtimestamp(START, tz=timezone.utc)
+        assert set(hourly[0]) >= {"temp", "pressure", "wind_deg", "precipitation_rate", "weather_icon"}
+
+        points = resample_forecast(forecast, times=["2021-04-01T08:00:00Z", "2020-01-01T00:00:00Z"])
+        assert points[0]["temp"] == hourly[1]["temp"]
+        assert points[1]["temp"] is None
+        with pytest.raises(ValueError):
+            resample_forecast(forecast)
+
+    @pytest.mark.asyncio
+    async def test_resample_cities(self):
+        """测试批量重采样按输入顺序返回，单个城市失败不影响其他城市，参数错误时不获取预报。"""
+        forecast = make_forecast()
+        fetched = []
+
+        async def fetch_forecast(city):
+            fetched.append(city)
+            if city == "Nowhere":
+                raise HTTPException(status_code=404, detail="城市不存在")
+            return forecast
+
+        results = await resample_cities(["Beijing", "Nowhere", "Shanghai"], fetch_forecast, "3h")
+        assert [item["city"] for item in results] == ["Beijing", "Nowhere", "Shanghai"]
+        assert results[0]["forecast"]["interval"] == "3h"
+        # 时间点按UTC整3小时对齐，第一个预报点07:00之后从09:00开始
+        assert results[0]["forecast"]["points"][0]["dt"].hour == 9
+        assert len(results[0]["forecast"]["points"]) == len(forecast) - 1
+        assert results[1] == {"city": "Nowhere", "forecast": None, "error": "城市不存在"}
+
+        results = await resample_cities(["Beijing"], fetch_forecast, times=[START + 1800])
+        assert results[0]["forecast"]["interval"] is None
+        assert len(results[0]["forecast"]["points"]) == 1
+
+        fetched.clear()
+        with pytest.raises(ValueError):
+            await resample_cities(["Beijing"], fetch_forecast, "abc")
+        assert fetched == []
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预报紧凑存储单元测试模块。
+测试列式预报的构建、还原与内存占用。
+"""
+
+import copy
+
+import numpy as np
+
+from app.services.cache_service import _deep_sizeof
+from app.services.forecast_store import CompactForecast, conditions
+
+
+def make_forecast_payload(points: int = 40, start: int = 1617260400) -> dict:
+    """
+    构造测试用的预报响应数据。
+
+    Args:
+        points: 预报点数量
+        start: 第一个预报点的时间戳
+
+    Returns:
+        dict: 与第三方API格式一致的预报字典
+    """
+    items = []
+    for i in range(points):
+        items.append({
+            "dt": start + i * 10800,
+            "main": {
+                "temp": 20.5 + i % 8,
+                "feels_like": 20.0 + i % 8,
+                "temp_min": 19.25 + i % 8,
+                "temp_max": 21.75 + i % 8,
+                "pressure": 1013,
+                "sea_level": 1013,
+                "grnd_level": 1008,
+                "humidity": 60 + i % 5,
+                "temp_kf": 0.5,
+            },
+            "weather": [
+                {
+                    "id": 800 if i % 3 else 500,
+                    "main": "Clear" if i % 3 else "Rain",
+                    "description": "晴" if i % 3 else "小雨",
+                    "icon": "01d" if i % 3 else "10d",
+                }
+            ],
+            "clouds": {"all": 10},
+            "wind": {"speed": 3.6, "deg": (i * 45) % 360, "gust": 5.1},
+            "visibility": 10000,
+            "pop": 0.2,
+            "sys": {"pod": "d"},
+            "dt_txt": "",
+        })
+    return {
+        "cod": "200",
+        "message": 0,
+        "cnt": points,
+        "list": items,
+        "city": {"id": 1816670, "name": "Beijing", "country": "CN", "timezone": 28800},
+    }
+
+
+class TestCompactForecast:
+    """紧凑预报测试类。"""
+
+    def test_round_trip(self):
+        """测试构建后还原的条目与原始数据一致。"""
+        payload = make_forecast_payload()
+        forecast = CompactForecast.from_payload(payload)
+
+        assert len(forecast) == 40
+        restored = forecast.to_payload()
+        for original, item in zip(payload["list"], restored["list"]):
+            assert item["dt"] == original["dt"]
+            assert item["main"]["temp_min"] == original["main"]["temp_min"]
+            assert item["main"]["humidity"] == original["main"]["humidity"]
+            assert item["wind"]["deg"] == original["wind"]["deg"]
+            assert item["weather"][0] == original["weather"][0]
+            assert "rain" not in item
+        assert restored["city"]["name"] == "Beijing"
+
+    def test_partial_view_and_columns(self):
+        """测试按点数还原与列访问。"""
+        forecast = CompactForecast.from_payload(make_forecast_payload())
+
+        assert forecast.to_payload(points=8)["cnt"] == 8
+        assert forecast.to_payload(points=100)["cnt"] == 40
+        assert np.allclose(forecast.column("temp")[:3], [20.5, 21.5, 22.5])
+        assert forecast.timezone_offset == 28800
+
+    def test_conditions_are_interned(self):
+        """测试天气状况在预报之间共享编码。"""
+        first = CompactForecast.from_payload(make_forecast_payload())
+        before = len(conditions)
+        second = CompactForecast.from_payload(make_forecast_payload(start=1617300000))
+
+        assert len(conditions) == before
+        assert set(np.unique(first.codes)) == set(np.unique(second.codes))
+
+    def test_memory_footprint(self):
+        """测试紧凑预报占用的内存远小于原始字典。"""
+        payload = make_forecast_payload()
+        forecast = CompactForecast.from_payload(copy.deepcopy(payload))
+
+        assert _deep_sizeof(forecast) * 4 < _deep_sizeof(payload)
+
+    def test_memo(self):
+        """测试派生结果只计算一次。"""
+        forecast = CompactForecast.from_payload(make_forecast_payload(points=8))
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return "daily"
+
+        assert forecast.memo("daily", factory) == "daily"
+        assert forecast.memo("daily", factory) == "daily"
+        assert len(calls) == 1
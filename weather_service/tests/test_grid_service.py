@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+区域网格服务单元测试模块。
+测试网格坐标、反距离加权插值，以及站点值优先使用已保存观测、只为缺少观测的城市获取天气和网格缓存。
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import City, WeatherRecord
+from app.services.cache_service import cache
+from app.services.city_catalog import city_catalog
+from app.services.grid_service import grid_axes, idw_grid, build_grid
+
+
+async def make_session_factory():
+    """
+    创建基于内存SQLite的会话工厂。
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class TestGridService:
+    """区域网格服务测试类。"""
+
+    def test_grid_axes(self):
+        """测试网格坐标包含两端，范围无效或网格过大时报错。"""
+        latitudes, longitudes = grid_axes(30, 110, 31, 112, 0.5)
+        assert latitudes.tolist() == [30, 30.5, 31]
+        assert longitudes.tolist() == [110, 110.5, 111, 111.5, 112]
+        with pytest.raises(ValueError):
+            grid_axes(31, 110, 30, 112, 0.5)
+        with pytest.raises(ValueError):
+            grid_axes(-80, -170, 80, 170, 0.01)
+
+    def test_idw_grid(self):
+        """测试插值：站点处取站点值，两站点中点取平均，结果在站点值范围内。"""
+        grid = idw_grid(np.array([30.0, 30.0]), np.array([110.0, 112.0]), np.array([0.0, 10.0]),
+                        np.array([30.0]), np.array([110.0, 111.0, 112.0]))
+        assert grid.shape == (1, 3)
+        assert grid[0].tolist() == pytest.approx([0.0, 5.0, 10.0])
+
+        rng = np.random.default_rng(0)
+        values = rng.uniform(0, 30, 20)
+        latitudes, longitudes = grid_axes(20, 100, 45, 125, 0.125)
+        grid = idw_grid(rng.uniform(20, 45, 20), rng.uniform(100, 125, 20), values, latitudes, longitudes)
+        assert grid.shape == (201, 201)
+        assert values.min() <= grid.min() and grid.max() <= values.max()
+
+    @pytest.mark.asyncio
+    async def test_build_grid_stations(self):
+        """测试有近期观测的城市不请求天气，过期观测的城市才请求，同一时间桶内命中缓存。"""
+        cache.invalidate(namespace="grid")
+        factory = await make_session_factory()
+        now = datetime.utcnow()
+        async with factory() as session:
+            cities = [
+                City(name="Beijing", country="CN", latitude=39.9, longitude=116.4, population=3),
+                City(name="Tianjin", country="CN", latitude=39.1, longitude=117.2, population=2),
+                City(name="Shijiazhuang", country="CN", latitude=38.0, longitude=114.5, population=1),
+                City(name="Shanghai", country="CN", latitude=31.2, longitude=121.5, population=4),
+            ]
+            session.add_all(cities)
+            await session.flush()
+            session.add(WeatherRecord(city_id=cities[0].id, observed_at=now - timedelta(minutes=5), temperature=20.0))
+            session.add(WeatherRecord(city_id=cities[1].id, observed_at=now - timedelta(minutes=50), temperature=22.0))
+            # 过期的观测不使用
+            session.add(WeatherRecord(city_id=cities[2].id, observed_at=now - timedelta(days=1), temperature=0.0))
+            await session.commit()
+            city_catalog.build([
+                {"id": city.id, "name": city.name, "country": city.country, "latitude": city.latitude,
+                 "longitude": city.longitude, "population": city.population}
+                for city in cities
+            ])
+
+        fetched = []
+
+        async def fetch_current(query):
+            fetched.append(query)
+            return {"temperature": 24.0}
+
+        try:
+            async with factory() as session:
+                grid = await build_grid(session, 37, 113, 41, 118, 0.5, "temperature", fetch_current)
+                assert fetched == ["Shijiazhuang,CN"]
+                assert {station["name"]: (station["value"], station["source"]) for station in grid["stations"]} == {
+                    "Beijing": (20.0, "stored"), "Tianjin": (22.0, "stored"), "Shijiazhuang": (24.0, "current"),
+                }
+                assert len(grid["values"]) == len(grid["latitudes"]) == 9
+                assert len(grid["values"][0]) == len(grid["longitudes"]) == 11
+                assert all(20.0 <= value <= 24.0 for row in grid["values"] for value in row)
+
+                assert await build_grid(session, 37, 113, 41, 118, 0.5, "temperature", fetch_current) is grid
+                assert len(fetched) == 1
+
+                # 范围内没有城市
+                assert await build_grid(session, 0, 0, 1, 1, 0.5, "temperature", fetch_current) is None
+                with pytest.raises(ValueError):
+                    await build_grid(session, 37, 113, 41, 118, 0.5, "visibility", fetch_current)
+        finally:
+            city_catalog.build([])
+            cache.invalidate(namespace="grid")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+查询历史服务单元测试模块。
+测试游标编解码、键集分页和过滤条件。
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import QueryHistory
+from app.services.batch_writer import bulk_insert_handler
+from app.utils.time_buckets import naive_utc
+from app.services.history_service import (
+    encode_cursor, decode_cursor, query_history_page, HistoryRingBuffer
+)
+
+
+BASE_TIME = datetime(2025, 4, 1, 12, 0, 0)
+
+
+async def make_session():
+    """
+    创建内存SQLite会话并写入测试数据。
+
+    每分钟一条记录，城市和IP轮换，另有两条与第10条同一时间的记录用于测试同时间排序。
+
+    Returns:
+        AsyncSession: 数据库会话
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)()
+    for i in range(30):
+        session.add(QueryHistory(
+            city_name=["Beijing", "Shanghai", "Guangzhou"][i % 3],
+            query_time=BASE_TIME + timedelta(minutes=i),
+            ip_address=f"10.0.0.{i % 2}",
+        ))
+    for _ in range(2):
+        session.add(QueryHistory(
+            city_name="Beijing",
+            query_time=BASE_TIME + timedelta(minutes=10),
+            ip_address="10.0.0.9",
+        ))
+    await session.commit()
+    return session
+
+
+class TestHistoryService:
+    """查询历史服务测试类。"""
+    
+    def test_cursor_round_trip(self):
+        """测试游标编解码。"""
+        cursor = encode_cursor(BASE_TIME, 42)
+        
+        assert decode_cursor(cursor) == (BASE_TIME, 42)
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+    
+    @pytest.mark.asyncio
+    async def test_pages_cover_all_rows_once(self):
+        """测试逐页翻页不重复、不遗漏，且按时间倒序。"""
+        session = await make_session()
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = await query_history_page(session, limit=7, cursor=cursor)
+            seen.extend(rows)
+            if cursor is None:
+                break
+        
+        assert len(seen) == 32
+        assert len({row.id for row in seen}) == 32
+        keys = [(row.query_time, row.id) for row in seen]
+        assert keys == sorted(keys, reverse=True)
+        await session.close()
+    
+    @pytest.mark.asyncio
+    async def test_filters(self):
+        """测试城市、IP和时间范围过滤。"""
+        session = await make_session()
+        
+        rows, _ = await query_history_page(session, limit=100, city="Shanghai")
+        assert len(rows) == 10
+        assert all(row.city_name == "Shanghai" for row in rows)
+        
+        rows, _ = await query_history_page(session, limit=100, ip_address="10.0.0.9")
+        assert len(rows) == 2
+        
+        rows, _ = await query_history_page(
+            session, limit=100,
+            start=BASE_TIME + timedelta(minutes=5),
+            end=BASE_TIME + timedelta(minutes=8),
+        )
+        assert [row.query_time.minute for row in rows] == [7, 6, 5]
+        await session.close()
+    
+    @pytest.mark.asyncio
+    async def test_index_is_used(self):
+        """测试过滤分页查询使用复合索引而非全表扫描。"""
+        session = await make_session()
+        
+        plan = await session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM query_history WHERE city_name = 'Beijing' "
+            "AND (query_time, id) < ('2025-04-01 12:10:00.000000', 5) "
+            "ORDER BY query_time DESC, id DESC LIMIT 21"
+        ))
+        detail = " ".join(str(row[-1]) for row in plan.all())
+        
+        assert "ix_query_history_city_time_id" in detail
+        assert "TEMP B-TREE" not in detail
+        await session.close()
+
+
+
+def as_keys(rows) -> list:
+    """将ORM对象或字典形式的记录转换为(查询时间, ID)列表。"""
+    return [
+        (row["query_time"], row["id"]) if isinstance(row, dict) else (row.query_time, row.id)
+        for row in rows
+    ]
+
+
+class TestHistoryRingBuffer:
+    """查询历史环形缓冲区测试类。"""
+    
+    @pytest.mark.asyncio
+    async def test_unprimed_buffer_falls_back(self):
+        """测试未从数据库加载的缓冲区不返回结果。"""
+        buffer = HistoryRingBuffer(capacity=10)
+        buffer.extend([{"id": 1, "city_name": "Beijing", "query_time": BASE_TIME, "ip_address": None}])
+        
+        assert buffer.recent(5) is None
+        assert buffer.stats["misses"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_matches_database(self):
+        """测试缓冲区结果与数据库查询一致，超出缓冲区的窗口回退到数据库。"""
+        session = await make_session()
+        full = HistoryRingBuffer(capacity=100)
+        partial = HistoryRingBuffer(capacity=10)
+        assert await full.prime(session) == 32
+        assert await partial.prime(session) == 10
+        assert full.complete and not partial.complete
+        
+        cases = [
+            {"limit": 5},
+            {"limit": 3, "city": "Beijing"},
+            {"limit": 100, "ip_address": "10.0.0.9"},
+            {"limit": 100, "start": BASE_TIME + timedelta(minutes=25)},
+            {"limit": 100, "city": "Shanghai"},
+        ]
+        for case in cases:
+            expected, _ = await query_history_page(session, **case)
+            assert as_keys(full.recent(**case)) == as_keys(expected)
+            
+            partial_rows = partial.recent(**case)
+            if partial_rows is not None:
+                assert as_keys(partial_rows) == as_keys(expected)
+        
+        # 带时区的时间范围转换为UTC后，缓冲区与数据库结果一致
+        beijing = timezone(timedelta(hours=8))
+        start = naive_utc((BASE_TIME + timedelta(hours=8, minutes=25)).replace(tzinfo=beijing))
+        expected, _ = await query_history_page(session, limit=100, start=start)
+        assert len(expected) == 5
+        assert as_keys(full.recent(limit=100, start=start)) == as_keys(expected)
+        
+        # 需要的记录超出缓冲区范围
+        assert partial.recent(limit=20) is None
+        assert partial.recent(limit=100, city="Shanghai") is None
+        await session.close()
+    
+    @pytest.mark.asyncio
+    async def test_pages_match_database(self):
+        """测试从缓冲区翻页的结果和游标与数据库一致。"""
+        session = await make_session()
+        buffer = HistoryRingBuffer(capacity=100)
+        await buffer.prime(session)
+        
+        cursor = None
+        while True:
+            rows, next_cursor = buffer.page(7, cursor=cursor)
+            expected, expected_cursor = await query_history_page(session, limit=7, cursor=cursor)
+            assert as_keys(rows) == as_keys(expected)
+            assert next_cursor == expected_cursor
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+        await session.close()
+    
+    @pytest.mark.asyncio
+    async def test_filled_on_write(self):
+        """测试批量写入成功后新记录带数据库ID进入缓冲区，容量满时淘汰最早的记录。"""
+        session = await make_session()
+        buffer = HistoryRingBuffer(capacity=33)
+        await buffer.prime(session)
+        factory = sessionmaker(bind=session.bind, class_=AsyncSession)
+        handler = bulk_insert_handler(QueryHistory, factory, on_inserted=buffer.extend)
+        
+        await handler([
+            {"city_name": "Wuhan", "query_time": BASE_TIME + timedelta(hours=1), "ip_address": None},
+            {"city_name": "Wuhan", "query_time": BASE_TIME + timedelta(hours=2), "ip_address": None},
+        ])
+        
+        assert len(buffer) == 33
+        assert not buffer.complete
+        rows = buffer.recent(2)
+        assert [row["id"] for row in rows] == [34, 33]
+        assert rows[0]["city_name"] == "Wuhan"
+        await session.close()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库结构升级单元测试模块。
+测试在旧版本创建的数据库上补齐列、索引和唯一约束，回填观测时间，升级可重复执行，升级后可以正常写入观测，
+查询历史的过滤分页查询使用补齐的复合索引。
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import init_schema
+from app.services.observation_service import save_observations
+from tests.test_observation_service import make_observation
+
+# 初始版本（随项目提供的weather_data.db）的表结构
+LEGACY_SCHEMA = [
+    """CREATE TABLE cities (
+        id INTEGER NOT NULL, name VARCHAR NOT NULL, country VARCHAR NOT NULL,
+        latitude FLOAT NOT NULL, longitude FLOAT NOT NULL, PRIMARY KEY (id))""",
+    "CREATE INDEX ix_cities_id ON cities (id)",
+    "CREATE INDEX ix_cities_name ON cities (name)",
+    """CREATE TABLE query_history (
+        id INTEGER NOT NULL, city_name VARCHAR NOT NULL, query_time DATETIME NOT NULL,
+        ip_address VARCHAR, PRIMARY KEY (id))""",
+    "CREATE INDEX ix_query_history_id ON query_history (id)",
+    """CREATE TABLE weather_records (
+        id INTEGER NOT NULL, city_id INTEGER NOT NULL, query_time DATETIME NOT NULL,
+        temperature FLOAT NOT NULL, humidity FLOAT, pressure FLOAT, wind_speed FLOAT,
+        wind_direction FLOAT, weather_description VARCHAR, weather_icon VARCHAR, extra_data JSON,
+        PRIMARY KEY (id), FOREIGN KEY(city_id) REFERENCES cities (id))""",
+    "CREATE INDEX ix_weather_records_id ON weather_records (id)",
+]
+
+
+async def make_legacy_engine(tmp_path):
+    """
+    创建使用旧版本表结构的SQLite数据库，并写入一个城市和两条同一时间的旧观测记录。
+
+    Returns:
+        AsyncEngine: 数据库引擎
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    async with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            await conn.execute(text(statement))
+        await conn.execute(text(
+            "INSERT INTO cities (id, name, country, latitude, longitude) VALUES (1, 'Beijing', 'CN', 39.9, 116.4)"
+        ))
+        for record_id in (1, 2):
+            await conn.execute(text(
+                "INSERT INTO weather_records (id, city_id, query_time, temperature) "
+                "VALUES (:id, 1, '2025-04-01 08:00:00.000000', 20.0)"
+            ), {"id": record_id})
+    return engine
+
+
+class TestMigrations:
+    """数据库结构升级测试类。"""
+
+    @pytest.mark.asyncio
+    async def test_upgrade_legacy_database(self, tmp_path):
+        """测试补齐列和索引、回填观测时间，并且第二次执行不做任何修改。"""
+        engine = await make_legacy_engine(tmp_path)
+        applied = await init_schema(engine)
+        assert "添加列cities.external_id" in applied
+        assert "创建唯一索引uq_weather_records_city_observed" in applied
+        assert await init_schema(engine) == []
+
+        async with engine.connect() as conn:
+            columns = {row[1] for row in await conn.execute(text("PRAGMA table_info(weather_records)"))}
+            assert "observed_at" in columns
+            # 同一城市同一时间的两条旧记录只回填一条
+            rows = (await conn.execute(text("SELECT id, observed_at FROM weather_records ORDER BY id"))).all()
+            assert rows[0][1] is not None and rows[1][1] is None
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_save_observations_after_upgrade(self, tmp_path):
+        """测试升级后观测数据可以按城市外部ID和观测时间去重写入。"""
+        engine = await make_legacy_engine(tmp_path)
+        await init_schema(engine)
+        factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        observation = make_observation(1743494400, 21.5)
+        async with factory() as session:
+            await save_observations(session, [observation, observation])
+            await session.commit()
+        async with engine.connect() as conn:
+            count = (await conn.execute(text(
+                "SELECT COUNT(*) FROM weather_records r JOIN cities c ON c.id = r.city_id "
+                "WHERE c.external_id = 1816670 AND r.observed_at IS NOT NULL"
+            ))).scalar()
+            assert count == 1
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_query_history_indexes_after_upgrade(self, tmp_path):
+        """测试旧的query_history表补齐复合索引，过滤分页查询使用索引而非全表扫描。"""
+        engine = await make_legacy_engine(tmp_path)
+        applied = await init_schema(engine)
+        for name in ("ix_query_history_time_id", "ix_query_history_city_time_id", "ix_query_history_ip_time_id"):
+            assert f"创建索引{name}" in applied
+
+        async with engine.connect() as conn:
+            plan = await conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM query_history WHERE city_name = 'Beijing' "
+                "AND (query_time, id) < ('2025-04-01 12:10:00.000000', 5) "
+                "ORDER BY query_time DESC, id DESC LIMIT 21"
+            ))
+            detail = " ".join(str(row[-1]) for row in plan.all())
+        assert "ix_query_history_city_time_id" in detail
+        assert "TEMP B-TREE" not in detail
+        await engine.dispose()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+观测数据持久化服务单元测试模块。
+测试观测数据的转换、去重写入和时间范围查询。
+"""
+
+import copy
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import City, WeatherRecord
+from app.services.city_catalog import load_geonames
+from app.services.observation_service import (
+    observation_from_payload, save_observations, find_city, query_observations
+)
+from tests.test_api import MOCK_CURRENT_WEATHER
+from tests.test_city_catalog import GEONAMES_LINES
+
+
+async def make_session_factory():
+    """
+    创建基于内存SQLite的会话工厂。
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def make_observation(dt: int, temp: float) -> dict:
+    """
+    构造一条观测数据。
+
+    Args:
+        dt: 观测时间戳
+        temp: 温度
+
+    Returns:
+        dict: 观测字典
+    """
+    payload = copy.deepcopy(MOCK_CURRENT_WEATHER)
+    payload["dt"] = dt
+    payload["main"]["temp"] = temp
+    return observation_from_payload(payload)
+
+
+class TestObservationService:
+    """观测数据持久化服务测试类。"""
+    
+    def test_observation_from_payload(self):
+        """测试实时天气响应的转换。"""
+        obs = observation_from_payload(MOCK_CURRENT_WEATHER)
+        
+        assert obs["city"]["external_id"] == 1816670
+        assert obs["city"]["name"] == "Beijing"
+        assert obs["record"]["observed_at"] == datetime.utcfromtimestamp(1617260400)
+        assert obs["record"]["temperature"] == 25.5
+        assert obs["record"]["extra_data"]["feels_like"] == 26.0
+    
+    @pytest.mark.asyncio
+    async def test_save_deduplicates(self):
+        """测试同一城市同一观测时间只保存一条记录。"""
+        factory = await make_session_factory()
+        async with factory() as session:
+            await save_observations(session, [
+                make_observation(1617260400, 25.5),
+                make_observation(1617260400, 26.0),
+                make_observation(1617264000, 27.0),
+            ])
+            await save_observations(session, [make_observation(1617264000, 28.0)])
+            await session.commit()
+            
+            cities = (await session.execute(select(func.count(City.id)))).scalar()
+            records = (await session.execute(select(WeatherRecord))).scalars().all()
+        
+        assert cities == 1
+        assert sorted(r.temperature for r in records) == [25.5, 27.0]
+    
+    @pytest.mark.asyncio
+    async def test_find_city_and_query_range(self):
+        """测试按城市名查找并按时间范围查询。"""
+        factory = await make_session_factory()
+        async with factory() as session:
+            await save_observations(session, [
+                make_observation(1617260400 + i * 3600, 20.0 + i) for i in range(5)
+            ])
+            await session.commit()
+            
+            city = await find_city(session, "beijing,cn")
+            assert city is not None
+            assert await find_city(session, "Shanghai") is None
+            
+            records = await query_observations(
+                session, city.id,
+                start=datetime.utcfromtimestamp(1617260400 + 3600),
+                end=datetime.utcfromtimestamp(1617260400 + 4 * 3600),
+            )
+        
+        assert [r.temperature for r in records] == [21.0, 22.0, 23.0]
+
+    @pytest.mark.asyncio
+    async def test_save_keeps_catalog_city(self, tmp_path):
+        """测试保存观测时不覆盖城市目录中同一external_id城市的名称、国家和坐标。"""
+        path = tmp_path / "cities.txt"
+        path.write_text("".join(GEONAMES_LINES), encoding="utf-8")
+        factory = await make_session_factory()
+        await load_geonames(str(path), factory)
+
+        observation = make_observation(1617260400, 25.5)
+        observation["city"].update(name="北京", country="中国", latitude=39.91, longitude=116.4)
+        async with factory() as session:
+            await save_observations(session, [observation])
+            await session.commit()
+
+            city = (await session.execute(select(City).where(City.external_id == 1816670))).scalars().one()
+            records = (await session.execute(select(func.count(WeatherRecord.id)))).scalar()
+
+        assert (city.name, city.country, city.latitude) == ("Beijing", "CN", 39.9075)
+        assert city.ascii_name == "Beijing"
+        assert records == 1
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+原始数据归档单元测试模块。
+测试规范化JSON、字典压缩、按内容哈希去重写入、字典训练和按需解压读取。
+"""
+
+import copy
+import importlib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import RawPayload
+from app.services.payload_archive import (
+    PayloadArchive, canonical_json, compress, decompress, train_dictionary, payloads_handler,
+    list_payloads, load_payload, iter_payloads, CODEC_ZLIB, CODEC_ZSTD
+)
+from tests.test_api import MOCK_CURRENT_WEATHER
+
+# 服务包导出了同名的全局归档实例，这里取模块本身
+archive_module = importlib.import_module("app.services.payload_archive")
+
+
+CODECS = [CODEC_ZLIB, pytest.param(CODEC_ZSTD, marks=pytest.mark.skipif(
+    archive_module.zstandard is None, reason="未安装zstandard"))]
+
+
+def current_payload(i: int):
+    """构造第i个实时天气响应，温度、时间等字段随i变化。"""
+    payload = copy.deepcopy(MOCK_CURRENT_WEATHER)
+    payload["dt"] = 1700000000 + i * 600
+    payload["main"]["temp"] = round(-5 + (i * 7.3) % 40, 2)
+    payload["main"]["humidity"] = 20 + i % 80
+    payload["wind"]["deg"] = (i * 37) % 360
+    return payload
+
+
+async def make_session_factory():
+    """
+    创建基于内存SQLite的会话工厂。
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class TestPayloadArchive:
+    """原始数据归档测试类。"""
+
+    def test_canonical_json(self):
+        """测试键顺序不同的相同内容得到相同的字节串。"""
+        assert canonical_json({"b": 1, "a": "晴"}) == canonical_json({"a": "晴", "b": 1})
+        assert canonical_json({"a": "晴"}) == '{"a":"晴"}'.encode("utf-8")
+
+    @pytest.mark.parametrize("codec", CODECS)
+    def test_dictionary_compression(self, codec):
+        """测试训练的字典能显著提高小响应的压缩率，且可以无损解压。"""
+        samples = [canonical_json(current_payload(i)) for i in range(200)]
+        dictionary = train_dictionary(codec, samples, size=8192)
+        assert 0 < len(dictionary) <= 8192
+
+        data = canonical_json(current_payload(1000))
+        plain = compress(codec, data)
+        with_dict = compress(codec, data, dictionary)
+        assert decompress(codec, plain) == data
+        assert decompress(codec, with_dict, dictionary) == data
+        assert len(with_dict) < len(plain) / 2
+        assert len(with_dict) < len(data) / 4
+
+    def test_train_requires_samples(self):
+        """测试样本太少时不能训练字典。"""
+        with pytest.raises(ValueError):
+            train_dictionary(CODEC_ZLIB, [b"{}"] * 3)
+
+    @pytest.mark.asyncio
+    async def test_archive_dedup_and_read(self, monkeypatch):
+        """测试归档按内容去重，训练字典后新旧响应都能解压，列表只返回元数据。"""
+        factory = await make_session_factory()
+        archive = PayloadArchive(codec=CODEC_ZLIB)
+        monkeypatch.setattr(archive_module, "payload_archive", archive)
+        handler = payloads_handler(archive, factory)
+        start = datetime(2025, 4, 1)
+
+        events = [("current", current_payload(i), start + timedelta(minutes=i), 1816670)
+                  for i in range(30)]
+        # 重复内容（键顺序不同）只保存一份
+        reordered = dict(reversed(list(current_payload(0).items())))
+        await handler(events + [("current", reordered, start + timedelta(days=1), 1816670)])
+        await handler(events[:5])
+
+        async with factory() as session:
+            assert (await session.execute(select(func.count()).select_from(RawPayload))).scalar() == 30
+            dictionary_id = await archive.train(session, samples=30, size=4096)
+            await session.commit()
+
+        await handler([("current", current_payload(100), start + timedelta(hours=2), 1816670)])
+
+        async with factory() as session:
+            rows = await list_payloads(session, kind="current", limit=2)
+            assert [row["fetched_at"] for row in rows] == [start + timedelta(hours=2),
+                                                          start + timedelta(minutes=29)]
+            assert rows[0]["dictionary_id"] == dictionary_id
+            assert rows[1]["dictionary_id"] is None
+            assert rows[0]["stored_size"] < rows[0]["raw_size"] / 4
+            assert "data" not in rows[0]
+
+            payload = await load_payload(session, rows[0]["sha256"])
+            assert payload == current_payload(100)
+            assert await load_payload(session, "0" * 64) is None
+
+            # 清空字典缓存，验证从数据库读取字典解压
+            fresh = PayloadArchive(codec=CODEC_ZLIB)
+            monkeypatch.setattr(archive_module, "payload_archive", fresh)
+            replayed = [item async for item in iter_payloads(session, "current", chunk_size=7)]
+            assert len(replayed) == 31
+            assert replayed[0][1] == current_payload(0)
+            assert replayed[-1][1] == current_payload(100)
+            assert replayed[-1][0]["city_external_id"] == 1816670
+
+            # 重新加载后新响应使用最新的字典
+            assert await fresh.load(session) == dictionary_id
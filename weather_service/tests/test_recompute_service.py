@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+离线重新计算服务单元测试模块。
+测试观测派生指标，以及分块并行计算、断点续算和规则版本变更后的重新计算。
+"""
+
+import importlib
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import City, WeatherRecord, ForecastDailySummary, ObservationMetric
+from app.services.forecast_aggregation import aggregate_daily, daily_records
+from app.services.forecast_store import CompactForecast
+from app.services.payload_archive import PayloadArchive, payloads_handler, CODEC_ZLIB
+from app.services.recompute_service import RECOMPUTE_JOBS, run_job, get_checkpoint
+from app.utils.meteo import dew_point, feels_like
+from tests.test_forecast_store import make_forecast_payload
+
+archive_module = importlib.import_module("app.services.payload_archive")
+
+
+async def make_session_factory(path=None):
+    """
+    创建基于SQLite的会话工厂。
+
+    Args:
+        path: 数据库文件路径，默认使用内存数据库
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}" if path else "sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def archive_forecasts(factory, monkeypatch, count: int) -> None:
+    """归档count个起始时间不同的预报响应，并用前几个响应训练字典。"""
+    archive = PayloadArchive(codec=CODEC_ZLIB)
+    monkeypatch.setattr(archive_module, "payload_archive", archive)
+    handler = payloads_handler(archive, factory)
+    fetched = datetime(2021, 4, 1)
+    events = [("forecast", make_forecast_payload(start=1617260400 + i * 10800),
+               fetched + timedelta(hours=3 * i), 1816670) for i in range(count)]
+    await handler(events[:count // 2])
+    async with factory() as session:
+        await archive.train(session, samples=count // 2, size=4096)
+        await session.commit()
+    await handler(events[count // 2:])
+
+
+class TestRecomputeService:
+    """离线重新计算服务测试类。"""
+
+    def test_dew_point(self):
+        """测试露点温度计算，湿度为0时没有露点。"""
+        assert dew_point(20.0, 50.0) == pytest.approx(9.26, abs=0.02)
+        assert dew_point(15.0, 100.0) == pytest.approx(15.0, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_forecast_daily_resume(self, monkeypatch):
+        """测试分块计算预报每日汇总，中断后从断点继续，结果与一次算完一致。"""
+        factory = await make_session_factory()
+        await archive_forecasts(factory, monkeypatch, 24)
+        job = RECOMPUTE_JOBS["forecast_daily"]
+
+        class Interrupted(Exception):
+            pass
+
+        def interrupt(name, processed, total, elapsed):
+            assert total == 24
+            if processed >= 10:
+                raise Interrupted()
+
+        with pytest.raises(Interrupted):
+            await run_job(job, factory, workers=1, chunk_size=10, progress=interrupt)
+        async with factory() as session:
+            checkpoint = await get_checkpoint(session, "forecast_daily")
+            assert checkpoint.processed == 10
+
+        seen = []
+        result = await run_job(job, factory, workers=1, chunk_size=10,
+                               progress=lambda *args: seen.append(args[1:3]))
+        assert result["processed"] == 14
+        assert seen == [(20, 24), (24, 24)]
+
+        async with factory() as session:
+            rows = (await session.execute(
+                select(ForecastDailySummary).order_by(ForecastDailySummary.payload_id,
+                                                      ForecastDailySummary.date)
+            )).scalars().all()
+        # 各响应起始时间不同，覆盖的当地日期数与逐个聚合的结果一致
+        assert len(rows) == sum(
+            len(aggregate_daily(CompactForecast.from_payload(make_forecast_payload(start=1617260400 + i * 10800)))["date"])
+            for i in range(24)
+        )
+        assert len({(row.payload_id, row.date) for row in rows}) == len(rows)
+        expected = daily_records(aggregate_daily(CompactForecast.from_payload(make_forecast_payload())))
+        assert rows[0].date == date(2021, 4, 1)
+        assert rows[0].mean_temp == expected[0]["mean_temp"]
+        assert rows[0].city_external_id == 1816670
+
+    @pytest.mark.asyncio
+    async def test_observation_metrics_process_pool(self, tmp_path):
+        """测试使用进程池计算观测派生指标，规则版本变更后清空并从头计算。"""
+        factory = await make_session_factory(tmp_path / "recompute.db")
+        async with factory() as session:
+            city = City(external_id=1816670, name="Beijing", country="CN", latitude=39.9, longitude=116.4)
+            session.add(city)
+            await session.flush()
+            for i in range(50):
+                session.add(WeatherRecord(city_id=city.id, observed_at=datetime(2025, 4, 1) + timedelta(hours=i),
+                                          temperature=10.0 + i % 20, humidity=None if i == 0 else 30 + i,
+                                          wind_speed=2.0))
+            await session.commit()
+
+        job = RECOMPUTE_JOBS["observation_metrics"]
+        result = await run_job(job, factory, workers=2, chunk_size=8, progress=lambda *args: None)
+        assert result == {"processed": 50, "written": 50, "last_id": 50}
+
+        async with factory() as session:
+            metrics = (await session.execute(
+                select(ObservationMetric).order_by(ObservationMetric.record_id)
+            )).scalars().all()
+            assert len(metrics) == 50
+            assert metrics[0].dew_point is None
+            assert metrics[1].dew_point == round(float(dew_point(11.0, 31.0)), 2)
+            assert metrics[1].feels_like == round(float(feels_like(11.0, 31.0, 2.0)), 2)
+
+            # 已全部计算完成时再次执行不处理任何数据
+            assert (await run_job(job, factory, workers=1, progress=lambda *args: None))["processed"] == 0
+
+        monkeypatch = pytest.MonkeyPatch()
+        monkeypatch.setattr(job, "version", job.version + 1)
+        try:
+            result = await run_job(job, factory, workers=1, chunk_size=100, progress=lambda *args: None)
+        finally:
+            monkeypatch.undo()
+        assert result["processed"] == 50
+        async with factory() as session:
+            count = await session.execute(select(func.count()).select_from(ObservationMetric))
+            assert count.scalar() == 50
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+图表渲染进程池单元测试模块。
+测试图表在渲染进程中生成，以及任务数上限和超时。
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.render_pool import RenderPool, RenderQueueFull, RenderTimeout
+
+
+FORECAST_DAILY = [
+    {"date": f"2025-04-0{day}", "max_temp": 20.0 + day, "min_temp": 10.0 + day, "humidity": 50.0 + day}
+    for day in range(1, 6)
+]
+
+
+class TestRenderPool:
+    """渲染进程池测试类。"""
+
+    @pytest.mark.asyncio
+    async def test_render_limits_and_timeout(self):
+        """测试两种图表在进程中生成PNG，超时的任务继续占用名额直到完成，名额用完时拒绝新任务。"""
+        pool = RenderPool(workers=1, max_queue=2, timeout=60)
+        try:
+            for kind in ("temperature", "dashboard"):
+                image = await pool.render(kind, FORECAST_DAILY, "北京")
+                assert image.startswith(b"\x89PNG")
+            with pytest.raises(ValueError):
+                await pool.render("radar", FORECAST_DAILY, "北京")
+
+            pool.timeout = 0.2
+            with pytest.raises(RenderTimeout):
+                await pool.submit(time.sleep, 1)
+            # 超时的任务仍在进程中执行，占用一个名额
+            assert pool.pending == 1
+            pool.timeout = 60
+            queued = asyncio.ensure_future(pool.submit(time.sleep, 0))
+            await asyncio.sleep(0)
+            with pytest.raises(RenderQueueFull):
+                await pool.submit(time.sleep, 0)
+            assert pool.stats["rejected"] == 1 and pool.stats["timeouts"] == 1
+
+            await queued
+            await asyncio.sleep(0.05)
+            assert pool.pending == 0
+            assert pool.stats["completed"] == 3
+        finally:
+            pool.stop()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据保留服务单元测试模块。
+测试小时、天汇总的计算，增量汇总进度，迟到数据的重新汇总，以及原始数据和小时汇总的分批清理和查询历史缓冲区的同步移除。
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import (
+    City, WeatherRecord, QueryHistory, QueryHistoryRollup, WeatherRecordRollup
+)
+from app.services.history_service import HistoryRingBuffer
+from app.services.retention_service import run_retention, get_watermark
+
+
+NOW = datetime(2025, 4, 10, 12, 30, 0)
+
+
+async def make_session_factory():
+    """
+    创建基于内存SQLite的会话工厂。
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def add_history(factory, start: datetime, hours: int, per_hour: int, city: str = "Beijing"):
+    """
+    每小时写入per_hour条查询历史。
+
+    Args:
+        factory: 会话工厂
+        start: 起始时间
+        hours: 小时数
+        per_hour: 每小时记录数
+        city: 城市名称
+    """
+    async with factory() as session:
+        for h in range(hours):
+            for i in range(per_hour):
+                session.add(QueryHistory(
+                    city_name=city,
+                    query_time=start + timedelta(hours=h, minutes=i),
+                    ip_address="127.0.0.1",
+                ))
+        await session.commit()
+
+
+async def count(factory, model, *criteria) -> int:
+    """统计满足条件的行数。"""
+    async with factory() as session:
+        result = await session.execute(select(func.count()).select_from(model).where(*criteria))
+        return result.scalar()
+
+
+class TestRetentionService:
+    """数据保留服务测试类。"""
+
+    @pytest.mark.asyncio
+    async def test_history_rollups(self):
+        """测试查询历史按小时、按天汇总，未完成的小时不参与汇总。"""
+        factory = await make_session_factory()
+        # 4月9日22点到4月10日12点，共15个小时，每小时3条
+        await add_history(factory, datetime(2025, 4, 9, 22), hours=15, per_hour=3)
+
+        report = await run_retention(factory, now=NOW, retention_days={"query_history": 0})
+
+        assert report["query_history"]["rolled_up"] == 14
+        assert report["query_history"]["watermark"] == datetime(2025, 4, 10, 12)
+        assert report["query_history"]["purged"] == 0
+        async with factory() as session:
+            result = await session.execute(
+                select(QueryHistoryRollup.bucket_start, QueryHistoryRollup.query_count)
+                .where(QueryHistoryRollup.granularity == "day")
+                .order_by(QueryHistoryRollup.bucket_start)
+            )
+            assert result.all() == [
+                (datetime(2025, 4, 9), 6),
+                (datetime(2025, 4, 10), 36),
+            ]
+
+    @pytest.mark.asyncio
+    async def test_incremental_rollup_updates_day(self):
+        """测试增量汇总：新的小时计入已存在的天汇总，已汇总的小时不重复计算。"""
+        factory = await make_session_factory()
+        await add_history(factory, datetime(2025, 4, 10, 8), hours=5, per_hour=2)
+        await run_retention(factory, now=NOW, retention_days={"query_history": 0})
+
+        await add_history(factory, datetime(2025, 4, 10, 13), hours=2, per_hour=2)
+        report = await run_retention(factory, now=NOW + timedelta(hours=3),
+                                     retention_days={"query_history": 0})
+
+        # 第一次运行时未完成的12点，以及新增的13、14点
+        assert report["query_history"]["rolled_up"] == 3
+        async with factory() as session:
+            day = await session.execute(
+                select(QueryHistoryRollup.query_count)
+                .where(QueryHistoryRollup.granularity == "day")
+            )
+            assert day.scalars().all() == [14]
+            assert await get_watermark(session, "query_history") == datetime(2025, 4, 10, 15)
+
+    @pytest.mark.asyncio
+    async def test_late_observations_rolled_up_before_purge(self):
+        """测试汇总后才写入、观测时间早于汇总进度的迟到数据被重新汇总，之后才会被清理。"""
+        factory = await make_session_factory()
+
+        async def add_observations(*times: datetime) -> None:
+            async with factory() as session:
+                session.add_all([
+                    WeatherRecord(city_id=1, observed_at=observed_at, temperature=20.0) for observed_at in times
+                ])
+                await session.commit()
+
+        async with factory() as session:
+            session.add(City(id=1, name="Beijing", country="CN", latitude=39.9, longitude=116.4))
+            await session.commit()
+        await add_observations(datetime(2025, 4, 1, 10), datetime(2025, 4, 1, 10, 20))
+        await run_retention(factory, now=NOW, retention_days={"weather_records": 0})
+
+        # 12:30之前汇总进度已到12点，11:50和4月1日10:40的观测之后才写入
+        await add_observations(datetime(2025, 4, 10, 11, 50), datetime(2025, 4, 1, 10, 40))
+        report = await run_retention(factory, now=NOW + timedelta(minutes=20),
+                                     retention_days={"weather_records": 5}, pause=0)
+
+        assert report["weather_records"]["rolled_up"] == 2
+        # 4月1日的3条观测全部计入汇总后才清理，4月10日的观测在保留期内
+        assert report["weather_records"]["purged"] == 3
+        assert await count(factory, WeatherRecord) == 1
+        async with factory() as session:
+            result = await session.execute(
+                select(WeatherRecordRollup.granularity, WeatherRecordRollup.bucket_start,
+                       WeatherRecordRollup.sample_count)
+                .order_by(WeatherRecordRollup.granularity, WeatherRecordRollup.bucket_start)
+            )
+            assert result.all() == [
+                ("day", datetime(2025, 4, 1), 3),
+                ("day", datetime(2025, 4, 10), 1),
+                ("hour", datetime(2025, 4, 1, 10), 3),
+                ("hour", datetime(2025, 4, 10, 11), 1),
+            ]
+
+    @pytest.mark.asyncio
+    async def test_late_observations_behind_purged_data(self):
+        """测试所在小时的原始数据或当日小时汇总已被清理的迟到数据不重新汇总，原有的小时和天汇总保持不变。"""
+        factory = await make_session_factory()
+
+        async def add_observations(*times: datetime) -> None:
+            async with factory() as session:
+                session.add_all([
+                    WeatherRecord(city_id=1, observed_at=observed_at, temperature=20.0) for observed_at in times
+                ])
+                await session.commit()
+
+        async def rollups(*criteria):
+            async with factory() as session:
+                result = await session.execute(
+                    select(WeatherRecordRollup.granularity, WeatherRecordRollup.bucket_start,
+                           WeatherRecordRollup.sample_count)
+                    .where(*criteria)
+                    .order_by(WeatherRecordRollup.granularity, WeatherRecordRollup.bucket_start)
+                )
+                return result.all()
+
+        async with factory() as session:
+            session.add(City(id=1, name="Beijing", country="CN", latitude=39.9, longitude=116.4))
+            await session.commit()
+        # 4月1日的原始数据在汇总后被清理，4月2日的原始数据保留但小时汇总被清理
+        await add_observations(datetime(2025, 4, 1, 10), datetime(2025, 4, 1, 10, 20),
+                               datetime(2025, 4, 2, 10), datetime(2025, 4, 2, 11), datetime(2025, 4, 2, 12))
+        await run_retention(factory, now=NOW, hourly_days=8, pause=0, retention_days={"weather_records": 9})
+        assert await count(factory, WeatherRecord) == 3
+        expected = [("day", datetime(2025, 4, 1), 2), ("day", datetime(2025, 4, 2), 3)]
+        assert await rollups() == expected
+
+        await add_observations(datetime(2025, 4, 1, 10, 40), datetime(2025, 4, 2, 10, 40))
+        report = await run_retention(factory, now=NOW + timedelta(minutes=20), hourly_days=8, pause=0,
+                                     retention_days={"weather_records": 9})
+
+        assert report["weather_records"]["rolled_up"] == 0
+        assert await rollups() == expected
+
+    @pytest.mark.asyncio
+    async def test_purge_only_rolled_up_history(self):
+        """测试分批清理已汇总的过期原始数据，汇总数据保留。"""
+        factory = await make_session_factory()
+        await add_history(factory, datetime(2025, 4, 1), hours=24, per_hour=5)
+
+        report = await run_retention(factory, now=NOW, retention_days={"query_history": 5},
+                                     batch_size=7, pause=0)
+
+        # 4月5日12:30之前的记录全部清理，汇总数据保留
+        assert report["query_history"]["purged"] == 120
+        assert await count(factory, QueryHistory) == 0
+        assert await count(factory, QueryHistoryRollup,
+                           QueryHistoryRollup.granularity == "hour") == 24
+
+    @pytest.mark.asyncio
+    async def test_purge_evicts_history_buffer(self, monkeypatch):
+        """测试清理查询历史后，内存缓冲区不再返回已清理的记录，剩余记录可以不访问数据库返回。"""
+        factory = await make_session_factory()
+        await add_history(factory, datetime(2025, 4, 1), hours=24, per_hour=5)
+        await add_history(factory, datetime(2025, 4, 9), hours=2, per_hour=5, city="Shanghai")
+        buffer = HistoryRingBuffer(capacity=15)
+        async with factory() as session:
+            await buffer.prime(session)
+        monkeypatch.setattr("app.services.retention_service.history_buffer", buffer)
+
+        await run_retention(factory, now=NOW, retention_days={"query_history": 5}, pause=0)
+
+        rows = buffer.recent(limit=100)
+        assert len(rows) == 10
+        assert {row["city_name"] for row in rows} == {"Shanghai"}
+        assert buffer.complete
+
+    @pytest.mark.asyncio
+    async def test_hourly_rollups_purged(self):
+        """测试超过保留期限的小时汇总被清理，天汇总保留。"""
+        factory = await make_session_factory()
+        await add_history(factory, datetime(2025, 4, 1), hours=48, per_hour=1)
+
+        await run_retention(factory, now=NOW, retention_days={"query_history": 0},
+                            hourly_days=9, pause=0)
+
+        # 小时汇总只保留4月1日12:30之后的
+        assert await count(factory, QueryHistoryRollup,
+                           QueryHistoryRollup.granularity == "hour") == 35
+        assert await count(factory, QueryHistoryRollup,
+                           QueryHistoryRollup.granularity == "day") == 2
+
+    @pytest.mark.asyncio
+    async def test_observation_rollups(self):
+        """测试观测数据汇总的平均值、最值和按样本数加权的天平均。"""
+        factory = await make_session_factory()
+        async with factory() as session:
+            city = City(name="Beijing", country="CN", latitude=39.9, longitude=116.4)
+            session.add(city)
+            await session.flush()
+            temps = {datetime(2025, 4, 9, 10): [10.0, 20.0, 30.0],
+                     datetime(2025, 4, 9, 11): [40.0]}
+            for hour, values in temps.items():
+                for i, temp in enumerate(values):
+                    session.add(WeatherRecord(
+                        city_id=city.id,
+                        observed_at=hour + timedelta(minutes=10 * i),
+                        temperature=temp,
+                        wind_speed=temp / 10,
+                    ))
+            await session.commit()
+
+        report = await run_retention(factory, now=NOW, retention_days={"weather_records": 0})
+
+        assert report["weather_records"]["rolled_up"] == 2
+        async with factory() as session:
+            result = await session.execute(
+                select(WeatherRecordRollup).where(WeatherRecordRollup.granularity == "day")
+            )
+            day = result.scalars().one()
+        assert day.sample_count == 4
+        assert day.temperature_avg == pytest.approx(25.0)
+        assert day.temperature_min == 10.0
+        assert day.temperature_max == 40.0
+        assert day.wind_speed_max == 4.0
+        assert day.humidity_avg is None
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+空间索引单元测试模块。
+测试KD树的最近邻和半径查询结果与逐点计算haversine距离一致，包括两极和180度经线附近。
+"""
+
+import numpy as np
+import pytest
+
+from app.services.spatial_index import SpatialIndex, EARTH_RADIUS_KM
+
+
+def haversine_km(lat, lon, latitudes, longitudes) -> np.ndarray:
+    """逐点计算haversine距离（千米）。"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat, lon, latitudes, longitudes))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class TestSpatialIndex:
+    """空间索引测试类。"""
+
+    @pytest.fixture(scope="class")
+    def points(self):
+        """球面上均匀分布的随机点。"""
+        rng = np.random.default_rng(7)
+        latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, 5000)))
+        longitudes = rng.uniform(-180, 180, 5000)
+        return latitudes, longitudes, SpatialIndex(latitudes, longitudes)
+
+    @pytest.mark.parametrize("lat,lon", [(39.9, 116.4), (-33.9, 151.2), (89.9, 10.0), (0.0, 179.99), (10.0, -179.9)])
+    def test_nearest_matches_brute_force(self, points, lat, lon):
+        """测试最近邻查询与逐点计算一致。"""
+        latitudes, longitudes, index = points
+        distances = haversine_km(lat, lon, latitudes, longitudes)
+        expected = np.argsort(distances)[:8]
+
+        result = index.nearest(lat, lon, k=8)
+        assert [i for i, _ in result] == expected.tolist()
+        assert [d for _, d in result] == pytest.approx(distances[expected].tolist(), abs=1e-6)
+
+    @pytest.mark.parametrize("radius", [0, 50, 500, 3000])
+    def test_within_matches_brute_force(self, points, radius):
+        """测试半径查询与逐点计算一致，结果按距离升序。"""
+        latitudes, longitudes, index = points
+        distances = haversine_km(0.0, 179.5, latitudes, longitudes)
+
+        result = index.within(0.0, 179.5, radius)
+        assert sorted(i for i, _ in result) == sorted(np.flatnonzero(distances <= radius).tolist())
+        assert [d for _, d in result] == sorted(d for _, d in result)
+
+    def test_small_and_empty(self):
+        """测试空索引和点数少于叶子大小的索引。"""
+        assert SpatialIndex([], []).nearest(0, 0, 3) == []
+        assert SpatialIndex([], []).within(0, 0, 100) == []
+        index = SpatialIndex([0.0, 0.0], [0.0, 1.0])
+        assert [i for i, _ in index.nearest(0, 0.9, 5)] == [1, 0]
+        assert index.nearest(0, 0, 1)[0][1] == pytest.approx(0.0, abs=1e-6)
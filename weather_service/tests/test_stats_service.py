@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+历史统计服务单元测试模块。
+测试指标的整体统计、日统计、滑动平均和度日数，以及从数据库读取观测数组和结果缓存。
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import City, WeatherRecord
+from app.services.cache_service import cache
+from app.services.stats_service import (
+    compute_statistics, observation_statistics, parse_metrics, parse_percentiles
+)
+
+
+async def make_session_factory():
+    """
+    创建基于内存SQLite的会话工厂。
+
+    Returns:
+        sessionmaker: 异步会话工厂
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class TestStatsService:
+    """历史统计服务测试类。"""
+
+    def test_compute_statistics(self):
+        """测试整体统计与numpy一致，缺失值不参与计算，滑动窗口跳过没有数据的日期。"""
+        # 1日、2日、4日各4次观测，3日没有数据
+        observed_at = np.array(["2025-01-01T00", "2025-01-01T06", "2025-01-01T12", "2025-01-01T18",
+                                "2025-01-02T00", "2025-01-02T06", "2025-01-02T12", "2025-01-02T18",
+                                "2025-01-04T00", "2025-01-04T06", "2025-01-04T12", "2025-01-04T18"],
+                               dtype="datetime64[s]")
+        temperature = np.array([10, 12, 14, 16, 20, 22, 24, 26, 0, 2, 4, 6], dtype=np.float64)
+        humidity = np.full(12, np.nan)
+        humidity[:2] = [40, 60]
+
+        result = compute_statistics(observed_at, {"temperature": temperature, "humidity": humidity},
+                                    percentiles=[50, 90], rolling_days=2, base_temperature=18)
+        assert result["count"] == 12
+
+        stats = result["metrics"]["temperature"]
+        assert stats["count"] == 12
+        assert stats["min"] == 0 and stats["max"] == 26
+        assert stats["mean"] == pytest.approx(temperature.mean(), abs=0.01)
+        assert stats["std"] == pytest.approx(temperature.std(ddof=1), abs=0.01)
+        assert stats["percentiles"] == {"p50": 13.0, "p90": pytest.approx(np.percentile(temperature, 90), abs=0.01)}
+
+        daily = stats["daily"]
+        assert [day["date"] for day in daily] == ["2025-01-01", "2025-01-02", "2025-01-04"]
+        assert [day["mean"] for day in daily] == [13.0, 23.0, 3.0]
+        assert daily[1]["min"] == 20 and daily[1]["max"] == 26
+        # 2日的窗口为1日和2日，4日的窗口为3日和4日（3日没有数据）
+        assert [day["rolling_mean"] for day in daily] == [13.0, 18.0, 3.0]
+
+        # 日平均气温13、23、3度，基础温度18度
+        assert result["degree_days"] == {"base": 18, "heating": 20.0, "cooling": 5.0, "days": 3}
+
+        humidity_stats = result["metrics"]["humidity"]
+        assert humidity_stats["count"] == 2
+        assert humidity_stats["mean"] == 50.0
+        assert [day["date"] for day in humidity_stats["daily"]] == ["2025-01-01"]
+
+    def test_parse_arguments(self):
+        """测试指标和分位数参数解析。"""
+        assert parse_metrics(None) == ["temperature", "humidity", "pressure", "wind_speed"]
+        assert parse_metrics("wind_speed, temperature,wind_speed") == ["wind_speed", "temperature"]
+        assert parse_percentiles("90,5") == [5.0, 90.0]
+        with pytest.raises(ValueError):
+            parse_metrics("visibility")
+        with pytest.raises(ValueError):
+            parse_percentiles("101")
+        with pytest.raises(ValueError):
+            parse_percentiles("abc")
+
+    @pytest.mark.asyncio
+    async def test_observation_statistics(self):
+        """测试从数据库读取时间范围内的观测，结果按城市、时间范围和指标缓存。"""
+        cache.invalidate(namespace="stats")
+        factory = await make_session_factory()
+        start = datetime(2025, 4, 1)
+        async with factory() as session:
+            city = City(external_id=1816670, name="Beijing", country="CN", latitude=39.9, longitude=116.4)
+            session.add(city)
+            await session.flush()
+            for hour in range(72):
+                session.add(WeatherRecord(city_id=city.id, observed_at=start + timedelta(hours=hour),
+                                          temperature=float(hour), pressure=None if hour % 2 else 1000.0))
+            await session.commit()
+            city_id = city.id
+
+        async with factory() as session:
+            result = await observation_statistics(session, city_id, ["temperature", "pressure"],
+                                                  start=start + timedelta(days=1), end=start + timedelta(days=2))
+            assert result["count"] == 24
+            assert result["metrics"]["temperature"]["min"] == 24
+            assert result["metrics"]["temperature"]["max"] == 47
+            assert result["metrics"]["pressure"]["count"] == 12
+            assert result["degree_days"]["days"] == 1
+
+            # 相同参数命中缓存，不同指标重新计算
+            session.add(WeatherRecord(city_id=city_id, observed_at=start + timedelta(days=1, minutes=30),
+                                      temperature=-10.0))
+            await session.commit()
+            cached_result = await observation_statistics(session, city_id, ["temperature", "pressure"],
+                                                         start=start + timedelta(days=1),
+                                                         end=start + timedelta(days=2))
+            assert cached_result is result
+            fresh = await observation_statistics(session, city_id, ["temperature"],
+                                                 start=start + timedelta(days=1), end=start + timedelta(days=2))
+            assert fresh["metrics"]["temperature"]["min"] == -10
+            assert "pressure" not in fresh["metrics"]
+        cache.invalidate(namespace="stats")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+热门城市统计单元测试模块。
+测试Space-Saving、Count-Min、滑动窗口和从查询历史重建。
+"""
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import QueryHistory
+from app.services.trending_service import (
+    SpaceSaving, CountMinSketch, SlidingTopK, TrendingTracker
+)
+
+
+NOW = datetime(2025, 4, 1, 12, 30, 15)
+
+
+class TestTrendingService:
+    """热门城市统计测试类。"""
+    
+    def test_space_saving_keeps_heavy_hitters(self):
+        """测试Space-Saving在计数器不足时仍保留高频项。"""
+        summary = SpaceSaving(capacity=10)
+        stream = ["Beijing"] * 300 + ["Shanghai"] * 200 + [f"city{i}" for i in range(500)]
+        random.Random(0).shuffle(stream)
+        for key in stream:
+            summary.add(key)
+        
+        assert len(summary.counts) == 10
+        assert {"Beijing", "Shanghai"} <= set(summary.counts)
+        assert summary.counts["Beijing"] >= 300
+    
+    def test_count_min_never_underestimates(self):
+        """测试Count-Min估计值不低于真实次数。"""
+        sketch = CountMinSketch(width=64, depth=4)
+        truth = Counter()
+        rng = random.Random(1)
+        for _ in range(2000):
+            key = f"city{rng.randint(0, 300)}"
+            sketch.add(key)
+            truth[key] += 1
+        
+        for key, count in truth.items():
+            assert CountMinSketch.estimate(sketch.table, key) >= count
+    
+    def test_sliding_window_expires_buckets(self):
+        """测试过期时间桶不计入窗口，同一位置的新桶会覆盖旧桶。"""
+        window = SlidingTopK(timedelta(hours=1), timedelta(minutes=1), capacity=5, width=256)
+        window.add("Beijing", NOW - timedelta(minutes=90), 50)
+        window.add("Shanghai", NOW - timedelta(minutes=30), 3)
+        window.add("Beijing", NOW, 2)
+        window.add("Guangzhou", NOW - timedelta(minutes=59), 1)
+        
+        result = window.top(10, NOW)
+        assert result["total"] == 6
+        assert result["cities"] == [
+            {"city": "Shanghai", "count": 3},
+            {"city": "Beijing", "count": 2},
+            {"city": "Guangzhou", "count": 1},
+        ]
+        assert result["start"] == datetime(2025, 4, 1, 11, 31)
+        assert result["end"] == datetime(2025, 4, 1, 12, 31)
+        
+        # 一小时后原来的桶全部过期
+        assert window.top(10, NOW + timedelta(hours=1))["total"] == 0
+    
+    def test_tracker_windows(self):
+        """测试小时和天窗口分别统计，未知窗口抛出异常。"""
+        tracker = TrendingTracker()
+        tracker.record("Beijing", NOW - timedelta(hours=3), count=5)
+        tracker.record("Shanghai", NOW, count=2)
+        
+        assert [c["city"] for c in tracker.top("hour", now=NOW)["cities"]] == ["Shanghai"]
+        day = tracker.top("day", now=NOW)
+        assert day["total"] == 7
+        assert day["cities"][0] == {"city": "Beijing", "count": 5}
+        with pytest.raises(ValueError):
+            tracker.top("week")
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_from_history(self):
+        """测试从查询历史重建统计。"""
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session = sessionmaker(bind=engine, class_=AsyncSession)()
+        offsets = [5, 10, 20, 30, 90, 120, 600, 2000]
+        for i, minutes in enumerate(offsets):
+            session.add(QueryHistory(
+                city_name="Beijing" if i % 2 else "Wuhan",
+                query_time=NOW - timedelta(minutes=minutes),
+            ))
+        await session.commit()
+        
+        tracker = TrendingTracker()
+        assert await tracker.rebuild(session, now=NOW) == 7
+        
+        hour = tracker.top("hour", now=NOW)
+        assert hour["total"] == 4
+        assert hour["cities"] == [
+            {"city": "Beijing", "count": 2},
+            {"city": "Wuhan", "count": 2},
+        ]
+        assert tracker.top("day", now=NOW)["total"] == 7
+        await session.close()
+    
+    def test_trending_api(self, client):
+        """
+        测试热门城市API。
+        
+        Args:
+            client: 测试客户端
+        """
+        response = client.get("/weather/trending?window=day&k=5")
+        assert response.status_code == 200
+        assert response.json()["window"] == "day"
+        
+        response = client.get("/weather/trending?window=week")
+        assert response.status_code == 400
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据可视化服务单元测试模块。
+测试图像格式协商、ETag条件请求匹配、各格式的图表编码，以及图形模板的复用。
+"""
+
+import base64
+
+import pytest
+
+from app.services.visualization_service import (
+    VisualizationService, chart_template, negotiate_image_format, etag_matches
+)
+from tests.test_render_pool import FORECAST_DAILY
+
+
+class TestVisualizationService:
+    """数据可视化服务测试类。"""
+
+    def test_negotiate_image_format(self):
+        """测试format参数优先，Accept按q值、具体程度和顺序选择，没有可接受的类型时为None。"""
+        assert negotiate_image_format("SVG", "image/png") == "svg"
+        with pytest.raises(ValueError):
+            negotiate_image_format("gif", None)
+
+        assert negotiate_image_format(None, None) == "png"
+        assert negotiate_image_format(None, "*/*") == "png"
+        # 浏览器请求图片时的Accept
+        assert negotiate_image_format(None, "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8") == "webp"
+        assert negotiate_image_format(None, "image/png;q=0.5, image/svg+xml;q=0.9") == "svg"
+        # 具体类型的q值优先于通配符
+        assert negotiate_image_format(None, "image/*, image/png;q=0") == "webp"
+        assert negotiate_image_format(None, "application/json") is None
+
+    def test_etag_matches(self):
+        """测试If-None-Match的逗号列表、弱验证器和“*”。"""
+        etag = '"abc"'
+        assert etag_matches('"abc"', etag)
+        assert etag_matches('"xyz", W/"abc"', etag)
+        assert etag_matches(' "xyz" ,"abc" ', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"abcd", "xyz"', etag)
+        assert not etag_matches("abc", etag)
+        assert not etag_matches(None, etag)
+        assert not etag_matches("", etag)
+
+    def test_render_formats(self):
+        """测试各格式的图像数据，以及Base64形式与PNG数据一致。"""
+        chart = VisualizationService.render_temperature_chart(FORECAST_DAILY, "北京", "png")
+        assert chart.startswith(b"\x89PNG")
+        assert VisualizationService.render_weather_dashboard(FORECAST_DAILY, "北京", "webp")[8:12] == b"WEBP"
+        assert b"<svg" in VisualizationService.render_weather_dashboard(FORECAST_DAILY, "北京", "svg")
+        encoded = VisualizationService.generate_temperature_chart(FORECAST_DAILY, "北京")
+        assert base64.b64decode(encoded).startswith(b"\x89PNG")
+
+    def test_templates_reused(self):
+        """测试每次渲染复用同一个图形，且渲染结果不受上一次渲染的数据影响。"""
+        cold = [
+            {"date": f"2025-01-1{day}", "max_temp": -2.0 + day, "min_temp": -9.0 + day, "humidity": 80.0}
+            for day in range(1, 3)
+        ]
+        for kind, render in (("temperature", VisualizationService.render_temperature_chart),
+                             ("dashboard", VisualizationService.render_weather_dashboard)):
+            first = render(FORECAST_DAILY, "北京", "svg")
+            figure = chart_template(kind).fig
+            render(cold, "哈尔滨", "svg")
+            assert render(FORECAST_DAILY, "北京", "svg") == first
+            assert chart_template(kind).fig is figure
+
+        dashboard = chart_template("dashboard")
+        VisualizationService.dashboard_figure(cold, "哈尔滨")
+        assert [bar.get_visible() for bar in dashboard.bars] == [True, True, False, False, False]
+        # 平均温度低于10°C时只显示“寒冷”分级的饼图
+        visible = [any(artist.get_visible() for artist in pie) for pie in dashboard.pies]
+        assert visible == [True, False, False, False]